@@ -0,0 +1,268 @@
+"""
+Este script se empleará para medir cuánto cambian el tamaño de las tablas de MySQL y la velocidad de los recorridos de Review con el
+esquema compacto (COLUMNAS_TABLAS_SQL_COMPACTO de load_data.py) respecto al esquema normal.
+
+Los datos de la base de datos cargada (NOMBRE_BASE_DATOS_SQL, o la de --origen) se copian en dos bases de datos auxiliares,
+"<origen>_estandar" y "<origen>_compacto", creadas con create_tables_sql y con los mismos índices (los de las tablas y los de
+INDICES_CONSULTAS_SQL). En cada una se mide:
+
+    - las filas, los bytes de datos y de índices de cada tabla y los bytes por fila (information_schema.TABLES, después de
+      ANALYZE TABLE, así que son estimaciones de InnoDB).
+    - el tiempo de cada consulta de CONSULTAS_RECORRIDO_ESQUEMA, que recorren Review entera o uno de sus índices. Cada consulta se
+      ejecuta una vez para calentar el buffer pool y después REPETICIONES_BENCHMARK_ESQUEMA veces, y se guarda el mejor tiempo.
+
+La base de datos de origen no se modifica. Las auxiliares se borran al terminar (salvo con --conservar), y el resultado se añade como
+una línea JSON a RUTA_RESULTADOS_BENCHMARK_ESQUEMA.
+
+Ejemplo:
+                python src/benchmark_esquema.py
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+import argparse
+import time
+from datetime import datetime
+from pymysql.connections import Connection
+from pymysql.cursors import Cursor
+from load_data import conectar_mysql, create_tables_sql, columnas_insercion_sql, COLUMNAS_TABLAS_SQL
+from indices_sql import crear_indices_consultas_sql
+from benchmark_ingesta import guardar_resultado, version_codigo
+
+############################################################################################################################################
+
+# Variantes del esquema que se comparan: nombre -> si es el esquema compacto
+VARIANTES_ESQUEMA = {"estandar": False, "compacto": True}
+
+# Consultas que recorren Review entera (o uno de sus índices): (descripción, consulta)
+CONSULTAS_RECORRIDO_ESQUEMA = [
+
+    ("recorrido completo de Review", "SELECT COUNT(*), SUM(overall), MAX(reviewTime) FROM Review;"),
+    ("puntuación media de cada producto", "SELECT id_producto, AVG(overall) FROM Review GROUP BY id_producto;"),
+    ("reviews de cada mes", "SELECT anio, anio_mes, COUNT(*) FROM Review GROUP BY anio, anio_mes;")
+]
+
+############################################################################################################################################
+
+# PREPARACIÓN DE LAS BASES DE DATOS AUXILIARES
+def copiar_base_datos(conexion:Connection, origen:str, destino:str, compacto:bool)-> None:
+    """
+
+    Crea la base de datos destino con el esquema indicado y copia en ella todas las filas de la base de datos origen, con los índices
+    de las consultas ya creados.
+
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL.
+        origen (str): base de datos de la que se copian las filas.
+        destino (str): base de datos auxiliar (se borra si ya existe).
+        compacto (bool): si es True, el destino se crea con el esquema compacto.
+
+    Returns:
+        None
+
+    """
+    cursor = conexion.cursor()
+
+    cursor.execute(f"DROP DATABASE IF EXISTS {destino};")
+    cursor.execute(f"CREATE DATABASE {destino};")
+    conexion.select_db(destino)
+
+    create_tables_sql(conexion, compacto=compacto)
+
+    # Las tablas se copian en el orden de creación, así que las filas a las que apuntan las claves foráneas ya están en el destino.
+    # Las columnas generadas se calculan de nuevo en el destino (en el origen pueden ser normales o virtuales)
+    for tabla in COLUMNAS_TABLAS_SQL:
+
+        columnas = ", ".join(columnas_insercion_sql(tabla=tabla, compacto=compacto))
+
+        inicio = time.perf_counter()
+        n_filas = cursor.execute(f"INSERT INTO {destino}.{tabla} ({columnas}) SELECT {columnas} FROM {origen}.{tabla};")
+        conexion.commit()
+
+        print(f"\n{n_filas:,} filas de \"{tabla}\" copiadas en \"{destino}\" en {time.perf_counter() - inicio:.2f} s.")
+
+    cursor.close()
+
+    crear_indices_consultas_sql(conexion=conexion, verificar=False)
+
+# MEDICIONES
+def medir_tamano_tablas(cursor:Cursor, base_datos:str)-> dict:
+    """
+
+    Mide las filas y los bytes de datos y de índices de cada tabla de una base de datos, con las estadísticas de InnoDB recién
+    actualizadas.
+
+    Args:
+        cursor (pymysql.cursors.Cursor): cursor de la conexión a MySQL.
+        base_datos (str): base de datos que se mide.
+
+    Returns:
+        dict: tabla -> {"filas", "bytes_datos", "bytes_indices", "bytes_por_fila"}.
+
+    """
+    cursor.execute(f"ANALYZE TABLE {', '.join(f'{base_datos}.{tabla}' for tabla in COLUMNAS_TABLAS_SQL)};")
+    cursor.fetchall()
+
+    cursor.execute("""
+        SELECT TABLE_NAME, TABLE_ROWS, DATA_LENGTH, INDEX_LENGTH
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = %s;
+    """, [base_datos])
+
+    tamanos = {}
+
+    for tabla, filas, bytes_datos, bytes_indices in cursor.fetchall():
+        if tabla in COLUMNAS_TABLAS_SQL:
+            tamanos[tabla] = {"filas": filas, "bytes_datos": bytes_datos, "bytes_indices": bytes_indices,
+                              "bytes_por_fila": round(bytes_datos / filas, 1) if filas else None}
+
+    return tamanos
+
+def medir_recorridos(cursor:Cursor, repeticiones:int)-> dict:
+    """
+
+    Mide el mejor tiempo de cada consulta de CONSULTAS_RECORRIDO_ESQUEMA, después de una primera ejecución para calentar el buffer
+    pool.
+
+    Args:
+        cursor (pymysql.cursors.Cursor): cursor de la conexión a MySQL, con la base de datos seleccionada.
+        repeticiones (int): veces que se ejecuta cada consulta.
+
+    Returns:
+        dict: descripción de la consulta -> mejor tiempo en segundos.
+
+    """
+    tiempos = {}
+
+    for descripcion, consulta in CONSULTAS_RECORRIDO_ESQUEMA:
+
+        cursor.execute(consulta)
+        cursor.fetchall()
+
+        mejor = None
+
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            cursor.execute(consulta)
+            cursor.fetchall()
+            segundos = time.perf_counter() - inicio
+
+            mejor = segundos if mejor is None else min(mejor, segundos)
+
+        tiempos[descripcion] = round(mejor, 4)
+
+    return tiempos
+
+############################################################################################################################################
+
+# EJECUCIÓN DEL BENCHMARK
+def ejecutar_benchmark_esquema(origen:str, repeticiones:int, conservar:bool=False)-> dict:
+    """
+
+    Copia la base de datos origen con cada variante del esquema y mide el tamaño de las tablas y los recorridos de cada copia.
+
+    Args:
+        origen (str): base de datos cargada de la que se copian los datos.
+        repeticiones (int): veces que se ejecuta cada consulta de recorrido.
+        conservar (bool, optional): si es True, no se borran las bases de datos auxiliares. Defaults to False.
+
+    Returns:
+        dict: resultado del benchmark, con el tamaño de las tablas y los tiempos de cada variante.
+
+    """
+    conexion = conectar_mysql()
+
+    resultado = {"fecha": datetime.now().isoformat(timespec="seconds"), "version": version_codigo(), "origen": origen,
+                 "repeticiones": repeticiones, "variantes": {}}
+
+    try:
+        for variante, compacto in VARIANTES_ESQUEMA.items():
+
+            destino = f"{origen}_{variante}"
+
+            copiar_base_datos(conexion=conexion, origen=origen, destino=destino, compacto=compacto)
+
+            cursor = conexion.cursor()
+            resultado["variantes"][variante] = {"tablas": medir_tamano_tablas(cursor=cursor, base_datos=destino),
+                                                "recorridos": medir_recorridos(cursor=cursor, repeticiones=repeticiones)}
+            cursor.close()
+
+    finally:
+        if not conservar:
+            cursor = conexion.cursor()
+            for variante in VARIANTES_ESQUEMA:
+                cursor.execute(f"DROP DATABASE IF EXISTS {origen}_{variante};")
+            cursor.close()
+
+        conexion.close()
+
+    return resultado
+
+def variacion(anterior:float, nuevo:float)-> str:
+    return f"{100 * (nuevo - anterior) / anterior:+.1f} %" if anterior else "-"
+
+def mostrar_informe_esquema(resultado:dict)-> None:
+    """
+
+    Muestra por pantalla el tamaño de cada tabla y el tiempo de cada recorrido con las dos variantes del esquema, y la variación del
+    compacto respecto al estándar.
+
+    Args:
+        resultado (dict): resultado de ejecutar_benchmark_esquema.
+
+    Returns:
+        None
+
+    """
+    estandar, compacto = resultado["variantes"]["estandar"], resultado["variantes"]["compacto"]
+
+    print(f"\nBenchmark del esquema de \"{resultado['origen']}\" (versión {resultado['version']}):")
+
+    print("Tamaño de las tablas (estándar -> compacto):")
+    for tabla in COLUMNAS_TABLAS_SQL:
+        antes, despues = estandar["tablas"][tabla], compacto["tablas"][tabla]
+        print(f"    - {tabla:<15} datos {antes['bytes_datos'] / 2**20:>10,.1f} -> {despues['bytes_datos'] / 2**20:>10,.1f} MB "
+              f"({variacion(antes['bytes_datos'], despues['bytes_datos'])}), índices {antes['bytes_indices'] / 2**20:>10,.1f} -> "
+              f"{despues['bytes_indices'] / 2**20:>10,.1f} MB ({variacion(antes['bytes_indices'], despues['bytes_indices'])}), "
+              f"{antes['bytes_por_fila'] or 0:,.1f} -> {despues['bytes_por_fila'] or 0:,.1f} bytes por fila")
+
+    print(f"Recorridos de Review (mejor de {resultado['repeticiones']}, estándar -> compacto):")
+    for descripcion, _ in CONSULTAS_RECORRIDO_ESQUEMA:
+        antes, despues = estandar["recorridos"][descripcion], compacto["recorridos"][descripcion]
+        print(f"    - {descripcion:<35} {antes:>9.3f} -> {despues:>9.3f} s ({variacion(antes, despues)})")
+
+############################################################################################################################################
+
+# LECTURA DE LOS ARGUMENTOS
+def leer_argumentos()-> argparse.Namespace:
+    """
+
+    Lee los argumentos de la línea de comandos del benchmark.
+
+    Returns:
+        argparse.Namespace: argumentos leídos.
+
+    """
+    parser = argparse.ArgumentParser(description="Benchmark del tamaño y los recorridos de las tablas con el esquema compacto.")
+    parser.add_argument("--origen", default=NOMBRE_BASE_DATOS_SQL, help="base de datos cargada de la que se copian los datos")
+    parser.add_argument("--repeticiones", type=int, default=REPETICIONES_BENCHMARK_ESQUEMA, help="veces que se ejecuta cada recorrido")
+    parser.add_argument("--salida", default=RUTA_RESULTADOS_BENCHMARK_ESQUEMA, help="fichero JSON lines donde se añade el resultado")
+    parser.add_argument("--conservar", action="store_true", help="no borra las bases de datos auxiliares al terminar")
+
+    return parser.parse_args()
+
+if __name__=="__main__":
+
+    argumentos = leer_argumentos()
+
+    resultado = ejecutar_benchmark_esquema(origen=argumentos.origen, repeticiones=argumentos.repeticiones, conservar=argumentos.conservar)
+
+    mostrar_informe_esquema(resultado=resultado)
+    guardar_resultado(resultado=resultado, ruta=argumentos.salida)
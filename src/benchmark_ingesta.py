@@ -0,0 +1,610 @@
+"""
+Este script se empleará para medir el rendimiento de la inserción de ficheros de datos con load_data.py (insertar_datos_global) o con
+inserta_dataset.py (insertar_dataset), de forma repetible, en lugar de fijarnos en los mensajes que se van mostrando por pantalla.
+
+Para cada ejecución se mide:
+
+    - las filas (reviews) por segundo y los MB por segundo del fichero en disco, por fichero y en total.
+    - el pico de memoria residente (RSS) del proceso.
+    - el tiempo dedicado a cada etapa (ETAPAS_BENCHMARK): decodificación del JSON (json.loads), formato de las fechas
+      (formatear_fecha), asignación de identificadores (asignar_ids_review en load_data.py; búsqueda por lotes y reserva de bloques en
+      inserta_dataset.py), executemany y commit de MySQL e insert_many de MongoDB. El resto del tiempo (lectura, transformación de
+      los lotes, etc.) aparece como "otros".
+
+Las etapas se miden envolviendo esas funciones mientras dura la ejecución, lo que añade un pequeño coste a cada llamada; con
+--sin-etapas solo se mide el total. Con la lectura en paralelo (LECTURA_PARALELA_MMAP) el JSON se decodifica en otros procesos y esas
+etapas no se pueden medir. Con ESCRITURA_MONGO_PARALELA, los insert_many se hacen en varios hilos a la vez, así que el tiempo de
+insert_many_mongo es la suma del de todos los hilos y puede ser mayor que el que realmente espera la carga.
+
+Con --simulado las escrituras no llegan a ninguna base de datos (sumidero simulado, que las descarta), para medir solo el coste de
+leer y preparar los datos. Sin --simulado se usan MySQL y MongoDB igual que en los scripts originales: con load_data las bases de datos
+se borran y se vuelven a crear, y con inserta_dataset los datos se añaden a las que ya existen.
+
+Los resultados se añaden como una línea JSON a RUTA_RESULTADOS_BENCHMARK (junto con el commit de git y la configuración), y con
+--comparar se muestra la diferencia de cada ejecución con la anterior del mismo cargador, sumidero y ficheros.
+
+Ejemplo:
+                python src/benchmark_ingesta.py --cargador load_data --ficheros data/Synthetic_Books_5.json --simulado
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import types
+import pymysql
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from functools import wraps
+from threading import Lock
+from typing import Callable, Iterator, List
+import load_data
+
+############################################################################################################################################
+
+# Etapas que se miden por separado
+ETAPAS_BENCHMARK = ["decodificacion_json", "formato_fechas", "mapeo_ids", "executemany_mysql", "commit_mysql", "insert_many_mongo"]
+
+# Valor de max_allowed_packet que devuelve el sumidero simulado (el de MySQL 8 por defecto)
+MAX_ALLOWED_PACKET_SIMULADO = 64 * 1024 * 1024
+
+# Opciones de configuracion.py que se guardan con cada resultado, porque cambian el rendimiento de la carga
+CONFIGURACION_BENCHMARK = ["BATCH_SIZE", "MODO_LOTES_ADAPTATIVOS", "MODO_BUSQUEDA_DIMENSIONES", "LECTURA_PARALELA_MMAP", "COMMIT_CADA_LOTES",
+                           "MONGO_INSERCION_CADA_LOTES", "ESQUEMA_COMPACTO", "ESCRITURA_MONGO_PARALELA", "HILOS_ESCRITURA_MONGO",
+                           "MODO_UPSERT_MONGODB"]
+
+############################################################################################################################################
+
+# MEDICIÓN DE LAS ETAPAS
+class MedidorEtapas:
+    """
+
+    Acumula el tiempo y el número de llamadas de cada etapa de la inserción.
+
+    Attributes:
+        segundos (dict): {etapa: segundos acumulados}.
+        llamadas (dict): {etapa: número de llamadas}.
+
+    """
+    def __init__(self):
+        self.segundos = {etapa: 0.0 for etapa in ETAPAS_BENCHMARK}
+        self.llamadas = {etapa: 0 for etapa in ETAPAS_BENCHMARK}
+        self._cerrojo = Lock()
+
+    def envolver(self, funcion:Callable, etapa:str)-> Callable:
+        """
+
+        Devuelve una función que hace lo mismo que funcion, sumando a la etapa el tiempo de cada llamada.
+
+        Args:
+            funcion (Callable): función a medir.
+            etapa (str): etapa a la que se suma el tiempo (de ETAPAS_BENCHMARK).
+
+        Returns:
+            Callable: función medida.
+
+        """
+        @wraps(funcion)
+        def funcion_medida(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                # Las escrituras de MongoDB pueden llegar desde varios hilos (ver escritura_mongo_paralela.py)
+                with self._cerrojo:
+                    self.segundos[etapa] += time.perf_counter() - inicio
+                    self.llamadas[etapa] += 1
+
+        return funcion_medida
+
+@contextmanager
+def instrumentar_cargadores(medidor:MedidorEtapas)-> Iterator[None]:
+    """
+
+    Sustituye, mientras dura el bloque with, las funciones de cada etapa de load_data.py e inserta_dataset.py por versiones medidas,
+    y las deja como estaban al salir.
+
+    Args:
+        medidor (MedidorEtapas): medidor donde se acumulan los tiempos.
+
+    Returns:
+        Iterator[None]: contexto de la medición.
+
+    """
+    # (módulo, atributo, etapa) de cada función medida
+    funciones = [(load_data, "formatear_fecha", "formato_fechas"), (load_data, "asignar_ids_review", "mapeo_ids"),
+                 (load_data, "persona_modificada", "mapeo_ids")]
+
+    # inserta_dataset.py solo se mide si ya se ha importado (importa menu_visualizacion.py, con sus propias dependencias)
+    if "inserta_dataset" in sys.modules:
+        import inserta_dataset
+        from secuencias_ids import AsignadorIds
+
+        funciones += [(inserta_dataset, "resolver_personas_lote", "mapeo_ids"), (inserta_dataset, "resolver_productos_lote", "mapeo_ids"),
+                      (AsignadorIds, "_reservar_bloque", "mapeo_ids")]
+
+    originales = [(objeto, atributo, getattr(objeto, atributo)) for objeto, atributo, _ in funciones]
+
+    try:
+        for objeto, atributo, etapa in funciones:
+            setattr(objeto, atributo, medidor.envolver(funcion=getattr(objeto, atributo), etapa=etapa))
+
+        # json.loads se usa como atributo del módulo json, así que en load_data.py se sustituye el módulo por uno con loads medido
+        load_data.json = types.SimpleNamespace(loads=medidor.envolver(funcion=json.loads, etapa="decodificacion_json"))
+
+        yield
+
+    finally:
+        for objeto, atributo, original in originales:
+            setattr(objeto, atributo, original)
+
+        load_data.json = json
+
+############################################################################################################################################
+
+# SUMIDERO SIMULADO (SIN ESCRITURAS)
+class CursorSimulado:
+    """
+
+    Cursor que acepta las mismas llamadas que el de pymysql que usan los cargadores, pero sin escribir nada.
+
+    """
+    max_stmt_length = 1024000
+
+    def __init__(self, conexion:"ConexionSimulada"):
+        self.conexion = conexion
+        self.lastrowid = None
+
+    def execute(self, query:str, args=None)-> int:
+        # Reservas de identificadores de secuencias_ids.py: se devuelve el final del bloque, como haría LAST_INSERT_ID()
+        if "LAST_INSERT_ID" in query:
+            self.conexion.siguiente_id += args[0]
+            self.lastrowid = self.conexion.siguiente_id
+        return 1
+
+    def executemany(self, query:str, args:list)-> int:
+        return len(args)
+
+    def fetchone(self)-> tuple:
+        return (MAX_ALLOWED_PACKET_SIMULADO,)
+
+    def fetchall(self)-> tuple:
+        return ()
+
+    def close(self)-> None:
+        pass
+
+class ConexionSimulada:
+    """
+
+    Conexión a MySQL simulada: los cursores no escriben nada y las búsquedas no devuelven filas (todas las personas y productos son
+    nuevos).
+
+    """
+    def __init__(self):
+        self.siguiente_id = 0
+
+    def cursor(self)-> CursorSimulado:
+        return CursorSimulado(conexion=self)
+
+    def commit(self)-> None:
+        pass
+
+    def rollback(self)-> None:
+        pass
+
+    def close(self)-> None:
+        pass
+
+class ColeccionSimulada:
+    """
+
+    Colección de MongoDB simulada, que descarta los documentos.
+
+    """
+    def __init__(self, name:str):
+        self.name = name
+
+    def insert_many(self, documentos:list, **kwargs)-> None:
+        pass
+
+    def bulk_write(self, operaciones:list, **kwargs)-> None:
+        pass
+
+    def with_options(self, **kwargs)-> "ColeccionSimulada":
+        return self
+
+    def delete_many(self, filtro:dict)-> types.SimpleNamespace:
+        return types.SimpleNamespace(deleted_count=0)
+
+class BaseDatosSimulada(dict):
+    """
+
+    Base de datos de MongoDB simulada, que crea las colecciones al pedirlas.
+
+    """
+    def __missing__(self, nombre:str)-> ColeccionSimulada:
+        self[nombre] = ColeccionSimulada(name=nombre)
+        return self[nombre]
+
+############################################################################################################################################
+
+# MEDICIÓN DE LAS ESCRITURAS
+class ConexionMedida:
+    """
+
+    Envoltorio de una conexión a MySQL (real o simulada) que mide los executemany de sus cursores y sus commits.
+
+    """
+    def __init__(self, conexion, medidor:MedidorEtapas):
+        self.conexion = conexion
+        self.medidor = medidor
+        self.commit = medidor.envolver(funcion=conexion.commit, etapa="commit_mysql")
+
+    def cursor(self):
+        cursor = self.conexion.cursor()
+        cursor.executemany = self.medidor.envolver(funcion=cursor.executemany, etapa="executemany_mysql")
+        return cursor
+
+    def __getattr__(self, nombre:str):
+        return getattr(self.conexion, nombre)
+
+class ColeccionMedida:
+    """
+
+    Envoltorio de una colección de MongoDB que mide sus insert_many (y sus bulk_write, con MODO_UPSERT_MONGODB) y cuenta los
+    documentos insertados (uno por review).
+
+    """
+    def __init__(self, coleccion, medidor:MedidorEtapas):
+        self.coleccion = coleccion
+        self.medidor = medidor
+        self.documentos = 0
+        self._envolver_escrituras(coleccion=coleccion)
+
+    def _envolver_escrituras(self, coleccion)-> None:
+        self._insert_many = self.medidor.envolver(funcion=coleccion.insert_many, etapa="insert_many_mongo")
+        self._bulk_write = self.medidor.envolver(funcion=coleccion.bulk_write, etapa="insert_many_mongo")
+
+    def insert_many(self, documentos:list, **kwargs):
+        self.documentos += len(documentos)
+        return self._insert_many(documentos, **kwargs)
+
+    def bulk_write(self, operaciones:list, **kwargs):
+        self.documentos += len(operaciones)
+        return self._bulk_write(operaciones, **kwargs)
+
+    def with_options(self, **kwargs)-> "ColeccionMedida":
+        # EscritorMongoParalelo pide la colección con el write concern de la carga (ver escritura_mongo_paralela.py): se siguen 
+        # midiendo y contando sus escrituras aquí
+        self._envolver_escrituras(coleccion=self.coleccion.with_options(**kwargs))
+        return self
+
+    def __getattr__(self, nombre:str):
+        return getattr(self.coleccion, nombre)
+
+class BaseDatosMedida:
+    """
+
+    Envoltorio de una base de datos de MongoDB cuyas colecciones son ColeccionMedida.
+
+    """
+    def __init__(self, base_datos, medidor:MedidorEtapas):
+        self.base_datos = base_datos
+        self.medidor = medidor
+        self.colecciones = {}
+
+    def __getitem__(self, nombre:str)-> ColeccionMedida:
+        if nombre not in self.colecciones:
+            self.colecciones[nombre] = ColeccionMedida(coleccion=self.base_datos[nombre], medidor=self.medidor)
+        return self.colecciones[nombre]
+
+    def __getattr__(self, nombre:str):
+        return getattr(self.base_datos, nombre)
+
+############################################################################################################################################
+
+# INFORMACIÓN DEL PROCESO Y DE LA VERSIÓN
+def pico_memoria_mb()-> float:
+    """
+
+    Devuelve el pico de memoria residente (RSS) del proceso hasta el momento, en MB, o None si no se puede medir (Windows).
+
+    Returns:
+        float: pico de memoria en MB.
+
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux da el valor en KB y macOS en bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+def version_codigo()-> str:
+    """
+
+    Devuelve el commit de git del código que se está midiendo (o None si no se puede consultar).
+
+    Returns:
+        str: hash corto del commit, con "+cambios" si hay cambios sin confirmar.
+
+    """
+    carpeta = os.path.dirname(os.path.abspath(__file__))
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=carpeta, capture_output=True, text=True, check=True).stdout.strip()
+        cambios = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=carpeta, capture_output=True, text=True,
+                                 check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return commit + ("+cambios" if cambios else "")
+
+############################################################################################################################################
+
+# EJECUCIÓN DEL BENCHMARK
+def preparar_sumidero(cargador:str, simulado:bool, medidor:MedidorEtapas)-> tuple:
+    """
+
+    Crea las conexiones a las que escribe el cargador, ya envueltas para medir las escrituras.
+
+    Args:
+        cargador (str): "load_data" o "inserta_dataset".
+        simulado (bool): si es True, las escrituras se descartan.
+        medidor (MedidorEtapas): medidor de las etapas.
+
+    Returns:
+        tuple: (conexion_sql, base_datos_mongo, conexion_secuencias), donde conexion_secuencias es None con load_data.
+
+    """
+    conexion_secuencias = None
+
+    if simulado:
+        conexion_sql = ConexionSimulada()
+        base_datos_mongo = BaseDatosSimulada()
+
+        if cargador == "inserta_dataset":
+            conexion_secuencias = ConexionSimulada()
+
+    elif cargador == "load_data":
+        # Igual que en main de load_data.py: las bases de datos se borran y se crean de nuevo
+        base_datos_mongo = load_data.get_database_mongo(database=NOMBRE_BASE_DATOS_MONGO_DB)
+        conexion_sql = load_data.conectar_mysql()
+        load_data.create_database_sql(conexion_sql)
+        load_data.create_tables_sql(conexion_sql)
+
+    else:
+        from pymongo import MongoClient
+        from secuencias_ids import conectar_secuencias, sincronizar_secuencias
+
+        # Igual que en main de inserta_dataset.py: los datos se añaden a las bases de datos que ya existen
+        base_datos_mongo = MongoClient(CONNECTION_STRING)[NOMBRE_BASE_DATOS_MONGO_DB]
+        conexion_sql = pymysql.connect(host="localhost", user=USER_SQL, password=PASSWORD_SQL, database=NOMBRE_BASE_DATOS_SQL)
+        conexion_secuencias = conectar_secuencias()
+        sincronizar_secuencias(conexion=conexion_secuencias)
+
+        if MODO_BUSQUEDA_DIMENSIONES == "por_lotes":
+            load_data.crear_indices_faltantes_sql(conexion=conexion_sql)
+
+    return ConexionMedida(conexion=conexion_sql, medidor=medidor), BaseDatosMedida(base_datos=base_datos_mongo, medidor=medidor), \
+           conexion_secuencias
+
+def ejecutar_benchmark(cargador:str, ficheros:List[str], batch_size:int, simulado:bool, medir_etapas:bool=True)-> dict:
+    """
+
+    Inserta los ficheros con el cargador indicado y mide el rendimiento de cada fichero y del total.
+
+    Args:
+        cargador (str): "load_data" (insertar_datos_global) o "inserta_dataset" (insertar_dataset).
+        ficheros (list): rutas de los ficheros de datos, que se insertan en orden.
+        batch_size (int): tamaño de los lotes.
+        simulado (bool): si es True, las escrituras se descartan (sumidero simulado).
+        medir_etapas (bool, optional): si es False, no se envuelven las funciones de cada etapa. Defaults to True.
+
+    Returns:
+        dict: resultado de la ejecución, listo para guardarse como JSON.
+
+    """
+    if cargador == "inserta_dataset":
+        from inserta_dataset import insertar_dataset
+
+    medidor = MedidorEtapas()
+    conexion_sql, base_datos_mongo, conexion_secuencias = preparar_sumidero(cargador=cargador, simulado=simulado, medidor=medidor)
+    coleccion = base_datos_mongo[COLECCION_MONGODB]
+
+    resultados_ficheros = []
+    inicio_total = time.perf_counter()
+
+    with instrumentar_cargadores(medidor=medidor) if medir_etapas else nullcontext():
+
+        for fichero in ficheros:
+            documentos_antes = coleccion.documentos
+            inicio = time.perf_counter()
+
+            if cargador == "load_data":
+                load_data.insertar_datos_global(file_in=fichero, sql_conexion=conexion_sql, mongodb_database=base_datos_mongo,
+                                                batch_size=batch_size)
+            else:
+                insertar_dataset(file_in=fichero, sql_conexion=conexion_sql, mongodb_database=base_datos_mongo, batch_size=batch_size,
+                                 conexion_secuencias=conexion_secuencias)
+
+            resultados_ficheros.append(calcular_rendimiento(fichero=fichero, filas=coleccion.documentos - documentos_antes,
+                                                            bytes_fichero=os.path.getsize(fichero), segundos=time.perf_counter() - inicio))
+
+    segundos_total = time.perf_counter() - inicio_total
+
+    conexion_sql.close()
+    if conexion_secuencias is not None:
+        conexion_secuencias.close()
+
+    total = calcular_rendimiento(fichero=None, filas=sum(resultado["filas"] for resultado in resultados_ficheros),
+                                 bytes_fichero=sum(resultado["bytes"] for resultado in resultados_ficheros), segundos=segundos_total)
+    del total["fichero"]
+
+    etapas = None
+
+    if medir_etapas:
+        etapas = {etapa: {"segundos": round(medidor.segundos[etapa], 4), "llamadas": medidor.llamadas[etapa]} for etapa in ETAPAS_BENCHMARK}
+        etapas["otros"] = {"segundos": round(max(segundos_total - sum(medidor.segundos.values()), 0.0), 4), "llamadas": None}
+
+    return {"fecha": datetime.now().isoformat(timespec="seconds"), "version": version_codigo(), "cargador": cargador,
+            "sumidero": "simulado" if simulado else "mysql_mongodb", "ficheros": resultados_ficheros, "total": total,
+            "pico_memoria_mb": pico_memoria_mb(), "etapas": etapas,
+            "configuracion": {**{opcion: globals()[opcion] for opcion in CONFIGURACION_BENCHMARK}, "BATCH_SIZE": batch_size}}
+
+def calcular_rendimiento(fichero:str, filas:int, bytes_fichero:int, segundos:float)-> dict:
+    """
+
+    Calcula las filas por segundo y los MB por segundo de una inserción.
+
+    Args:
+        fichero (str): ruta del fichero (None para el total).
+        filas (int): reviews insertadas.
+        bytes_fichero (int): tamaño del fichero en disco.
+        segundos (float): tiempo de la inserción.
+
+    Returns:
+        dict: {"fichero", "filas", "bytes", "segundos", "filas_por_segundo", "mb_por_segundo"}.
+
+    """
+    return {"fichero": fichero, "filas": filas, "bytes": bytes_fichero, "segundos": round(segundos, 4),
+            "filas_por_segundo": round(filas / segundos, 1) if segundos else None,
+            "mb_por_segundo": round(bytes_fichero / (1024 * 1024) / segundos, 3) if segundos else None}
+
+############################################################################################################################################
+
+# GUARDADO, INFORME Y COMPARACIÓN DE LOS RESULTADOS
+def guardar_resultado(resultado:dict, ruta:str=RUTA_RESULTADOS_BENCHMARK)-> None:
+    """
+
+    Añade el resultado de una ejecución como una línea JSON al fichero de resultados.
+
+    Args:
+        resultado (dict): resultado de ejecutar_benchmark.
+        ruta (str, optional): fichero de resultados. Defaults to RUTA_RESULTADOS_BENCHMARK.
+
+    Returns:
+        None
+
+    """
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+
+    with open(ruta, "a", encoding="utf-8") as fichero:
+        fichero.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+
+def mostrar_informe_benchmark(resultado:dict)-> None:
+    """
+
+    Muestra por pantalla el resultado de una ejecución.
+
+    Args:
+        resultado (dict): resultado de ejecutar_benchmark.
+
+    Returns:
+        None
+
+    """
+    print(f"\nBenchmark de {resultado['cargador']} (sumidero {resultado['sumidero']}, versión {resultado['version']}):")
+
+    for fila in resultado["ficheros"] + [dict(resultado["total"], fichero="TOTAL")]:
+        print(f"    - {fila['fichero']}: {fila['filas']:,} reviews en {fila['segundos']:.2f} s ({fila['filas_por_segundo'] or 0:,.0f} reviews/s, "
+              f"{fila['mb_por_segundo'] or 0:,.2f} MB/s)")
+
+    if resultado["pico_memoria_mb"] is not None:
+        print(f"    - pico de memoria: {resultado['pico_memoria_mb']:,.1f} MB")
+
+    if resultado["etapas"]:
+        segundos_total = resultado["total"]["segundos"] or 1.0
+        print("Tiempo por etapa:")
+        for etapa, medida in resultado["etapas"].items():
+            print(f"    - {etapa:<20} {medida['segundos']:>9.2f} s ({100 * medida['segundos'] / segundos_total:5.1f} %)")
+
+def comparar_resultados(ruta:str=RUTA_RESULTADOS_BENCHMARK)-> None:
+    """
+
+    Muestra, para cada ejecución guardada, la variación de reviews por segundo respecto a la anterior con el mismo cargador, sumidero
+    y ficheros.
+
+    Args:
+        ruta (str, optional): fichero de resultados. Defaults to RUTA_RESULTADOS_BENCHMARK.
+
+    Returns:
+        None
+
+    """
+    if not os.path.exists(ruta):
+        print(f"\nNo hay resultados guardados en \"{ruta}\".")
+        return
+
+    anteriores = {}
+
+    with open(ruta, encoding="utf-8") as fichero:
+        for linea in fichero:
+            resultado = json.loads(linea)
+            clave = (resultado["cargador"], resultado["sumidero"], tuple(fila["fichero"] for fila in resultado["ficheros"]))
+            rendimiento = resultado["total"]["filas_por_segundo"] or 0.0
+
+            variacion = ""
+            if clave in anteriores and anteriores[clave]:
+                variacion = f" ({100 * (rendimiento - anteriores[clave]) / anteriores[clave]:+.1f} % respecto a la anterior)"
+
+            print(f"{resultado['fecha']}  {resultado['version']}  {resultado['cargador']:<15} {resultado['sumidero']:<13} "
+                  f"{rendimiento:>12,.0f} reviews/s{variacion}")
+
+            anteriores[clave] = rendimiento
+
+############################################################################################################################################
+
+# LECTURA DE LOS ARGUMENTOS
+def leer_argumentos()-> argparse.Namespace:
+    """
+
+    Lee los argumentos de la línea de comandos del benchmark.
+
+    Returns:
+        argparse.Namespace: argumentos leídos.
+
+    """
+    parser = argparse.ArgumentParser(description="Benchmark de la inserción de ficheros de datos en MySQL y MongoDB.")
+    parser.add_argument("--cargador", choices=["load_data", "inserta_dataset"], default="load_data", help="script cuya inserción se mide")
+    parser.add_argument("--ficheros", nargs="+", help="ficheros de datos (por defecto, los de configuracion.py de ese script)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="tamaño de los lotes")
+    parser.add_argument("--simulado", action="store_true", help="descarta las escrituras en lugar de enviarlas a MySQL y MongoDB")
+    parser.add_argument("--sin-etapas", action="store_true", help="solo mide el total, sin el tiempo de cada etapa")
+    parser.add_argument("--salida", default=RUTA_RESULTADOS_BENCHMARK, help="fichero JSON lines donde se añade el resultado")
+    parser.add_argument("--comparar", action="store_true", help="muestra la evolución de los resultados guardados y termina")
+
+    return parser.parse_args()
+
+if __name__=="__main__":
+
+    argumentos = leer_argumentos()
+
+    if argumentos.comparar:
+        comparar_resultados(ruta=argumentos.salida)
+
+    else:
+        ficheros = argumentos.ficheros or (FICHEROS_DATOS_LOAD_DATA if argumentos.cargador == "load_data" else FICHEROS_DATOS_INSERTA_DATASET)
+
+        resultado = ejecutar_benchmark(cargador=argumentos.cargador, ficheros=ficheros, batch_size=argumentos.batch_size,
+                                       simulado=argumentos.simulado, medir_etapas=not argumentos.sin_etapas)
+
+        mostrar_informe_benchmark(resultado=resultado)
+        guardar_resultado(resultado=resultado, ruta=argumentos.salida)
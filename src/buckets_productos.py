@@ -0,0 +1,327 @@
+"""
+Este script se empleará para mantener, además de la colección de las reviews (un documento por review, con _id igual al id_review), una
+colección de MongoDB con las reviews agrupadas por producto (patrón bucket): COLECCION_BUCKETS_MONGODB.
+
+Las reviews de un producto están repartidas por toda la colección de las reviews, así que leer las de un producto (o las de una
+categoría) obliga a buscar antes sus id_review en MySQL y a traerse después los documentos con un $in enorme, cada uno en un sitio
+distinto. En la colección de buckets, cada documento guarda hasta TAMANO_BUCKET_PRODUCTOS reviews de un mismo producto, con unos
+agregados ya calculados:
+
+    {"id_producto": 17, "tipo_producto": 3, "n_reviews": 200, "primera_review": 1520, "ultima_review": 98311,
+     "por_overall": {"5": {"n_reviews": 120, "n_con_texto": 119, "suma_longitud_review_text": 61234}, ...},
+     "reviews": [{"id_review": 1520, "id_persona": 4, "overall": 5, "reviewTime": "2014-03-02", "reviewText": "...", ...}, ...]}
+
+Así, las reviews de un producto se leen con unos pocos documentos seguidos del índice (id_producto, primera_review), y las medias de una
+categoría se calculan con los agregados de sus buckets, sin leer cada review.
+
+Las cargas (load_data.py, pipeline_ingesta.py, carga_masiva.py e inserta_dataset.py) añaden las reviews a los buckets con EscritorBuckets
+si MODO_BUCKETS_PRODUCTOS está activado, a la vez que insertan los documentos de la colección de las reviews. Las reviews de cada
+producto se añaden con un único update (upsert) al primer bucket del producto en el que quepan todas, o a uno nuevo si no cabe en
+ninguno, de forma que ningún bucket pasa de TAMANO_BUCKET_PRODUCTOS reviews. Al reanudar una carga, las reviews no confirmadas en MySQL
+se quitan también de los buckets (ver puntos_control.py). Con MODO_UPSERT_MONGODB (inserta_dataset.py), las reviews que ya están en
+algún bucket de su producto no se vuelven a añadir, de forma que repetir una inserción que falló a medias no duplica reviews en los
+buckets ni en sus agregados.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+import time
+from pymongo import UpdateOne
+from pymongo.database import Database
+from typing import Dict, List
+from metricas_ingesta import MetricasIngesta
+
+############################################################################################################################################
+
+# Campos del documento de MongoDB de una review que se copian en su bucket
+CAMPOS_DOCUMENTO_BUCKET = ["helpful", "reviewText", "summary"]
+
+# Índices de la colección de buckets: (nombre, campos). El de id_producto sirve para leer los buckets de un producto en orden y para
+# encontrar, al insertar, el bucket del producto con sitio; el de tipo_producto, para los agregados de una categoría
+INDICES_BUCKETS_MONGODB = [
+
+    ("idx_buckets_producto", [("id_producto", 1), ("primera_review", 1)]),
+    ("idx_buckets_tipo_producto", [("tipo_producto", 1)])
+]
+
+############################################################################################################################################
+
+# CREACIÓN DE LAS REVIEWS DE LOS BUCKETS
+def crear_review_bucket(fila_review:tuple, documento:dict)-> dict:
+    """
+
+    Crea la review que se guarda en un bucket, a partir de su fila de Review y de su documento de MongoDB.
+
+    Args:
+        fila_review (tuple): fila de Review (id_review, id_persona, id_producto, overall, [unixReviewTime,] reviewTime).
+        documento (dict): documento de MongoDB de la review.
+
+    Returns:
+        dict: review del bucket, solo con los campos no nulos.
+
+    """
+    review = {"id_review": fila_review[0], "id_persona": fila_review[1]}
+
+    # Igual que en MySQL, donde overall es un entero
+    if fila_review[3] is not None:
+        review["overall"] = round(fila_review[3])
+    if fila_review[-1] is not None:
+        review["reviewTime"] = fila_review[-1]
+
+    for campo in CAMPOS_DOCUMENTO_BUCKET:
+        if campo in documento:
+            review[campo] = documento[campo]
+
+    return review
+
+def agregados_reviews(reviews:List[dict])-> Dict[str, int]:
+    """
+
+    Calcula los agregados de un grupo de reviews de un bucket, con los nombres de campo con puntos de MongoDB ("por_overall.5.n_reviews"),
+    para poder sumarlos con $inc a los de un bucket que ya existe.
+
+    Args:
+        reviews (list): reviews del bucket (crear_review_bucket).
+
+    Returns:
+        dict: campo -> valor de los agregados (n_reviews y, por cada overall, n_reviews, n_con_texto y suma_longitud_review_text).
+
+    """
+    agregados = {"n_reviews": len(reviews)}
+
+    for review in reviews:
+
+        if "overall" not in review:
+            continue
+
+        prefijo = f"por_overall.{review['overall']}"
+        agregados[f"{prefijo}.n_reviews"] = agregados.get(f"{prefijo}.n_reviews", 0) + 1
+
+        # Las reviews sin texto no cuentan para la media de la longitud (igual que $avg en la consulta 7 de menu_visualizacion.py)
+        if "reviewText" in review:
+            agregados[f"{prefijo}.n_con_texto"] = agregados.get(f"{prefijo}.n_con_texto", 0) + 1
+            agregados[f"{prefijo}.suma_longitud_review_text"] = agregados.get(f"{prefijo}.suma_longitud_review_text", 0) + len(review["reviewText"])
+
+    return agregados
+
+def crear_bucket(id_producto:int, tipo_producto:int, reviews:List[dict])-> dict:
+    """
+
+    Crea un documento de bucket completo, con sus reviews y sus agregados.
+
+    Args:
+        id_producto (int): producto del bucket.
+        tipo_producto (int): tipo de producto del producto.
+        reviews (list): reviews del bucket (crear_review_bucket).
+
+    Returns:
+        dict: documento del bucket.
+
+    """
+    bucket = {"id_producto": id_producto, "tipo_producto": tipo_producto, "primera_review": min(review["id_review"] for review in reviews),
+              "ultima_review": max(review["id_review"] for review in reviews), "por_overall": {}, "reviews": reviews}
+
+    # Pasamos los nombres con puntos de los agregados a subdocumentos
+    for campo, valor in agregados_reviews(reviews=reviews).items():
+
+        *ruta, nombre = campo.split(".")
+        destino = bucket
+
+        for parte in ruta:
+            destino = destino.setdefault(parte, {})
+
+        destino[nombre] = valor
+
+    return bucket
+
+############################################################################################################################################
+
+# ESCRITURA DE LAS REVIEWS EN LOS BUCKETS
+def crear_indices_buckets(mongodb_database:Database)-> None:
+    """
+
+    Crea los índices de INDICES_BUCKETS_MONGODB en la colección de buckets (si ya existen, MongoDB no hace nada).
+
+    Args:
+        mongodb_database (pymongo.database.Database): Base de datos de MongoDB.
+
+    Returns:
+        None
+
+    """
+    coleccion = mongodb_database[COLECCION_BUCKETS_MONGODB]
+
+    for nombre_indice, campos in INDICES_BUCKETS_MONGODB:
+        coleccion.create_index(campos, name=nombre_indice)
+
+class EscritorBuckets:
+    """
+
+    Añade las reviews de los lotes a la colección de buckets, con un único bulk_write por escritura.
+
+    Attributes:
+        coleccion (Collection): colección de buckets.
+        tamano_bucket (int): número máximo de reviews de cada bucket.
+        idempotente (bool): si es True, las reviews que ya están en los buckets de su producto no se vuelven a añadir.
+
+    """
+    def __init__(self, mongodb_database:Database, tamano_bucket:int=TAMANO_BUCKET_PRODUCTOS, metricas:MetricasIngesta=None,
+                 idempotente:bool=False):
+        self.coleccion = mongodb_database[COLECCION_BUCKETS_MONGODB]
+        self.tamano_bucket = tamano_bucket
+        self.metricas = metricas
+        self.idempotente = idempotente
+
+        # Sin el índice de id_producto, cada update de la escritura tendría que recorrer todos los buckets
+        crear_indices_buckets(mongodb_database=mongodb_database)
+
+    def operaciones_producto(self, id_producto:int, tipo_producto:int, reviews:List[dict])-> List[UpdateOne]:
+        """
+
+        Crea los updates que añaden las reviews de un producto a sus buckets, en grupos de como mucho tamano_bucket reviews. Cada grupo
+        va al primer bucket del producto en el que quepa entero, o a uno nuevo (upsert) si no cabe en ninguno.
+
+        Args:
+            id_producto (int): producto de las reviews.
+            tipo_producto (int): tipo de producto del producto.
+            reviews (list): reviews del producto (crear_review_bucket), en orden de id_review.
+
+        Returns:
+            list: operaciones UpdateOne para bulk_write.
+
+        """
+        operaciones = []
+
+        for inicio in range(0, len(reviews), self.tamano_bucket):
+
+            grupo = reviews[inicio:inicio + self.tamano_bucket]
+
+            operaciones.append(UpdateOne(
+                {"id_producto": id_producto, "n_reviews": {"$lte": self.tamano_bucket - len(grupo)}},
+                {"$push": {"reviews": {"$each": grupo}},
+                 "$inc": agregados_reviews(reviews=grupo),
+                 "$min": {"primera_review": grupo[0]["id_review"]},
+                 "$max": {"ultima_review": grupo[-1]["id_review"]},
+                 "$setOnInsert": {"tipo_producto": tipo_producto}},
+                upsert=True))
+
+        return operaciones
+
+    def reviews_ya_escritas(self, reviews_productos:Dict[int, List[dict]])-> set:
+        """
+
+        Busca cuáles de las reviews a escribir ya están en algún bucket de su producto (por ejemplo, al repetir una inserción que 
+        falló después de escribir los buckets), con una sola consulta por el índice de id_producto.
+
+        Args:
+            reviews_productos (dict): {id_producto: reviews} a escribir.
+
+        Returns:
+            set: id_review de las reviews que ya están en los buckets.
+
+        """
+        ids_reviews = [review["id_review"] for reviews in reviews_productos.values() for review in reviews]
+
+        buckets = self.coleccion.find({"id_producto": {"$in": list(reviews_productos)}, "reviews.id_review": {"$in": ids_reviews}},
+                                      {"reviews.id_review": 1})
+
+        return {review["id_review"] for bucket in buckets for review in bucket["reviews"]} & set(ids_reviews)
+
+    def escribir(self, filas_review:List[tuple], documentos:List[dict], tipo_producto:int)-> None:
+        """
+
+        Añade a los buckets las reviews de unas filas de Review y de sus documentos de MongoDB (en el mismo orden).
+
+        Args:
+            filas_review (list): filas de Review (id_review, id_persona, id_producto, overall, [unixReviewTime,] reviewTime).
+            documentos (list): documento de MongoDB de cada fila.
+            tipo_producto (int): tipo de producto de las reviews (todas son del mismo fichero).
+
+        Returns:
+            None
+
+        """
+        reviews_productos = {}
+
+        for fila_review, documento in zip(filas_review, documentos):
+            reviews_productos.setdefault(fila_review[2], []).append(crear_review_bucket(fila_review=fila_review, documento=documento))
+
+        # Un $push no es idempotente: las reviews que ya estaban se quitan antes de crear los updates
+        if self.idempotente and reviews_productos:
+            ya_escritas = self.reviews_ya_escritas(reviews_productos=reviews_productos)
+
+            if ya_escritas:
+                reviews_productos = {id_producto: [review for review in reviews if review["id_review"] not in ya_escritas]
+                                     for id_producto, reviews in reviews_productos.items()}
+
+        operaciones = []
+
+        for id_producto, reviews in reviews_productos.items():
+            if not reviews:
+                continue
+            operaciones += self.operaciones_producto(id_producto=id_producto, tipo_producto=tipo_producto, reviews=reviews)
+
+        if not operaciones:
+            return
+
+        # Cada update es de un producto distinto o de un grupo distinto del mismo producto, así que el orden no importa
+        inicio = time.perf_counter()
+        self.coleccion.bulk_write(operaciones, ordered=False)
+        segundos = time.perf_counter() - inicio
+
+        if self.metricas is not None:
+            self.metricas.registrar_escritura(destino=f"mongodb.{self.coleccion.name}", n_filas=len(filas_review), segundos=segundos)
+
+############################################################################################################################################
+
+# DESCARTE DE LAS REVIEWS NO CONFIRMADAS
+def descartar_reviews_buckets(mongodb_database:Database, id_review:int, id_review_fin:int=None)-> int:
+    """
+
+    Quita de los buckets las reviews con id_review mayor o igual que id_review (y menor que id_review_fin, si se pasa), y vuelve a
+    calcular los agregados de los buckets afectados. Los buckets que se quedan vacíos se borran.
+
+    Args:
+        mongodb_database (Database): base de datos de MongoDB.
+        id_review (int): primer id_review no confirmado.
+        id_review_fin (int, optional): primer id_review fuera del bloque reservado por este proceso (ver secuencias_ids.py).
+            Defaults to None.
+
+    Returns:
+        int: número de reviews quitadas.
+
+    """
+    coleccion = mongodb_database[COLECCION_BUCKETS_MONGODB]
+
+    filtro = {"ultima_review": {"$gte": id_review}}
+
+    if id_review_fin is not None:
+        filtro["primera_review"] = {"$lt": id_review_fin}
+
+    n_descartadas = 0
+
+    # Solo se reanuda tras un fallo, y los buckets afectados son pocos, así que se rehacen uno a uno
+    for bucket in coleccion.find(filtro):
+
+        restantes = [review for review in bucket["reviews"]
+                     if review["id_review"] < id_review or (id_review_fin is not None and review["id_review"] >= id_review_fin)]
+
+        n_descartadas += len(bucket["reviews"]) - len(restantes)
+
+        if restantes:
+            coleccion.replace_one({"_id": bucket["_id"]}, crear_bucket(id_producto=bucket["id_producto"],
+                                                                       tipo_producto=bucket["tipo_producto"], reviews=restantes))
+        else:
+            coleccion.delete_one({"_id": bucket["_id"]})
+
+    if n_descartadas:
+        print(f"\nSe han quitado {n_descartadas} reviews de los buckets de MongoDB de un lote que no llegó a confirmarse.")
+
+    return n_descartadas
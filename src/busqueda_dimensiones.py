@@ -0,0 +1,177 @@
+"""
+Este script se empleará para buscar en MySQL las personas y los productos que ya existen, durante la inserción de ficheros nuevos con
+inserta_dataset.py, sin tener que cargar antes las tablas Personas y Productos enteras en memoria (SELECT * FROM ...).
+
+En lugar de eso, para cada lote de reviews se buscan solo los reviewerID y asin que todavía no se conocen, con una única consulta
+WHERE ... IN (...) por tabla (en trozos de TAMANO_CONSULTA_IN valores), que usa los índices idx_personas_reviewerID e
+idx_productos_asin. Los resultados se guardan en una caché LRU de tamaño acotado (TAMANO_CACHE_DIMENSIONES), de forma que las
+personas y productos que se repiten en lotes seguidos no se vuelven a consultar.
+
+Así, insertar un fichero pequeño en una base de datos grande solo lee de las dimensiones las filas que necesita.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+from collections import OrderedDict
+from pymysql.connections import Connection
+from typing import Iterable
+
+############################################################################################################################################
+
+# CACHÉ LRU DE LAS DIMENSIONES
+class CacheLRU:
+    """
+
+    Caché de tamaño acotado que, al llenarse, descarta las claves que hace más tiempo que no se usan.
+
+    Attributes:
+        capacidad (int): número máximo de claves guardadas.
+
+    """
+    def __init__(self, capacidad:int):
+        self.capacidad = capacidad
+        self._datos = OrderedDict()
+
+    def __contains__(self, clave)-> bool:
+        return clave in self._datos
+
+    def __len__(self)-> int:
+        return len(self._datos)
+
+    def get(self, clave, defecto=None):
+        if clave not in self._datos:
+            return defecto
+
+        # La clave pasa a ser la usada más recientemente
+        self._datos.move_to_end(clave)
+        return self._datos[clave]
+
+    def __setitem__(self, clave, valor)-> None:
+        self._datos[clave] = valor
+        self._datos.move_to_end(clave)
+
+        if len(self._datos) > self.capacidad:
+            self._datos.popitem(last=False)
+
+    def update(self, otro:dict)-> None:
+        for clave, valor in otro.items():
+            self[clave] = valor
+
+############################################################################################################################################
+
+# BÚSQUEDA DE LAS PERSONAS Y PRODUCTOS DE UN LOTE
+def buscar_filas_por_clave(conexion:Connection, query:str, claves:list)-> list:
+    """
+
+    Ejecuta una consulta con un WHERE ... IN (...) para una lista de claves, en trozos de TAMANO_CONSULTA_IN valores.
+
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL.
+        query (str): consulta con un hueco {marcadores} donde van los %s del IN.
+        claves (list): valores a buscar.
+
+    Returns:
+        list: todas las filas devueltas, en el orden de la consulta dentro de cada trozo.
+
+    """
+    filas = []
+    cursor = conexion.cursor()
+
+    for inicio in range(0, len(claves), TAMANO_CONSULTA_IN):
+        trozo = claves[inicio:inicio + TAMANO_CONSULTA_IN]
+        cursor.execute(query.format(marcadores=", ".join(["%s"] * len(trozo))), trozo)
+        filas.extend(cursor.fetchall())
+
+    cursor.close()
+
+    return filas
+
+def resolver_personas_lote(conexion:Connection, cache:CacheLRU, reviewerIDs:Iterable[str])-> dict:
+    """
+
+    Devuelve las personas ya existentes de un lote, buscando en MySQL solo las que no están en la caché.
+
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL.
+        cache (CacheLRU): caché {reviewerID: (id_persona, reviewerName)}.
+        reviewerIDs (Iterable[str]): reviewerID de las reviews del lote.
+
+    Returns:
+        dict: diccionario {reviewerID: (id_persona, reviewerName)} con las personas del lote que ya existen (mismo formato que
+        cargar_datos_usuarios de inserta_dataset.py).
+
+    """
+    personas_lote = {}
+    pendientes = []
+
+    for reviewerID in dict.fromkeys(reviewerIDs):
+        persona = cache.get(reviewerID)
+        if persona is not None:
+            personas_lote[reviewerID] = persona
+        elif reviewerID is not None:
+            pendientes.append(reviewerID)
+
+    query = """
+            SELECT id_persona, reviewerID, reviewerName
+            FROM personas
+            WHERE reviewerID IN ({marcadores})
+            ORDER BY id_persona
+    """
+
+    # La comparación de MySQL no distingue mayúsculas, así que solo nos quedamos con las coincidencias exactas
+    pendientes_exactos = set(pendientes)
+
+    for id_persona, reviewerID, reviewerName in buscar_filas_por_clave(conexion=conexion, query=query, claves=pendientes):
+        if reviewerID in pendientes_exactos:
+            personas_lote[reviewerID] = (id_persona, reviewerName)
+
+    return personas_lote
+
+def resolver_productos_lote(conexion:Connection, cache:CacheLRU, asins:Iterable[str])-> dict:
+    """
+
+    Devuelve los productos ya existentes de un lote, buscando en MySQL solo los que no están en la caché. Igual que con la carga
+    completa de la tabla, si un asin aparece con varios tipos de producto se queda el de mayor id_producto.
+
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL.
+        cache (CacheLRU): caché {asin: (id_producto, tipo_producto)}.
+        asins (Iterable[str]): asin de las reviews del lote.
+
+    Returns:
+        dict: diccionario {asin: (id_producto, tipo_producto)} con los productos del lote que ya existen (mismo formato que
+        cargar_datos_productos de inserta_dataset.py).
+
+    """
+    productos_lote = {}
+    pendientes = []
+
+    for asin in dict.fromkeys(asins):
+        producto = cache.get(asin)
+        if producto is not None:
+            productos_lote[asin] = producto
+        elif asin is not None:
+            pendientes.append(asin)
+
+    query = """
+            SELECT id_producto, asin, tipo_producto
+            FROM productos
+            WHERE asin IN ({marcadores})
+            ORDER BY id_producto
+    """
+
+    # La comparación de MySQL no distingue mayúsculas, así que solo nos quedamos con las coincidencias exactas
+    pendientes_exactos = set(pendientes)
+
+    for id_producto, asin, tipo_producto in buscar_filas_por_clave(conexion=conexion, query=query, claves=pendientes):
+        if asin in pendientes_exactos:
+            productos_lote[asin] = (id_producto, tipo_producto)
+
+    return productos_lote
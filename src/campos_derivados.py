@@ -0,0 +1,105 @@
+"""
+Este script se empleará para añadir a los documentos de MongoDB de cada review unos campos calculados al insertarlos (campos
+derivados), para que las consultas 6 y 7 de menu_visualizacion.py se puedan resolver enteras en MongoDB, con una agregación, en lugar
+de buscar primero en MySQL los id_review de una categoría y traerse después los documentos completos:
+
+    - tipo_producto: identificador del tipo de producto (categoría) de la review, el mismo que en MySQL.
+    - overall: puntuación de la review.
+    - longitud_review_text: número de caracteres de reviewText.
+    - palabras_summary: palabras de summary en minúsculas, de al menos LONGITUD_MINIMA_PALABRA_SUMMARY caracteres (las que se usan
+      en la nube de palabras).
+    - ratio_helpful: fracción de votos útiles (helpful[0] / helpful[1]), solo si la review tiene algún voto y los dos valores son
+      números.
+
+Como el resto de campos de los documentos, los que no tienen valor no se guardan. Los campos se añaden en todas las inserciones
+(load_data.py, carga_masiva.py e inserta_dataset.py) si CAMPOS_DERIVADOS_MONGODB está activado, y se consultan con los índices de
+INDICES_CONSULTAS_MONGODB de load_data.py.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+import re
+from numbers import Number
+from typing import List
+
+############################################################################################################################################
+
+# Expresión regular de las palabras de summary (letras, números y apóstrofos, sin signos de puntuación)
+PATRON_PALABRA = re.compile(r"\w[\w']*")
+
+############################################################################################################################################
+
+# CÁLCULO DE LOS CAMPOS DERIVADOS
+def palabras_summary(summary:str)-> List[str]:
+    """
+
+    Separa el summary de una review en palabras, en minúsculas y sin signos de puntuación, y se queda con las de al menos
+    LONGITUD_MINIMA_PALABRA_SUMMARY caracteres.
+
+    Args:
+        summary (str): resumen de la review.
+
+    Returns:
+        list: palabras del summary, en orden y con repeticiones.
+
+    """
+    return [palabra for palabra in PATRON_PALABRA.findall(summary.lower()) if len(palabra) >= LONGITUD_MINIMA_PALABRA_SUMMARY]
+
+def ratio_helpful(helpful:list)-> float:
+    """
+
+    Calcula la fracción de votos útiles de una review.
+
+    Args:
+        helpful (list): votos de utilidad de la review ([votos útiles, votos totales]).
+
+    Returns:
+        float: votos útiles entre votos totales (None si la review no tiene votos o alguno de los valores no es un número).
+
+    """
+    if not isinstance(helpful, (list, tuple)) or len(helpful) < 2:
+        return None
+
+    # Un valor nulo o de otro tipo (por ejemplo, [None, 3]) no puede hacer fallar la carga entera
+    if not all(isinstance(valor, Number) and not isinstance(valor, bool) for valor in helpful[:2]) or not helpful[1]:
+        return None
+
+    return helpful[0] / helpful[1]
+
+def anadir_campos_derivados(documento:dict, tipo_producto:int, overall:float, helpful:list, reviewText:str, summary:str)-> None:
+    """
+
+    Añade los campos derivados no nulos al documento de MongoDB de una review.
+
+    Args:
+        documento (dict): documento de la review, que se modifica.
+        tipo_producto (int): identificador del tipo de producto de la review.
+        overall (float): puntuación de la review.
+        helpful (list): votos de utilidad de la review.
+        reviewText (str): texto de la review.
+        summary (str): resumen de la review.
+
+    Returns:
+        None
+
+    """
+    documento["tipo_producto"] = tipo_producto
+
+    # Igual que en MySQL, donde overall es un entero
+    if overall is not None:
+        documento["overall"] = round(overall)
+    if reviewText is not None:
+        documento["longitud_review_text"] = len(reviewText)
+    if summary is not None:
+        documento["palabras_summary"] = palabras_summary(summary=summary)
+
+    ratio = ratio_helpful(helpful=helpful)
+    if ratio is not None:
+        documento["ratio_helpful"] = ratio
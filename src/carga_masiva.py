@@ -0,0 +1,265 @@
+"""
+Este script se empleará para hacer la carga inicial de load_data.py en modo masivo. En lugar de insertar cada lote con executemany
+y ON DUPLICATE KEY UPDATE (que en una base de datos recién creada no tiene nada que actualizar), las filas de cada tabla se vuelcan a
+ficheros TSV temporales (staging) y se cargan en MySQL con LOAD DATA LOCAL INFILE, que es mucho más rápido para millones de filas.
+
+Las reviews se van escribiendo en su fichero TSV a medida que se leen los ficheros de datos. Las tablas Personas, Productos y
+Tipos_producto se escriben al final, a partir de los diccionarios globales de load_data.py (y de los nombres guardados en
+NombresPersonas), de forma que cada fila aparece una única vez y con su valor definitivo (por ejemplo, el último reviewerName no nulo
+de cada persona). Así las tablas resultantes son idénticas a las de la carga por lotes. Los documentos de MongoDB se siguen
+insertando por lotes con el mismo escritor que en la carga por lotes (y sus reviews en los buckets de productos, si
+MODO_BUCKETS_PRODUCTOS está activado).
+
+Para poder usar este modo, el servidor de MySQL tiene que tener activada la variable local_infile (SET GLOBAL local_infile = 1).
+La inserción de inserta_dataset.py sigue usando siempre las consultas con ON DUPLICATE KEY UPDATE.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+import os
+import shutil
+import tempfile
+from pymongo.database import Database
+from pymysql.connections import Connection
+from pymysql.cursors import Cursor
+from typing import List, TextIO
+import load_data
+from load_data import extraer_tipo_producto, iterar_campos_fichero, asignar_ids_review, persona_modificada, crear_documento_mongo
+from buckets_productos import EscritorBuckets
+from escritura_mongo_paralela import crear_escritor_mongo
+from mapa_identidades import NombresPersonas
+
+############################################################################################################################################
+
+# Columnas de cada tabla en el orden en el que se escriben en los ficheros TSV. El orden de las tablas es el orden de carga,
+# ya que primero tienen que existir las filas a las que apuntan las claves foráneas
+COLUMNAS_TABLAS_CARGA_MASIVA = {
+
+    "Tipos_producto": ["tipo_producto", "nombre_tipo_producto"],
+    "Personas": ["id_persona", "reviewerID", "reviewerName"],
+    "Productos": ["id_producto", "asin", "tipo_producto"],
+    "Review": ["id_review", "id_persona", "id_producto", "overall", "unixReviewTime", "reviewTime"]
+}
+
+# Con el esquema compacto, unixReviewTime es una columna virtual: el valor del fichero TSV se lee en una variable y se descarta
+if ESQUEMA_COMPACTO:
+    COLUMNAS_TABLAS_CARGA_MASIVA["Review"] = ["id_review", "id_persona", "id_producto", "overall", "@unixReviewTime", "reviewTime"]
+
+############################################################################################################################################
+
+# ESCRITURA DE LOS FICHEROS TSV
+def escapar_valor_tsv(valor)-> str:
+    """
+
+    Convierte un valor de Python en un campo de texto válido para LOAD DATA con las opciones por defecto (campos separados por
+    tabuladores, líneas separadas por saltos de línea y la barra invertida como carácter de escape).
+
+    Args:
+        valor: valor a escribir (None, número o cadena de caracteres).
+
+    Returns:
+        str: el valor ya escapado. Los valores nulos se escriben como \\N.
+
+    """
+    if valor is None:
+        return "\\N"
+
+    if not isinstance(valor, str):
+        return str(valor)
+
+    # Escapamos los caracteres que tienen un significado especial para LOAD DATA
+    return valor.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r").replace("\0", "\\0")
+
+def escribir_fila_tsv(fichero:TextIO, fila:tuple)-> None:
+    """
+
+    Escribe una fila (tupla de valores) en un fichero TSV de staging.
+
+    Args:
+        fichero (TextIO): fichero abierto en modo escritura.
+        fila (tuple): valores de la fila, en el orden de las columnas de la tabla.
+
+    Returns:
+        None
+
+    """
+    fichero.write("\t".join([escapar_valor_tsv(valor) for valor in fila]) + "\n")
+
+# CARGA DE UN FICHERO TSV EN UNA TABLA
+def cargar_tsv_sql(cursor:Cursor, ruta_tsv:str, tabla:str)-> int:
+    """
+
+    Carga un fichero TSV de staging en una tabla de MySQL con LOAD DATA LOCAL INFILE.
+
+    Args:
+        cursor (Cursor): cursor de una conexión creada con local_infile=True.
+        ruta_tsv (str): ruta del fichero TSV.
+        tabla (str): nombre de la tabla (clave de COLUMNAS_TABLAS_CARGA_MASIVA).
+
+    Returns:
+        int: número de filas cargadas.
+
+    """
+    query = f"""
+                LOAD DATA LOCAL INFILE %s
+                INTO TABLE {tabla}
+                CHARACTER SET utf8mb4
+                FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+                LINES TERMINATED BY '\\n'
+                ({", ".join(COLUMNAS_TABLAS_CARGA_MASIVA[tabla])});
+        """
+
+    # MySQL espera la ruta con barras normales también en Windows
+    filas_cargadas = cursor.execute(query, [ruta_tsv.replace(os.sep, "/")])
+
+    # Con LOCAL los errores de conversión o de claves duplicadas no paran la carga, se convierten en avisos
+    cursor.execute("SHOW COUNT(*) WARNINGS;")
+    n_avisos = cursor.fetchone()[0]
+
+    if n_avisos:
+        print(f"\nAviso: la carga de la tabla \"{tabla}\" ha generado {n_avisos} avisos en MySQL (SHOW WARNINGS para verlos).")
+
+    return filas_cargadas
+
+############################################################################################################################################
+
+# VOLCADO DE UN FICHERO DE DATOS A STAGING
+def volcar_fichero_staging(file_in:str, fichero_review:TextIO, mongodb_database:Database, batch_size:int)-> int:
+    """
+
+    Lee un fichero de datos review a review, asigna los identificadores con los contadores globales de load_data.py (igual que
+    insertar_datos_global), escribe las reviews en el TSV de staging e inserta los documentos en MongoDB por lotes.
+
+    Args:
+        file_in (str): ruta del fichero de entrada de datos.
+        fichero_review (TextIO): fichero TSV de staging de la tabla Review, abierto en modo escritura.
+        mongodb_database (Database): base de datos de MongoDB.
+        batch_size (int): tamaño de los lotes de documentos de MongoDB.
+
+    Returns:
+        int: número de reviews leídas del fichero.
+
+    """
+    # Los documentos se escriben con el mismo escritor que la carga por lotes (en paralelo si ESCRITURA_MONGO_PARALELA está activado,
+    # con el write concern de la carga y reintentando los tramos que fallen, ver escritura_mongo_paralela.py)
+    escritor_mongo = crear_escritor_mongo(coleccion=mongodb_database[COLECCION_MONGODB], batch_size=batch_size)
+    documentos_insertar_mongo = []
+    filas_insertar_buckets = []
+    n_reviews = 0
+
+    # Las reviews se añaden también a los buckets de sus productos, a la vez que los documentos (ver buckets_productos.py)
+    escritor_buckets = EscritorBuckets(mongodb_database=mongodb_database) if MODO_BUCKETS_PRODUCTOS else None
+
+    # Extraemos el nombre del tipo de producto a partir del nombre del fichero de datos
+    nombre_tipo_producto = extraer_tipo_producto(nombre_fichero=file_in)
+
+    for _, campos in iterar_campos_fichero(file_in=file_in):
+
+        reviewerID, asin, reviewerName, helpful, reviewText, overall, summary, unixReviewTime, reviewTime = campos
+
+        id_persona, id_producto, id_tipo_producto, (persona_nueva, _, _) = asignar_ids_review(reviewerID=reviewerID, asin=asin, 
+                                                                                              nombre_tipo_producto=nombre_tipo_producto)
+
+        # Guardamos el último reviewerName no nulo de la persona (igual que haría el ON DUPLICATE KEY UPDATE)
+        persona_modificada(id_persona=id_persona, reviewerName=reviewerName, persona_nueva=persona_nueva)
+
+        fila_review = (load_data.id_review, id_persona, id_producto, overall, unixReviewTime, reviewTime)
+        escribir_fila_tsv(fichero=fichero_review, fila=fila_review)
+
+        documentos_insertar_mongo.append(crear_documento_mongo(id_review=load_data.id_review, helpful=helpful, reviewText=reviewText,
+                                                               summary=summary, tipo_producto=id_tipo_producto, overall=overall))
+
+        if escritor_buckets is not None:
+            filas_insertar_buckets.append(fila_review)
+
+        load_data.id_review += 1
+        n_reviews += 1
+
+        if len(documentos_insertar_mongo) >= batch_size:
+            escritor_mongo.escribir(documentos=documentos_insertar_mongo)
+
+            if escritor_buckets is not None:
+                escritor_buckets.escribir(filas_review=filas_insertar_buckets, documentos=documentos_insertar_mongo, tipo_producto=id_tipo_producto)
+                filas_insertar_buckets.clear()
+
+            documentos_insertar_mongo.clear()
+
+    if documentos_insertar_mongo:
+        escritor_mongo.escribir(documentos=documentos_insertar_mongo)
+
+        if escritor_buckets is not None:
+            escritor_buckets.escribir(filas_review=filas_insertar_buckets, documentos=documentos_insertar_mongo, tipo_producto=id_tipo_producto)
+
+    # Esperamos a que terminen las escrituras que sigan en vuelo antes de pasar al siguiente fichero
+    escritor_mongo.cerrar()
+
+    if MODO_LOTES_ADAPTATIVOS:
+        escritor_mongo.mostrar_informe()
+
+    return n_reviews
+
+# CARGA MASIVA COMPLETA
+def cargar_ficheros_masivo(ficheros:List[str], sql_conexion:Connection, mongodb_database:Database, batch_size:int)-> None:
+    """
+
+    Carga todos los ficheros de datos con LOAD DATA LOCAL INFILE. Primero se vuelcan todas las reviews a staging, después se escriben
+    las tablas de dimensiones a partir de los diccionarios globales y por último se cargan las cuatro tablas en orden.
+
+    Args:
+        ficheros (list): rutas de los ficheros de datos.
+        sql_conexion (pymysql.connections.Connection): conexión a MySQL creada con local_infile=True y con la base de datos seleccionada.
+        mongodb_database (Database): base de datos de MongoDB (ya creada).
+        batch_size (int): tamaño de los lotes de documentos de MongoDB.
+
+    Returns:
+        None
+
+    """
+    # La tabla Personas se escribe al final, así que además de la huella hace falta el último nombre de cada persona
+    load_data.nombres_personas = NombresPersonas(guardar_nombres=True)
+
+    # Carpeta temporal donde dejamos los ficheros TSV (se borra al terminar)
+    carpeta_staging = tempfile.mkdtemp(prefix="staging_", dir=CARPETA_STAGING)
+    rutas_tsv = {tabla: os.path.join(carpeta_staging, f"{tabla.lower()}.tsv") for tabla in COLUMNAS_TABLAS_CARGA_MASIVA}
+
+    try:
+        # Las reviews se escriben en streaming, a medida que se leen los ficheros
+        with open(rutas_tsv["Review"], "w", encoding="utf-8", newline="\n") as fichero_review:
+
+            for fichero in ficheros:
+                n_reviews = volcar_fichero_staging(file_in=fichero, fichero_review=fichero_review, mongodb_database=mongodb_database, batch_size=batch_size)
+
+                print(f"\nYa hemos volcado las {n_reviews} reviews del fichero: \"{fichero}\" a staging y a la colección \"{COLECCION_MONGODB}\".")
+
+        # Las dimensiones se escriben una sola vez, con sus valores definitivos
+        with open(rutas_tsv["Tipos_producto"], "w", encoding="utf-8", newline="\n") as fichero_tsv:
+            for nombre_tipo_producto, id_tipo_producto in load_data.dicc_ids_tipos_producto.items():
+                escribir_fila_tsv(fichero=fichero_tsv, fila=(id_tipo_producto, nombre_tipo_producto))
+
+        with open(rutas_tsv["Personas"], "w", encoding="utf-8", newline="\n") as fichero_tsv:
+            for reviewerID, id_persona in load_data.dicc_ids_personas.items():
+                escribir_fila_tsv(fichero=fichero_tsv, fila=(id_persona, reviewerID, load_data.nombres_personas.get(id_persona)))
+
+        with open(rutas_tsv["Productos"], "w", encoding="utf-8", newline="\n") as fichero_tsv:
+            for (asin, nombre_tipo_producto), id_producto in load_data.dicc_ids_productos.items():
+                escribir_fila_tsv(fichero=fichero_tsv, fila=(id_producto, asin, load_data.dicc_ids_tipos_producto[nombre_tipo_producto]))
+
+        # Cargamos las tablas en orden (las claves foráneas tienen que apuntar a filas que ya existan)
+        cursor = sql_conexion.cursor()
+
+        for tabla in COLUMNAS_TABLAS_CARGA_MASIVA:
+            filas_cargadas = cargar_tsv_sql(cursor=cursor, ruta_tsv=rutas_tsv[tabla], tabla=tabla)
+            print(f"\nTabla de SQL: \"{tabla}\" cargada con LOAD DATA ({filas_cargadas} filas).")
+
+        sql_conexion.commit()
+        cursor.close()
+
+    finally:
+        shutil.rmtree(carpeta_staging, ignore_errors=True)
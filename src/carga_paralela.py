@@ -0,0 +1,279 @@
+"""
+Este script se empleará para cargar en paralelo varios ficheros de datos en las bases de datos, empleando un proceso por fichero.
+Es una alternativa a recorrer los ficheros uno detrás de otro en load_data.py, pensada para las cargas completas de todas las categorías.
+
+El problema de paralelizar la carga es que los identificadores se asignan con contadores globales que dependen del orden en el que se
+procesan las líneas. Para que las filas de Personas, Productos, Tipos_producto y Review sean idénticas a las de la carga secuencial,
+la carga se divide en tres fases:
+
+    1. Escaneo (en paralelo): cada proceso recorre su fichero y cuenta las líneas, los productos distintos y los reviewerID en orden
+       de primera aparición (junto con su último reviewerName no nulo).
+    2. Reparto de identificadores (proceso principal): se reservan rangos consecutivos de id_review e id_producto para cada fichero,
+       se resuelve el id_persona de cada reviewerID en el orden de los ficheros y se insertan las tablas compartidas (Personas y
+       Tipos_producto) antes de que ningún proceso inserte reviews.
+    3. Inserción (en paralelo): cada proceso inserta Productos, Review y los documentos de MongoDB de su fichero, reutilizando
+       insertar_datos_global con los contadores ya posicionados al inicio de su rango.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pymongo import MongoClient
+from pymongo.database import Database
+from pymysql.connections import Connection
+from typing import List
+from lectura_ficheros import abrir_fichero_datos
+from mapa_identidades import crear_mapa_identidades
+import load_data
+from load_data import extraer_tipo_producto, insertar_lote_sql, conectar_mysql, insertar_datos_global, QUERY_INSERTAR_PERSONAS, \
+                      QUERY_INSERTAR_TIPOS_PRODUCTO
+
+############################################################################################################################################
+
+# FASE 1: ESCANEO DE UN FICHERO
+def escanear_fichero(file_in:str)-> dict:
+    """
+
+    Recorre un fichero de datos sin insertar nada, para conocer cuántos identificadores va a necesitar. Se ejecuta en un proceso
+    independiente por cada fichero.
+
+    Args:
+        file_in (str): ruta del fichero de entrada de datos.
+
+    Returns:
+        dict: diccionario con el resumen del fichero:
+            - "fichero": ruta del fichero.
+            - "nombre_tipo_producto": tipo de producto extraído del nombre del fichero.
+            - "n_lineas": número de reviews del fichero.
+            - "n_productos": número de asin distintos del fichero.
+            - "revisores": diccionario {reviewerID: reviewerName} en orden de primera aparición, con el último nombre no nulo.
+
+    """
+    n_lineas = 0
+    asins = set()
+    revisores = {}
+
+    # Abrimos el fichero de datos en modo lectura (puede estar comprimido, ver lectura_ficheros.py)
+    fichero, _, _ = abrir_fichero_datos(file_in=file_in)
+
+    with fichero as file:
+
+        for linea in file:
+
+            data = json.loads(linea)
+
+            reviewerID = data.get("reviewerID", None)
+            reviewerName = data.get("reviewerName", None)
+
+            # Igual que en el ON DUPLICATE KEY UPDATE, el nombre solo se sobrescribe con valores no nulos
+            if reviewerID not in revisores or reviewerName is not None:
+                revisores[reviewerID] = reviewerName
+
+            asins.add(data.get("asin", None))
+            n_lineas += 1
+
+    return {
+
+        "fichero": file_in,
+        "nombre_tipo_producto": extraer_tipo_producto(nombre_fichero=file_in),
+        "n_lineas": n_lineas,
+        "n_productos": len(asins),
+        "revisores": revisores
+    }
+
+# FASE 2: REPARTO DE LOS RANGOS DE IDENTIFICADORES
+def planificar_rangos_ids(escaneos:List[dict])-> tuple:
+    """
+
+    A partir de los escaneos de los ficheros (en el mismo orden que la carga secuencial), reserva un rango de identificadores de
+    reviews y de productos para cada fichero y resuelve el id_persona global de cada reviewerID.
+
+    Args:
+        escaneos (list): lista con los resúmenes devueltos por escanear_fichero, en el orden de FICHEROS_DATOS_LOAD_DATA.
+
+    Returns:
+        tuple:
+            - planes (list): un diccionario por fichero con los valores iniciales de los contadores para su proceso.
+            - valores_personas (list): tuplas (id_persona, reviewerID, reviewerName) a insertar en Personas.
+            - valores_tipos_producto (list): tuplas (tipo_producto, nombre_tipo_producto) a insertar en Tipos_producto.
+
+    Raises:
+        ValueError: si dos ficheros tienen el mismo tipo de producto, porque entonces comparten productos y no se pueden repartir rangos.
+
+    """
+    # Partimos del estado actual de los contadores de load_data (en una carga nueva, todos a 0)
+    id_review_siguiente = load_data.id_review
+    id_producto_siguiente = load_data.contador_producto
+    id_tipo_siguiente = load_data.contador_tipo_producto
+    id_persona_siguiente = load_data.contador_persona
+
+    ids_personas = load_data.dicc_ids_personas.copy()
+    nombres_personas = {}
+    valores_tipos_producto = []
+    planes = []
+
+    for escaneo in escaneos:
+
+        nombre_tipo_producto = escaneo["nombre_tipo_producto"]
+
+        # Un fichero vacío no asigna ningún identificador (tampoco el de su tipo de producto)
+        if escaneo["n_lineas"] == 0:
+            continue
+
+        if nombre_tipo_producto in load_data.dicc_ids_tipos_producto or nombre_tipo_producto in [v[1] for v in valores_tipos_producto]:
+            raise ValueError(f"El tipo de producto \"{nombre_tipo_producto}\" aparece en más de un fichero.")
+
+        # Resolvemos los reviewerID en el mismo orden en el que los vería la carga secuencial
+        ids_personas_fichero = crear_mapa_identidades()
+
+        for reviewerID, reviewerName in escaneo["revisores"].items():
+            if reviewerID not in ids_personas:
+                ids_personas[reviewerID] = id_persona_siguiente
+                id_persona_siguiente += 1
+            ids_personas_fichero[reviewerID] = ids_personas[reviewerID]
+            if reviewerName is not None or reviewerID not in nombres_personas:
+                nombres_personas[reviewerID] = reviewerName
+
+        planes.append({
+
+            "fichero": escaneo["fichero"],
+            "nombre_tipo_producto": nombre_tipo_producto,
+            "id_tipo_producto": id_tipo_siguiente,
+            "id_review_inicial": id_review_siguiente,
+            "id_producto_inicial": id_producto_siguiente,
+            "ids_personas": ids_personas_fichero
+        })
+
+        valores_tipos_producto.append((id_tipo_siguiente, nombre_tipo_producto))
+
+        # Reservamos los rangos de este fichero, el siguiente fichero empieza justo después
+        id_review_siguiente += escaneo["n_lineas"]
+        id_producto_siguiente += escaneo["n_productos"]
+        id_tipo_siguiente += 1
+
+    # Ningún proceso asigna personas nuevas (todos sus reviewerID están en su plan), así que su contador empieza después de todas las
+    # ya repartidas: asignar_ids_review compara cada id_persona con el contador para saber si la persona es nueva
+    for plan in planes:
+        plan["id_persona_siguiente"] = id_persona_siguiente
+
+    valores_personas = [(ids_personas[reviewerID], reviewerID, reviewerName) for reviewerID, reviewerName in nombres_personas.items()]
+
+    return planes, valores_personas, valores_tipos_producto
+
+# FASE 3: INSERCIÓN DE UN FICHERO EN UN PROCESO INDEPENDIENTE
+def posicionar_contadores(plan:dict)-> None:
+    """
+
+    Posiciona los contadores y diccionarios globales de load_data (que en un proceso hijo son propios) al inicio del rango reservado
+    para un fichero.
+
+    Args:
+        plan (dict): plan del fichero generado en planificar_rangos_ids.
+
+    Returns:
+        None
+
+    """
+    load_data.dicc_ids_personas = plan["ids_personas"]
+    load_data.dicc_ids_productos = crear_mapa_identidades(clave_compuesta=True)
+    load_data.dicc_ids_tipos_producto = {plan["nombre_tipo_producto"]: plan["id_tipo_producto"]}
+    load_data.contador_persona = plan["id_persona_siguiente"]
+    load_data.contador_producto = plan["id_producto_inicial"]
+    load_data.contador_tipo_producto = plan["id_tipo_producto"] + 1
+    load_data.id_review = plan["id_review_inicial"]
+
+def _cargar_fichero_en_proceso(plan:dict, batch_size:int)-> str:
+    """
+
+    Inserta un fichero desde un proceso hijo. Posiciona los contadores globales de load_data al inicio del rango reservado y llama a
+    insertar_datos_global sin insertar Personas ni Tipos_producto.
+
+    Args:
+        plan (dict): plan del fichero generado en planificar_rangos_ids.
+        batch_size (int): tamaño de un lote de datos.
+
+    Returns:
+        str: ruta del fichero insertado.
+
+    """
+    posicionar_contadores(plan=plan)
+
+    # Cada proceso necesita sus propias conexiones (no se pueden compartir entre procesos)
+    conexion = conectar_mysql()
+    conexion.select_db(NOMBRE_BASE_DATOS_SQL)
+    cliente_mongo = MongoClient(CONNECTION_STRING)
+
+    try:
+        insertar_datos_global(file_in=plan["fichero"], sql_conexion=conexion, mongodb_database=cliente_mongo[NOMBRE_BASE_DATOS_MONGO_DB],
+                              batch_size=batch_size, insertar_personas_y_tipos=False)
+    finally:
+        conexion.close()
+        cliente_mongo.close()
+
+    return plan["fichero"]
+
+############################################################################################################################################
+
+# CARGA COMPLETA EN PARALELO
+def cargar_ficheros_en_paralelo(ficheros:List[str], sql_conexion:Connection, mongodb_database:Database, batch_size:int,
+                                num_procesos:int)-> None:
+    """
+
+    Carga todos los ficheros en paralelo siguiendo las tres fases descritas al inicio del script. Las bases de datos y las tablas ya
+    tienen que estar creadas. Si dos ficheros comparten tipo de producto, se hace la carga secuencial de siempre.
+
+    Args:
+        ficheros (list): rutas de los ficheros de datos, en el orden en el que se cargarían de forma secuencial.
+        sql_conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL, con la base de datos ya seleccionada.
+        mongodb_database (Database): base de datos de MongoDB (ya creada).
+        batch_size (int): tamaño de un lote de datos.
+        num_procesos (int): número máximo de procesos que se ejecutan a la vez.
+
+    Returns:
+        None
+
+    """
+    # Usamos "spawn" para que los procesos hijos no hereden las conexiones abiertas del proceso principal
+    contexto = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=num_procesos, mp_context=contexto) as pool:
+
+        # FASE 1
+        escaneos = list(pool.map(escanear_fichero, ficheros))
+
+        # FASE 2
+        try:
+            planes, valores_personas, valores_tipos_producto = planificar_rangos_ids(escaneos=escaneos)
+
+        except ValueError as error:
+            print(f"\nNo se puede hacer la carga en paralelo ({error}). Se cargan los ficheros de forma secuencial.")
+
+            for fichero in ficheros:
+                insertar_datos_global(file_in=fichero, sql_conexion=sql_conexion, mongodb_database=mongodb_database, batch_size=batch_size)
+            return
+
+        cursor = sql_conexion.cursor()
+
+        # Las tablas compartidas se insertan antes que las reviews, que tienen claves foráneas hacia ellas
+        insertar_lote_sql(cursor=cursor, query=QUERY_INSERTAR_TIPOS_PRODUCTO, valores=valores_tipos_producto)
+
+        for inicio in range(0, len(valores_personas), batch_size):
+            insertar_lote_sql(cursor=cursor, query=QUERY_INSERTAR_PERSONAS, valores=valores_personas[inicio:inicio + batch_size])
+
+        sql_conexion.commit()
+        cursor.close()
+
+        print(f"\nIdentificadores repartidos: {len(valores_personas)} personas y {sum(e['n_lineas'] for e in escaneos)} reviews.")
+
+        # FASE 3
+        for fichero in pool.map(_cargar_fichero_en_proceso, planes, [batch_size] * len(planes)):
+            print(f"\nYa hemos cargado los datos del fichero: \"{fichero}\" en las bases de datos.")
@@ -77,6 +77,148 @@ BATCH_SIZE = 5000
 
 ############################################################################################################################################
 
+# Carga en paralelo de los ficheros de load_data.py (un proceso por fichero, ver carga_paralela.py)
+MODO_CARGA_PARALELA = False
+NUM_PROCESOS_CARGA = 4
+
+# Carga masiva de load_data.py con LOAD DATA LOCAL INFILE (ver carga_masiva.py). Requiere local_infile=ON en el servidor MySQL
+MODO_CARGA_MASIVA = False
+CARPETA_STAGING = None  # carpeta para los ficheros TSV temporales, None para usar la carpeta temporal del sistema
+
+# Carga inicial rápida: con MODO_CARGA_MASIVA, las tablas se crean sin claves y estas se añaden (y validan) al final de la carga
+DIFERIR_RESTRICCIONES = False
+
+# Inserción en pipeline: el parseo, la escritura en MySQL y la escritura en MongoDB se solapan (ver pipeline_ingesta.py)
+MODO_PIPELINE = False
+TAMANO_COLAS_PIPELINE = 4  # número máximo de lotes pendientes en cada cola
+
+# Lectura de cada fichero en paralelo, dividiéndolo en rangos de bytes con mmap (ver lectura_paralela.py)
+LECTURA_PARALELA_MMAP = False
+NUM_PROCESOS_LECTURA = 4
+TAMANO_RANGO_LECTURA = 64 * 1024 * 1024  # bytes de cada rango
+
+# Tamaño de los buffers de lectura de los ficheros de datos, que pueden estar comprimidos (.json.gz o .json.zst, ver lectura_ficheros.py)
+TAMANO_BUFFER_LECTURA = 8 * 1024 * 1024  # bytes
+
+# Puntos de control de la inserción (ver puntos_control.py). Tras cada commit se guarda hasta dónde se ha llegado en cada
+# fichero, para poder reanudar una carga interrumpida con: python load_data.py --resume (o python inserta_dataset.py --resume)
+GUARDAR_PUNTOS_CONTROL = False
+CARPETA_PUNTOS_CONTROL = "puntos_control"  # carpeta donde se guardan los ficheros de puntos de control
+
+# Identificadores asignados a cada reviewerID y (asin, tipo_producto) durante la carga de load_data.py: con False se guardan en
+# diccionarios (lo más rápido); con True, en mapas compactos (ver mapa_identidades.py), que ocupan unas 2,5 veces menos memoria pero
+# hacen cada búsqueda unas 5 veces más lenta, para cargas con tantos revisores que los diccionarios no caben en memoria
+MAPAS_IDENTIDADES_COMPACTOS = False
+
+# Búsqueda de las personas y productos ya existentes en inserta_dataset.py: "por_lotes" (consultas WHERE ... IN por cada lote, con una
+# caché LRU, ver busqueda_dimensiones.py) o "precarga" (SELECT * de las tablas Personas y Productos enteras al empezar cada fichero)
+MODO_BUSQUEDA_DIMENSIONES = "por_lotes"
+TAMANO_CACHE_DIMENSIONES = 500000  # número máximo de personas (y de productos) en la caché
+TAMANO_CONSULTA_IN = 1000  # número máximo de valores en cada WHERE ... IN
+
+# Número máximo de fechas distintas (reviewTime) cuya conversión a YYYY-MM-DD se guarda en caché (ver formatear_fecha de load_data.py)
+TAMANO_CACHE_FECHAS = 100000
+
+# Política de commits de MySQL y de inserciones en MongoDB durante la inserción de cada fichero (ver politica_volcado.py). Se vuelca en
+# cuanto se llega a cualquiera de los límites; un límite a None no se usa, y con los tres a None solo se vuelca al final del fichero
+COMMIT_CADA_LOTES = 20
+COMMIT_CADA_SEGUNDOS = 30
+COMMIT_CADA_MEGABYTES = None
+MONGO_INSERCION_CADA_LOTES = 1
+MONGO_INSERCION_CADA_SEGUNDOS = None
+MONGO_INSERCION_CADA_MEGABYTES = None
+
+# Número de identificadores de personas y productos nuevos que reserva de una vez cada inserción en la tabla de secuencias (ver 
+# secuencias_ids.py). Los de las reviews se reservan de BATCH_SIZE en BATCH_SIZE
+TAMANO_BLOQUE_IDS = 1000
+
+# Tamaños de escritura adaptativos (ver escritura_adaptativa.py): cada tabla de SQL y la colección de MongoDB ajustan su propio tamaño
+# de escritura según las filas por segundo medidas, entre TAMANO_LOTE_MINIMO y TAMANO_LOTE_MAXIMO filas. Con False, se usa BATCH_SIZE
+MODO_LOTES_ADAPTATIVOS = False
+TAMANO_LOTE_MINIMO = 500
+TAMANO_LOTE_MAXIMO = 100000
+
+# Generador de ficheros de datos sintéticos para pruebas de escala (ver generador_dataset.py). Cada escenario indica el número de
+# reviews, personas y productos; la popularidad de personas y productos sigue una ley de potencias con los exponentes indicados
+ESCENARIOS_GENERADOR = {
+
+    "10M": (10_000_000, 1_200_000, 350_000),
+    "100M": (100_000_000, 12_000_000, 3_500_000),
+    "1B": (1_000_000_000, 120_000_000, 35_000_000)
+}
+SEMILLA_GENERADOR = 2025
+EXPONENTE_POPULARIDAD_PERSONAS = 1.1
+EXPONENTE_POPULARIDAD_PRODUCTOS = 1.2
+PROBABILIDADES_OVERALL = [0.05, 0.05, 0.10, 0.22, 0.58]  # probabilidad de cada puntuación, de 1 a 5 estrellas
+MEDIA_PALABRAS_REVIEW = 80  # longitud de reviewText (log-normal), en palabras
+DISPERSION_PALABRAS_REVIEW = 0.9
+PROBABILIDAD_SIN_NOMBRE = 0.05  # fracción de personas sin reviewerName
+
+# Fichero (JSON lines) donde benchmark_ingesta.py añade los resultados de cada ejecución, para comparar versiones
+RUTA_RESULTADOS_BENCHMARK = "benchmarks/resultados_ingesta.jsonl"
+
+# Métricas en directo de la inserción (ver metricas_ingesta.py): reportadores que se usan ("log_json" y/o "prometheus", con una lista
+# vacía no se recogen métricas), cada cuántos segundos se escribe la línea JSON, dónde (None para mostrarla por pantalla) y en qué
+# puerto local se sirven las métricas de Prometheus
+METRICAS_REPORTADORES = ["log_json"]
+INTERVALO_METRICAS_SEGUNDOS = 30
+RUTA_LOG_METRICAS = None
+PUERTO_METRICAS = 9108
+
+# Índices secundarios de las consultas (ver indices_sql.py): si se crean al terminar la carga (load_data.py e inserta_dataset.py) y si
+# después se comprueba con EXPLAIN que las consultas del recomendador y del menú de visualización los usan
+CREAR_INDICES_CONSULTAS = True
+VERIFICAR_INDICES_EXPLAIN = True
+
+# Esquema compacto de las tablas de MySQL (ver COLUMNAS_TABLAS_SQL_COMPACTO de load_data.py): tipos más pequeños y una sola fecha por
+# review. Tiene que coincidir con el de la base de datos; una base de datos ya cargada se convierte con esquema_compacto.py
+ESQUEMA_COMPACTO = False
+
+# Fichero (JSON lines) donde benchmark_esquema.py añade los resultados, y veces que se repite cada consulta de recorrido
+RUTA_RESULTADOS_BENCHMARK_ESQUEMA = "benchmarks/resultados_esquema.jsonl"
+REPETICIONES_BENCHMARK_ESQUEMA = 5
+
+# Campos derivados de los documentos de MongoDB (ver campos_derivados.py): si se añaden al insertar, y longitud mínima de las palabras
+# de summary que se guardan. Número de palabras más frecuentes que la consulta 6 del menú pide a MongoDB para la nube de palabras
+CAMPOS_DERIVADOS_MONGODB = True
+LONGITUD_MINIMA_PALABRA_SUMMARY = 4
+NUMERO_PALABRAS_NUBE = 1000
+
+# Colección de MongoDB con las reviews agrupadas por producto en buckets (ver buckets_productos.py): si las cargas la mantienen, nombre
+# de la colección, número máximo de reviews de cada bucket y reviews de un producto que se muestran en la consulta 3 del menú
+MODO_BUCKETS_PRODUCTOS = False
+COLECCION_BUCKETS_MONGODB = "reviews_por_producto"
+TAMANO_BUCKET_PRODUCTOS = 200
+NUMERO_REVIEWS_PRODUCTO = 5
+
+# Escritura en paralelo de los documentos de MongoDB en load_data.py e inserta_dataset.py (ver escritura_mongo_paralela.py): si se usa,
+# hilos que escriben, escrituras en vuelo como máximo (con todas ocupadas, la lectura del fichero espera), write concern de la carga,
+# reintentos de los documentos que fallan y segundos de espera antes del primer reintento (se duplican en cada uno). El write concern de
+# la carga no espera al journal; con puntos de control se usa siempre j=True, para que lo confirmado antes de cada commit de MySQL no se
+# pierda si cae MongoDB
+ESCRITURA_MONGO_PARALELA = False
+HILOS_ESCRITURA_MONGO = 4
+MAXIMO_ESCRITURAS_MONGO_EN_VUELO = 8
+WRITE_CONCERN_CARGA_MONGO = {"w": 1, "j": False}
+REINTENTOS_ESCRITURA_MONGO = 3
+ESPERA_REINTENTO_MONGO_SEGUNDOS = 0.5
+
+# Si inserta_dataset.py escribe los documentos de MongoDB con upserts (bulk_write de UpdateOne con los campos no nulos, ver
+# insertar_documentos en escritura_adaptativa.py), como el ON DUPLICATE KEY UPDATE de MySQL. Así se puede repetir una inserción que
+# falló a medias sin errores de _id duplicado, a cambio de que cada escritura sea algo más lenta que un insert_many (con
+# MODO_BUCKETS_PRODUCTOS, las reviews que ya estén en los buckets tampoco se vuelven a añadir)
+MODO_UPSERT_MONGODB = False
+
+# Detección en inserta_dataset.py de las reviews que ya están en la base de datos, con el mismo (reviewerID, asin, unixReviewTime), para no
+# volver a insertarlas (ver filtro_duplicados.py): si se usa, carpeta donde se guarda el filtro de Bloom entre inserciones, capacidad de
+# su primer filtro (crece solo si hace falta) y probabilidad de falso positivo (solo esas reviews se buscan en MySQL)
+DETECTAR_REVIEWS_DUPLICADAS = False
+CARPETA_FILTRO_DUPLICADOS = "filtros_duplicados"
+CAPACIDAD_INICIAL_FILTRO_DUPLICADOS = 1_000_000
+PROBABILIDAD_ERROR_FILTRO_DUPLICADOS = 0.001
+
+############################################################################################################################################
+
 
 
 
@@ -0,0 +1,386 @@
+"""
+Este script se empleará para escribir los lotes en MySQL y MongoDB con un tamaño de escritura propio para cada destino (cada tabla
+de SQL y la colección de MongoDB), que se ajusta solo a partir de lo que se va midiendo, en lugar de usar el mismo BATCH_SIZE para
+todo. Una fila de Review ocupa unos pocos bytes, mientras que un documento de MongoDB con un reviewText largo puede ocupar varios KB,
+así que el tamaño que da más filas por segundo no es el mismo para cada destino.
+
+Para cada destino hay un ControlTamanoLote que, tras cada escritura, mide las filas por segundo y los bytes por fila:
+
+    - Si el rendimiento ha mejorado respecto a la escritura anterior, sigue cambiando el tamaño en la misma dirección (lo multiplica o
+      lo divide por FACTOR_AJUSTE_LOTE); si ha empeorado, cambia de dirección.
+    - El tamaño nunca pasa de TAMANO_LOTE_MAXIMO ni baja de TAMANO_LOTE_MINIMO, y tampoco de las filas que caben en el límite de bytes
+      del destino: la mitad de max_allowed_packet del servidor MySQL, o maxMessageSizeBytes de MongoDB (48 MB, el tamaño máximo de
+      un mensaje al servidor) por cada insert_many.
+
+Las filas de SQL se acumulan entre lotes (EscritorSql), de forma que una escritura puede juntar filas de varios lotes; antes de cada
+commit hay que llamar a volcar() para escribir lo que quede. Las dimensiones (Personas, Tipos_producto y Productos) siempre se
+escriben enteras antes que las reviews, para respetar las claves foráneas. Los documentos de MongoDB se acumulan según la política de
+inserciones (ver politica_volcado.py) y EscritorMongo los divide en escrituras del tamaño que toque.
+
+Con MODO_LOTES_ADAPTATIVOS desactivado, los tamaños se quedan fijos en BATCH_SIZE y todo se escribe igual que antes.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+import time
+import bson
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+from pymysql.cursors import Cursor
+from typing import Dict, List
+from metricas_ingesta import MetricasIngesta
+
+############################################################################################################################################
+
+# Factor por el que se multiplica o divide el tamaño de escritura en cada ajuste
+FACTOR_AJUSTE_LOTE = 1.25
+
+# Peso de la última medida en la media de bytes por fila
+PESO_MEDIA_BYTES = 0.2
+
+# Número de filas que se miden para estimar los bytes por fila de cada escritura (medirlas todas costaría casi tanto como escribirlas)
+FILAS_MUESTRA_BYTES = 32
+
+# Límite de bytes de cada insert_many: maxMessageSizeBytes de MongoDB (tamaño máximo de un mensaje al servidor, 48 MB). Por encima,
+# pymongo parte la escritura en varios mensajes, así que no se gana nada con escrituras más grandes (16 MB es el límite de cada
+# documento BSON, no de una escritura)
+LIMITE_BYTES_MONGO = 48_000_000
+
+# Orden en el que se escriben las tablas de SQL (primero las que son referenciadas por claves foráneas)
+ORDEN_TABLAS_LOTE = ["personas", "tipos_producto", "productos", "review"]
+
+############################################################################################################################################
+
+# CONTROL DEL TAMAÑO DE ESCRITURA DE UN DESTINO
+class ControlTamanoLote:
+    """
+
+    Tamaño de escritura de un destino, ajustado a partir del rendimiento medido (búsqueda por ascenso de colina).
+
+    Attributes:
+        nombre (str): nombre del destino (para los informes).
+        tamano (int): número de filas de la siguiente escritura.
+        adaptativo (bool): si el tamaño se ajusta o se queda fijo.
+        bytes_por_fila (float): media de los bytes por fila medidos (None hasta la primera escritura).
+
+    """
+    def __init__(self, nombre:str, tamano_inicial:int, limite_bytes:int, adaptativo:bool=True, tamano_minimo:int=TAMANO_LOTE_MINIMO,
+                 tamano_maximo:int=TAMANO_LOTE_MAXIMO):
+        self.nombre = nombre
+        self.adaptativo = adaptativo
+        self.limite_bytes = limite_bytes
+        self.tamano_minimo = tamano_minimo
+        self.tamano_maximo = tamano_maximo
+        self.tamano = tamano_inicial
+        self.bytes_por_fila = None
+
+        self._direccion = 1
+        self._rendimiento_anterior = None
+
+        # Totales para el informe
+        self.escrituras = 0
+        self.filas = 0
+        self.segundos = 0.0
+
+    def _acotar(self, tamano:int)-> int:
+        maximo = self.tamano_maximo
+
+        # Que la escritura no pase del límite de bytes del destino
+        if self.bytes_por_fila:
+            maximo = min(maximo, int(self.limite_bytes / self.bytes_por_fila))
+
+        return max(self.tamano_minimo, min(tamano, maximo))
+
+    def registrar_escritura(self, n_filas:int, n_bytes:float, segundos:float)-> None:
+        """
+
+        Apunta el resultado de una escritura y, si es adaptativo, calcula el tamaño de la siguiente.
+
+        Args:
+            n_filas (int): filas escritas.
+            n_bytes (float): bytes (estimados) de las filas escritas.
+            segundos (float): tiempo que ha tardado la escritura.
+
+        Returns:
+            None
+
+        """
+        self.escrituras += 1
+        self.filas += n_filas
+        self.segundos += segundos
+
+        if not n_filas:
+            return
+
+        bytes_por_fila = n_bytes / n_filas
+        self.bytes_por_fila = bytes_por_fila if self.bytes_por_fila is None else \
+                              (1 - PESO_MEDIA_BYTES) * self.bytes_por_fila + PESO_MEDIA_BYTES * bytes_por_fila
+
+        # Las escrituras mucho más pequeñas que el tamaño actual (restos al final de un fichero) no dicen nada del rendimiento
+        if not self.adaptativo or segundos <= 0 or n_filas < self.tamano // 2:
+            return
+
+        rendimiento = n_filas / segundos
+
+        if self._rendimiento_anterior is not None and rendimiento < self._rendimiento_anterior:
+            self._direccion = -self._direccion
+
+        self._rendimiento_anterior = rendimiento
+
+        factor = FACTOR_AJUSTE_LOTE if self._direccion > 0 else 1 / FACTOR_AJUSTE_LOTE
+        self.tamano = self._acotar(int(self.tamano * factor))
+
+    def resumen(self)-> str:
+        filas_por_segundo = self.filas / self.segundos if self.segundos else 0.0
+        return (f"{self.nombre:<15} tamaño final {self.tamano:>7}  {self.escrituras:>6} escrituras  {self.filas:>10} filas  "
+                f"({filas_por_segundo:,.0f} filas/s)")
+
+############################################################################################################################################
+
+# ESTIMACIÓN DEL TAMAÑO DE LAS FILAS
+def estimar_bytes_filas_sql(filas:List[tuple])-> float:
+    """
+
+    Estima los bytes que ocupan unas filas de SQL en la sentencia INSERT, a partir de una muestra.
+
+    Args:
+        filas (list): tuplas de valores.
+
+    Returns:
+        float: bytes estimados del total de filas.
+
+    """
+    muestra = filas[:FILAS_MUESTRA_BYTES]
+    bytes_muestra = sum(len(valor) if isinstance(valor, str) else 8 for fila in muestra for valor in fila)
+
+    return bytes_muestra * len(filas) / len(muestra) if muestra else 0.0
+
+def estimar_bytes_documentos(documentos:List[dict])-> float:
+    """
+
+    Estima los bytes en BSON de unos documentos de MongoDB, a partir de una muestra.
+
+    Args:
+        documentos (list): documentos.
+
+    Returns:
+        float: bytes estimados del total de documentos.
+
+    """
+    muestra = documentos[:FILAS_MUESTRA_BYTES]
+    bytes_muestra = sum(len(bson.encode(documento)) for documento in muestra)
+
+    return bytes_muestra * len(documentos) / len(muestra) if muestra else 0.0
+
+############################################################################################################################################
+
+# INSERCIÓN DE LOS DOCUMENTOS DE MONGODB
+def operacion_upsert(documento:dict)-> UpdateOne:
+    """
+
+    Crea el upsert de un documento: si no existe se inserta, y si ya existe se actualizan solo los campos que trae el documento (que
+    nunca lleva campos nulos), igual que el ON DUPLICATE KEY UPDATE de MySQL. Con ReplaceOne se perderían los campos que el documento
+    nuevo no tenga.
+
+    Args:
+        documento (dict): documento de MongoDB, con su _id.
+
+    Returns:
+        UpdateOne: operación para bulk_write.
+
+    """
+    campos = {campo: valor for campo, valor in documento.items() if campo != "_id"}
+
+    # MongoDB no admite un $set vacío; con $setOnInsert del propio _id, un documento ya existente se queda como estaba
+    return UpdateOne({"_id": documento["_id"]}, {"$set": campos} if campos else {"$setOnInsert": {"_id": documento["_id"]}}, upsert=True)
+
+def insertar_documentos(coleccion:Collection, documentos:List[dict], upsert:bool=False, **opciones)-> None:
+    """
+
+    Inserta documentos en una colección con insert_many o, en modo upsert, con un bulk_write de operacion_upsert, que se puede repetir
+    sin errores de _id duplicado.
+
+    Args:
+        coleccion (Collection): colección de MongoDB.
+        documentos (list): documentos a insertar.
+        upsert (bool, optional): si es True, los documentos que ya existen se actualizan en lugar de dar error. Defaults to False.
+        **opciones: opciones de insert_many o bulk_write (ordered).
+
+    Returns:
+        None
+
+    """
+    if upsert:
+        coleccion.bulk_write([operacion_upsert(documento=documento) for documento in documentos], **opciones)
+    else:
+        coleccion.insert_many(documentos, **opciones)
+
+############################################################################################################################################
+
+# ESCRITURA EN MYSQL
+class EscritorSql:
+    """
+
+    Acumula las filas de los lotes por tabla y las escribe con executemany en escrituras del tamaño de cada ControlTamanoLote.
+
+    Attributes:
+        cursor (Cursor): cursor de la conexión a MySQL.
+        controles (dict): {tabla: ControlTamanoLote}, con las tablas de ORDEN_TABLAS_LOTE.
+
+    """
+    def __init__(self, cursor:Cursor, queries:Dict[str, str], batch_size:int, metricas:MetricasIngesta=None):
+        self.cursor = cursor
+        self.queries = queries
+        self.metricas = metricas
+        self.pendientes = {tabla: [] for tabla in ORDEN_TABLAS_LOTE}
+
+        # Límite de bytes de cada sentencia: max_allowed_packet del servidor (pymysql parte las sentencias por max_stmt_length, que
+        # ajustamos para que una escritura entera quepa en una sola sentencia sin pasarse del paquete)
+        cursor.execute("SELECT @@max_allowed_packet;")
+        max_allowed_packet = int(cursor.fetchone()[0])
+        cursor.max_stmt_length = max(cursor.max_stmt_length, int(0.9 * max_allowed_packet))
+
+        self.controles = {tabla: ControlTamanoLote(nombre=tabla, tamano_inicial=batch_size, limite_bytes=max_allowed_packet // 2,
+                                                   adaptativo=MODO_LOTES_ADAPTATIVOS)
+                          for tabla in ORDEN_TABLAS_LOTE}
+
+    def _escribir(self, tabla:str, filas:List[tuple])-> None:
+        control = self.controles[tabla]
+        inicio_tramo = 0
+
+        # El tamaño puede cambiar tras cada escritura, así que cada tramo se corta con el tamaño del momento
+        while inicio_tramo < len(filas):
+            tramo = filas[inicio_tramo:inicio_tramo + control.tamano]
+            inicio_tramo += len(tramo)
+
+            inicio = time.perf_counter()
+            self.cursor.executemany(self.queries[tabla], tramo)
+            segundos = time.perf_counter() - inicio
+
+            control.registrar_escritura(n_filas=len(tramo), n_bytes=estimar_bytes_filas_sql(tramo), segundos=segundos)
+
+            if self.metricas is not None:
+                self.metricas.registrar_escritura(destino=f"mysql.{tabla}", n_filas=len(tramo), segundos=segundos)
+
+    def anadir_lote(self, lote:dict)-> None:
+        """
+
+        Añade las filas de un lote y escribe las reviews que ya completen una escritura (con las dimensiones pendientes antes).
+
+        Args:
+            lote (dict): diccionario con las listas de filas de cada tabla de ORDEN_TABLAS_LOTE (pueden faltar tablas).
+
+        Returns:
+            None
+
+        """
+        for tabla in ORDEN_TABLAS_LOTE:
+            self.pendientes[tabla].extend(lote.get(tabla, []))
+
+        tamano_review = self.controles["review"].tamano
+
+        if len(self.pendientes["review"]) >= tamano_review:
+
+            # Solo escribimos escrituras completas de reviews; el resto se queda pendiente para juntarse con el siguiente lote
+            n_completas = len(self.pendientes["review"]) // tamano_review * tamano_review
+            self.volcar_dimensiones()
+
+            self._escribir(tabla="review", filas=self.pendientes["review"][:n_completas])
+            del self.pendientes["review"][:n_completas]
+
+    def volcar_dimensiones(self)-> None:
+        """
+
+        Escribe todas las filas pendientes de Personas, Tipos_producto y Productos.
+
+        """
+        for tabla in ORDEN_TABLAS_LOTE[:-1]:
+            if self.pendientes[tabla]:
+                self._escribir(tabla=tabla, filas=self.pendientes[tabla])
+                self.pendientes[tabla].clear()
+
+    def volcar(self)-> None:
+        """
+
+        Escribe todas las filas pendientes. Hay que llamarla antes de cada commit y al terminar.
+
+        """
+        self.volcar_dimensiones()
+
+        if self.pendientes["review"]:
+            self._escribir(tabla="review", filas=self.pendientes["review"])
+            self.pendientes["review"].clear()
+
+    def mostrar_informe(self, file_in:str)-> None:
+        print(f"\nTamaños de escritura en MySQL para el fichero \"{file_in}\":")
+        for control in self.controles.values():
+            if control.escrituras:
+                print(f"    - {control.resumen()}")
+
+# ESCRITURA EN MONGODB
+class EscritorMongo:
+    """
+
+    Inserta documentos en una colección de MongoDB con insert_many (o con upserts), en escrituras del tamaño de su ControlTamanoLote.
+
+    Attributes:
+        coleccion (Collection): colección de MongoDB.
+        upsert (bool): si es True, los documentos se escriben con upserts (ver insertar_documentos).
+        control (ControlTamanoLote): tamaño de escritura de la colección.
+
+    """
+    def __init__(self, coleccion:Collection, batch_size:int, metricas:MetricasIngesta=None, upsert:bool=False):
+        self.coleccion = coleccion
+        self.upsert = upsert
+        self.metricas = metricas
+        self.control = ControlTamanoLote(nombre=coleccion.name, tamano_inicial=batch_size, limite_bytes=LIMITE_BYTES_MONGO,
+                                         adaptativo=MODO_LOTES_ADAPTATIVOS)
+
+    def escribir(self, documentos:List[dict])-> None:
+        """
+
+        Inserta los documentos, partidos en escrituras del tamaño actual. Sin modo adaptativo, se insertan todos de una vez.
+
+        Args:
+            documentos (list): documentos a insertar.
+
+        Returns:
+            None
+
+        """
+        inicio_tramo = 0
+
+        # El tamaño puede cambiar tras cada escritura, así que cada tramo se corta con el tamaño del momento
+        while inicio_tramo < len(documentos):
+            tramo = documentos[inicio_tramo:inicio_tramo + self.control.tamano] if MODO_LOTES_ADAPTATIVOS else documentos
+            inicio_tramo += len(tramo)
+
+            inicio = time.perf_counter()
+            insertar_documentos(coleccion=self.coleccion, documentos=tramo, upsert=self.upsert)
+            segundos = time.perf_counter() - inicio
+
+            # Sin modo adaptativo no hace falta estimar los bytes
+            n_bytes = estimar_bytes_documentos(tramo) if MODO_LOTES_ADAPTATIVOS else 0.0
+            self.control.registrar_escritura(n_filas=len(tramo), n_bytes=n_bytes, segundos=segundos)
+
+            if self.metricas is not None:
+                self.metricas.registrar_escritura(destino=f"mongodb.{self.coleccion.name}", n_filas=len(tramo), segundos=segundos)
+
+    # Las escrituras son síncronas, así que no hay nada que esperar (misma interfaz que EscritorMongoParalelo, ver 
+    # escritura_mongo_paralela.py)
+    def esperar(self)-> None:
+        pass
+
+    def cerrar(self)-> None:
+        pass
+
+    def mostrar_informe(self)-> None:
+        print("Tamaño de escritura en MongoDB:")
+        print(f"    - {self.control.resumen()}")
@@ -0,0 +1,294 @@
+"""
+Este script se empleará para insertar los documentos de MongoDB de load_data.py e inserta_dataset.py sin parar el bucle que lee el
+fichero y escribe en MySQL. Con EscritorMongo (ver escritura_adaptativa.py), cada insert_many se hace en el propio bucle y en modo
+ordenado, así que una escritura lenta para toda la carga, y MongoDB solo recibe una escritura cada vez.
+
+EscritorMongoParalelo tiene la misma interfaz que EscritorMongo, pero cada tramo de documentos se inserta desde un grupo de
+HILOS_ESCRITURA_MONGO hilos:
+
+    - Los insert_many son no ordenados (ordered=False): MongoDB puede repartir los documentos como quiera y un error en uno no para
+      el resto.
+    - Como mucho hay MAXIMO_ESCRITURAS_MONGO_EN_VUELO tramos escribiéndose o esperando hilo. Con todos los huecos ocupados, escribir()
+      espera a que termine alguno, de forma que la lectura del fichero no puede acumular documentos en memoria sin límite.
+    - Las escrituras de la carga usan el write concern WRITE_CONCERN_CARGA_MONGO (por defecto w=1 sin esperar al journal), en lugar
+      del de la conexión. Con puntos de control se espera siempre al journal (j=True): si no, esperar() solo garantiza que los
+      documentos han llegado a la memoria de mongod, y una caída de MongoDB después del punto de control perdería documentos que la
+      reanudación ya no vuelve a escribir.
+    - Si fallan algunos documentos de un tramo, solo se vuelven a insertar esos (hasta REINTENTOS_ESCRITURA_MONGO veces, esperando
+      cada vez el doble). Si falla la conexión, se reintenta el tramo entero; los documentos que sí se habían insertado dan entonces
+      error de clave duplicada, que en los reintentos no se tiene en cuenta.
+    - En modo upsert (MODO_UPSERT_MONGODB en inserta_dataset.py), cada tramo se escribe con un bulk_write no ordenado de upserts
+      (ver insertar_documentos en escritura_adaptativa.py), con los mismos reintentos.
+
+Antes de cada commit de MySQL hay que llamar a esperar(), que espera a que terminen todas las escrituras en vuelo y lanza el primer
+error que haya habido, para que MongoDB llegue hasta la misma review que MySQL (y los puntos de control sigan siendo correctos).
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import BoundedSemaphore, Lock
+from pymongo.collection import Collection
+from pymongo.errors import AutoReconnect, BulkWriteError
+from pymongo.write_concern import WriteConcern
+from typing import List
+from escritura_adaptativa import ControlTamanoLote, EscritorMongo, estimar_bytes_documentos, insertar_documentos, LIMITE_BYTES_MONGO
+from metricas_ingesta import MetricasIngesta
+
+############################################################################################################################################
+
+# Código de error de MongoDB de clave duplicada
+CODIGO_CLAVE_DUPLICADA = 11000
+
+############################################################################################################################################
+
+# DOCUMENTOS QUE HAY QUE REINTENTAR
+def documentos_fallidos(documentos:List[dict], error:BulkWriteError, reintento:int, upsert:bool=False)-> List[dict]:
+    """
+
+    Devuelve los documentos de un insert_many (o bulk_write de upserts) no ordenado que hay que volver a escribir tras un
+    BulkWriteError.
+
+    Args:
+        documentos (list): documentos de la escritura, en el mismo orden.
+        error (BulkWriteError): error de la escritura.
+        reintento (int): número de reintentos ya hechos (0 en la primera escritura).
+        upsert (bool, optional): si la escritura era de upserts. Defaults to False.
+
+    Returns:
+        list: documentos que no se han escrito (vacía si no hay que reintentar nada).
+
+    """
+    errores_escritura = error.details.get("writeErrors", [])
+
+    # En la primera escritura, una clave duplicada es un documento que ya estaba en la colección, y reintentarlo no sirve de nada (con
+    # upserts, solo pasa si dos upserts del mismo _id insertan a la vez, y al reintentar el segundo actualiza el documento)
+    if not upsert and reintento == 0 and any(error_escritura["code"] == CODIGO_CLAVE_DUPLICADA for error_escritura in errores_escritura):
+        raise error
+
+    # Si no se ha cumplido el write concern, no se sabe qué documentos han quedado escritos, así que se reintentan todos
+    if error.details.get("writeConcernErrors"):
+        return documentos
+
+    if upsert:
+        return [documentos[error_escritura["index"]] for error_escritura in errores_escritura]
+
+    # En los reintentos, una clave duplicada es un documento que ya se insertó en un intento anterior
+    return [documentos[error_escritura["index"]] for error_escritura in errores_escritura
+            if error_escritura["code"] != CODIGO_CLAVE_DUPLICADA]
+
+############################################################################################################################################
+
+# ESCRITURA DE LOS DOCUMENTOS EN PARALELO
+class EscritorMongoParalelo:
+    """
+
+    Inserta documentos en una colección de MongoDB con insert_many no ordenados desde un grupo de hilos, con un número máximo de
+    escrituras en vuelo.
+
+    Attributes:
+        coleccion (Collection): colección de MongoDB, con el write concern de la carga.
+        upsert (bool): si es True, los documentos se escriben con upserts.
+        control (ControlTamanoLote): tamaño de cada tramo de documentos.
+        reintentos (int): reintentos hechos.
+        documentos_reintentados (int): documentos que se han vuelto a insertar en los reintentos.
+
+    """
+    def __init__(self, coleccion:Collection, batch_size:int, metricas:MetricasIngesta=None, n_hilos:int=HILOS_ESCRITURA_MONGO,
+                 maximo_en_vuelo:int=MAXIMO_ESCRITURAS_MONGO_EN_VUELO, write_concern:dict=WRITE_CONCERN_CARGA_MONGO, upsert:bool=False):
+        self.coleccion = coleccion.with_options(write_concern=WriteConcern(**write_concern))
+        self.upsert = upsert
+        self.metricas = metricas
+        self.control = ControlTamanoLote(nombre=coleccion.name, tamano_inicial=batch_size, limite_bytes=LIMITE_BYTES_MONGO,
+                                         adaptativo=MODO_LOTES_ADAPTATIVOS)
+        self.reintentos = 0
+        self.documentos_reintentados = 0
+
+        self._hilos = ThreadPoolExecutor(max_workers=n_hilos, thread_name_prefix="escritura_mongo")
+        self._huecos = BoundedSemaphore(maximo_en_vuelo)
+        self._cerrojo = Lock()
+        self._en_vuelo = []
+        self._errores = []
+
+    def escribir(self, documentos:List[dict])-> None:
+        """
+
+        Reparte los documentos en tramos del tamaño actual y los manda a insertar, sin esperar a que terminen (salvo que no quede
+        ningún hueco libre). Si alguna escritura anterior ha fallado, lanza su error.
+
+        Args:
+            documentos (list): documentos a insertar. La lista se puede vaciar o reutilizar después de la llamada.
+
+        Returns:
+            None
+
+        """
+        self._comprobar_errores()
+
+        inicio_tramo = 0
+
+        while inicio_tramo < len(documentos):
+
+            # Cada tramo es una lista nueva, así que no le afecta que el bucle de carga vacíe la suya
+            tramo = documentos[inicio_tramo:inicio_tramo + self.control.tamano]
+            inicio_tramo += len(tramo)
+
+            # Con todos los huecos ocupados, esperamos a que termine alguna escritura (backpressure)
+            self._huecos.acquire()
+            self._en_vuelo.append(self._hilos.submit(self._escribir_tramo, tramo))
+
+        self._en_vuelo = [escritura for escritura in self._en_vuelo if not escritura.done()]
+
+    def _escribir_tramo(self, tramo:List[dict])-> None:
+        """
+
+        Inserta un tramo de documentos (en uno de los hilos) y apunta la escritura. Si falla, guarda el error para lanzarlo desde el
+        hilo de la carga.
+
+        Args:
+            tramo (list): documentos del tramo.
+
+        Returns:
+            None
+
+        """
+        try:
+            inicio = time.perf_counter()
+            self._insertar_con_reintentos(documentos=tramo)
+            segundos = time.perf_counter() - inicio
+
+            # Sin modo adaptativo no hace falta estimar los bytes
+            n_bytes = estimar_bytes_documentos(tramo) if MODO_LOTES_ADAPTATIVOS else 0.0
+
+            with self._cerrojo:
+                self.control.registrar_escritura(n_filas=len(tramo), n_bytes=n_bytes, segundos=segundos)
+
+            if self.metricas is not None:
+                self.metricas.registrar_escritura(destino=f"mongodb.{self.coleccion.name}", n_filas=len(tramo), segundos=segundos)
+
+        except Exception as error:
+            with self._cerrojo:
+                self._errores.append(error)
+
+        finally:
+            self._huecos.release()
+
+    def _insertar_con_reintentos(self, documentos:List[dict])-> None:
+        """
+
+        Inserta los documentos con un insert_many (o un bulk_write de upserts) no ordenado y reintenta solo los que fallen.
+
+        Args:
+            documentos (list): documentos a insertar.
+
+        Returns:
+            None
+
+        """
+        pendientes = documentos
+        reintento = 0
+
+        while True:
+            try:
+                insertar_documentos(coleccion=self.coleccion, documentos=pendientes, upsert=self.upsert, ordered=False)
+                return
+
+            except BulkWriteError as error:
+                ultimo_error = error
+                fallidos = documentos_fallidos(documentos=pendientes, error=error, reintento=reintento, upsert=self.upsert)
+
+                if not fallidos:
+                    return
+
+            # Si se pierde la conexión, no se sabe qué documentos han llegado a insertarse
+            except AutoReconnect as error:
+                ultimo_error = error
+                fallidos = pendientes
+
+            if reintento >= REINTENTOS_ESCRITURA_MONGO:
+                raise ultimo_error
+
+            time.sleep(ESPERA_REINTENTO_MONGO_SEGUNDOS * 2 ** reintento)
+
+            reintento += 1
+            pendientes = fallidos
+
+            with self._cerrojo:
+                self.reintentos += 1
+                self.documentos_reintentados += len(fallidos)
+
+    def _comprobar_errores(self)-> None:
+        with self._cerrojo:
+            if self._errores:
+                raise self._errores[0]
+
+    def esperar(self)-> None:
+        """
+
+        Espera a que terminen todas las escrituras en vuelo y lanza el primer error que haya habido. Hay que llamarla antes de cada
+        commit de MySQL.
+
+        Returns:
+            None
+
+        """
+        wait(self._en_vuelo)
+        self._en_vuelo = []
+
+        self._comprobar_errores()
+
+    def cerrar(self)-> None:
+        """
+
+        Espera a que terminen todas las escrituras y para los hilos.
+
+        Returns:
+            None
+
+        """
+        try:
+            self.esperar()
+        finally:
+            self._hilos.shutdown(wait=True)
+
+    def mostrar_informe(self)-> None:
+        print("Tamaño de escritura en MongoDB:")
+        print(f"    - {self.control.resumen()}")
+
+        if self.reintentos:
+            print(f"    - {self.reintentos} reintentos, {self.documentos_reintentados} documentos reinsertados")
+
+############################################################################################################################################
+
+# ELECCIÓN DEL ESCRITOR DE MONGODB DE UNA CARGA
+def crear_escritor_mongo(coleccion:Collection, batch_size:int, metricas:MetricasIngesta=None, upsert:bool=False, duradero:bool=False):
+    """
+
+    Crea el escritor de los documentos de MongoDB de una carga: EscritorMongoParalelo si ESCRITURA_MONGO_PARALELA está activado, y
+    EscritorMongo si no.
+
+    Args:
+        coleccion (Collection): colección de MongoDB.
+        batch_size (int): tamaño inicial de las escrituras.
+        metricas (MetricasIngesta, optional): métricas en directo de la carga. Defaults to None.
+        upsert (bool, optional): si es True, los documentos se escriben con upserts. Defaults to False.
+        duradero (bool, optional): si es True (con puntos de control), las escrituras en paralelo esperan al journal. Defaults to False.
+
+    Returns:
+        EscritorMongoParalelo o EscritorMongo: escritor de la colección.
+
+    """
+    if ESCRITURA_MONGO_PARALELA:
+        write_concern = {**WRITE_CONCERN_CARGA_MONGO, "j": True} if duradero else WRITE_CONCERN_CARGA_MONGO
+
+        return EscritorMongoParalelo(coleccion=coleccion, batch_size=batch_size, metricas=metricas, write_concern=write_concern, upsert=upsert)
+
+    return EscritorMongo(coleccion=coleccion, batch_size=batch_size, metricas=metricas, upsert=upsert)
@@ -0,0 +1,199 @@
+"""
+Este script se empleará para convertir una base de datos de MySQL ya cargada al esquema compacto (COLUMNAS_TABLAS_SQL_COMPACTO de
+load_data.py), sin tener que volver a cargar los ficheros de datos.
+
+Con miles de millones de reviews, los bytes de cada fila de Review deciden cuánta parte de la tabla y de sus índices cabe en el buffer
+pool de InnoDB. El esquema compacto guarda overall en TINYINT, los identificadores sin signo, tipo_producto en SMALLINT, y la fecha una
+sola vez: unixReviewTime pasa a ser una columna virtual calculada a partir de reviewTime.
+
+Antes de convertir nada se comprueba que todos los datos caben en los tipos nuevos y que unixReviewTime es siempre la medianoche UTC
+de reviewTime (como en los ficheros de Amazon), para que no se pierda ningún valor. Si hay algún problema, no se cambia nada. Cada tabla
+se convierte con un único ALTER TABLE, con la comprobación de claves foráneas desactivada mientras tanto (las dos columnas de cada
+clave foránea cambian de tipo en tablas distintas).
+
+Después de convertir la base de datos hay que poner ESQUEMA_COMPACTO = True en configuracion.py, para que las inserciones dejen de
+enviar unixReviewTime. El efecto en el tamaño de las tablas y en la velocidad de los recorridos se mide con benchmark_esquema.py.
+
+Ejemplo:
+                python src/esquema_compacto.py
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+import pymysql
+from pymysql.connections import Connection
+from typing import List
+from load_data import crear_columnas_fecha_faltantes_sql, COLUMNAS_TABLAS_SQL_COMPACTO, COLUMNAS_FECHA_REVIEW_SQL
+
+############################################################################################################################################
+
+# Comprobaciones antes de convertir: (descripción, consulta que cuenta las filas que no caben en el esquema compacto)
+COMPROBACIONES_ESQUEMA_COMPACTO = [
+
+    ("reviews con overall fuera de TINYINT UNSIGNED", "SELECT COUNT(*) FROM Review WHERE overall NOT BETWEEN 0 AND 255;"),
+    ("reviews con identificadores fuera de INT UNSIGNED",
+     "SELECT COUNT(*) FROM Review WHERE LEAST(id_review, id_persona, id_producto) < 0 OR GREATEST(id_review, id_persona, id_producto) > 4294967295;"),
+    ("personas con id_persona fuera de INT UNSIGNED", "SELECT COUNT(*) FROM Personas WHERE id_persona NOT BETWEEN 0 AND 4294967295;"),
+    ("productos con id_producto fuera de INT UNSIGNED", "SELECT COUNT(*) FROM Productos WHERE id_producto NOT BETWEEN 0 AND 4294967295;"),
+    ("tipos de producto fuera de SMALLINT UNSIGNED", "SELECT COUNT(*) FROM Tipos_producto WHERE tipo_producto NOT BETWEEN 0 AND 65535;"),
+    ("reviewerID de más de 32 caracteres", "SELECT COUNT(*) FROM Personas WHERE CHAR_LENGTH(reviewerID) > 32;"),
+    ("asin de más de 20 caracteres", "SELECT COUNT(*) FROM Productos WHERE CHAR_LENGTH(asin) > 20;"),
+    ("nombres de tipo de producto de más de 64 caracteres", "SELECT COUNT(*) FROM Tipos_producto WHERE CHAR_LENGTH(nombre_tipo_producto) > 64;"),
+    ("reviews cuyo unixReviewTime no es la medianoche UTC de reviewTime",
+     """SELECT COUNT(*) FROM Review
+        WHERE unixReviewTime IS NOT NULL AND (reviewTime IS NULL OR unixReviewTime <> (TO_DAYS(reviewTime) - 719528) * 86400);""")
+]
+
+############################################################################################################################################
+
+# COMPROBACIONES
+def es_esquema_compacto(conexion:Connection)-> bool:
+    """
+
+    Indica si las tablas de la base de datos ya tienen el esquema compacto (overall en TINYINT).
+
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL, con la base de datos seleccionada.
+
+    Returns:
+        bool: True si la tabla Review ya tiene el esquema compacto.
+
+    """
+    cursor = conexion.cursor()
+
+    cursor.execute("""
+        SELECT DATA_TYPE
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND LOWER(TABLE_NAME) = 'review' AND COLUMN_NAME = 'overall';
+    """)
+    fila = cursor.fetchone()
+    cursor.close()
+
+    return fila is not None and fila[0].lower() == "tinyint"
+
+def validar_esquema_compacto(conexion:Connection)-> List[str]:
+    """
+
+    Comprueba que todos los datos de las tablas caben en el esquema compacto sin perder ningún valor.
+
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL, con la base de datos seleccionada.
+
+    Returns:
+        list: lista de mensajes con los problemas encontrados (vacía si todo es correcto).
+
+    """
+    problemas = []
+    cursor = conexion.cursor()
+
+    for descripcion, consulta in COMPROBACIONES_ESQUEMA_COMPACTO:
+
+        cursor.execute(consulta)
+        n_filas = cursor.fetchone()[0]
+
+        if n_filas:
+            problemas.append(f"{n_filas} {descripcion}")
+
+    cursor.close()
+
+    return problemas
+
+############################################################################################################################################
+
+# CONVERSIÓN AL ESQUEMA COMPACTO
+def alteraciones_esquema_compacto(tabla:str)-> List[str]:
+    """
+
+    Devuelve los cambios de un ALTER TABLE que pasan una tabla al esquema compacto: las columnas normales se modifican y las generadas
+    (unixReviewTime) se vuelven a crear, porque MySQL no permite convertir una columna normal en una virtual. Las columnas generadas de
+    fecha (COLUMNAS_FECHA_REVIEW_SQL) no cambian.
+
+    Args:
+        tabla (str): nombre de la tabla (clave de COLUMNAS_TABLAS_SQL_COMPACTO).
+
+    Returns:
+        list: cambios de la tabla ("MODIFY COLUMN ...", "DROP COLUMN ...", "ADD COLUMN ...").
+
+    """
+    alteraciones = []
+
+    for columna in COLUMNAS_TABLAS_SQL_COMPACTO[tabla]:
+
+        if columna in COLUMNAS_FECHA_REVIEW_SQL:
+            continue
+
+        if " AS (" in columna:
+            alteraciones += [f"DROP COLUMN {columna.split()[0]}", f"ADD COLUMN {columna}"]
+        else:
+            alteraciones.append(f"MODIFY COLUMN {columna}")
+
+    return alteraciones
+
+def migrar_esquema_compacto(conexion:Connection)-> bool:
+    """
+
+    Convierte las tablas de la base de datos al esquema compacto, después de validar los datos. Si hay algún problema, no se cambia
+    nada.
+
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL, con la base de datos seleccionada.
+
+    Returns:
+        bool: True si la base de datos ha quedado con el esquema compacto.
+
+    """
+    if es_esquema_compacto(conexion=conexion):
+        print("\nLas tablas de SQL ya tienen el esquema compacto.")
+        return True
+
+    problemas = validar_esquema_compacto(conexion=conexion)
+
+    if problemas:
+        print("\nNo se ha convertido la base de datos al esquema compacto porque hay datos que no caben:")
+        for problema in problemas:
+            print(f"    - {problema}")
+        return False
+
+    # Las columnas generadas de fecha tienen que existir antes de convertir Review (las bases de datos antiguas pueden no tenerlas)
+    crear_columnas_fecha_faltantes_sql(conexion=conexion)
+
+    cursor = conexion.cursor()
+
+    # Mientras se convierten, las columnas de cada clave foránea tienen tipos distintos en sus dos tablas
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0;")
+
+    try:
+        # Un único ALTER TABLE por tabla, para reconstruir cada tabla (e índices) una sola vez
+        for tabla in COLUMNAS_TABLAS_SQL_COMPACTO:
+            cursor.execute(f"ALTER TABLE {tabla} " + ", ".join(alteraciones_esquema_compacto(tabla=tabla)) + ";")
+            print(f"\nTabla de SQL: \"{tabla}\" convertida al esquema compacto.")
+
+    finally:
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1;")
+
+    cursor.close()
+
+    return es_esquema_compacto(conexion=conexion)
+
+############################################################################################################################################
+
+if __name__=="__main__":
+
+    try:
+        conexion_sql = pymysql.connect(host="localhost", user=USER_SQL, password=PASSWORD_SQL, database=NOMBRE_BASE_DATOS_SQL)
+
+        if migrar_esquema_compacto(conexion=conexion_sql) and not ESQUEMA_COMPACTO:
+            print("\nAviso: pon ESQUEMA_COMPACTO = True en configuracion.py antes de volver a insertar datos en esta base de datos.")
+
+        conexion_sql.close()
+
+    except Exception as e:
+        # Controlamos posibles excepciones
+        print(f"\n>>>>>>>>>>>>>>>> ERROR: {e}")
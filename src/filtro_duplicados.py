@@ -0,0 +1,629 @@
+"""
+Este script se empleará para detectar en inserta_dataset.py las reviews que ya están en la base de datos (la misma review en varios
+ficheros de categorías, o un fichero que se vuelve a entregar), que si no se insertarían otra vez con un id_review nuevo, tanto en
+Review como en la colección de MongoDB.
+
+Una review está repetida si ya hay otra con el mismo (reviewerID, asin, unixReviewTime). Buscar cada review en MySQL haría una consulta
+más por review, así que primero se mira en un filtro de Bloom con las claves de todas las reviews de la base de datos:
+
+    - Si el filtro dice que la clave no está, seguro que no está (un filtro de Bloom no tiene falsos negativos), y la review se
+      inserta sin consultar nada.
+    - Si dice que está, puede ser un falso positivo (con probabilidad PROBABILIDAD_ERROR_FILTRO_DUPLICADOS), así que las claves
+      sospechosas de cada lote se confirman con una única consulta a MySQL, y solo se descartan las que de verdad existen.
+
+El filtro es escalable (FiltroBloomEscalable): empieza con capacidad para CAPACIDAD_INICIAL_FILTRO_DUPLICADOS claves y, cuando se
+llena, añade otro el doble de grande y con la mitad de probabilidad de error, de forma que la probabilidad total nunca pasa de
+PROBABILIDAD_ERROR_FILTRO_DUPLICADOS. Con un 0,1 % de error ocupa unos 1,8 bytes por review (unos 180 MB para cien millones).
+
+El filtro se guarda en CARPETA_FILTRO_DUPLICADOS al terminar la inserción (de forma atómica, como los puntos de control), junto con una
+huella de las reviews de la base de datos en ese momento (servidor, base de datos, número de reviews, mayor id_review y un CRC32 de la
+review con ese id_review, todo sacado de la clave primaria de Review sin recorrer sus filas) y un CRC32 de los bits. Al empezar:
+
+    - Si la huella coincide, el filtro se usa tal cual.
+    - Si no coincide pero la review con el id_review guardado sigue igual, se añaden al filtro solo las reviews posteriores (las que
+      se han insertado después sin filtro), y se usa si con ellas sale el número de reviews actual.
+    - Si no (el fichero no existe o está dañado, se ha cargado la base de datos con load_data.py, se han borrado reviews o una inserción
+      a la vez ha dejado reviews con identificadores más bajos), el filtro se vuelve a construir recorriendo Review.
+
+La detección está desactivada por defecto (DETECTAR_REVIEWS_DUPLICADAS): la primera inserción tiene que recorrer Review entera para
+construir el filtro y todas calculan un hash por review.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+import hashlib
+import json
+import math
+import os
+import tempfile
+import time
+import zlib
+from pymysql.connections import Connection
+from pymysql.cursors import SSCursor
+from typing import List, Set, Tuple
+
+############################################################################################################################################
+
+# Cada filtro nuevo del filtro escalable tiene FACTOR_CRECIMIENTO_FILTRO veces la capacidad del anterior y RATIO_ERROR_FILTRO veces su
+# probabilidad de error (la suma de las probabilidades de todos los filtros no pasa de la probabilidad total)
+FACTOR_CRECIMIENTO_FILTRO = 2
+RATIO_ERROR_FILTRO = 0.5
+
+# Reviewers que se confirman en cada consulta a MySQL
+TAMANO_CONSULTA_DUPLICADOS = 1000
+
+# Filas que se leen de cada vez al construir el filtro
+TAMANO_LECTURA_FILTRO = 10000
+
+# Versión del formato del fichero del filtro (un fichero de otra versión se descarta y el filtro se vuelve a construir)
+VERSION_FICHERO_FILTRO = 2
+
+# Huella de las reviews de la base de datos: número y mayor id_review (los dos salen de un índice, sin leer las filas de Review)
+QUERY_HUELLA_REVIEWS = """
+    SELECT COUNT(*), MAX(id_review)
+    FROM Review;
+"""
+
+# CRC32 de una review, buscada por su clave primaria
+QUERY_CRC_REVIEW = """
+    SELECT CRC32(CONCAT_WS(',', id_review, id_persona, id_producto, unixReviewTime))
+    FROM Review
+    WHERE id_review = %s;
+"""
+
+# Todas las reviews de la base de datos, con su clave
+QUERY_CLAVES_REVIEWS = """
+    SELECT p.reviewerID, pr.asin, r.unixReviewTime, r.id_review
+    FROM Review r
+    INNER JOIN Personas p ON p.id_persona = r.id_persona
+    INNER JOIN Productos pr ON pr.id_producto = r.id_producto
+"""
+
+############################################################################################################################################
+
+# CLAVES DE LAS REVIEWS
+def clave_review(reviewerID:str, asin:str, unixReviewTime:int)-> Tuple[str, str, int]:
+    return (reviewerID, asin, unixReviewTime)
+
+def hashes_clave(clave:tuple)-> Tuple[int, int]:
+    """
+
+    Calcula los dos hashes de 64 bits de una clave, a partir de los que se obtienen todas las posiciones del filtro (doble hashing).
+
+    Args:
+        clave (tuple): clave de la review (clave_review).
+
+    Returns:
+        tuple: (h1, h2), con h2 impar para que recorra todas las posiciones.
+
+    """
+    resumen = hashlib.blake2b("\x1f".join(str(campo) for campo in clave).encode("utf-8"), digest_size=16).digest()
+
+    return int.from_bytes(resumen[:8], "little"), int.from_bytes(resumen[8:], "little") | 1
+
+############################################################################################################################################
+
+# FILTROS DE BLOOM
+class FiltroBloom:
+    """
+
+    Filtro de Bloom de tamaño fijo, con los bits en un bytearray.
+
+    Attributes:
+        capacidad (int): número de claves para el que se ha dimensionado.
+        probabilidad_error (float): probabilidad de falso positivo con capacidad claves.
+        n_bits (int): bits del filtro.
+        n_hashes (int): posiciones que se marcan por clave.
+        n_elementos (int): claves añadidas.
+
+    """
+    def __init__(self, capacidad:int, probabilidad_error:float, bits:bytearray=None, n_elementos:int=0):
+        self.capacidad = capacidad
+        self.probabilidad_error = probabilidad_error
+
+        # Tamaño óptimo: m = -n ln(p) / ln(2)^2 bits y k = m / n ln(2) hashes
+        self.n_bits = max(8, math.ceil(-capacidad * math.log(probabilidad_error) / math.log(2) ** 2))
+        self.n_hashes = max(1, round(self.n_bits / capacidad * math.log(2)))
+
+        self.bits = bits if bits is not None else bytearray((self.n_bits + 7) // 8)
+        self.n_elementos = n_elementos
+
+    def posiciones(self, h1:int, h2:int)-> List[int]:
+        return [(h1 + i * h2) % self.n_bits for i in range(self.n_hashes)]
+
+    def contiene(self, h1:int, h2:int)-> bool:
+        return all(self.bits[posicion >> 3] & (1 << (posicion & 7)) for posicion in self.posiciones(h1, h2))
+
+    def anadir(self, h1:int, h2:int)-> None:
+        for posicion in self.posiciones(h1, h2):
+            self.bits[posicion >> 3] |= 1 << (posicion & 7)
+
+        self.n_elementos += 1
+
+    def lleno(self)-> bool:
+        return self.n_elementos >= self.capacidad
+
+class FiltroBloomEscalable:
+    """
+
+    Filtro de Bloom que crece: cuando el último filtro llega a su capacidad, se añade otro más grande y con menos probabilidad de error.
+    Una clave está en el filtro si está en alguno de ellos.
+
+    Attributes:
+        capacidad_inicial (int): capacidad del primer filtro.
+        probabilidad_error (float): probabilidad de falso positivo total.
+        filtros (list): filtros de Bloom, del más antiguo al más nuevo (las claves nuevas van al último).
+
+    """
+    def __init__(self, capacidad_inicial:int=CAPACIDAD_INICIAL_FILTRO_DUPLICADOS,
+                 probabilidad_error:float=PROBABILIDAD_ERROR_FILTRO_DUPLICADOS, filtros:List[FiltroBloom]=None):
+        self.capacidad_inicial = capacidad_inicial
+        self.probabilidad_error = probabilidad_error
+        self.filtros = filtros if filtros is not None else []
+
+    def nuevo_filtro(self)-> FiltroBloom:
+        """
+
+        Crea el siguiente filtro: el i-ésimo tiene capacidad_inicial * FACTOR_CRECIMIENTO_FILTRO^i claves y probabilidad de error
+        probabilidad_error * (1 - RATIO_ERROR_FILTRO) * RATIO_ERROR_FILTRO^i, que sumadas dan como mucho probabilidad_error.
+
+        Returns:
+            FiltroBloom: filtro nuevo, ya añadido a filtros.
+
+        """
+        i = len(self.filtros)
+
+        filtro = FiltroBloom(capacidad=self.capacidad_inicial * FACTOR_CRECIMIENTO_FILTRO ** i,
+                             probabilidad_error=self.probabilidad_error * (1 - RATIO_ERROR_FILTRO) * RATIO_ERROR_FILTRO ** i)
+        self.filtros.append(filtro)
+
+        return filtro
+
+    def contiene(self, clave:tuple)-> bool:
+        h1, h2 = hashes_clave(clave)
+        return any(filtro.contiene(h1, h2) for filtro in self.filtros)
+
+    def anadir(self, clave:tuple)-> None:
+        filtro = self.filtros[-1] if self.filtros and not self.filtros[-1].lleno() else self.nuevo_filtro()
+        filtro.anadir(*hashes_clave(clave))
+
+    @property
+    def n_elementos(self)-> int:
+        return sum(filtro.n_elementos for filtro in self.filtros)
+
+    @property
+    def n_bytes(self)-> int:
+        return sum(len(filtro.bits) for filtro in self.filtros)
+
+############################################################################################################################################
+
+# LECTURA Y ESCRITURA DEL FILTRO
+def ruta_filtro_duplicados()-> str:
+    return os.path.join(CARPETA_FILTRO_DUPLICADOS, f"{NOMBRE_BASE_DATOS_SQL}.bloom")
+
+def huella_base_datos(conexion:Connection)-> dict:
+    """
+
+    Calcula la huella de las reviews de la base de datos con la que se guarda el filtro: servidor, base de datos, número de reviews,
+    mayor id_review y el CRC32 de la review con ese id_review. Todo sale de la clave primaria de Review, así que no hace falta recorrer
+    la tabla en cada inserción (ver abrir_detector_duplicados).
+
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL.
+
+    Returns:
+        dict: {"servidor", "base_datos", "n_reviews", "max_id_review", "crc_ultima_review"}.
+
+    """
+    cursor = conexion.cursor()
+
+    cursor.execute("SELECT @@hostname, @@port, DATABASE();")
+    servidor, puerto, base_datos = cursor.fetchone()
+
+    cursor.execute(QUERY_HUELLA_REVIEWS)
+    n_reviews, max_id_review = cursor.fetchone()
+
+    cursor.close()
+
+    max_id_review = None if max_id_review is None else int(max_id_review)
+
+    return {"servidor": f"{servidor}:{puerto}", "base_datos": base_datos, "n_reviews": int(n_reviews), "max_id_review": max_id_review,
+            "crc_ultima_review": crc_review(conexion=conexion, id_review=max_id_review)}
+
+def crc_review(conexion:Connection, id_review:int)-> int:
+    """
+
+    Calcula el CRC32 de la review con un id_review (una búsqueda por la clave primaria).
+
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL.
+        id_review (int): identificador de la review, o None.
+
+    Returns:
+        int: CRC32 de la review, o None si no existe.
+
+    """
+    if id_review is None:
+        return None
+
+    cursor = conexion.cursor()
+    cursor.execute(QUERY_CRC_REVIEW, (id_review,))
+    fila = cursor.fetchone()
+    cursor.close()
+
+    return None if fila is None else int(fila[0])
+
+def crc_filtro(filtro:FiltroBloomEscalable)-> int:
+    crc = 0
+    for f in filtro.filtros:
+        crc = zlib.crc32(f.bits, crc)
+
+    return crc
+
+def guardar_filtro(filtro:FiltroBloomEscalable, huella:dict, ruta:str)-> None:
+    """
+
+    Guarda el filtro en disco de forma atómica (fichero temporal, fsync y os.replace, como guardar_punto_control en puntos_control.py):
+    una línea JSON con la cabecera (versión del formato, huella de la base de datos, parámetros y CRC32 de los bits) y, a continuación,
+    los bits de cada filtro.
+
+    Args:
+        filtro (FiltroBloomEscalable): filtro a guardar.
+        huella (dict): huella de la base de datos con la que se corresponde el filtro (huella_base_datos).
+        ruta (str): ruta del fichero.
+
+    Returns:
+        None
+
+    """
+    carpeta = os.path.dirname(ruta) or "."
+    os.makedirs(carpeta, exist_ok=True)
+
+    cabecera = {"version": VERSION_FICHERO_FILTRO, "huella": huella, "capacidad_inicial": filtro.capacidad_inicial,
+                "probabilidad_error": filtro.probabilidad_error, "crc_bits": crc_filtro(filtro=filtro),
+                "filtros": [{"capacidad": f.capacidad, "probabilidad_error": f.probabilidad_error, "n_elementos": f.n_elementos}
+                            for f in filtro.filtros]}
+
+    descriptor, ruta_temporal = tempfile.mkstemp(prefix=".filtro_duplicados_", suffix=".bloom", dir=carpeta)
+
+    try:
+        with os.fdopen(descriptor, "wb") as fichero:
+            fichero.write(json.dumps(cabecera).encode("utf-8") + b"\n")
+            for f in filtro.filtros:
+                fichero.write(f.bits)
+            fichero.flush()
+            os.fsync(fichero.fileno())
+
+        os.replace(ruta_temporal, ruta)
+
+    except BaseException:
+        if os.path.exists(ruta_temporal):
+            os.remove(ruta_temporal)
+        raise
+
+def cargar_filtro(ruta:str)-> Tuple[FiltroBloomEscalable, dict]:
+    """
+
+    Carga un filtro guardado con guardar_filtro, comprobando la versión del formato, el tamaño de cada filtro y el CRC32 de los bits.
+
+    Args:
+        ruta (str): ruta del fichero.
+
+    Returns:
+        tuple: (filtro, huella de la base de datos con la que se guardó), o (None, None) si el fichero no existe, no se puede leer o
+            está dañado.
+
+    """
+    if not os.path.exists(ruta):
+        return None, None
+
+    try:
+        with open(ruta, "rb") as fichero:
+            cabecera = json.loads(fichero.readline().decode("utf-8"))
+
+            if cabecera.get("version") != VERSION_FICHERO_FILTRO:
+                return None, None
+
+            filtros = []
+
+            for datos in cabecera["filtros"]:
+                # Los bits se leen directamente, sin reservar antes un filtro vacío del mismo tamaño
+                f = FiltroBloom(capacidad=datos["capacidad"], probabilidad_error=datos["probabilidad_error"], bits=bytearray(),
+                                n_elementos=datos["n_elementos"])
+                f.bits = bytearray(fichero.read((f.n_bits + 7) // 8))
+
+                # Un fichero cortado no sirve
+                if len(f.bits) != (f.n_bits + 7) // 8:
+                    return None, None
+
+                filtros.append(f)
+
+            # Ni uno con bytes de más
+            if fichero.read(1):
+                return None, None
+
+    except (OSError, ValueError, KeyError):
+        return None, None
+
+    filtro = FiltroBloomEscalable(capacidad_inicial=cabecera["capacidad_inicial"], probabilidad_error=cabecera["probabilidad_error"],
+                                  filtros=filtros)
+
+    if crc_filtro(filtro=filtro) != cabecera["crc_bits"]:
+        return None, None
+
+    return filtro, cabecera["huella"]
+
+def anadir_reviews_filtro(filtro:FiltroBloomEscalable, conexion:Connection, desde_id_review:int=None)-> int:
+    """
+
+    Añade al filtro las claves de las reviews de la base de datos, leyéndolas por partes (cursor sin buffer) para no traerse la tabla
+    entera a memoria.
+
+    Args:
+        filtro (FiltroBloomEscalable): filtro al que se añaden las claves.
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL.
+        desde_id_review (int, optional): si se indica, solo se añaden las reviews con un id_review mayor (un recorrido de la clave
+            primaria desde ese punto). Defaults to None (todas).
+
+    Returns:
+        int: número de reviews añadidas.
+
+    """
+    n_reviews = 0
+
+    cursor = conexion.cursor(SSCursor)
+
+    if desde_id_review is None:
+        cursor.execute(QUERY_CLAVES_REVIEWS)
+    else:
+        cursor.execute(QUERY_CLAVES_REVIEWS + "WHERE r.id_review > %s;", (desde_id_review,))
+
+    while filas := cursor.fetchmany(TAMANO_LECTURA_FILTRO):
+        for reviewerID, asin, unixReviewTime, _ in filas:
+            filtro.anadir(clave_review(reviewerID=reviewerID, asin=asin, unixReviewTime=unixReviewTime))
+
+        n_reviews += len(filas)
+
+    cursor.close()
+
+    return n_reviews
+
+def construir_filtro(conexion:Connection, n_reviews:int)-> FiltroBloomEscalable:
+    """
+
+    Construye el filtro con las claves de todas las reviews de la base de datos.
+
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL.
+        n_reviews (int): reviews de la base de datos, para que el primer filtro ya tenga sitio para todas.
+
+    Returns:
+        FiltroBloomEscalable: filtro con todas las claves.
+
+    """
+    filtro = FiltroBloomEscalable(capacidad_inicial=max(CAPACIDAD_INICIAL_FILTRO_DUPLICADOS, n_reviews))
+
+    inicio = time.perf_counter()
+
+    anadir_reviews_filtro(filtro=filtro, conexion=conexion)
+
+    print(f"\nFiltro de reviews duplicadas construido con {filtro.n_elementos:,} reviews ({filtro.n_bytes / 2**20:,.1f} MB) "
+          f"en {time.perf_counter() - inicio:.2f} s.")
+
+    return filtro
+
+def actualizar_filtro(filtro:FiltroBloomEscalable, huella_filtro:dict, conexion:Connection, huella:dict)-> bool:
+    """
+
+    Pone al día un filtro guardado cuya huella no coincide con la de la base de datos, añadiéndole solo las reviews insertadas después
+    de guardarlo (las de id_review mayor que el de su huella). Solo se puede si la base de datos es la misma, la review con el
+    id_review guardado no ha cambiado y, con las reviews añadidas, sale el número de reviews actual (si no, faltan reviews con
+    identificadores más bajos, o se han borrado reviews).
+
+    Args:
+        filtro (FiltroBloomEscalable): filtro cargado del fichero.
+        huella_filtro (dict): huella con la que se guardó el filtro.
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL.
+        huella (dict): huella actual de la base de datos (huella_base_datos).
+
+    Returns:
+        bool: True si el filtro ya está al día, False si hay que construirlo de nuevo.
+
+    """
+    if (huella_filtro.get("servidor"), huella_filtro.get("base_datos")) != (huella["servidor"], huella["base_datos"]):
+        return False
+
+    max_id_review = huella_filtro.get("max_id_review")
+
+    if max_id_review is not None and crc_review(conexion=conexion, id_review=max_id_review) != huella_filtro.get("crc_ultima_review"):
+        return False
+
+    n_nuevas = anadir_reviews_filtro(filtro=filtro, conexion=conexion, desde_id_review=max_id_review)
+
+    return huella_filtro.get("n_reviews", 0) + n_nuevas == huella["n_reviews"]
+
+############################################################################################################################################
+
+# DETECCIÓN DE LAS REVIEWS DUPLICADAS
+class DetectorDuplicados:
+    """
+
+    Detecta las reviews de cada lote que ya están en la base de datos (o antes en el mismo fichero), con el filtro de Bloom y una consulta
+    a MySQL por lote solo para las claves que el filtro da como posibles.
+
+    Attributes:
+        conexion (Connection): conexión a MySQL con la que se confirman las claves (la de la inserción).
+        filtro (FiltroBloomEscalable): filtro con las claves de todas las reviews insertadas.
+        pendientes (set): claves de las reviews añadidas desde el último commit, que puede que todavía no estén en MySQL.
+        n_sospechosas (int): claves que el filtro ha dado como posibles y se han consultado en MySQL.
+        n_confirmadas (int): claves consultadas que sí estaban en MySQL.
+        n_duplicadas (int): reviews descartadas por repetidas.
+
+    """
+    def __init__(self, conexion:Connection, filtro:FiltroBloomEscalable):
+        self.conexion = conexion
+        self.filtro = filtro
+        self.pendientes = set()
+        self.n_sospechosas = 0
+        self.n_confirmadas = 0
+        self.n_duplicadas = 0
+
+    def confirmar_en_bd(self, claves:Set[tuple], bloque_propio:Tuple[int, int]=None)-> Set[tuple]:
+        """
+
+        Busca en MySQL cuáles de las claves son de reviews que ya existen.
+
+        Args:
+            claves (set): claves a confirmar.
+            bloque_propio (tuple, optional): (primer id_review, primer id_review fuera) del bloque del lote. Las reviews de ese bloque
+                no cuentan, porque son las del propio lote si ya se había insertado antes de reanudar. Defaults to None.
+
+        Returns:
+            set: claves que están en la base de datos.
+
+        """
+        reviewerIDs = list({clave[0] for clave in claves})
+        existentes = set()
+
+        cursor = self.conexion.cursor()
+
+        # Con el índice de reviewerID, cada consulta solo lee las reviews de esos reviewers
+        for inicio in range(0, len(reviewerIDs), TAMANO_CONSULTA_DUPLICADOS):
+
+            grupo = reviewerIDs[inicio:inicio + TAMANO_CONSULTA_DUPLICADOS]
+            cursor.execute(QUERY_CLAVES_REVIEWS + f"WHERE p.reviewerID IN ({', '.join(['%s'] * len(grupo))});", grupo)
+
+            existentes.update(clave_review(reviewerID=reviewerID, asin=asin, unixReviewTime=unixReviewTime)
+                              for reviewerID, asin, unixReviewTime, id_review in cursor.fetchall()
+                              if bloque_propio is None or not bloque_propio[0] <= id_review < bloque_propio[1])
+
+        cursor.close()
+
+        return claves & existentes
+
+    def detectar_lote(self, claves:List[tuple], bloque_propio:Tuple[int, int]=None)-> Set[int]:
+        """
+
+        Busca las reviews repetidas de un lote y añade al filtro las que no lo están (se supone que se van a insertar todas).
+
+        Args:
+            claves (list): clave de cada review del lote, en orden.
+            bloque_propio (tuple, optional): bloque de identificadores del lote (ver confirmar_en_bd). Defaults to None.
+
+        Returns:
+            set: posiciones en el lote de las reviews repetidas.
+
+        """
+        duplicadas = set()
+        sospechosas = {}  # clave -> posición en el lote
+        vistas = set()
+
+        for posicion, clave in enumerate(claves):
+
+            # Repetida dentro del lote o en un lote aún sin confirmar en MySQL
+            if clave in vistas or clave in self.pendientes:
+                duplicadas.add(posicion)
+
+            elif self.filtro.contiene(clave):
+                sospechosas[clave] = posicion
+
+            vistas.add(clave)
+
+        if sospechosas:
+            self.n_sospechosas += len(sospechosas)
+
+            for clave in self.confirmar_en_bd(claves=set(sospechosas), bloque_propio=bloque_propio):
+                duplicadas.add(sospechosas[clave])
+                self.n_confirmadas += 1
+
+        for posicion, clave in enumerate(claves):
+            if posicion not in duplicadas and clave not in self.pendientes:
+                self.filtro.anadir(clave)
+                self.pendientes.add(clave)
+
+        self.n_duplicadas += len(duplicadas)
+
+        return duplicadas
+
+    def registrar_commit(self)-> None:
+        """
+
+        Tras un commit, las reviews añadidas ya se pueden confirmar en MySQL, así que dejan de estar pendientes.
+
+        Returns:
+            None
+
+        """
+        self.pendientes.clear()
+
+    def mostrar_informe(self)-> None:
+        print(f"\nReviews duplicadas descartadas: {self.n_duplicadas:,} ({self.n_sospechosas:,} claves consultadas en MySQL, "
+              f"{self.n_sospechosas - self.n_confirmadas:,} falsos positivos del filtro; filtro con {self.filtro.n_elementos:,} reviews "
+              f"en {self.filtro.n_bytes / 2**20:,.1f} MB).")
+
+def abrir_detector_duplicados(conexion:Connection)-> DetectorDuplicados:
+    """
+
+    Crea el detector de duplicados de una inserción: carga el filtro guardado si tiene la misma probabilidad de error que la
+    configuración y sigue al día con la base de datos (misma huella, ver huella_base_datos) o se puede poner al día con las reviews
+    insertadas después (ver actualizar_filtro) y, si no, lo construye. El fichero se borra al cargarlo, de forma que si la inserción
+    se interrumpe no queda un filtro guardado sin las reviews insertadas.
+
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL.
+
+    Returns:
+        DetectorDuplicados: detector de la inserción.
+
+    """
+    ruta = ruta_filtro_duplicados()
+    huella = huella_base_datos(conexion=conexion)
+
+    filtro, huella_filtro = cargar_filtro(ruta=ruta)
+
+    if filtro is not None and filtro.probabilidad_error != PROBABILIDAD_ERROR_FILTRO_DUPLICADOS:
+        filtro = None
+
+    if filtro is not None and huella_filtro == huella:
+        print(f"\nFiltro de reviews duplicadas cargado de: \"{ruta}\" ({filtro.n_elementos:,} reviews).")
+
+    elif filtro is not None and actualizar_filtro(filtro=filtro, huella_filtro=huella_filtro, conexion=conexion, huella=huella):
+        print(f"\nFiltro de reviews duplicadas cargado de: \"{ruta}\" y puesto al día con las reviews insertadas después "
+              f"({filtro.n_elementos:,} reviews).")
+
+    else:
+        filtro = construir_filtro(conexion=conexion, n_reviews=huella["n_reviews"])
+
+    if os.path.exists(ruta):
+        os.remove(ruta)
+
+    return DetectorDuplicados(conexion=conexion, filtro=filtro)
+
+def guardar_detector_duplicados(detector:DetectorDuplicados)-> None:
+    """
+
+    Guarda el filtro del detector al terminar la inserción, con la huella de la base de datos. Si mientras tanto otra
+    inserción ha guardado el suyo, no se guarda ninguno de los dos (a cada uno le faltan las reviews del otro), y la siguiente
+    inserción lo construirá de nuevo.
+
+    Args:
+        detector (DetectorDuplicados): detector de la inserción, después del último commit.
+
+    Returns:
+        None
+
+    """
+    ruta = ruta_filtro_duplicados()
+
+    if os.path.exists(ruta):
+        os.remove(ruta)
+        return
+
+    guardar_filtro(filtro=detector.filtro, huella=huella_base_datos(conexion=detector.conexion), ruta=ruta)
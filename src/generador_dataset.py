@@ -0,0 +1,395 @@
+"""
+Este script se empleará para generar ficheros de datos sintéticos, con el mismo formato (JSON lines) y los mismos campos que los
+ficheros _5.json de Amazon: reviewerID, asin, reviewerName, helpful, reviewText, overall, summary, unixReviewTime y reviewTime. Así se
+pueden probar load_data.py e inserta_dataset.py con 10 millones, 100 millones o 1000 millones de reviews sin depender de los ficheros
+que haya en la carpeta NOMBRE_CARPETA.
+
+Los datos se parecen a los reales en lo que afecta al rendimiento de la carga:
+
+    - Las personas y los productos de cada review se eligen con una ley de potencias (EXPONENTE_POPULARIDAD_PERSONAS y
+      EXPONENTE_POPULARIDAD_PRODUCTOS): unos pocos reciben muchas reviews y la mayoría muy pocas.
+    - La puntuación (overall) sigue PROBABILIDADES_OVERALL, que por defecto está sesgada hacia las 5 estrellas como en Amazon.
+    - La longitud de reviewText sigue una distribución log-normal (MEDIA_PALABRAS_REVIEW y DISPERSION_PALABRAS_REVIEW).
+    - Una fracción de las personas (PROBABILIDAD_SIN_NOMBRE) no tiene reviewerName, y las fechas son más frecuentes cuanto más
+      recientes.
+
+El generador es determinista: con la misma semilla y los mismos parámetros se escribe exactamente el mismo fichero. Las reviews se
+generan en bloques de TAMANO_BLOQUE_GENERACION con NumPy (cada bloque con su propio generador aleatorio, a partir de la semilla y del
+número de bloque), así que la memoria usada no depende del número de reviews. No se garantiza que cada persona y cada producto tenga al
+menos 5 reviews, como en los ficheros _5.json originales.
+
+Ejemplo:
+                python src/generador_dataset.py --escenario 10M --categoria Synthetic_Books --comprimir
+
+escribirá "data/Synthetic_Books_5.json.gz", que se inserta como cualquier otro fichero de datos.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+import argparse
+import gzip
+import io
+import time
+import zlib
+import numpy as np
+from datetime import date, timedelta
+from typing import List, TextIO
+
+############################################################################################################################################
+
+# Número de reviews que se generan de una vez
+TAMANO_BLOQUE_GENERACION = 100000
+
+# Caracteres de los identificadores (reviewerID y asin), que se forman como en Amazon con mayúsculas y dígitos
+ALFABETO_IDS = np.frombuffer(b"0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ", dtype=np.uint8)
+
+# Los identificadores son una permutación del índice de la persona o del producto: (índice * multiplicador + desplazamiento) módulo
+# 36 ^ caracteres. Los multiplicadores son primos (y, por tanto, primos con 36), así que dos índices nunca dan el mismo identificador
+CARACTERES_REVIEWER_ID = 10
+MULTIPLICADOR_REVIEWER_ID = 10_000_000_019
+DESPLAZAMIENTO_REVIEWER_ID = 1_357_924_680_135
+CARACTERES_ASIN = 8
+MULTIPLICADOR_ASIN = 1_000_000_007
+
+# Nombres con los que se forman los reviewerName
+NOMBRES = ["Ana", "Carlos", "Lucia", "Javier", "Maria", "David", "Laura", "Pablo", "Sara", "Daniel", "Elena", "Jorge", "Marta", "Andres",
+           "Paula", "Miguel", "Carmen", "Alberto", "Julia", "Sergio", "John", "Emily", "Michael", "Sarah", "James", "Jessica"]
+APELLIDOS = ["Garcia", "Lopez", "Martinez", "Sanchez", "Perez", "Gomez", "Fernandez", "Ruiz", "Diaz", "Moreno", "Smith", "Johnson",
+             "Brown", "Taylor", "Miller", "Wilson"]
+
+# Sílabas y tamaño del vocabulario con el que se forman reviewText y summary, y número de palabras del texto de base del que se
+# recortan (las palabras del texto de base también siguen una ley de potencias, como en un texto real)
+SILABAS = ["la", "me", "so", "ra", "to", "ni", "co", "de", "pu", "ve", "mi", "sa", "lo", "ga", "te", "bu", "en", "al", "re", "fi"]
+TAMANO_VOCABULARIO = 5000
+PALABRAS_TEXTO_BASE = 1_000_000
+
+# Longitud máxima de reviewText y longitud de summary, en palabras
+MAXIMO_PALABRAS_REVIEW = 2000
+MINIMO_PALABRAS_SUMMARY = 1
+MAXIMO_PALABRAS_SUMMARY = 8
+
+# Parámetros de los votos de utilidad (helpful = [votos útiles, votos totales])
+PROBABILIDAD_GEOMETRICA_VOTOS = 0.35
+PROBABILIDAD_VOTO_UTIL = 0.7
+
+# Fechas entre las que se reparten las reviews (las de los ficheros de Amazon van de 1996 a 2014)
+FECHA_INICIO_GENERADOR = date(1999, 1, 1)
+FECHA_FIN_GENERADOR = date(2014, 7, 23)
+
+############################################################################################################################################
+
+# MUESTREO DE LA POPULARIDAD
+def muestrear_ley_potencias(rng:np.random.Generator, n_elementos:int, exponente:float, n_muestras:int)-> np.ndarray:
+    """
+
+    Elige n_muestras índices entre 0 y n_elementos - 1, de forma que el índice k se elige con una probabilidad aproximadamente
+    proporcional a 1 / (k + 1) ^ exponente (ley de Zipf). Se invierte la función de distribución de la ley continua, así que no hace
+    falta guardar una tabla con la probabilidad de cada elemento.
+
+    Args:
+        rng (np.random.Generator): generador aleatorio.
+        n_elementos (int): número de elementos (personas o productos).
+        exponente (float): exponente de la ley de potencias (0 es una distribución uniforme).
+        n_muestras (int): número de índices a elegir.
+
+    Returns:
+        np.ndarray: array de int64 con los índices elegidos.
+
+    """
+    u = rng.random(n_muestras)
+
+    if abs(exponente - 1.0) < 1e-9:
+        x = np.power(float(n_elementos), u)
+    else:
+        a = 1.0 - exponente
+        x = np.power(1.0 + u * (float(n_elementos) ** a - 1.0), 1.0 / a)
+
+    return np.minimum(x.astype(np.int64), n_elementos) - 1
+
+# IDENTIFICADORES Y NOMBRES
+def codificar_ids(indices:np.ndarray, prefijo:str, n_caracteres:int, multiplicador:int, desplazamiento:int=0)-> List[str]:
+    """
+
+    Convierte índices de personas o productos en identificadores con el formato de Amazon (por ejemplo "A2IBPI20UZ" o "B0ABCD1234").
+
+    Args:
+        indices (np.ndarray): índices a convertir.
+        prefijo (str): carácter inicial de los identificadores.
+        n_caracteres (int): número de caracteres después del prefijo.
+        multiplicador (int): multiplicador de la permutación (primo mayor que 3).
+        desplazamiento (int, optional): desplazamiento de la permutación. Defaults to 0.
+
+    Returns:
+        list: identificadores, en el mismo orden que los índices.
+
+    """
+    modulo = 36 ** n_caracteres
+    valores = (indices.astype(np.uint64) * np.uint64(multiplicador) + np.uint64(desplazamiento % modulo)) % np.uint64(modulo)
+
+    # Cada columna es un carácter del identificador, que se saca del alfabeto con su dígito en base 36
+    potencias = np.uint64(36) ** np.arange(n_caracteres - 1, -1, -1, dtype=np.uint64)
+    caracteres = ALFABETO_IDS[(valores[:, None] // potencias) % np.uint64(36)]
+
+    return [prefijo + identificador.decode() for identificador in caracteres.view(f"S{n_caracteres}").ravel()]
+
+def nombres_personas(indices:np.ndarray)-> list:
+    """
+
+    Devuelve el reviewerName de cada persona (o None si no tiene), que solo depende de su índice, para que una misma persona tenga
+    siempre el mismo nombre.
+
+    Args:
+        indices (np.ndarray): índices de las personas.
+
+    Returns:
+        list: nombres (str o None).
+
+    """
+    # Mezclamos los bits del índice para que los nombres no sigan el orden de popularidad
+    mezcla = (indices.astype(np.uint64) * np.uint64(2654435761)) % np.uint64(1 << 32)
+    sin_nombre = (mezcla % np.uint64(10000)) < np.uint64(int(PROBABILIDAD_SIN_NOMBRE * 10000))
+
+    return [None if vacio else f"{NOMBRES[valor % len(NOMBRES)]} {APELLIDOS[(valor // len(NOMBRES)) % len(APELLIDOS)]}"
+            for valor, vacio in zip(mezcla.tolist(), sin_nombre.tolist())]
+
+############################################################################################################################################
+
+# TEXTOS
+class TextoBase:
+    """
+
+    Texto largo de palabras inventadas, del que se recortan los reviewText y summary de las reviews (recortar es mucho más rápido que
+    elegir cada palabra de cada review).
+
+    Attributes:
+        texto (str): palabras separadas por espacios.
+        inicios (np.ndarray): posición de inicio de cada palabra en el texto (con una posición final extra).
+
+    """
+    def __init__(self, semilla:int):
+        rng = np.random.default_rng([semilla, 0])
+
+        # Palabras de 2 a 4 sílabas
+        vocabulario = ["".join(SILABAS[s] for s in rng.integers(0, len(SILABAS), size=rng.integers(2, 5)))
+                       for _ in range(TAMANO_VOCABULARIO)]
+
+        palabras = [vocabulario[i] for i in muestrear_ley_potencias(rng=rng, n_elementos=TAMANO_VOCABULARIO, exponente=1.0,
+                                                                    n_muestras=PALABRAS_TEXTO_BASE).tolist()]
+        self.texto = " ".join(palabras)
+
+        # Cada palabra ocupa su longitud más el espacio
+        self.inicios = np.concatenate(([0], np.cumsum([len(palabra) + 1 for palabra in palabras])))
+
+    def recortes(self, rng:np.random.Generator, n_palabras:np.ndarray)-> List[str]:
+        """
+
+        Recorta del texto un fragmento de cada longitud pedida, empezando en una palabra aleatoria.
+
+        Args:
+            rng (np.random.Generator): generador aleatorio.
+            n_palabras (np.ndarray): número de palabras de cada fragmento.
+
+        Returns:
+            list: fragmentos de texto.
+
+        """
+        palabras_texto = len(self.inicios) - 1
+        primeras = rng.integers(0, palabras_texto - n_palabras + 1)
+
+        inicios = self.inicios[primeras].tolist()
+        fines = (self.inicios[primeras + n_palabras] - 1).tolist()
+
+        return [self.texto[inicio:fin] for inicio, fin in zip(inicios, fines)]
+
+############################################################################################################################################
+
+# FECHAS
+def formatear_fecha_amazon(dia:date)-> str:
+    """
+
+    Escribe una fecha con el formato de reviewTime de los ficheros de Amazon (mes con dos cifras, día sin ceros a la izquierda).
+
+    Ejemplo:
+                date(2012, 7, 9) se convertirá en "07 9, 2012"
+
+    Args:
+        dia (date): fecha.
+
+    Returns:
+        str: fecha con el formato "MM D, YYYY".
+
+    """
+    return f"{dia.month:02d} {dia.day}, {dia.year}"
+
+# GENERACIÓN DE LAS REVIEWS
+def generar_bloque(semilla:int, numero_bloque:int, n_reviews:int, n_personas:int, n_productos:int, desplazamiento_asin:int,
+                   texto_base:TextoBase, fechas:List[str])-> List[str]:
+    """
+
+    Genera las líneas JSON de un bloque de reviews.
+
+    Args:
+        semilla (int): semilla del generador.
+        numero_bloque (int): número del bloque dentro del fichero (cada bloque usa su propio generador aleatorio).
+        n_reviews (int): número de reviews del bloque.
+        n_personas (int): número total de personas.
+        n_productos (int): número total de productos.
+        desplazamiento_asin (int): desplazamiento de la permutación de los asin (distinto para cada categoría).
+        texto_base (TextoBase): texto del que se recortan reviewText y summary.
+        fechas (list): reviewTime de cada día entre FECHA_INICIO_GENERADOR y FECHA_FIN_GENERADOR.
+
+    Returns:
+        list: líneas del fichero (con el salto de línea).
+
+    """
+    rng = np.random.default_rng([semilla, 1, numero_bloque])
+
+    indices_personas = muestrear_ley_potencias(rng=rng, n_elementos=n_personas, exponente=EXPONENTE_POPULARIDAD_PERSONAS, n_muestras=n_reviews)
+    indices_productos = muestrear_ley_potencias(rng=rng, n_elementos=n_productos, exponente=EXPONENTE_POPULARIDAD_PRODUCTOS, n_muestras=n_reviews)
+
+    reviewerIDs = codificar_ids(indices=indices_personas, prefijo="A", n_caracteres=CARACTERES_REVIEWER_ID, multiplicador=MULTIPLICADOR_REVIEWER_ID,
+                                desplazamiento=DESPLAZAMIENTO_REVIEWER_ID)
+    asins = codificar_ids(indices=indices_productos, prefijo="B0", n_caracteres=CARACTERES_ASIN, multiplicador=MULTIPLICADOR_ASIN,
+                          desplazamiento=desplazamiento_asin)
+    reviewerNames = nombres_personas(indices=indices_personas)
+
+    overall = rng.choice(np.arange(1, 6), size=n_reviews, p=PROBABILIDADES_OVERALL).tolist()
+
+    votos_totales = rng.geometric(p=PROBABILIDAD_GEOMETRICA_VOTOS, size=n_reviews) - 1
+    votos_utiles = rng.binomial(votos_totales, PROBABILIDAD_VOTO_UTIL)
+
+    # Longitudes de los textos, en palabras
+    media_log = np.log(MEDIA_PALABRAS_REVIEW) - DISPERSION_PALABRAS_REVIEW ** 2 / 2
+    palabras_review = np.clip(rng.lognormal(mean=media_log, sigma=DISPERSION_PALABRAS_REVIEW, size=n_reviews).astype(np.int64),
+                              1, MAXIMO_PALABRAS_REVIEW)
+    palabras_summary = rng.integers(MINIMO_PALABRAS_SUMMARY, MAXIMO_PALABRAS_SUMMARY + 1, size=n_reviews)
+
+    reviewTexts = texto_base.recortes(rng=rng, n_palabras=palabras_review)
+    summaries = texto_base.recortes(rng=rng, n_palabras=palabras_summary)
+
+    # La densidad de reviews crece linealmente con la fecha (la raíz de una uniforme), como el crecimiento de Amazon
+    dias = (np.sqrt(rng.random(n_reviews)) * (len(fechas) - 1)).astype(np.int64)
+    segundos_inicio = (FECHA_INICIO_GENERADOR - date(1970, 1, 1)).days * 86400
+    unixReviewTimes = (segundos_inicio + dias * 86400).tolist()
+
+    lineas = []
+
+    # Todos los textos son de letras y espacios, así que las líneas se escriben directamente sin pasar por json.dumps
+    for reviewerID, asin, reviewerName, utiles, totales, reviewText, puntuacion, summary, unixReviewTime, dia in zip(
+            reviewerIDs, asins, reviewerNames, votos_utiles.tolist(), votos_totales.tolist(), reviewTexts, overall, summaries,
+            unixReviewTimes, dias.tolist()):
+
+        nombre = f"\"reviewerName\": \"{reviewerName}\", " if reviewerName is not None else ""
+
+        lineas.append(f"{{\"reviewerID\": \"{reviewerID}\", \"asin\": \"{asin}\", {nombre}\"helpful\": [{utiles}, {totales}], "
+                      f"\"reviewText\": \"{reviewText}\", \"overall\": {puntuacion}.0, \"summary\": \"{summary}\", "
+                      f"\"unixReviewTime\": {unixReviewTime}, \"reviewTime\": \"{fechas[dia]}\"}}\n")
+
+    return lineas
+
+############################################################################################################################################
+
+# ESCRITURA DEL FICHERO
+def abrir_fichero_salida(file_out:str)-> TextIO:
+    """
+
+    Abre el fichero de salida en modo texto, comprimiéndolo con gzip si termina en .gz (sin la fecha en la cabecera, para que el
+    fichero sea siempre idéntico).
+
+    Args:
+        file_out (str): ruta del fichero de salida.
+
+    Returns:
+        TextIO: fichero de texto listo para escribir.
+
+    """
+    if file_out.endswith(".gz"):
+        return io.TextIOWrapper(gzip.GzipFile(filename="", mode="wb", fileobj=open(file_out, "wb"), mtime=0), encoding="utf-8", newline="\n")
+
+    return open(file_out, "w", encoding="utf-8", newline="\n")
+
+def generar_dataset(file_out:str, n_reviews:int, n_personas:int, n_productos:int, semilla:int=SEMILLA_GENERADOR)-> None:
+    """
+
+    Escribe un fichero de datos sintético con n_reviews reviews, en bloques de TAMANO_BLOQUE_GENERACION.
+
+    Args:
+        file_out (str): ruta del fichero de salida (con el nombre de la categoría, por ejemplo "data/Synthetic_Books_5.json").
+        n_reviews (int): número de reviews.
+        n_personas (int): número de personas distintas entre las que se reparten las reviews.
+        n_productos (int): número de productos distintos entre los que se reparten las reviews.
+        semilla (int, optional): semilla del generador. Defaults to SEMILLA_GENERADOR.
+
+    Returns:
+        None
+
+    """
+    inicio = time.perf_counter()
+
+    texto_base = TextoBase(semilla=semilla)
+    fechas = [formatear_fecha_amazon(FECHA_INICIO_GENERADOR + timedelta(days=dia))
+              for dia in range((FECHA_FIN_GENERADOR - FECHA_INICIO_GENERADOR).days + 1)]
+
+    # Los productos de cada categoría son distintos (los asin dependen del nombre del fichero); las personas se comparten
+    desplazamiento_asin = zlib.crc32(file_out.rsplit("/", 1)[-1].split("_5.json")[0].encode())
+
+    with abrir_fichero_salida(file_out=file_out) as fichero:
+
+        for numero_bloque, inicio_bloque in enumerate(range(0, n_reviews, TAMANO_BLOQUE_GENERACION)):
+            fichero.writelines(generar_bloque(semilla=semilla, numero_bloque=numero_bloque,
+                                              n_reviews=min(TAMANO_BLOQUE_GENERACION, n_reviews - inicio_bloque), n_personas=n_personas,
+                                              n_productos=n_productos, desplazamiento_asin=desplazamiento_asin, texto_base=texto_base,
+                                              fechas=fechas))
+
+            print(f"\r    - {min(inicio_bloque + TAMANO_BLOQUE_GENERACION, n_reviews):,} de {n_reviews:,} reviews", end="", flush=True)
+
+    print(f"\nFichero \"{file_out}\" generado en {time.perf_counter() - inicio:.1f} s.")
+
+############################################################################################################################################
+
+# LECTURA DE LOS ARGUMENTOS
+def leer_argumentos()-> argparse.Namespace:
+    """
+
+    Lee los argumentos de la línea de comandos del generador. Con --escenario se toman el número de reviews, personas y productos de
+    ESCENARIOS_GENERADOR, que se pueden cambiar con --reviews, --personas y --productos.
+
+    Returns:
+        argparse.Namespace: argumentos leídos.
+
+    """
+    parser = argparse.ArgumentParser(description="Generación de ficheros de datos sintéticos con el formato de las reviews de Amazon.")
+    parser.add_argument("--escenario", choices=list(ESCENARIOS_GENERADOR), help="tamaño predefinido (reviews, personas y productos)")
+    parser.add_argument("--reviews", type=int, help="número de reviews")
+    parser.add_argument("--personas", type=int, help="número de personas distintas")
+    parser.add_argument("--productos", type=int, help="número de productos distintos")
+    parser.add_argument("--categoria", default="Synthetic", help="tipo de producto, que da nombre al fichero (Defaults to Synthetic)")
+    parser.add_argument("--semilla", type=int, default=SEMILLA_GENERADOR, help="semilla del generador")
+    parser.add_argument("--comprimir", action="store_true", help="escribe el fichero comprimido con gzip (.json.gz)")
+
+    argumentos = parser.parse_args()
+
+    n_reviews, n_personas, n_productos = ESCENARIOS_GENERADOR.get(argumentos.escenario, (None, None, None))
+    argumentos.reviews = argumentos.reviews or n_reviews
+    argumentos.personas = argumentos.personas or n_personas
+    argumentos.productos = argumentos.productos or n_productos
+
+    if None in (argumentos.reviews, argumentos.personas, argumentos.productos):
+        parser.error("hay que indicar --escenario o los tres valores --reviews, --personas y --productos")
+
+    return argumentos
+
+if __name__=="__main__":
+
+    argumentos = leer_argumentos()
+    extension = ".json.gz" if argumentos.comprimir else ".json"
+
+    generar_dataset(file_out=f"{NOMBRE_CARPETA}/{argumentos.categoria}_5{extension}", n_reviews=argumentos.reviews,
+                    n_personas=argumentos.personas, n_productos=argumentos.productos, semilla=argumentos.semilla)
@@ -0,0 +1,277 @@
+"""
+Este script se empleará para crear los índices secundarios de las consultas de machine_learning.py, menu_visualizacion.py y
+neo4JProyecto.py (INDICES_CONSULTAS_SQL de load_data.py) al terminar la carga de los datos, y para comprobar con EXPLAIN que MySQL los
+usa de verdad.
+
+Sin estos índices, las auto-uniones de Review del recomendador (similitud entre dos personas, vecinos de una persona) y las búsquedas
+por id_producto, asin o nombre_tipo_producto recorren la tabla entera en cada consulta. Los índices se crean una vez cargados los
+datos, con un único ALTER TABLE por tabla, porque construirlos de golpe es mucho más rápido que mantenerlos en cada inserción.
+Después se actualizan las estadísticas de las tablas (ANALYZE TABLE) y se ejecuta EXPLAIN sobre cada consulta de
+CONSULTAS_VERIFICACION_INDICES, con valores sacados de los propios datos: si alguna de sus tablas se lee entera (tipo de acceso ALL
+o index), se avisa por pantalla.
+
+Las consultas por fecha usan las columnas generadas anio y anio_mes de Review (COLUMNAS_FECHA_REVIEW_SQL de load_data.py), que se
+añaden aquí a las bases de datos creadas antes de que existieran.
+
+También se puede ejecutar por separado, sobre una base de datos ya cargada:
+
+    python src/indices_sql.py
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+import pymysql
+from pymysql.connections import Connection
+from pymysql.cursors import Cursor
+from typing import List
+from load_data import crear_indices_faltantes_sql, crear_columnas_fecha_faltantes_sql, INDICES_CONSULTAS_SQL
+
+############################################################################################################################################
+
+# Consultas que se comprueban con EXPLAIN: (descripción, consulta, alias de las tablas que no se pueden leer enteras). Son las
+# consultas de machine_learning.py, menu_visualizacion.py y neo4JProyecto.py, con los parámetros por nombre (ver obtener_valores_muestra)
+CONSULTAS_VERIFICACION_INDICES = [
+
+    ("similitud entre dos personas (machine_learning.py, neo4JProyecto.py)",
+     """SELECT r1.id_producto, r1.overall, r2.overall
+        FROM review r1 INNER JOIN review r2 ON r1.id_producto = r2.id_producto
+        WHERE r1.id_persona = %(id_persona)s AND r2.id_persona = %(id_persona)s""",
+     ["r1", "r2"]),
+
+    ("puntuación media de una persona (machine_learning.py, neo4JProyecto.py)",
+     """SELECT AVG(overall)
+        FROM review
+        WHERE id_persona = %(id_persona)s""",
+     ["review"]),
+
+    ("vecinos de una persona (machine_learning.py)",
+     """SELECT DISTINCT r2.id_persona
+        FROM review r1
+        INNER JOIN review r2 ON r1.id_producto = r2.id_producto
+        WHERE r1.id_persona = %(id_persona)s""",
+     ["r1", "r2"]),
+
+    ("personas que han valorado un producto (neo4JProyecto.py)",
+     """SELECT DISTINCT(r.id_persona)
+        FROM review r
+        WHERE r.id_producto = %(id_producto)s""",
+     ["r"]),
+
+    ("reviews de un producto (neo4JProyecto.py)",
+     """SELECT r.id_persona, r.overall, r.reviewTime
+        FROM review r
+        WHERE r.id_producto = %(id_producto)s""",
+     ["r"]),
+
+    ("productos de una categoría (neo4JProyecto.py)",
+     """SELECT DISTINCT(p.id_producto)
+        FROM productos p
+        INNER JOIN tipos_producto pr ON p.tipo_producto = pr.tipo_producto
+        WHERE pr.nombre_tipo_producto = %(nombre_tipo_producto)s""",
+     ["pr"]),
+
+    ("puntuaciones de un producto (menu_visualizacion.py)",
+     """SELECT r.overall,count(*)
+        FROM review r
+        INNER JOIN productos p ON p.id_producto = r.id_producto
+        WHERE asin = %(asin)s
+        GROUP BY r.overall""",
+     ["r", "p"]),
+
+    ("reviews de una persona por categoría (neo4JProyecto.py)",
+     """SELECT tp.nombre_tipo_producto as categoria, count(*)
+        FROM productos pr
+        INNER JOIN review r ON r.id_producto = pr.id_producto
+        INNER JOIN tipos_producto tp ON pr.tipo_producto = tp.tipo_producto
+        WHERE r.id_persona = %(id_persona)s
+        GROUP BY categoria""",
+     ["r", "pr"]),
+
+    ("reviews de una categoría en un año (menu_visualizacion.py)",
+     """SELECT count(*)
+        FROM review r
+        INNER JOIN productos p ON p.id_producto = r.id_producto
+        INNER JOIN tipos_producto pr ON p.tipo_producto = pr.tipo_producto
+        WHERE r.anio = %(anio)s AND pr.nombre_tipo_producto = %(nombre_tipo_producto)s""",
+     ["r", "pr"]),
+
+    ("evolución mensual de las reviews de una categoría (menu_visualizacion.py)",
+     """SELECT r.anio, r.anio_mes, count(*)
+        FROM review r
+        INNER JOIN productos p ON p.id_producto = r.id_producto
+        INNER JOIN tipos_producto pr ON p.tipo_producto = pr.tipo_producto
+        WHERE pr.nombre_tipo_producto = %(nombre_tipo_producto)s
+        GROUP BY r.anio, r.anio_mes""",
+     ["r", "pr"])
+]
+
+# Tipos de acceso de EXPLAIN que leen la tabla (ALL) o el índice (index) enteros
+TIPOS_ACCESO_COMPLETO = {"ALL", "index"}
+
+############################################################################################################################################
+
+# VERIFICACIÓN DE LOS ÍNDICES CON EXPLAIN
+def obtener_valores_muestra(cursor:Cursor)-> dict:
+    """
+
+    Saca de la base de datos unos valores reales (una review cualquiera, con su producto y su categoría) para los parámetros de las
+    consultas de CONSULTAS_VERIFICACION_INDICES.
+
+    Args:
+        cursor (pymysql.cursors.Cursor): cursor de la conexión a MySQL.
+
+    Returns:
+        dict: valores de id_persona, id_producto, asin, nombre_tipo_producto y anio (None si las tablas están vacías).
+
+    """
+    cursor.execute("""
+        SELECT r.id_persona, r.id_producto, p.asin, tp.nombre_tipo_producto, r.anio
+        FROM review r
+        INNER JOIN productos p ON p.id_producto = r.id_producto
+        INNER JOIN tipos_producto tp ON tp.tipo_producto = p.tipo_producto
+        LIMIT 1;
+    """)
+    fila = cursor.fetchone()
+
+    if fila is None:
+        return None
+
+    return dict(zip(["id_persona", "id_producto", "asin", "nombre_tipo_producto", "anio"], fila))
+
+def explicar_consulta(cursor:Cursor, consulta:str, valores:dict)-> List[dict]:
+    """
+
+    Ejecuta EXPLAIN sobre una consulta y devuelve el plan de ejecución.
+
+    Args:
+        cursor (pymysql.cursors.Cursor): cursor de la conexión a MySQL.
+        consulta (str): consulta SQL, con los parámetros por nombre.
+        valores (dict): valores de los parámetros.
+
+    Returns:
+        list: una fila del plan por cada tabla de la consulta, como diccionario columna -> valor (table, type, key, Extra...).
+
+    """
+    cursor.execute(f"EXPLAIN {consulta}", valores)
+
+    columnas = [descripcion[0] for descripcion in cursor.description]
+
+    return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+
+def verificar_indices_sql(conexion:Connection)-> List[str]:
+    """
+
+    Comprueba con EXPLAIN que ninguna de las consultas de CONSULTAS_VERIFICACION_INDICES lee enteras las tablas que deberían buscarse
+    por índice, y muestra por pantalla el acceso y el índice de cada una.
+
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL, con la base de datos seleccionada.
+
+    Returns:
+        list: lista de mensajes con los problemas encontrados (vacía si todas las consultas usan los índices).
+
+    """
+    problemas = []
+    cursor = conexion.cursor()
+
+    valores = obtener_valores_muestra(cursor=cursor)
+
+    if valores is None:
+        print("\nNo se han comprobado los índices de SQL porque la tabla Review está vacía.")
+        cursor.close()
+        return problemas
+
+    print("\nPlanes de ejecución de las consultas (EXPLAIN):")
+
+    for descripcion, consulta, tablas in CONSULTAS_VERIFICACION_INDICES:
+
+        print(f"\n    {descripcion}:")
+
+        for fila in explicar_consulta(cursor=cursor, consulta=consulta, valores=valores):
+
+            if fila["table"] not in tablas:
+                continue
+
+            # "Using index" indica que el índice cubre la consulta, sin leer las filas de la tabla
+            cubriente = " (índice cubriente)" if "Using index" in (fila["Extra"] or "") else ""
+
+            print(f"        - {fila['table']}: acceso {fila['type']}, índice {fila['key']}{cubriente}")
+
+            if fila["type"] in TIPOS_ACCESO_COMPLETO:
+                problemas.append(f"la consulta \"{descripcion}\" lee entera la tabla {fila['table']} (acceso {fila['type']})")
+
+    cursor.close()
+
+    return problemas
+
+############################################################################################################################################
+
+# CREACIÓN DE LOS ÍNDICES AL TERMINAR LA CARGA
+def crear_indices_consultas_sql(conexion:Connection, verificar:bool=VERIFICAR_INDICES_EXPLAIN)-> bool:
+    """
+
+    Añade las columnas generadas de fecha de Review y crea los índices de INDICES_CONSULTAS_SQL que falten, actualiza las estadísticas
+    de las tablas en las que se han creado y, si se indica, comprueba con EXPLAIN que las consultas los usan.
+
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL, con la base de datos seleccionada.
+        verificar (bool, optional): si es True, se comprueban los planes de ejecución. Defaults to VERIFICAR_INDICES_EXPLAIN.
+
+    Returns:
+        bool: True si todas las consultas comprobadas usan los índices (o si no se comprueban).
+
+    """
+    # Los índices de las consultas por fecha necesitan las columnas anio y anio_mes (las bases de datos antiguas pueden no tenerlas)
+    crear_columnas_fecha_faltantes_sql(conexion=conexion)
+
+    indices_creados = crear_indices_faltantes_sql(conexion=conexion, indices=INDICES_CONSULTAS_SQL)
+
+    if indices_creados:
+
+        # Con las estadísticas al día, el optimizador conoce la selectividad de los índices nuevos
+        tablas = [tabla for tabla, indices in INDICES_CONSULTAS_SQL.items() if any(nombre in indices_creados for nombre, _ in indices)]
+
+        cursor = conexion.cursor()
+        cursor.execute(f"ANALYZE TABLE {', '.join(tablas)};")
+        cursor.fetchall()
+        cursor.close()
+
+        print(f"\nÍndices de las consultas de SQL creados con éxito: {len(indices_creados)}.")
+
+    if not verificar:
+        return True
+
+    problemas = verificar_indices_sql(conexion=conexion)
+
+    if problemas:
+        print("\nAviso: hay consultas que no usan los índices de SQL:")
+        for problema in problemas:
+            print(f"    - {problema}")
+        return False
+
+    print("\nTodas las consultas comprobadas usan los índices de SQL.")
+
+    return True
+
+############################################################################################################################################
+
+if __name__=="__main__":
+
+    try:
+        # Sobre la base de datos ya cargada, creamos los índices que falten y comprobamos los planes de ejecución
+        conexion_sql = pymysql.connect(host="localhost", user=USER_SQL, password=PASSWORD_SQL, database=NOMBRE_BASE_DATOS_SQL)
+
+        crear_indices_consultas_sql(conexion=conexion_sql, verificar=True)
+
+        conexion_sql.close()
+
+    except Exception as e:
+        # Controlamos posibles excepciones
+        print(f"\n>>>>>>>>>>>>>>>> ERROR: {e}")
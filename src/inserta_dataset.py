@@ -8,6 +8,8 @@ Además, cabe destacar que el procesado de los ficheros se hace línea a línea
 anteriormente, es decir, que ya existe en la base de datos, entonces se actualizará la información referente a ese dato con la nueva 
 información encontrada. Esto se hará siempre que la nueva información no sea un valor nulo. De esta forma gestionamos correctamente la 
 aparición de valores repetidos, sin que haya duplicados incoherentes y permitiendo actualización de los datos, además de escalabilidad.
+Con DETECTAR_REVIEWS_DUPLICADAS, las reviews que ya están en la base de datos (mismo reviewerID, asin y unixReviewTime) no se vuelven a
+insertar (ver filtro_duplicados.py).
 
 En caso de cualquier error, se recogerán las excepciones para que el programa no termine de forma abrupta en ningún caso.
 
@@ -21,9 +23,22 @@ Proyecto: Proyecto Final 2024/2025 - Bases de Datos
 
 # Importamos las librerías necesarias
 from configuracion import*
-import json
 import pymysql
-from load_data import extraer_tipo_producto, formatear_fecha, insertar_lote_sql
+from itertools import islice
+from typing import Iterable, Iterator, Tuple
+from load_data import extraer_tipo_producto, iterar_campos_fichero, crear_documento_mongo, insertar_lote_sql, crear_indices_faltantes_sql, \
+                      crear_indices_mongodb, QUERY_INSERTAR_TIPOS_PRODUCTO, QUERIES_TABLAS_LOTE
+from puntos_control import leer_opcion_reanudar, crear_punto_control, cargar_punto_control, registrar_avance_fichero, borrar_punto_control, \
+                           descartar_documentos_no_confirmados
+from busqueda_dimensiones import CacheLRU, resolver_personas_lote, resolver_productos_lote, buscar_filas_por_clave
+from politica_volcado import crear_politica_commits, crear_politica_mongo
+from escritura_adaptativa import EscritorSql
+from escritura_mongo_paralela import crear_escritor_mongo
+from buckets_productos import EscritorBuckets
+from metricas_ingesta import MetricasIngesta, iniciar_metricas, parar_metricas
+from indices_sql import crear_indices_consultas_sql
+from secuencias_ids import AsignadorIds, conectar_secuencias, sincronizar_secuencias, reservar_bloque_ids
+from filtro_duplicados import DetectorDuplicados, abrir_detector_duplicados, guardar_detector_duplicados, clave_review
 from menu_visualizacion import get_database_mongo, ejecutar_consulta_sql
 from pymysql.connections import Connection
 from pymongo.database import Database
@@ -59,55 +74,116 @@ def extraer_numero_tipo_producto(conexion:Connection, nombre_tipo_producto:str)-
 
     return id_numerico
 
-# EXTRACCIÓN NUEVO ID (DE PRODUCTO, TIPO PRODUCTO O REVIEW)
-def crear_nuevo_id_numerico(conexion:Connection, tabla:str, nombre_columna:str)->int:
+# AGRUPACIÓN DE LAS REVIEWS EN LOTES
+def agrupar_en_lotes(iterable:Iterable, tamano:int)-> Iterator[list]:
     """
-    Genera un nuevo identificador numérico para una tabla de base de datos, incrementando el valor más alto existente. Esta función se 
-    conecta a una base de datos a través de la conexión proporcionada, consulta el valor más alto del identificador especificado en una
-    tabla y devuelve un nuevo ID incrementado en una unidad.
+    Agrupa los elementos de un iterable en listas de como mucho "tamano" elementos, sin tener que leerlo entero.
 
     Args:
-        conexion: Objeto de conexión a la base de datos. Se utiliza para ejecutar la consulta SQL.
-        tabla (str): Nombre de la tabla en la base de datos de la cual se extraerá el identificador más alto.
-        nombre_columna (str): Nombre de la columna que contiene los identificadores numéricos.
+        iterable (Iterable): elementos a agrupar (por ejemplo, las reviews que devuelve iterar_campos_fichero).
+        tamano (int): número máximo de elementos de cada lote.
 
     Returns:
-        int: Un nuevo identificador numérico, que es el valor más alto actual más uno.
+        Iterator[list]: generador de lotes, en el mismo orden que el iterable.
     
     """
-    # Buscamos cúal es el identificador numérico de persona más alto (el último), para continuar con esa numeración
-    query_idx = f"""
+    iterador = iter(iterable)
 
-            SELECT {nombre_columna}
-            FROM {tabla}
-            ORDER BY {nombre_columna} DESC
-            LIMIT 1
+    # Cogemos los siguientes "tamano" elementos hasta que se acaben
+    while lote := list(islice(iterador, tamano)):
+        yield lote
 
-    """  
+# CONTADORES QUE SE GUARDAN EN EL PUNTO DE CONTROL
+def contadores_punto_control(ids_review:AsignadorIds, ids_personas:AsignadorIds, ids_productos:AsignadorIds)-> dict:
+    """
+    Devuelve el estado de los identificadores que se guarda en el punto de control de un fichero. Solo el bloque de reviews en curso 
+    hace falta para reanudar; los de personas y productos se guardan como información.
 
-    # Como los identificadores son únicos, con ordenar por ese campo descendientemente y coger el primero nos sirve
-    ultimo_id = int(ejecutar_consulta_sql(conexion=conexion, sql=query_idx)[0][0])
+    Args:
+        ids_review (AsignadorIds): asignador de los identificadores de las reviews.
+        ids_personas (AsignadorIds): asignador de los identificadores de las personas.
+        ids_productos (AsignadorIds): asignador de los identificadores de los productos.
+
+    Returns:
+        dict: {"id_review", "fin_bloque_review", "contador_persona", "contador_producto"}.
+    
+    """
+    return {"id_review": ids_review.siguiente_id, "fin_bloque_review": ids_review.fin_bloque, 
+            "contador_persona": ids_personas.siguiente_id, "contador_producto": ids_productos.siguiente_id}
+
+# IDENTIFICADORES CON LOS QUE HAN QUEDADO LAS PERSONAS Y PRODUCTOS NUEVOS
+def resolver_dimensiones_nuevas(conexion:Connection, personas_nuevas:dict, productos_nuevos:dict, tipo_producto:int)-> Tuple[dict, dict]:
+    """
+    Busca, después de escribirlos, con qué identificador han quedado en MySQL las personas y productos nuevos de un lote. Si otra 
+    inserción que se hace a la vez ya había insertado la misma persona (o el mismo producto del mismo tipo), el índice UNIQUE hace que 
+    la fila nueva actualice la suya en lugar de crear otra (ver INDICES_UNICOS_SQL de load_data.py), y las reviews del lote tienen que
+    usar el identificador de esa fila. Las lecturas son con LOCK IN SHARE MODE, para ver las filas ya confirmadas por otras 
+    conexiones aunque sean posteriores al inicio de la transacción.
+
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL.
+        personas_nuevas (dict): {reviewerID: id_persona reservado} de las personas nuevas del lote.
+        productos_nuevos (dict): {asin: id_producto reservado} de los productos nuevos del lote.
+        tipo_producto (int): tipo de producto de los productos nuevos.
+
+    Returns:
+        tuple: (cambios de id_persona, cambios de id_producto), diccionarios {id reservado: id de la fila que ya existía} solo con los
+            identificadores que hay que cambiar.
+    
+    """
+    query_personas = """
+            SELECT reviewerID, id_persona
+            FROM Personas
+            WHERE reviewerID IN ({marcadores})
+            LOCK IN SHARE MODE
+    """
 
-    # El nuevo identificador saldrá de sumar 1 al último identificador que existía en la base de datos
-    nuevo_id = ultimo_id + 1
+    query_productos = f"""
+            SELECT asin, id_producto
+            FROM Productos
+            WHERE tipo_producto = {int(tipo_producto)} AND asin IN ({{marcadores}})
+            LOCK IN SHARE MODE
+    """
+
+    cambios = []
+
+    for query, nuevos in ((query_personas, personas_nuevas), (query_productos, productos_nuevos)):
+
+        # Los índices no distinguen mayúsculas, así que la fila que ha quedado puede tener la clave escrita de otra forma
+        guardados = {clave.lower(): identificador for clave, identificador in buscar_filas_por_clave(conexion=conexion, query=query, 
+                                                                                                   claves=list(nuevos))}
+
+        cambios.append({identificador: guardados[clave.lower()] for clave, identificador in nuevos.items() 
+                        if guardados.get(clave.lower(), identificador) != identificador})
 
-    return nuevo_id
+    return cambios[0], cambios[1]
 
 ############################################################################################################################################
 
 # INSERCIÓN DEL NUEVO FICHERO
-def insertar_dataset(file_in:str, sql_conexion:Connection, mongodb_database:Database, batch_size:int)-> None:
+def insertar_dataset(file_in:str, sql_conexion:Connection, mongodb_database:Database, batch_size:int, conexion_secuencias:Connection, 
+                     punto_control:dict=None, metricas:MetricasIngesta=None, detector_duplicados:DetectorDuplicados=None)-> None:
     """
 
     Función que se encarga de la inserción de datos procedentes de un único fichero, pero que se distribuyen en distintas bases de datos,
     de SQL y de MongoDB, y también en distintas tablas y colecciones. La lectura del fichero se hace línea a línea, donde para crear un 
-    objeto de tipo JSON usamos json.loads(linea).
+    objeto de tipo JSON usamos json.loads(linea). Las reviews se procesan por lotes de batch_size: con MODO_BUSQUEDA_DIMENSIONES a
+    "por_lotes", antes de cada lote se buscan en MySQL (o en la caché LRU) solo las personas y productos que aparecen en él, en lugar de
+    cargar las tablas Personas y Productos enteras al empezar.
 
     Args:
         file_in (str): ruta del fichero de entrada de datos.
         mongodb_database: Objeto de MongoClient.
         sql_conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL, obtenido previamente con "pymysql.connect()".
         batch_size (int): tamaño de un lote de datos, controla cada cuanto tenemos que hacer inserciones.
+        conexion_secuencias (pymysql.connections.Connection): conexión de conectar_secuencias, con la que se reservan los bloques de 
+            identificadores nuevos (ver secuencias_ids.py).
+        punto_control (dict, optional): punto de control de la inserción (ver puntos_control.py). Si se pasa, se hace commit tras cada
+            lote (sin él, según la política de commits de politica_volcado.py) y se guarda el avance del fichero, y si el fichero ya 
+            estaba empezado se sigue desde el último lote confirmado. Defaults to None.
+        metricas (MetricasIngesta, optional): métricas en directo de la inserción (ver metricas_ingesta.py). Defaults to None.
+        detector_duplicados (DetectorDuplicados, optional): si se pasa, las reviews que ya están en la base de datos (mismo reviewerID,
+            asin y unixReviewTime) no se vuelven a insertar (ver filtro_duplicados.py). Defaults to None.
 
     Returns:
         None. No devuelve nada, solo hace las inserciones correspondientes en las bases de datos indicadas.
@@ -124,211 +200,284 @@ def insertar_dataset(file_in:str, sql_conexion:Connection, mongodb_database:Data
     valores_insertar_personas = []
     valores_insertar_productos = []
     documentos_insertar_mongo = []
-
-    # Inicializamos diccionarios para almacenar tuplas de datos ya existentes en la base de datos
-    personas_cargadas = cargar_datos_usuarios(conexion=sql_conexion)  # estructura -> reviewerID: (id_persona, reviewerName)
-    productos_cargados = cargar_datos_productos(conexion=sql_conexion)  # estructura -> asin: (id_producto, tipo_producto)
+    filas_insertar_buckets = [] # filas de Review de los documentos pendientes, para los buckets de productos
+    personas_nuevas = {} # personas nuevas del lote -> reviewerID: id_persona reservado
+    productos_nuevos = {} # productos nuevos del lote -> asin: id_producto reservado
+
+    # Inicializamos diccionarios para almacenar tuplas de datos ya existentes en la base de datos. En la búsqueda por lotes se rellenan
+    # en cada lote, solo con las personas y productos que aparecen en él (ver busqueda_dimensiones.py)
+    if MODO_BUSQUEDA_DIMENSIONES == "por_lotes":
+        cache_personas = CacheLRU(capacidad=TAMANO_CACHE_DIMENSIONES)  # estructura -> reviewerID: (id_persona, reviewerName)
+        cache_productos = CacheLRU(capacidad=TAMANO_CACHE_DIMENSIONES)  # estructura -> asin: (id_producto, tipo_producto)
+    else:
+        personas_cargadas = cargar_datos_usuarios(conexion=sql_conexion)  # estructura -> reviewerID: (id_persona, reviewerName)
+        productos_cargados = cargar_datos_productos(conexion=sql_conexion)  # estructura -> asin: (id_producto, tipo_producto)
+
+    # Estado del fichero en el punto de control (None si no se había empezado a insertar)
+    estado_fichero = punto_control["ficheros"].get(file_in) if punto_control is not None else None
 
     # Extraemos el nombre del tipo de producto a partir del nombre del fichero de datos
     nombre_tipo_producto = extraer_tipo_producto(nombre_fichero=file_in) 
 
-    # Extraemos el nuevo id de tipo de producto
-    nuevo_id_tipo_producto = crear_nuevo_id_numerico(conexion=sql_conexion, tabla=NOMBRES_TABLAS_SQL[2], nombre_columna="tipo_producto")
+    # Al reanudar, el tipo de producto ya existe si se llegó a confirmar algún lote del fichero
+    nuevo_id_tipo_producto = None
+
+    if estado_fichero is not None:
+        try:
+            nuevo_id_tipo_producto = extraer_numero_tipo_producto(conexion=sql_conexion, nombre_tipo_producto=nombre_tipo_producto)
+        except IndexError:
+            pass
+
+    # Reservamos el nuevo id de tipo de producto en su secuencia
+    if nuevo_id_tipo_producto is None:
+        nuevo_id_tipo_producto = reservar_bloque_ids(conexion=conexion_secuencias, nombre_secuencia="tipo_producto", n_ids=1)
 
     # Esta inserción es única ya que todos las reviews del fichero son del mismo tipo de producto (viene dado por el nombre del fichero)
     valores_insertar_tipos_producto = [(nuevo_id_tipo_producto, nombre_tipo_producto)]
 
-    insertar_lote_sql(
-                cursor=cursor, 
-                query="""
-                            INSERT INTO Tipos_producto (tipo_producto, nombre_tipo_producto)
-                            VALUES (%s, %s)
-                            ON DUPLICATE KEY UPDATE 
-                                nombre_tipo_producto = IF(VALUES(nombre_tipo_producto) IS NOT NULL, VALUES(nombre_tipo_producto), nombre_tipo_producto);
-
-                    """, 
-                    valores=valores_insertar_tipos_producto)
-
-    # Extraemos el nuevo identificador para las reviews, luego lo iremos actualizando de 1 en 1 por cada fila
-    nuevo_id_review = crear_nuevo_id_numerico(conexion=sql_conexion, tabla=NOMBRES_TABLAS_SQL[3], nombre_columna="id_review")
-
-    # Extraemos el nuevo identificador numerico para las personas, luego lo iremos actualizando cuando corresponda
-    nuevo_id_usuario = crear_nuevo_id_numerico(conexion=sql_conexion, tabla=NOMBRES_TABLAS_SQL[0], nombre_columna="id_persona")
-
-    # Extraemos el nuevo identificador numerico para los productos, luego lo iremos actualizando cuando corresponda
-    nuevo_id_producto = crear_nuevo_id_numerico(conexion=sql_conexion, tabla=NOMBRES_TABLAS_SQL[1], nombre_columna="id_producto")
-
-    # Abrimos el fichero de datos en modo lectura
-    with open(file_in, "r") as file:
-                    
-        # Iteramos por cada línea del fichero
-        for linea in file:
-
-            # Extraemos el diccionario donde tenemos los datos de una review
-            data = json.loads(linea)
-
-            # Accedemos a cada campo del diccionario de data, ponemos None en caso de que ese campo no se encuentre en el diccionario
-            reviewerID = data.get("reviewerID", None)
-            asin = data.get("asin", None)
-            reviewerName = data.get("reviewerName", None)
-            helpful = data.get("helpful", [None, None])
-            reviewText = data.get("reviewText", None)
-            overall = data.get("overall", None)
-            summary = data.get("summary", None)
-            unixReviewTime = data.get("unixReviewTime", None)
-            reviewTime = formatear_fecha(data.get("reviewTime", None))  # Formateamos la fecha al formato date (YYYY-MM-DD)
+    insertar_lote_sql(cursor=cursor, query=QUERY_INSERTAR_TIPOS_PRODUCTO, valores=valores_insertar_tipos_producto)
+
+    # Los identificadores de las reviews se reservan en bloques del tamaño de un lote, así cada lote usa exactamente un bloque. Al 
+    # reanudar hay que seguir con el bloque del punto de control, que es el de la primera review no confirmada del fichero
+    bloque_review = None
+
+    if estado_fichero is not None:
+        bloque_review = (estado_fichero["contadores"]["id_review"], estado_fichero["contadores"]["fin_bloque_review"])
+
+    ids_review = AsignadorIds(conexion=conexion_secuencias, nombre_secuencia="id_review", tamano_bloque=batch_size, bloque_inicial=bloque_review)
+
+    # Los identificadores de las personas y productos nuevos se reservan en bloques de TAMANO_BLOQUE_IDS
+    ids_personas = AsignadorIds(conexion=conexion_secuencias, nombre_secuencia="id_persona", tamano_bloque=TAMANO_BLOQUE_IDS)
+    ids_productos = AsignadorIds(conexion=conexion_secuencias, nombre_secuencia="id_producto", tamano_bloque=TAMANO_BLOQUE_IDS)
+
+    # Byte del fichero desde el que empezamos a leer
+    desplazamiento = estado_fichero["desplazamiento"] if estado_fichero is not None else 0
+
+    if punto_control is not None:
+
+        # Los documentos del bloque de reviews en curso son de un lote que no llegó a confirmarse en MySQL (los identificadores de
+        # fuera del bloque pueden ser de otras inserciones que se estén haciendo a la vez)
+        descartar_documentos_no_confirmados(mongodb_database=mongodb_database, id_review=ids_review.siguiente_id, 
+                                            id_review_fin=ids_review.fin_bloque)
+
+        registrar_avance_fichero(punto_control=punto_control, fichero=file_in, desplazamiento=desplazamiento, 
+                                 contadores=contadores_punto_control(ids_review=ids_review, ids_personas=ids_personas, ids_productos=ids_productos))
+
+    # Cada cuánto se hace commit en MySQL y cada cuánto se insertan los documentos acumulados en MongoDB (ver politica_volcado.py)
+    politica_commits = crear_politica_commits(desplazamiento_inicial=desplazamiento)
+    politica_mongo = crear_politica_mongo(desplazamiento_inicial=desplazamiento)
+
+    # Escritores con un tamaño de escritura propio para cada tabla y para la colección (ver escritura_adaptativa.py)
+    escritor_sql = EscritorSql(cursor=cursor, queries=QUERIES_TABLAS_LOTE, batch_size=batch_size, metricas=metricas)
+    # Los documentos se insertan en paralelo con ESCRITURA_MONGO_PARALELA (ver escritura_mongo_paralela.py), esperando al journal si hay
+    # puntos de control, y con MODO_UPSERT_MONGODB los que ya existan se actualizan en lugar de dar error
+    escritor_mongo = crear_escritor_mongo(coleccion=mongo_db_collection, batch_size=batch_size, metricas=metricas, upsert=MODO_UPSERT_MONGODB,
+                                          duradero=punto_control is not None)
+
+    # Las reviews se añaden también a los buckets de sus productos, a la vez que los documentos (ver buckets_productos.py), y con
+    # MODO_UPSERT_MONGODB sin repetir las que ya estén en ellos
+    escritor_buckets = EscritorBuckets(mongodb_database=mongodb_database, metricas=metricas, 
+                                       idempotente=MODO_UPSERT_MONGODB) if MODO_BUCKETS_PRODUCTOS else None
+
+    if metricas is not None:
+        metricas.iniciar_fichero(file_in=file_in, desplazamiento_inicial=desplazamiento)
+
+    # Iteramos por lotes de reviews del fichero, ya separadas en sus campos
+    for lote_campos in agrupar_en_lotes(iterable=iterar_campos_fichero(file_in=file_in, desplazamiento_inicial=desplazamiento), tamano=batch_size):
+
+        # En la búsqueda por lotes, solo se traen de MySQL (o de la caché) las personas y productos de este lote
+        if MODO_BUSQUEDA_DIMENSIONES == "por_lotes":
+            personas_cargadas = resolver_personas_lote(conexion=sql_conexion, cache=cache_personas, reviewerIDs=[campos[0] for _, campos in lote_campos])
+            productos_cargados = resolver_productos_lote(conexion=sql_conexion, cache=cache_productos, asins=[campos[1] for _, campos in lote_campos])
+
+        if metricas is not None:
+            metricas.registrar_lote_leido(n_lineas=len(lote_campos), desplazamiento=lote_campos[-1][0])
+
+        # Posiciones del lote de las reviews que ya están en la base de datos (el filtro de Bloom solo manda a MySQL las sospechosas). 
+        # Las que tengan un id_review del bloque del lote son del propio lote, que se vuelve a insertar al reanudar
+        duplicadas = set()
+
+        if detector_duplicados is not None:
+            duplicadas = detector_duplicados.detectar_lote(claves=[clave_review(reviewerID=campos[0], asin=campos[1], unixReviewTime=campos[7])
+                                                                   for _, campos in lote_campos],
+                                                           bloque_propio=(ids_review.siguiente_id, ids_review.fin_bloque))
+
+        # Iteramos por cada review del lote
+        for posicion, (desplazamiento_review, campos) in enumerate(lote_campos):
+
+            # Las reviews repetidas se saltan enteras. Su id_review se gasta igualmente, para que cada lote siga usando exactamente un 
+            # bloque de identificadores (y al reanudar se repitan los mismos)
+            if posicion in duplicadas:
+                ids_review.siguiente()
+                desplazamiento = desplazamiento_review
+                continue
+
+            # Accedemos a cada campo de la review (None en caso de que ese campo no se encuentre en la línea)
+            reviewerID, asin, reviewerName, helpful, reviewText, overall, summary, unixReviewTime, reviewTime = campos
 
             # Solo hacemos inserciones si la persona no existe ya en la BBDD
             if reviewerID not in personas_cargadas:
 
+                # ID que vamos a usar para insertar en las reviews (el siguiente de los reservados para personas)
+                id_persona_insertar_en_review = ids_personas.siguiente()
+
                 # Lo añadimos a la lista de inserción
-                valores_insertar_personas.append((nuevo_id_usuario, reviewerID, reviewerName))  
+                valores_insertar_personas.append((id_persona_insertar_en_review, reviewerID, reviewerName))  
 
                 # Lo añadimos al diccionario
-                personas_cargadas[reviewerID] = (nuevo_id_usuario, reviewerName)
-
-                # ID que vamos a usar para insertar en las reviews
-                id_persona_insertar_en_review = nuevo_id_usuario
-
-                # Actualizamos el identificador, para el siguiente producto nuevo
-                nuevo_id_usuario += 1
+                personas_cargadas[reviewerID] = (id_persona_insertar_en_review, reviewerName)
+                personas_nuevas[reviewerID] = id_persona_insertar_en_review
 
             else:
                 # ID que vamos a usar para insertar en las reviews
                 id_persona_insertar_en_review = personas_cargadas[reviewerID][0]  # accedemos al dicc: reviewerID: (id_persona, reviewerName)
 
+                # Si llega un nombre no nulo distinto del que ya teníamos (por ejemplo, la persona no tenía nombre), actualizamos la fila. 
+                # En cualquier otro caso no se envía nada, porque el ON DUPLICATE KEY UPDATE no cambiaría la fila
+                if reviewerName is not None and personas_cargadas[reviewerID][1] != reviewerName:
+                    valores_insertar_personas.append((id_persona_insertar_en_review, reviewerID, reviewerName))
+                    personas_cargadas[reviewerID] = (id_persona_insertar_en_review, reviewerName)
+
             # Solo hacemos inserciones si el producto no existe ya en la BBDD
             if asin not in productos_cargados:
 
+                # ID que vamos a usar para insertar en las reviews (el siguiente de los reservados para productos)
+                id_producto_insertar_en_review = ids_productos.siguiente()
+
                 # Lo añadimos a la lista de inserción
-                valores_insertar_productos.append((nuevo_id_producto, asin, nuevo_id_tipo_producto))  
+                valores_insertar_productos.append((id_producto_insertar_en_review, asin, nuevo_id_tipo_producto))  
 
                 # Lo añadimos al diccionario
-                productos_cargados[asin] = (nuevo_id_producto, nuevo_id_tipo_producto)
-
-                # ID que vamos a usar para insertar en las reviews
-                id_producto_insertar_en_review = nuevo_id_producto
-
-                # Actualizamos el identificador, para la siguiente persona nueva
-                nuevo_id_producto += 1
+                productos_cargados[asin] = (id_producto_insertar_en_review, nuevo_id_tipo_producto)
+                productos_nuevos[asin] = id_producto_insertar_en_review
 
             else:
                 # ID que vamos a usar para insertar en las reviews
                 id_producto_insertar_en_review = productos_cargados[asin][0]  # accedemos al dicc: asin: (id_producto, tipo_producto)
 
-            # En la tabla de reviews siempre insertamos, pase lo que pase
-            valores_insertar_review.append((nuevo_id_review, id_persona_insertar_en_review, id_producto_insertar_en_review, overall, unixReviewTime, reviewTime))
+            # Identificador de la review (el siguiente del bloque del lote)
+            nuevo_id_review = ids_review.siguiente()
+
+            # En la tabla de reviews siempre insertamos, pase lo que pase (con el esquema compacto, sin unixReviewTime, que se calcula a
+            # partir de reviewTime)
+            if ESQUEMA_COMPACTO:
+                valores_insertar_review.append((nuevo_id_review, id_persona_insertar_en_review, id_producto_insertar_en_review, overall, reviewTime))
+            else:
+                valores_insertar_review.append((nuevo_id_review, id_persona_insertar_en_review, id_producto_insertar_en_review, overall, unixReviewTime, reviewTime))
 
             # Añadimos a la lista de documentos, el diccionario con los campos correspondientes (MongoDB)
-            documento = {
-
-                "_id": nuevo_id_review,
-                "helpful": helpful,
-                "reviewText": reviewText,
-                "summary": summary
-            }
-
-            # Pero solo vamos a querer insertar los campos no nulos del diccionario
-            documentos_insertar_mongo.append({k: v for k, v in documento.items() if v is not None})
-
-            # Para la review, actualizamos el contador (identificador). Para cada fila nueva se suma 1
-            nuevo_id_review += 1
-
-            # Inserción por lotes, solo si las listas ya tienen el tamaño deseado 
-            # Añadimos el ON DUPLICATE KEY UPDATE, para que si ya existe la PRIMARY KEY, se actualicen el resto de campos de esa entrada de la tabla
-            if len(valores_insertar_personas) >= batch_size or len(valores_insertar_productos) >= batch_size or len(valores_insertar_review) >= batch_size :
-
-                insertar_lote_sql(
-                    cursor=cursor, 
-                    query="""
-                                INSERT INTO Personas (id_persona, reviewerID, reviewerName)
-                                VALUES (%s, %s, %s)
-                                ON DUPLICATE KEY UPDATE 
-                                    reviewerID = IF(VALUES(reviewerID) IS NOT NULL, VALUES(reviewerID), reviewerID), 
-                                    reviewerName = IF(VALUES(reviewerName) IS NOT NULL, VALUES(reviewerName), reviewerName);
-
-                        """, 
-                    valores=valores_insertar_personas)
-                
-                
-                # Limpiar listas después de la inserción
-                valores_insertar_personas.clear()
-
-                insertar_lote_sql(
-                    cursor=cursor, 
-                    query="""
-                                INSERT INTO Productos (id_producto, asin, tipo_producto)
-                                VALUES (%s, %s, %s)
-                                ON DUPLICATE KEY UPDATE 
-                                    asin = IF(VALUES(asin) IS NOT NULL, VALUES(asin), asin), 
-                                    tipo_producto = IF(VALUES(tipo_producto) IS NOT NULL, VALUES(tipo_producto), tipo_producto);
-
-                        """, 
-                    valores=valores_insertar_productos)
-                
-                # Limpiar listas después de la inserción
-                valores_insertar_productos.clear()
-                
-                insertar_lote_sql(
-                    cursor=cursor, 
-                    query="""
-                                INSERT INTO Review (id_review, id_persona, id_producto, overall, unixReviewTime, reviewTime)
-                                VALUES (%s, %s, %s, %s, %s, %s)
-                                ON DUPLICATE KEY UPDATE 
-                                    overall = IF(VALUES(overall) IS NOT NULL, VALUES(overall), overall), 
-                                    unixReviewTime = IF(VALUES(unixReviewTime) IS NOT NULL, VALUES(unixReviewTime), unixReviewTime), 
-                                    reviewTime = IF(VALUES(reviewTime) IS NOT NULL, VALUES(reviewTime), reviewTime);
-
-                        """, 
-                        valores=valores_insertar_review)
-                                
-                mongo_db_collection.insert_many(documentos_insertar_mongo)
-                
-                # Limpiar listas después de la inserción
-                valores_insertar_review.clear()
-                documentos_insertar_mongo.clear()
-
-        # Inserción final si quedan datos en las listas y no se ha completado un lote
-        if len(valores_insertar_personas) or len(valores_insertar_productos) or len(valores_insertar_review):
-                insertar_lote_sql(
-                    cursor=cursor, 
-                    query="""
-                                INSERT INTO Personas (id_persona, reviewerID, reviewerName)
-                                VALUES (%s, %s, %s)
-                                ON DUPLICATE KEY UPDATE 
-                                    reviewerID = IF(VALUES(reviewerID) IS NOT NULL, VALUES(reviewerID), reviewerID), 
-                                    reviewerName = IF(VALUES(reviewerName) IS NOT NULL, VALUES(reviewerName), reviewerName);
-                        """, 
-                    valores=valores_insertar_personas)
-                
-                insertar_lote_sql(
-                    cursor=cursor, 
-                    query="""
-                                INSERT INTO Productos (id_producto, asin, tipo_producto)
-                                VALUES (%s, %s, %s)
-                                ON DUPLICATE KEY UPDATE 
-                                    asin = IF(VALUES(asin) IS NOT NULL, VALUES(asin), asin), 
-                                    tipo_producto = IF(VALUES(tipo_producto) IS NOT NULL, VALUES(tipo_producto), tipo_producto);
-                        """, 
-                    valores=valores_insertar_productos)
-                
-                insertar_lote_sql(
-                    cursor=cursor, 
-                    query="""
-                                INSERT INTO Review (id_review, id_persona, id_producto, overall, unixReviewTime, reviewTime)
-                                VALUES (%s, %s, %s, %s, %s, %s)
-                                ON DUPLICATE KEY UPDATE 
-                                    overall = IF(VALUES(overall) IS NOT NULL, VALUES(overall), overall), 
-                                    unixReviewTime = IF(VALUES(unixReviewTime) IS NOT NULL, VALUES(unixReviewTime), unixReviewTime), 
-                                    reviewTime = IF(VALUES(reviewTime) IS NOT NULL, VALUES(reviewTime), reviewTime);
-                        """, 
-                        valores=valores_insertar_review)
-                
-                mongo_db_collection.insert_many(documentos_insertar_mongo)
+            documentos_insertar_mongo.append(crear_documento_mongo(id_review=nuevo_id_review, helpful=helpful, reviewText=reviewText, 
+                                                                   summary=summary, tipo_producto=nuevo_id_tipo_producto, overall=overall))
+
+            # Byte hasta el que llegan las reviews que ya tenemos en las listas
+            desplazamiento = desplazamiento_review
+
+        # Inserción de las filas del lote, una vez por lote (aunque se hayan saltado reviews repetidas), para que cada escritura, commit y
+        # punto de control coincida con el final de un lote y de su bloque de identificadores de reviews. Las consultas llevan 
+        # ON DUPLICATE KEY UPDATE, para que si ya existe la PRIMARY KEY (o la persona o el producto), se actualicen el resto de campos 
+        # de esa entrada
+        escritor_sql.anadir_lote(lote={"personas": valores_insertar_personas, "productos": valores_insertar_productos})
+
+        # Las personas y productos nuevos se escriben ya, antes que sus reviews: si la caché los descarta, la búsqueda por lotes tiene 
+        # que encontrarlos en MySQL, y si otra inserción a la vez ya los había insertado, las reviews tienen que usar sus identificadores
+        escritor_sql.volcar_dimensiones()
+
+        if personas_nuevas or productos_nuevos:
+            cambios_personas, cambios_productos = resolver_dimensiones_nuevas(conexion=sql_conexion, personas_nuevas=personas_nuevas, 
+                                                                              productos_nuevos=productos_nuevos, 
+                                                                              tipo_producto=nuevo_id_tipo_producto)
+
+            # Las reviews del lote y la caché pasan a usar los identificadores de las filas que ya existían
+            if cambios_personas or cambios_productos:
+                valores_insertar_review[:] = [(fila[0], cambios_personas.get(fila[1], fila[1]), cambios_productos.get(fila[2], fila[2]), 
+                                               *fila[3:]) for fila in valores_insertar_review]
+
+                for reviewerID, id_persona in personas_nuevas.items():
+                    if id_persona in cambios_personas:
+                        personas_cargadas[reviewerID] = (cambios_personas[id_persona], personas_cargadas[reviewerID][1])
+
+                for asin, id_producto in productos_nuevos.items():
+                    if id_producto in cambios_productos:
+                        productos_cargados[asin] = (cambios_productos[id_producto], nuevo_id_tipo_producto)
+
+        escritor_sql.anadir_lote(lote={"review": valores_insertar_review})
+
+        if escritor_buckets is not None:
+            filas_insertar_buckets.extend(valores_insertar_review)
+
+        # Limpiar listas después de la inserción
+        valores_insertar_personas.clear()
+        valores_insertar_productos.clear()
+        valores_insertar_review.clear()
+        personas_nuevas.clear()
+        productos_nuevos.clear()
+
+        # Con puntos de control se hace commit tras cada lote, ya que al reanudar solo se conoce el bloque de identificadores de 
+        # reviews del último lote (ver secuencias_ids.py). Si no, se sigue la política de commits
+        toca_commit = politica_commits.registrar_lote(desplazamiento=desplazamiento) or punto_control is not None
+
+        # Los documentos pendientes se insertan siempre antes de un commit, para que MongoDB llegue hasta la misma review que MySQL
+        if politica_mongo.registrar_lote(desplazamiento=desplazamiento) or toca_commit:
+            escritor_mongo.escribir(documentos=documentos_insertar_mongo)
+
+            if escritor_buckets is not None:
+                escritor_buckets.escribir(filas_review=filas_insertar_buckets, documentos=documentos_insertar_mongo, 
+                                          tipo_producto=nuevo_id_tipo_producto)
+                filas_insertar_buckets.clear()
+
+            documentos_insertar_mongo.clear()
+            politica_mongo.reiniciar()
+
+        if toca_commit:
+            # Las escrituras de MongoDB que sigan en vuelo tienen que terminar antes del commit
+            escritor_mongo.esperar()
+            escritor_sql.volcar()
+            sql_conexion.commit()
+            politica_commits.reiniciar()
+
+            if detector_duplicados is not None:
+                detector_duplicados.registrar_commit()
+
+        # Con puntos de control, tras cada commit se guarda hasta dónde hemos llegado
+        if punto_control is not None:
+            registrar_avance_fichero(punto_control=punto_control, fichero=file_in, desplazamiento=desplazamiento, 
+                                     contadores=contadores_punto_control(ids_review=ids_review, ids_personas=ids_personas, ids_productos=ids_productos))
+
+        # Las personas y productos del lote (incluidos los nuevos) quedan en la caché para los lotes siguientes
+        if MODO_BUSQUEDA_DIMENSIONES == "por_lotes":
+            cache_personas.update(personas_cargadas)
+            cache_productos.update(productos_cargados)
+
+    # Escritura final de las filas que el escritor tenga pendientes (los lotes ya se han añadido todos)
+    escritor_sql.volcar()
+
+    # Documentos pendientes de los últimos lotes (según la política de MongoDB, puede haber varios lotes acumulados)
+    if documentos_insertar_mongo:
+        escritor_mongo.escribir(documentos=documentos_insertar_mongo)
+
+        if escritor_buckets is not None:
+            escritor_buckets.escribir(filas_review=filas_insertar_buckets, documentos=documentos_insertar_mongo, tipo_producto=nuevo_id_tipo_producto)
+
+    escritor_mongo.cerrar()
         
     # Guardamos los cambios tras las inserciones
     sql_conexion.commit()
 
+    if detector_duplicados is not None:
+        detector_duplicados.registrar_commit()
+
+    if metricas is not None:
+        metricas.terminar_fichero()
+
+    if MODO_LOTES_ADAPTATIVOS:
+        escritor_sql.mostrar_informe(file_in=file_in)
+        escritor_mongo.mostrar_informe()
+
+    if punto_control is not None:
+        registrar_avance_fichero(punto_control=punto_control, fichero=file_in, desplazamiento=desplazamiento, 
+                                 contadores=contadores_punto_control(ids_review=ids_review, ids_personas=ids_personas, ids_productos=ids_productos),
+                                 completado=True)
+
     # Cerramos el cursor
     cursor.close()
 
@@ -402,13 +551,14 @@ def cargar_datos_productos(conexion:Connection)-> dict:
 ############################################################################################################################################
 
 # FUNCIÓN MAIN PARA EJECUTAR EL PROCESO COMPLETO
-def main():
+def main(reanudar:bool=False):
     """
     
     Función principal del script, que se encarga de ejecutar el proceso completo.
 
     Args:
-        None.
+        reanudar (bool, optional): si es True, se continúa la inserción desde el último punto de control guardado (ver 
+            puntos_control.py). Defaults to False.
 
     Returns:
         None
@@ -428,20 +578,72 @@ def main():
     print(f"\nNos hemos conectado a la base de datos MongoDB: \"{NOMBRE_BASE_DATOS_MONGO_DB}\" con éxito. ")
 
 
+    # Punto de control de la inserción (si se reanuda, el último guardado)
+    punto_control = cargar_punto_control(nombre_proceso="inserta_dataset") if reanudar else None
+
+    if reanudar and punto_control is None:
+        print("\nNo hay ningún punto de control guardado, se insertan los ficheros desde el principio.")
+
+    elif punto_control is not None:
+        print(f"\nReanudamos la inserción desde el punto de control: \"{punto_control['ruta']}\".")
+
+    if punto_control is None and (GUARDAR_PUNTOS_CONTROL or reanudar):
+        punto_control = crear_punto_control(nombre_proceso="inserta_dataset")
+
     # En caso de que nos hayamos podido conectar a MySQL
     if conexion_mysql:
 
+        # Conexión aparte para reservar los identificadores nuevos, con las secuencias al día con el contenido de las tablas
+        conexion_secuencias = conectar_secuencias()
+        sincronizar_secuencias(conexion=conexion_secuencias)
+
+        # La búsqueda por lotes necesita los índices de reviewerID y asin (las bases de datos antiguas pueden no tenerlos)
+        if MODO_BUSQUEDA_DIMENSIONES == "por_lotes":
+            crear_indices_faltantes_sql(conexion=conexion_mysql)
+
+        # Filtro de Bloom con las reviews que ya hay en la base de datos, el guardado o uno nuevo (ver filtro_duplicados.py)
+        detector_duplicados = abrir_detector_duplicados(conexion=conexion_mysql) if DETECTAR_REVIEWS_DUPLICADAS else None
+
+        # Métricas en directo de la inserción (ver metricas_ingesta.py)
+        metricas, reportadores = iniciar_metricas(ficheros=FICHEROS_DATOS_INSERTA_DATASET)
+
         # Iteramos sobre todos los ficheros nuevos que queremos insertar
         for fichero in FICHEROS_DATOS_INSERTA_DATASET: 
 
+            # Al reanudar, los ficheros que ya se terminaron de insertar se saltan
+            if punto_control is not None and punto_control["ficheros"].get(fichero, {}).get("completado", False):
+                print(f"\nEl fichero: \"{fichero}\" ya estaba insertado según el punto de control, lo saltamos.")
+                continue
+
             # Insertamoslos datos en el fichero correspondiente
-            insertar_dataset(file_in=fichero, sql_conexion=conexion_mysql, mongodb_database=dbname, batch_size=BATCH_SIZE)
+            insertar_dataset(file_in=fichero, sql_conexion=conexion_mysql, mongodb_database=dbname, batch_size=BATCH_SIZE, 
+                             conexion_secuencias=conexion_secuencias, punto_control=punto_control, metricas=metricas, 
+                             detector_duplicados=detector_duplicados)
 
             # Avisamos al usuario de que todo ha ido bien
             print(f"\nYa hemos cargado los datos del fichero: \"{fichero}\" en la base de datos SQL: \"{NOMBRE_BASE_DATOS_SQL}\".")
 
             # Avisamos al usuario de que todo ha ido bien
             print(f"\nYa hemos cargado los datos del fichero: \"{fichero}\" en la colección \"{COLECCION_MONGODB}\" de la base de datos MongoDb : \"{NOMBRE_BASE_DATOS_MONGO_DB}\".")
+
+        parar_metricas(reportadores=reportadores)
+
+        # El filtro, ya con las reviews insertadas, se guarda para la siguiente inserción
+        if detector_duplicados is not None:
+            detector_duplicados.mostrar_informe()
+            guardar_detector_duplicados(detector=detector_duplicados)
+
+        # Las bases de datos cargadas antes de que se definieran los índices de las consultas los reciben aquí (si ya existen, no se
+        # vuelven a crear)
+        if CREAR_INDICES_CONSULTAS:
+            crear_indices_consultas_sql(conexion=conexion_mysql)
+            crear_indices_mongodb(mongodb_database=dbname)
+
+        # La inserción ha terminado, ya no hace falta el punto de control
+        if punto_control is not None:
+            borrar_punto_control(punto_control=punto_control)
+
+        conexion_secuencias.close()
               
     # Cerramos la conexión MySQl
     conexion_mysql.close()
@@ -452,7 +654,7 @@ if __name__=="__main__":
 
     try:
         # Llamamos a la función principal del archivo para que desarrolle el proceso completo
-        main()
+        main(reanudar=leer_opcion_reanudar(descripcion="Inserción de ficheros de datos nuevos en MySQL y MongoDB."))
 
     except Exception as e:
         # Controlamos posibles excepciones
@@ -0,0 +1,201 @@
+"""
+Este script se empleará para abrir los ficheros de datos de las reviews, tanto sin comprimir (_5.json) como comprimidos con gzip
+(_5.json.gz) o zstd (_5.json.zst), sin tener que descomprimirlos antes en disco. Los ficheros comprimidos se leen en streaming, con
+buffers de lectura grandes (TAMANO_BUFFER_LECTURA) para que el descompresor trabaje con bloques grandes en lugar de línea a línea.
+
+Para leer ficheros .zst hace falta la librería opcional zstandard (pip install zstandard), que solo se importa si se usa.
+
+Además, se mide lo que se lee de cada fichero (bytes en disco, bytes ya descomprimidos y tiempo dedicado a la lectura y la
+descompresión), para mostrar al terminar un informe del rendimiento de entrada/salida.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+import gzip
+import io
+import time
+from typing import BinaryIO, Tuple
+
+############################################################################################################################################
+
+# Extensiones de compresión admitidas
+EXTENSION_GZIP = ".gz"
+EXTENSION_ZSTD = ".zst"
+
+# Tamaño de los bloques que se van leyendo cuando hay que saltar bytes de un fichero comprimido (no se puede hacer seek)
+TAMANO_BLOQUE_SALTO = 1024 * 1024
+
+############################################################################################################################################
+
+# DETECCIÓN DE LOS FICHEROS COMPRIMIDOS
+def es_fichero_comprimido(file_in:str)-> bool:
+    """
+
+    Indica si un fichero de datos está comprimido (gzip o zstd), según su extensión.
+
+    Args:
+        file_in (str): ruta del fichero de datos.
+
+    Returns:
+        bool: True si el fichero termina en .gz o .zst.
+
+    """
+    return file_in.endswith((EXTENSION_GZIP, EXTENSION_ZSTD))
+
+def quitar_extension_compresion(file_in:str)-> str:
+    """
+
+    Quita la extensión de compresión de la ruta de un fichero de datos, si la tiene.
+
+    Ejemplo:
+                "data/Digital_Music_5.json.gz" se convertirá en "data/Digital_Music_5.json"
+
+    Args:
+        file_in (str): ruta del fichero de datos.
+
+    Returns:
+        str: la ruta sin la extensión .gz o .zst.
+
+    """
+    for extension in (EXTENSION_GZIP, EXTENSION_ZSTD):
+        if file_in.endswith(extension):
+            return file_in[:-len(extension)]
+
+    return file_in
+
+############################################################################################################################################
+
+# MEDICIÓN DE LA LECTURA
+class LectorMedido(io.RawIOBase):
+    """
+
+    Envoltorio de un fichero binario que cuenta los bytes que se leen de él y el tiempo que se tarda en leerlos (incluida la
+    descompresión, si el fichero envuelto es un descompresor).
+
+    Attributes:
+        fichero (BinaryIO): fichero (o flujo descomprimido) del que se lee.
+        fichero_base (BinaryIO): fichero sobre el que está el flujo descomprimido, que se cierra a la vez (puede ser None).
+        bytes_leidos (int): bytes leídos hasta el momento.
+        tiempo_lectura (float): segundos dedicados a leer hasta el momento.
+
+    """
+    def __init__(self, fichero:BinaryIO, fichero_base:BinaryIO=None):
+        super().__init__()
+        self.fichero = fichero
+        self.fichero_base = fichero_base
+        self.bytes_leidos = 0
+        self.tiempo_lectura = 0.0
+
+    def readable(self)-> bool:
+        return True
+
+    def readinto(self, buffer)-> int:
+        inicio = time.perf_counter()
+        n_bytes = self.fichero.readinto(buffer)
+        self.tiempo_lectura += time.perf_counter() - inicio
+
+        self.bytes_leidos += n_bytes or 0
+
+        return n_bytes
+
+    def close(self)-> None:
+        if not self.closed:
+            self.fichero.close()
+            if self.fichero_base is not None:
+                self.fichero_base.close()
+        super().close()
+
+############################################################################################################################################
+
+# APERTURA DE UN FICHERO DE DATOS
+def abrir_fichero_datos(file_in:str, desplazamiento_inicial:int=0)-> Tuple[io.BufferedReader, LectorMedido, LectorMedido]:
+    """
+
+    Abre un fichero de datos en modo lectura binaria, descomprimiéndolo en streaming si es un .gz o un .zst, y lo deja posicionado en
+    desplazamiento_inicial (medido sobre los datos ya descomprimidos).
+
+    Args:
+        file_in (str): ruta del fichero de datos.
+        desplazamiento_inicial (int, optional): byte de los datos (descomprimidos) desde el que se empieza a leer. Defaults to 0.
+
+    Returns:
+        tuple:
+            - fichero (io.BufferedReader): fichero listo para leer línea a línea (se cierra con un with).
+            - lector_disco (LectorMedido): medidor de lo que se lee del fichero en disco.
+            - lector_datos (LectorMedido): medidor de los datos ya descomprimidos y del tiempo de lectura y descompresión.
+
+    Raises:
+        ImportError: si el fichero es .zst y no está instalada la librería zstandard.
+
+    """
+    lector_disco = LectorMedido(open(file_in, "rb", buffering=0))
+
+    if file_in.endswith(EXTENSION_GZIP):
+        flujo_datos = gzip.GzipFile(fileobj=io.BufferedReader(lector_disco, buffer_size=TAMANO_BUFFER_LECTURA), mode="rb")
+
+    elif file_in.endswith(EXTENSION_ZSTD):
+        try:
+            import zstandard
+        except ImportError:
+            lector_disco.close()
+            raise ImportError("Para leer ficheros .zst hay que instalar la librería zstandard (pip install zstandard).")
+
+        flujo_datos = zstandard.ZstdDecompressor().stream_reader(lector_disco, read_size=TAMANO_BUFFER_LECTURA, closefd=True)
+
+    else:
+        # Sin comprimir podemos saltar directamente al desplazamiento
+        lector_disco.fichero.seek(desplazamiento_inicial)
+        flujo_datos = lector_disco
+
+    # Si el fichero no está comprimido, los dos medidores son el mismo
+    lector_datos = flujo_datos if flujo_datos is lector_disco else LectorMedido(flujo_datos, fichero_base=lector_disco)
+    fichero = io.BufferedReader(lector_datos, buffer_size=TAMANO_BUFFER_LECTURA)
+
+    # En un fichero comprimido hay que descomprimir (y descartar) todo lo anterior al desplazamiento
+    if lector_datos is not lector_disco:
+        pendiente = desplazamiento_inicial
+        while pendiente > 0:
+            bloque = fichero.read(min(pendiente, TAMANO_BLOQUE_SALTO))
+            if not bloque:
+                break
+            pendiente -= len(bloque)
+
+    return fichero, lector_disco, lector_datos
+
+############################################################################################################################################
+
+# INFORME DE RENDIMIENTO DE LA LECTURA
+def mostrar_informe_lectura(file_in:str, bytes_disco:int, bytes_datos:int, tiempo_lectura:float, tiempo_total:float)-> None:
+    """
+
+    Muestra por pantalla cuánto se ha leído de un fichero de datos y a qué velocidad.
+
+    Args:
+        file_in (str): ruta del fichero de datos.
+        bytes_disco (int): bytes leídos del fichero en disco (comprimidos, si lo está).
+        bytes_datos (int): bytes de datos ya descomprimidos.
+        tiempo_lectura (float): segundos dedicados a leer y descomprimir, o None si no se ha podido medir (lectura en otros procesos).
+        tiempo_total (float): segundos totales desde que se abrió el fichero hasta que se terminó de procesar.
+
+    Returns:
+        None
+
+    """
+    megabytes_disco = bytes_disco / (1024 * 1024)
+    megabytes_datos = bytes_datos / (1024 * 1024)
+
+    print(f"\nLectura del fichero \"{file_in}\": {megabytes_disco:,.1f} MB en disco, {megabytes_datos:,.1f} MB de datos.")
+
+    if tiempo_lectura:
+        print(f"    - lectura y descompresión: {tiempo_lectura:.1f} s ({megabytes_disco / tiempo_lectura:,.1f} MB/s en disco, "
+              f"{megabytes_datos / tiempo_lectura:,.1f} MB/s de datos)")
+
+    if tiempo_total:
+        print(f"    - total (incluyendo parseo e inserción): {tiempo_total:.1f} s ({megabytes_datos / tiempo_total:,.1f} MB/s de datos)")
@@ -0,0 +1,382 @@
+"""
+Este script se empleará para leer en paralelo un único fichero de datos muy grande (por ejemplo, Clothing_Shoes_and_Jewelry_5.json),
+de forma que el parseo de las líneas escale con el número de núcleos aunque solo se cargue un fichero.
+
+El fichero se mapea en memoria (mmap) y se divide en rangos de bytes que empiezan y terminan justo después de un salto de línea, para
+que ninguna línea quede partida entre dos rangos. Cada rango se parsea en un proceso independiente (json.loads y formateo de la fecha)
+y se devuelve en forma de lote de columnas compacto:
+
+    - overall y unixReviewTime como arrays de NumPy.
+    - reviewerID y asin "internados": una tabla con los valores distintos del rango y un array de NumPy con el código de cada fila.
+    - el resto de campos (reviewerName, helpful, reviewText, summary, reviewTime) como listas.
+
+Los lotes se consumen en el mismo orden que las líneas del fichero, porque la asignación de identificadores (que se sigue haciendo
+en el proceso principal, en load_data.py) depende del orden de las reviews. generar_lotes_fichero de load_data.py los reparte en lotes
+de batch_size reviews (agrupar_columnas) y los transforma directamente con transformar_columnas (ver transformacion_lotes.py), sin
+volver a crear una tupla por review; iterar_campos_paralelo solo se usa en las cargas que trabajan review a review.
+
+El pool de procesos se crea la primera vez que se lee un fichero y se reutiliza para todos los siguientes (con "spawn", cada proceso
+nuevo tiene que volver a importar los scripts), hasta que se cierra con cerrar_pool_lectura o al salir del programa.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+import atexit
+import json
+import mmap
+import math
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Tuple
+import numpy as np
+from load_data import formatear_fecha
+from transformacion_lotes import UNIX_REVIEW_TIME_NULO
+
+############################################################################################################################################
+
+# Pool de procesos de lectura compartido por todos los ficheros (se crea en obtener_pool_lectura) y su número de procesos
+pool_lectura = None
+procesos_pool_lectura = 0
+
+# Columnas de un lote de columnas que tienen un valor por review (ver parsear_rango)
+COLUMNAS_POR_FILA = ["cod_revisor", "cod_asin", "overall", "unixReviewTime", "desplazamiento", "reviewerName", "helpful", "reviewText",
+                     "summary", "reviewTime"]
+
+############################################################################################################################################
+
+# DIVISIÓN DEL FICHERO EN RANGOS DE BYTES
+def calcular_rangos_fichero(file_in:str, tamano_rango:int, desplazamiento_inicial:int=0)-> List[Tuple[int, int]]:
+    """
+
+    Divide un fichero en rangos de bytes de aproximadamente tamano_rango bytes, alineados a los saltos de línea.
+
+    Args:
+        file_in (str): ruta del fichero de datos.
+        tamano_rango (int): tamaño aproximado de cada rango, en bytes.
+        desplazamiento_inicial (int, optional): byte desde el que se empieza (inicio de una línea). Defaults to 0.
+
+    Returns:
+        list: lista de tuplas (inicio, fin) con los rangos, en el orden del fichero. El byte fin no se incluye en el rango.
+
+    """
+    tamano_fichero = os.path.getsize(file_in)
+
+    # mmap no permite mapear ficheros vacíos
+    if tamano_fichero == 0:
+        return []
+
+    rangos = []
+
+    with open(file_in, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+
+        inicio = desplazamiento_inicial
+        while inicio < tamano_fichero:
+
+            # Buscamos el primer salto de línea a partir del corte aproximado, y el rango termina justo después
+            salto_linea = mapa.find(b"\n", min(inicio + tamano_rango, tamano_fichero) - 1)
+            fin = tamano_fichero if salto_linea == -1 else salto_linea + 1
+
+            rangos.append((inicio, fin))
+            inicio = fin
+
+    return rangos
+
+# PARSEO DE UN RANGO (SE EJECUTA EN UN PROCESO HIJO)
+def parsear_rango(file_in:str, inicio:int, fin:int)-> dict:
+    """
+
+    Parsea las líneas de un rango de bytes del fichero y devuelve sus reviews como un lote de columnas.
+
+    Args:
+        file_in (str): ruta del fichero de datos.
+        inicio (int): primer byte del rango (es el comienzo de una línea).
+        fin (int): byte siguiente al último del rango (justo después de un salto de línea, o el final del fichero).
+
+    Returns:
+        dict: lote de columnas con las claves "n_filas", "tabla_revisores", "cod_revisor", "tabla_asins", "cod_asin", "overall",
+        "unixReviewTime", "desplazamiento" (byte en el que termina cada línea), "reviewerName", "helpful", "reviewText", "summary" y 
+        "reviewTime".
+
+    """
+    # Tablas de valores distintos (internado) de reviewerID y asin
+    codigos_revisores, codigos_asins = {}, {}
+
+    cod_revisor, cod_asin, overall, unix_review_time, desplazamientos = [], [], [], [], []
+    columnas = {"reviewerName": [], "helpful": [], "reviewText": [], "summary": [], "reviewTime": []}
+
+    with open(file_in, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+
+        posicion = inicio
+        while posicion < fin:
+
+            salto_linea = mapa.find(b"\n", posicion, fin)
+            fin_linea = fin if salto_linea == -1 else salto_linea + 1
+
+            linea = mapa[posicion:fin_linea]
+            posicion = fin_linea
+
+            # La última línea del fichero puede venir vacía si termina en salto de línea
+            if not linea.strip():
+                continue
+
+            desplazamientos.append(fin_linea)
+
+            data = json.loads(linea)
+
+            cod_revisor.append(codigos_revisores.setdefault(data.get("reviewerID", None), len(codigos_revisores)))
+            cod_asin.append(codigos_asins.setdefault(data.get("asin", None), len(codigos_asins)))
+
+            valor_overall = data.get("overall", None)
+            overall.append(math.nan if valor_overall is None else valor_overall)
+
+            valor_unix_review_time = data.get("unixReviewTime", None)
+            unix_review_time.append(UNIX_REVIEW_TIME_NULO if valor_unix_review_time is None else valor_unix_review_time)
+
+            columnas["reviewerName"].append(data.get("reviewerName", None))
+            columnas["helpful"].append(data.get("helpful", [None, None]))
+            columnas["reviewText"].append(data.get("reviewText", None))
+            columnas["summary"].append(data.get("summary", None))
+            columnas["reviewTime"].append(formatear_fecha(data.get("reviewTime", None)))
+
+    return {
+
+        "n_filas": len(cod_revisor),
+        "tabla_revisores": list(codigos_revisores),
+        "cod_revisor": np.array(cod_revisor, dtype=np.int32),
+        "tabla_asins": list(codigos_asins),
+        "cod_asin": np.array(cod_asin, dtype=np.int32),
+        "overall": np.array(overall, dtype=np.float64),
+        "unixReviewTime": np.array(unix_review_time, dtype=np.int64),
+        "desplazamiento": np.array(desplazamientos, dtype=np.int64),
+        **columnas
+    }
+
+############################################################################################################################################
+
+# POOL DE PROCESOS DE LECTURA
+def obtener_pool_lectura(num_procesos:int)-> ProcessPoolExecutor:
+    """
+
+    Devuelve el pool de procesos de lectura, creándolo si aún no existe (o si se ha pedido otro número de procesos).
+
+    Args:
+        num_procesos (int): número de procesos del pool.
+
+    Returns:
+        ProcessPoolExecutor: pool de procesos.
+
+    """
+    global pool_lectura, procesos_pool_lectura
+
+    if pool_lectura is None or procesos_pool_lectura != num_procesos:
+        cerrar_pool_lectura()
+
+        # Usamos "spawn" para que los procesos hijos no hereden las conexiones abiertas del proceso principal
+        pool_lectura = ProcessPoolExecutor(max_workers=num_procesos, mp_context=multiprocessing.get_context("spawn"))
+        procesos_pool_lectura = num_procesos
+
+    return pool_lectura
+
+@atexit.register
+def cerrar_pool_lectura()-> None:
+    """
+
+    Cierra el pool de procesos de lectura, si está abierto (se llama también al salir del programa).
+
+    """
+    global pool_lectura
+
+    if pool_lectura is not None:
+        pool_lectura.shutdown(wait=True, cancel_futures=True)
+        pool_lectura = None
+
+############################################################################################################################################
+
+# LECTURA COMPLETA DEL FICHERO EN PARALELO
+def leer_columnas_paralelo(file_in:str, num_procesos:int, tamano_rango:int, desplazamiento_inicial:int=0)-> Iterator[dict]:
+    """
+
+    Parsea un fichero por rangos en un pool de procesos y devuelve (yield) los lotes de columnas en el orden del fichero. Como mucho hay
+    2 * num_procesos rangos en vuelo, para que la memoria no crezca si el consumidor es más lento que el parseo.
+
+    Args:
+        file_in (str): ruta del fichero de datos.
+        num_procesos (int): número de procesos que parsean a la vez.
+        tamano_rango (int): tamaño aproximado de cada rango, en bytes.
+        desplazamiento_inicial (int, optional): byte desde el que se empieza a leer (inicio de una línea). Defaults to 0.
+
+    Returns:
+        Iterator[dict]: generador de lotes de columnas (ver parsear_rango).
+
+    """
+    rangos = deque(calcular_rangos_fichero(file_in=file_in, tamano_rango=tamano_rango, desplazamiento_inicial=desplazamiento_inicial))
+    en_vuelo = deque()
+    pool = obtener_pool_lectura(num_procesos=num_procesos)
+
+    try:
+        while rangos or en_vuelo:
+
+            while rangos and len(en_vuelo) < 2 * num_procesos:
+                inicio, fin = rangos.popleft()
+                en_vuelo.append(pool.submit(parsear_rango, file_in, inicio, fin))
+
+            yield en_vuelo.popleft().result()
+
+    finally:
+        # Si se deja de leer a mitad del fichero, los rangos que aún no han empezado no se parsean (el pool sigue abierto)
+        for futuro in en_vuelo:
+            futuro.cancel()
+
+# REPARTO DE LOS LOTES DE COLUMNAS EN LOTES DE batch_size REVIEWS
+def cortar_columnas(columnas:dict, inicio:int, fin:int)-> dict:
+    """
+
+    Devuelve las reviews [inicio, fin) de un lote de columnas (las tablas de reviewerID y asin se comparten, y los arrays de NumPy 
+    son vistas, no copias).
+
+    Args:
+        columnas (dict): lote de columnas (ver parsear_rango).
+        inicio (int): primera review.
+        fin (int): review siguiente a la última.
+
+    Returns:
+        dict: lote de columnas con las reviews del tramo.
+
+    """
+    tramo = {columna: columnas[columna][inicio:fin] for columna in COLUMNAS_POR_FILA}
+    tramo["n_filas"] = len(tramo["cod_revisor"])
+    tramo["tabla_revisores"], tramo["tabla_asins"] = columnas["tabla_revisores"], columnas["tabla_asins"]
+
+    return tramo
+
+def concatenar_columnas(primero:dict, segundo:dict)-> dict:
+    """
+
+    Une dos lotes de columnas consecutivos. Las tablas de reviewerID y asin se juntan, desplazando los códigos del segundo lote.
+
+    Args:
+        primero (dict): lote de columnas con las primeras reviews.
+        segundo (dict): lote de columnas con las reviews siguientes.
+
+    Returns:
+        dict: lote de columnas con las reviews de los dos.
+
+    """
+    union = {"n_filas": primero["n_filas"] + segundo["n_filas"],
+             "tabla_revisores": primero["tabla_revisores"] + segundo["tabla_revisores"],
+             "cod_revisor": np.concatenate((primero["cod_revisor"], segundo["cod_revisor"] + len(primero["tabla_revisores"]))),
+             "tabla_asins": primero["tabla_asins"] + segundo["tabla_asins"],
+             "cod_asin": np.concatenate((primero["cod_asin"], segundo["cod_asin"] + len(primero["tabla_asins"])))}
+
+    for columna in COLUMNAS_POR_FILA:
+        if columna not in union:
+            union[columna] = np.concatenate((primero[columna], segundo[columna])) if isinstance(primero[columna], np.ndarray) else \
+                             primero[columna] + segundo[columna]
+
+    return union
+
+def agrupar_columnas(lotes_columnas:Iterator[dict], tamano:int)-> Iterator[dict]:
+    """
+
+    Reparte los lotes de columnas de los rangos (de tamaño variable) en lotes de exactamente tamano reviews, salvo el último, igual
+    que los lotes que forma generar_lotes_fichero review a review.
+
+    Args:
+        lotes_columnas (Iterator[dict]): lotes de columnas en el orden del fichero (ver leer_columnas_paralelo).
+        tamano (int): número de reviews de cada lote.
+
+    Returns:
+        Iterator[dict]: generador de lotes de columnas.
+
+    """
+    pendiente = None
+
+    for columnas in lotes_columnas:
+        inicio = 0
+
+        # Completamos el lote que quedó a medias con las primeras reviews de este rango
+        if pendiente is not None:
+            inicio = tamano - pendiente["n_filas"]
+            pendiente = concatenar_columnas(primero=pendiente, segundo=cortar_columnas(columnas=columnas, inicio=0, fin=inicio))
+
+            if pendiente["n_filas"] < tamano:
+                continue
+
+            yield pendiente
+            pendiente = None
+
+        while inicio + tamano <= columnas["n_filas"]:
+            yield cortar_columnas(columnas=columnas, inicio=inicio, fin=inicio + tamano)
+            inicio += tamano
+
+        if inicio < columnas["n_filas"]:
+            pendiente = cortar_columnas(columnas=columnas, inicio=inicio, fin=columnas["n_filas"])
+
+    if pendiente is not None:
+        yield pendiente
+
+############################################################################################################################################
+
+# LECTURA REVIEW A REVIEW
+
+def iterar_campos_columnas(columnas:dict)-> Iterator[tuple]:
+    """
+
+    Recorre un lote de columnas fila a fila, devolviendo los campos de cada review con el mismo formato que extraer_campos_review
+    de load_data.py, junto con el byte en el que termina su línea (igual que iterar_campos_fichero).
+
+    Args:
+        columnas (dict): lote de columnas devuelto por parsear_rango.
+
+    Returns:
+        Iterator[tuple]: generador de tuplas (desplazamiento, campos), donde campos es la tupla (reviewerID, asin, reviewerName, 
+        helpful, reviewText, overall, summary, unixReviewTime, reviewTime).
+
+    """
+    tabla_revisores, tabla_asins = columnas["tabla_revisores"], columnas["tabla_asins"]
+
+    # tolist() convierte los arrays a tipos de Python de una sola vez (más rápido que acceder elemento a elemento)
+    for desplazamiento, cod_revisor, cod_asin, overall, unix_review_time, reviewerName, helpful, reviewText, summary, reviewTime in zip(
+            columnas["desplazamiento"].tolist(), columnas["cod_revisor"].tolist(), columnas["cod_asin"].tolist(), 
+            columnas["overall"].tolist(), columnas["unixReviewTime"].tolist(), columnas["reviewerName"], columnas["helpful"], 
+            columnas["reviewText"], columnas["summary"], columnas["reviewTime"]):
+
+        yield desplazamiento, (
+
+            tabla_revisores[cod_revisor],
+            tabla_asins[cod_asin],
+            reviewerName,
+            helpful,
+            reviewText,
+            None if math.isnan(overall) else overall,
+            summary,
+            None if unix_review_time == UNIX_REVIEW_TIME_NULO else unix_review_time,
+            reviewTime
+        )
+
+def iterar_campos_paralelo(file_in:str, num_procesos:int, tamano_rango:int, desplazamiento_inicial:int=0)-> Iterator[tuple]:
+    """
+
+    Recorre todas las reviews de un fichero, parseado en paralelo, devolviendo sus campos en el orden del fichero.
+
+    Args:
+        file_in (str): ruta del fichero de datos.
+        num_procesos (int): número de procesos que parsean a la vez.
+        tamano_rango (int): tamaño aproximado de cada rango, en bytes.
+        desplazamiento_inicial (int, optional): byte desde el que se empieza a leer (inicio de una línea). Defaults to 0.
+
+    Returns:
+        Iterator[tuple]: generador de tuplas (desplazamiento, campos) con el mismo formato que iterar_campos_fichero.
+
+    """
+    for columnas in leer_columnas_paralelo(file_in=file_in, num_procesos=num_procesos, tamano_rango=tamano_rango,
+                                           desplazamiento_inicial=desplazamiento_inicial):
+        yield from iterar_campos_columnas(columnas=columnas)
@@ -22,21 +22,39 @@ Proyecto: Proyecto Final 2024/2025 - Bases de Datos
 # Importamos las librerías necesarias
 from configuracion import*
 import json
+import os
 from pymongo import MongoClient
 from pymongo.database import Database
 from pymysql.connections import Connection
 import pymysql
 from datetime import datetime
+from functools import lru_cache
 import re
 from pymysql.cursors import Cursor
-from typing import List, Tuple
+import time
+from typing import Iterator, List, Tuple
+from mapa_identidades import crear_mapa_identidades, NombresPersonas
+from secuencias_ids import sincronizar_secuencias
+from transformacion_lotes import transformar_lote, transformar_columnas
+from campos_derivados import anadir_campos_derivados
+from politica_volcado import crear_politica_commits, crear_politica_mongo
+from escritura_adaptativa import EscritorSql
+from escritura_mongo_paralela import crear_escritor_mongo
+from buckets_productos import EscritorBuckets
+from metricas_ingesta import MetricasIngesta, iniciar_metricas, parar_metricas
+from lectura_ficheros import es_fichero_comprimido, quitar_extension_compresion, abrir_fichero_datos, mostrar_informe_lectura
+from puntos_control import leer_opcion_reanudar, crear_punto_control, cargar_punto_control, registrar_avance_fichero, \
+                           borrar_punto_control, descartar_documentos_no_confirmados
 
 ############################################################################################################################################
 
 # Variables globales empleadas para controlar los identificadores únicos a la hora de hacer las inserciones
-dicc_ids_personas = {}
-dicc_ids_productos = {} # clave (asin, tipo_producto) valor id_producto
+# Los identificadores de personas y productos se guardan en diccionarios, o en mapas compactos con MAPAS_IDENTIDADES_COMPACTOS (ver
+# mapa_identidades.py), que con millones de claves ocupan mucha menos memoria a cambio de búsquedas más lentas
+dicc_ids_personas = crear_mapa_identidades()
+dicc_ids_productos = crear_mapa_identidades(clave_compuesta=True) # clave (asin, tipo_producto) valor id_producto
 dicc_ids_tipos_producto = {}
+nombres_personas = NombresPersonas() # huella del último reviewerName no nulo enviado a SQL de cada id_persona
 contador_persona = 0
 contador_producto = 0
 contador_tipo_producto = 0
@@ -49,7 +67,11 @@ def extraer_tipo_producto(nombre_fichero:str)-> str:
     """
 
     Función que recibe una ruta de un fichero y extrae el tipo de producto al que corresponden los datos
-    de dicho archivo. Se emplea para ello regex.
+    de dicho archivo. Se emplea para ello regex. El fichero puede estar comprimido (.json.gz o .json.zst) y puede
+    tener el prefijo "reviews_" de los volcados originales de Amazon.
+
+    Ejemplo:
+                "data/reviews_Digital_Music_5.json.gz" devolverá "Digital_Music"
 
     Args:
         nombre_fichero (str): ruta del archivo de datos, incluyendo posibles carpetas externas y demás.
@@ -59,20 +81,22 @@ def extraer_tipo_producto(nombre_fichero:str)-> str:
         al que corresponden los datos del fichero.
     
     """
-    # Definimos nuestro patrón de regex
-    patron_products = r".*\/(.*)_.*"
+    # Definimos nuestro patrón de regex (el prefijo "reviews_" es opcional)
+    patron_products = r".*\/(?:reviews_)?(.*)_.*"
 
-    # Extraemos del nombre del fichero, el tipo de producto
-    tipo_producto = re.match(pattern=patron_products, string=nombre_fichero).group(1)  
+    # Extraemos del nombre del fichero (sin la extensión de compresión), el tipo de producto
+    tipo_producto = re.match(pattern=patron_products, string=quitar_extension_compresion(file_in=nombre_fichero)).group(1)  
 
     return tipo_producto
 
 # FORMATEO DE LA FECHA PARA SER DE TIPO DATE (YYYY-MM-DD)
+@lru_cache(maxsize=TAMANO_CACHE_FECHAS)
 def formatear_fecha(fecha_antigua:str)-> str:
     """
 
     Esta función formatea las fechas que vienen con una estructura no compatible con los tipos de datos de fehca de SQL,
-    para convertirlas a un formato que ya puede ser utilizado como tipo de dato date (YYYY-MM-DD)
+    para convertirlas a un formato que ya puede ser utilizado como tipo de dato date (YYYY-MM-DD). Como en un fichero se repiten
+    mucho las mismas fechas, los resultados se guardan en caché (lru_cache) y cada fecha distinta solo se convierte una vez.
 
     Ejemplo: 
                 "07 9, 2012" se convertirá en "2012-07-09"
@@ -99,7 +123,7 @@ def formatear_fecha(fecha_antigua:str)-> str:
 ############################################################################################################################################
 
 # CREACIÓN DE LA CONEXIÓN CON pymysql
-def conectar_mysql()-> Connection:
+def conectar_mysql(local_infile:bool=False)-> Connection:
     """
 
     Esta función intenta crear una conexión con una base de datos MySQL usando los datos
@@ -107,7 +131,7 @@ def conectar_mysql()-> Connection:
     se captura la excepción y se imprime un mensaje de error.
 
     Args:
-        None
+        local_infile (bool, optional): permite usar LOAD DATA LOCAL INFILE con esta conexión (carga masiva). Defaults to False.
 
     Returns:
         - Devuelve un objeto de tipo pymysql.connections.Connection si la conexión es exitosa.
@@ -118,7 +142,8 @@ def conectar_mysql()-> Connection:
         conexion = pymysql.connect(
         host="localhost",
         user=USER_SQL,              # el usuario
-        password=PASSWORD_SQL)      # tu constraseña
+        password=PASSWORD_SQL,      # tu constraseña
+        local_infile=local_infile)
         
         return conexion 
     
@@ -166,14 +191,272 @@ def create_database_sql(conexion:Connection)-> None:
     except Exception as error:
         print(f"\nError al crear la base de datos SQL: {error}")
 
+# ESQUEMA DE LAS TABLAS SQL
+# Columnas generadas de Review con el año y el año-mes (AAAAMM) de reviewTime. MySQL las calcula y guarda en cada inserción, así que
+# las consultas por año o por mes pueden filtrar y agrupar por ellas con índices, en lugar de aplicar YEAR() a toda la tabla
+COLUMNAS_FECHA_REVIEW_SQL = [
+    "anio SMALLINT AS (YEAR(reviewTime)) STORED",
+    "anio_mes MEDIUMINT AS (YEAR(reviewTime) * 100 + MONTH(reviewTime)) STORED"
+]
+
+# Columnas de cada tabla, en el orden en el que se crean las tablas (primero las tablas a las que apuntan las claves foráneas)
+COLUMNAS_TABLAS_SQL = {
+
+    "Personas": [
+        "id_persona INT NOT NULL",
+        "reviewerID VARCHAR(250) NOT NULL",
+        "reviewerName VARCHAR(250)"
+    ],
+    "Tipos_producto": [
+        "tipo_producto INT NOT NULL",
+        "nombre_tipo_producto VARCHAR(250) NOT NULL"
+    ],
+    "Productos": [
+        "id_producto INT NOT NULL",
+        "asin VARCHAR(20) NOT NULL",
+        "tipo_producto INT NOT NULL"
+    ],
+    "Review": [
+        "id_review INT NOT NULL",
+        "id_persona INT NOT NULL",
+        "id_producto INT NOT NULL",
+        "overall INT NOT NULL",
+        "unixReviewTime BIGINT",
+        "reviewTime date"
+    ] + COLUMNAS_FECHA_REVIEW_SQL
+}
+
+# Esquema compacto de las tablas (ESQUEMA_COMPACTO), con el menor tipo que admite cada columna: overall en TINYINT, los identificadores 
+# sin signo y tipo_producto en SMALLINT. La fecha se guarda una sola vez (reviewTime, 3 bytes): unixReviewTime pasa a ser una columna 
+# virtual, calculada al leerla a partir de reviewTime (en los ficheros de Amazon es siempre la medianoche UTC de ese día), que no ocupa 
+# espacio en las filas
+COLUMNAS_TABLAS_SQL_COMPACTO = {
+
+    "Personas": [
+        "id_persona INT UNSIGNED NOT NULL",
+        "reviewerID VARCHAR(32) NOT NULL",
+        "reviewerName VARCHAR(250)"
+    ],
+    "Tipos_producto": [
+        "tipo_producto SMALLINT UNSIGNED NOT NULL",
+        "nombre_tipo_producto VARCHAR(64) NOT NULL"
+    ],
+    "Productos": [
+        "id_producto INT UNSIGNED NOT NULL",
+        "asin VARCHAR(20) NOT NULL",
+        "tipo_producto SMALLINT UNSIGNED NOT NULL"
+    ],
+    "Review": [
+        "id_review INT UNSIGNED NOT NULL",
+        "id_persona INT UNSIGNED NOT NULL",
+        "id_producto INT UNSIGNED NOT NULL",
+        "overall TINYINT UNSIGNED NOT NULL",
+        "reviewTime date",
+        "unixReviewTime BIGINT AS ((TO_DAYS(reviewTime) - 719528) * 86400) VIRTUAL"
+    ] + COLUMNAS_FECHA_REVIEW_SQL
+}
+
+def columnas_tablas_sql(compacto:bool=ESQUEMA_COMPACTO)-> dict:
+    """
+
+    Devuelve las columnas de cada tabla del esquema normal o del compacto.
+
+    Args:
+        compacto (bool, optional): si es True, las del esquema compacto. Defaults to ESQUEMA_COMPACTO.
+
+    Returns:
+        dict: tabla -> lista de definiciones de sus columnas.
+    
+    """
+    return COLUMNAS_TABLAS_SQL_COMPACTO if compacto else COLUMNAS_TABLAS_SQL
+
+def columnas_insercion_sql(tabla:str, compacto:bool=ESQUEMA_COMPACTO)-> List[str]:
+    """
+
+    Devuelve los nombres de las columnas de una tabla a las que se les da valor al insertar (todas menos las generadas).
+
+    Args:
+        tabla (str): nombre de la tabla (clave de COLUMNAS_TABLAS_SQL).
+        compacto (bool, optional): si es True, las del esquema compacto. Defaults to ESQUEMA_COMPACTO.
+
+    Returns:
+        list: nombres de las columnas, en el orden de la tabla.
+    
+    """
+    return [columna.split()[0] for columna in columnas_tablas_sql(compacto=compacto)[tabla] if " AS (" not in columna]
+
+# Clave primaria de cada tabla
+CLAVES_PRIMARIAS_SQL = {
+
+    "Personas": "id_persona",
+    "Tipos_producto": "tipo_producto",
+    "Productos": "id_producto",
+    "Review": "id_review"
+}
+
+# Claves foráneas de cada tabla: (columna, tabla referenciada). La columna referenciada es la clave primaria de esa tabla
+CLAVES_FORANEAS_SQL = {
+
+    "Productos": [("tipo_producto", "Tipos_producto")],
+    "Review": [("id_persona", "Personas"), ("id_producto", "Productos")]
+}
+
+# Índices secundarios de cada tabla: (nombre del índice, columnas). Los de reviewerID y asin permiten buscar personas y productos
+# concretos sin recorrer la tabla entera (ver busqueda_dimensiones.py)
+INDICES_SQL = {
+
+    "Personas": [("idx_personas_reviewerID", ["reviewerID"])],
+    "Productos": [("idx_productos_asin", ["asin", "tipo_producto"])]
+}
+
+# Índices de INDICES_SQL que son UNIQUE: cada persona y cada producto de un tipo tiene una sola fila. Así, si dos inserta_dataset.py a
+# la vez encuentran la misma persona nueva, la segunda inserción actualiza la fila de la primera en lugar de crear otra con su propio
+# id_persona (ver insertar_dimensiones_nuevas en inserta_dataset.py). Como las columnas no distinguen mayúsculas, tampoco lo hacen
+# los índices
+INDICES_UNICOS_SQL = {"idx_personas_reviewerID", "idx_productos_asin"}
+
+# Índices secundarios de las consultas de machine_learning.py, menu_visualizacion.py y neo4JProyecto.py. No se crean con las tablas,
+# sino al terminar la carga (ver indices_sql.py), para no mantenerlos en cada inserción. Los dos compuestos de Review cubren las
+# auto-uniones del recomendador (review r1 INNER JOIN review r2 ON r1.id_producto = r2.id_producto WHERE r1.id_persona = ...) sin leer
+# la tabla, y MySQL puede usarlos también para las claves foráneas de id_persona e id_producto en lugar de los que crea por su cuenta.
+# Los de anio y anio_mes sirven para las consultas por fecha: la categoría está en Productos, así que las de una categoría llegan a
+# Review por id_producto (un rango del índice por cada producto de la categoría)
+INDICES_CONSULTAS_SQL = {
+
+    "Tipos_producto": [("idx_tipos_producto_nombre", ["nombre_tipo_producto"])],
+    "Review": [("idx_review_persona_producto_overall", ["id_persona", "id_producto", "overall"]),
+               ("idx_review_producto_persona_overall", ["id_producto", "id_persona", "overall"]),
+               ("idx_review_producto_anio_mes", ["id_producto", "anio", "anio_mes"]),
+               ("idx_review_anio_mes", ["anio", "anio_mes"])]
+}
+
+def restricciones_tabla_sql(tabla:str)-> List[str]:
+    """
+
+    Devuelve las definiciones de la clave primaria, de las claves foráneas y de los índices secundarios de una tabla, tal y como se 
+    escriben dentro de un CREATE TABLE (o detrás de un ADD en un ALTER TABLE).
+
+    Args:
+        tabla (str): nombre de la tabla (clave de COLUMNAS_TABLAS_SQL).
+
+    Returns:
+        list: lista de definiciones de restricciones.
+    
+    """
+    restricciones = [f"PRIMARY KEY ({CLAVES_PRIMARIAS_SQL[tabla]})"]
+
+    for columna, tabla_referenciada in CLAVES_FORANEAS_SQL.get(tabla, []):
+        restricciones.append(f"FOREIGN KEY ({columna}) REFERENCES {tabla_referenciada} ({CLAVES_PRIMARIAS_SQL[tabla_referenciada]}) ON DELETE CASCADE")
+
+    for nombre_indice, columnas in INDICES_SQL.get(tabla, []):
+        restricciones.append(definicion_indice_sql(nombre_indice=nombre_indice, columnas=columnas))
+
+    return restricciones
+
+def definicion_indice_sql(nombre_indice:str, columnas:List[str])-> str:
+    return f"{'UNIQUE ' if nombre_indice in INDICES_UNICOS_SQL else ''}INDEX {nombre_indice} ({', '.join(columnas)})"
+
+def crear_indices_faltantes_sql(conexion:Connection, indices:dict=INDICES_SQL)-> List[str]:
+    """
+
+    Crea los índices secundarios que no existan todavía, para bases de datos creadas antes de que se definieran. Todos los índices 
+    que faltan en una tabla se añaden con un único ALTER TABLE. Los de INDICES_UNICOS_SQL que existan sin ser UNIQUE se vuelven a
+    crear (si la tabla tiene filas repetidas no se puede, y se deja el índice como estaba).
+
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL, con la base de datos seleccionada.
+        indices (dict, optional): índices de cada tabla, con el formato de INDICES_SQL. Defaults to INDICES_SQL.
+
+    Returns:
+        list: nombres de los índices creados.
+    
+    """
+    cursor = conexion.cursor()
+
+    cursor.execute("""
+        SELECT DISTINCT LOWER(TABLE_NAME), INDEX_NAME, NON_UNIQUE
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE();
+    """)
+    indices_existentes = {(tabla, nombre_indice): bool(no_unico) for tabla, nombre_indice, no_unico in cursor.fetchall()}
+
+    indices_creados = []
+
+    for tabla, indices_tabla in indices.items():
+
+        indices_faltantes = [(nombre_indice, columnas) for nombre_indice, columnas in indices_tabla 
+                             if (tabla.lower(), nombre_indice) not in indices_existentes]
+
+        if indices_faltantes:
+            cursor.execute(f"ALTER TABLE {tabla} " + ", ".join([f"ADD {definicion_indice_sql(nombre_indice=nombre_indice, columnas=columnas)}" 
+                                                                 for nombre_indice, columnas in indices_faltantes]) + ";")
+
+            for nombre_indice, _ in indices_faltantes:
+                indices_creados.append(nombre_indice)
+                print(f"\nÍndice de SQL: \"{nombre_indice}\" creado en la tabla \"{tabla}\".")
+
+        # Índices que tienen que ser UNIQUE y se crearon sin serlo
+        for nombre_indice, columnas in indices_tabla:
+            if nombre_indice in INDICES_UNICOS_SQL and indices_existentes.get((tabla.lower(), nombre_indice)):
+                try:
+                    cursor.execute(f"ALTER TABLE {tabla} DROP INDEX {nombre_indice}, "
+                                   f"ADD {definicion_indice_sql(nombre_indice=nombre_indice, columnas=columnas)};")
+                except pymysql.err.IntegrityError as error:
+                    print(f"\nEl índice de SQL: \"{nombre_indice}\" no se ha podido hacer UNIQUE (hay filas repetidas en la tabla "
+                          f"\"{tabla}\"): {error}")
+                    continue
+
+                indices_creados.append(nombre_indice)
+                print(f"\nÍndice de SQL: \"{nombre_indice}\" de la tabla \"{tabla}\" vuelto a crear como UNIQUE.")
+
+    cursor.close()
+
+    return indices_creados
+
+def crear_columnas_fecha_faltantes_sql(conexion:Connection)-> bool:
+    """
+
+    Añade a la tabla Review las columnas generadas de COLUMNAS_FECHA_REVIEW_SQL, para bases de datos creadas antes de que se 
+    definieran. MySQL las rellena para todas las filas que ya hay en la tabla.
+
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL, con la base de datos seleccionada.
+
+    Returns:
+        bool: True si se han añadido columnas.
+    
+    """
+    cursor = conexion.cursor()
+
+    cursor.execute("""
+        SELECT COLUMN_NAME
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND LOWER(TABLE_NAME) = 'review';
+    """)
+    columnas_existentes = {fila[0] for fila in cursor.fetchall()}
+
+    columnas_faltantes = [columna for columna in COLUMNAS_FECHA_REVIEW_SQL if columna.split()[0] not in columnas_existentes]
+
+    if columnas_faltantes:
+        cursor.execute("ALTER TABLE Review " + ", ".join([f"ADD COLUMN {columna}" for columna in columnas_faltantes]) + ";")
+        print(f"\nColumnas generadas de SQL: {', '.join([columna.split()[0] for columna in columnas_faltantes])} añadidas a la tabla \"Review\".")
+
+    cursor.close()
+
+    return bool(columnas_faltantes)
+
 # CREACIÓN DE TABLAS SQL
-def create_tables_sql(conexion:Connection)-> None:
+def create_tables_sql(conexion:Connection, diferir_restricciones:bool=False, compacto:bool=ESQUEMA_COMPACTO)-> None:
     """
 
     Esta función crea las tabla de SQL en la base de datos estipulada, mediante la conexión que se le pasa como argumento.
 
     Args:
         conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL, obtenido previamente con "pymysql.connect()".
+        diferir_restricciones (bool, optional): si es True, las tablas se crean sin claves primarias ni foráneas, que se añaden al 
+            final de la carga con crear_restricciones_diferidas_sql (carga inicial rápida). Defaults to False.
+        compacto (bool, optional): si es True, las tablas se crean con el esquema compacto (COLUMNAS_TABLAS_SQL_COMPACTO). 
+            Defaults to ESQUEMA_COMPACTO.
 
     Returns:
         None: La función no devuelve ningún valor. Si se ejecuta con éxito, crea las tablas en la base de datos. En caso de error, 
@@ -183,84 +466,134 @@ def create_tables_sql(conexion:Connection)-> None:
     try:
         cursor = conexion.cursor()
 
-        ################## TABLA PERSONAS ##################
+        for tabla, columnas in columnas_tablas_sql(compacto=compacto).items():
 
-        query_tabla_personas = """
+            # En la carga rápida creamos las tablas "desnudas", sin restricciones ni índices que mantener en cada inserción
+            definiciones = columnas if diferir_restricciones else columnas + restricciones_tabla_sql(tabla)
 
-            CREATE TABLE Personas (
+            query_tabla = f"CREATE TABLE {tabla} ({', '.join(definiciones)});"
 
-                id_persona INT NOT NULL PRIMARY KEY,
-                reviewerID VARCHAR(250) NOT NULL,
-                reviewerName VARCHAR(250)
+            cursor.execute(query_tabla)
 
-            );"""
+            print(f"\nTabla de SQL: \"{tabla}\" creada con éxito.")
         
-        # Tabla PERSONAS
-        cursor.execute(query_tabla_personas)
+        # Cerramos el cursor
+        cursor.close()
 
-        print("\nTabla de SQL: \"Personas\" creada con éxito.")
+    except Exception as error:
+        print(f"\nError al crear la tabla SQL: {error}")
 
-        ################## TABLA TIPOS DE PRODUCTO ##################
+# CREACIÓN DE LAS RESTRICCIONES AL FINAL DE UNA CARGA RÁPIDA
+def validar_restricciones_sql(conexion:Connection)-> List[str]:
+    """
 
-        query_tabla_tipos_producto = """
+    Comprueba que los datos cargados en unas tablas sin restricciones cumplen las claves primarias y los índices UNIQUE (sin 
+    duplicados) y las claves foráneas (sin filas huérfanas), antes de añadirlas.
 
-            CREATE TABLE Tipos_producto (
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL, con la base de datos seleccionada.
 
-                tipo_producto INT NOT NULL PRIMARY KEY,
-                nombre_tipo_producto VARCHAR(250) NOT NULL
+    Returns:
+        list: lista de mensajes con los problemas encontrados (vacía si todo es correcto).
+    
+    """
+    problemas = []
+    cursor = conexion.cursor()
 
-            );"""
-        
-        # Tabla Tipos de Producto 
-        cursor.execute(query_tabla_tipos_producto)
+    for tabla, clave_primaria in CLAVES_PRIMARIAS_SQL.items():
 
-        print("\nTabla de SQL: \"Tipos de producto\" creada con éxito.")   
+        cursor.execute(f"SELECT COUNT(*) - COUNT(DISTINCT {clave_primaria}) FROM {tabla};")
+        n_duplicados = cursor.fetchone()[0]
 
-        ################## TABLA PRODUCTOS ##################
+        if n_duplicados:
+            problemas.append(f"{n_duplicados} valores duplicados de {clave_primaria} en {tabla}")
 
-        query_tabla_productos = """
+    for tabla, indices_tabla in INDICES_SQL.items():
+        for nombre_indice, columnas in indices_tabla:
 
-            CREATE TABLE Productos (
+            if nombre_indice not in INDICES_UNICOS_SQL:
+                continue
 
-                id_producto INT NOT NULL PRIMARY KEY,
-                asin VARCHAR(20) NOT NULL,
-                tipo_producto INT NOT NULL,
-                FOREIGN KEY (tipo_producto) REFERENCES Tipos_producto (tipo_producto) ON DELETE CASCADE
+            cursor.execute(f"SELECT COUNT(*) - COUNT(DISTINCT {', '.join(columnas)}) FROM {tabla};")
+            n_duplicados = cursor.fetchone()[0]
 
-            );"""
-        
-        # Tabla Productos
-        cursor.execute(query_tabla_productos)
+            if n_duplicados:
+                problemas.append(f"{n_duplicados} valores duplicados de ({', '.join(columnas)}) en {tabla}")
 
-        print("\nTabla de SQL: \"Productos\" creada con éxito.")
+    for tabla, claves_foraneas in CLAVES_FORANEAS_SQL.items():
+        for columna, tabla_referenciada in claves_foraneas:
 
-        ################## TABLA REVIEW ##################
+            columna_referenciada = CLAVES_PRIMARIAS_SQL[tabla_referenciada]
 
-        query_tabla_review = """
+            cursor.execute(f"""
+                SELECT COUNT(*)
+                FROM {tabla} t
+                LEFT JOIN {tabla_referenciada} r ON r.{columna_referenciada} = t.{columna}
+                WHERE r.{columna_referenciada} IS NULL;
+            """)
+            n_huerfanas = cursor.fetchone()[0]
 
-            CREATE TABLE Review (
+            if n_huerfanas:
+                problemas.append(f"{n_huerfanas} filas de {tabla} con {columna} sin correspondencia en {tabla_referenciada}")
 
-                id_review INT NOT NULL PRIMARY KEY,
-                id_persona INT NOT NULL,
-                id_producto INT NOT NULL,
-                overall INT NOT NULL,
-                unixReviewTime BIGINT,
-                reviewTime date,
-                FOREIGN KEY (id_persona) REFERENCES Personas (id_persona) ON DELETE CASCADE,
-                FOREIGN KEY (id_producto) REFERENCES Productos (id_producto) ON DELETE CASCADE
+    cursor.close()
 
-            );"""
-        
-        # Tabla REVIEW 
-        cursor.execute(query_tabla_review)
+    return problemas
 
-        print("\nTabla de SQL: \"Review\" creada con éxito.")        
-        
-        # Cerramos el cursor
-        cursor.close()
+def crear_restricciones_diferidas_sql(conexion:Connection)-> None:
+    """
 
-    except Exception as error:
-        print(f"\nError al crear la tabla SQL: {error}")
+    Añade de una sola vez las claves primarias y foráneas a unas tablas creadas con create_tables_sql(diferir_restricciones=True),
+    una vez que ya se han cargado todos los datos. Antes se validan los datos, y si hay algún problema no se añade nada. Al final se
+    comprueba en information_schema que todas las restricciones existen. Si algo falla se lanza una excepción, para que la carga 
+    no se dé por buena (sin claves primarias, los ON DUPLICATE KEY UPDATE de inserta_dataset.py serían inserciones normales).
+
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL, con la base de datos seleccionada.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: si los datos no cumplen las restricciones (se muestran antes los problemas encontrados).
+        RuntimeError: si después de crearlas no están todas las restricciones en la base de datos.
+    
+    """
+    problemas = validar_restricciones_sql(conexion=conexion)
+
+    if problemas:
+        print("\nNo se han creado las restricciones porque los datos no son válidos:")
+        for problema in problemas:
+            print(f"    - {problema}")
+        raise ValueError(f"Las tablas de SQL se han quedado sin claves primarias ni foráneas ({len(problemas)} problemas en los datos).")
+
+    cursor = conexion.cursor()
+
+    # Ya hemos validado las claves foráneas, así que MySQL no necesita volver a recorrer las tablas para comprobarlas
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0;")
+
+    try:
+        # Un único ALTER TABLE por tabla, para reconstruir cada tabla (e índices) una sola vez
+        for tabla in COLUMNAS_TABLAS_SQL:
+            cursor.execute(f"ALTER TABLE {tabla} " + ", ".join([f"ADD {restriccion}" for restriccion in restricciones_tabla_sql(tabla)]) + ";")
+            print(f"\nRestricciones de la tabla de SQL: \"{tabla}\" creadas con éxito.")
+
+    finally:
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1;")
+
+    # Verificación final: contamos las restricciones que hay realmente en la base de datos
+    cursor.execute("""
+        SELECT COUNT(*)
+        FROM information_schema.TABLE_CONSTRAINTS
+        WHERE TABLE_SCHEMA = DATABASE() AND CONSTRAINT_TYPE IN ('PRIMARY KEY', 'FOREIGN KEY');
+    """)
+    n_restricciones = cursor.fetchone()[0]
+    cursor.close()
+
+    n_esperadas = len(CLAVES_PRIMARIAS_SQL) + sum(len(claves) for claves in CLAVES_FORANEAS_SQL.values())
+
+    if n_restricciones != n_esperadas:
+        raise RuntimeError(f"Se esperaban {n_esperadas} restricciones y en la base de datos hay {n_restricciones}.")
 
 # INSERCIÓN DATOS POR LOTES A LA BASE DE DATOS DE MYSQL 
 def insertar_lote_sql(cursor: Cursor, query: str, valores: List[Tuple])-> None:
@@ -282,6 +615,61 @@ def insertar_lote_sql(cursor: Cursor, query: str, valores: List[Tuple])-> None:
     if valores:
         cursor.executemany(query, valores)
 
+# CONSULTAS DE INSERCIÓN POR LOTES
+# Añadimos el ON DUPLICATE KEY UPDATE, para que si ya existe la PRIMARY KEY, se actualicen el resto de campos (solo con valores no nulos)
+QUERY_INSERTAR_PERSONAS = """
+                INSERT INTO Personas (id_persona, reviewerID, reviewerName)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    reviewerID = IF(VALUES(reviewerID) IS NOT NULL, VALUES(reviewerID), reviewerID),
+                    reviewerName = IF(VALUES(reviewerName) IS NOT NULL, VALUES(reviewerName), reviewerName);
+        """
+
+QUERY_INSERTAR_TIPOS_PRODUCTO = """
+                INSERT INTO Tipos_producto (tipo_producto, nombre_tipo_producto)
+                VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE
+                    nombre_tipo_producto = IF(VALUES(nombre_tipo_producto) IS NOT NULL, VALUES(nombre_tipo_producto), nombre_tipo_producto);
+        """
+
+QUERY_INSERTAR_PRODUCTOS = """
+                INSERT INTO Productos (id_producto, asin, tipo_producto)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    asin = IF(VALUES(asin) IS NOT NULL, VALUES(asin), asin),
+                    tipo_producto = IF(VALUES(tipo_producto) IS NOT NULL, VALUES(tipo_producto), tipo_producto);
+        """
+
+QUERY_INSERTAR_REVIEW = """
+                INSERT INTO Review (id_review, id_persona, id_producto, overall, unixReviewTime, reviewTime)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    overall = IF(VALUES(overall) IS NOT NULL, VALUES(overall), overall),
+                    unixReviewTime = IF(VALUES(unixReviewTime) IS NOT NULL, VALUES(unixReviewTime), unixReviewTime),
+                    reviewTime = IF(VALUES(reviewTime) IS NOT NULL, VALUES(reviewTime), reviewTime);
+        """
+
+# Con el esquema compacto, unixReviewTime se calcula a partir de reviewTime, así que las filas de Review no lo llevan
+QUERY_INSERTAR_REVIEW_COMPACTO = """
+                INSERT INTO Review (id_review, id_persona, id_producto, overall, reviewTime)
+                VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    overall = IF(VALUES(overall) IS NOT NULL, VALUES(overall), overall),
+                    reviewTime = IF(VALUES(reviewTime) IS NOT NULL, VALUES(reviewTime), reviewTime);
+        """
+
+if ESQUEMA_COMPACTO:
+    QUERY_INSERTAR_REVIEW = QUERY_INSERTAR_REVIEW_COMPACTO
+
+# Consulta de inserción de cada lista de filas de un lote (ver escritura_adaptativa.py)
+QUERIES_TABLAS_LOTE = {
+
+    "personas": QUERY_INSERTAR_PERSONAS,
+    "tipos_producto": QUERY_INSERTAR_TIPOS_PRODUCTO,
+    "productos": QUERY_INSERTAR_PRODUCTOS,
+    "review": QUERY_INSERTAR_REVIEW
+}
+
 ############################################################################################################################################
 
 # CREACIÓN DE LA CONEXIÓN CON MONGODB Y SU DATABASE
@@ -313,228 +701,651 @@ def get_database_mongo(database:str)-> Database:
     print(f"\nBase de datos MongoDB: \"{database}\" creada con éxito.")
     return client[database]
 
+# Índices compuestos de la colección de MongoDB sobre los campos derivados (ver campos_derivados.py): (nombre, campos). Con el de
+# tipo_producto, overall y longitud_review_text, la media de la longitud del texto por overall de una categoría (consulta 7 de 
+# menu_visualizacion.py) se calcula solo con el índice, y la nube de palabras (consulta 6) encuentra las reviews de la categoría
+INDICES_CONSULTAS_MONGODB = [
+
+    ("idx_tipo_overall_longitud", [("tipo_producto", 1), ("overall", 1), ("longitud_review_text", 1)])
+]
+
+def crear_indices_mongodb(mongodb_database:Database)-> None:
+    """
+
+    Crea los índices de INDICES_CONSULTAS_MONGODB en la colección de las reviews (si ya existen, MongoDB no hace nada).
+
+    Args:
+        mongodb_database (pymongo.database.Database): Base de datos de MongoDB.
+
+    Returns:
+        None
+    
+    """
+    coleccion = mongodb_database[COLECCION_MONGODB]
+
+    for nombre_indice, campos in INDICES_CONSULTAS_MONGODB:
+        coleccion.create_index(campos, name=nombre_indice)
+        print(f"\nÍndice de MongoDB: \"{nombre_indice}\" creado en la colección \"{COLECCION_MONGODB}\".")
+
 ############################################################################################################################################
 
+# EXTRACCIÓN DE LOS CAMPOS DE UNA REVIEW
+def extraer_campos_review(data:dict)-> tuple:
+    """
+
+    Extrae los campos de una review a partir del diccionario obtenido con json.loads(linea). Si un campo no se encuentra en el 
+    diccionario, se devuelve None en su lugar. La fecha ya se devuelve formateada (YYYY-MM-DD).
+
+    Args:
+        data (dict): diccionario con los datos de una review.
+
+    Returns:
+        tuple: (reviewerID, asin, reviewerName, helpful, reviewText, overall, summary, unixReviewTime, reviewTime)
+    
+    """
+    return (
+
+        data.get("reviewerID", None),
+        data.get("asin", None),
+        data.get("reviewerName", None),
+        data.get("helpful", [None, None]),
+        data.get("reviewText", None),
+        data.get("overall", None),
+        data.get("summary", None),
+        data.get("unixReviewTime", None),
+        formatear_fecha(data.get("reviewTime", None))  # Formateamos la fecha al formato date (YYYY-MM-DD)
+    )
+
+# ASIGNACIÓN DE IDENTIFICADORES ÚNICOS A PARTIR DE LOS CONTADORES Y DICCIONARIOS GLOBALES
+def asignar_ids_review(reviewerID:str, asin:str, nombre_tipo_producto:str)-> Tuple[int, int, int, Tuple[bool, bool, bool]]:
+    """
+
+    Devuelve los identificadores numéricos de la persona, el producto y el tipo de producto de una review. Si alguno de ellos no se 
+    había visto antes, se le asigna el siguiente valor de su contador global.
+
+    Args:
+        reviewerID (str): identificador de la persona que hace la review.
+        asin (str): identificador del producto.
+        nombre_tipo_producto (str): nombre del tipo de producto (extraído del nombre del fichero).
+
+    Returns:
+        tuple: (id_persona, id_producto, id_tipo_producto, nuevos), donde nuevos es una tupla de booleanos 
+        (persona_nueva, producto_nuevo, tipo_producto_nuevo) que indica qué identificadores se acaban de asignar.
+    
+    """
+    # Variables globales empleadas para controlar los identificadores únicos
+    global dicc_ids_personas, dicc_ids_productos, dicc_ids_tipos_producto, contador_persona, contador_producto, contador_tipo_producto
+
+    # setdefault devuelve el id ya asignado, o guarda y devuelve el valor del contador si la clave no estaba (una sola búsqueda)
+    id_persona = dicc_ids_personas.setdefault(reviewerID, contador_persona)
+    persona_nueva = id_persona == contador_persona
+
+    if persona_nueva:
+        contador_persona += 1  # actualizamos el contador
+    
+    # Tenemos en cuenta que puede haber el mismo asin para distintos tipos de productos
+    id_producto = dicc_ids_productos.setdefault((asin, nombre_tipo_producto), contador_producto)
+    producto_nuevo = id_producto == contador_producto
+
+    if producto_nuevo:
+        contador_producto += 1  # actualizamos el contador
+
+    tipo_producto_nuevo = nombre_tipo_producto not in dicc_ids_tipos_producto
+    
+    if tipo_producto_nuevo:
+        dicc_ids_tipos_producto[nombre_tipo_producto] = contador_tipo_producto  # si el valor no está en el diccionario lo guardamos
+        id_tipo_producto = contador_tipo_producto  # cogemos el id a partir del contador
+        contador_tipo_producto += 1 # actualizamos el contador
+    else:
+        # si el valor ya está en el diccionario, sacamos el id de ahí
+        id_tipo_producto = dicc_ids_tipos_producto[nombre_tipo_producto] 
+
+    return id_persona, id_producto, id_tipo_producto, (persona_nueva, producto_nuevo, tipo_producto_nuevo)
+
+# DETECCIÓN DE CAMBIOS EN LOS DATOS DE UNA PERSONA
+def persona_modificada(id_persona:int, reviewerName:str, persona_nueva:bool)-> bool:
+    """
+
+    Indica si hay que enviar la fila de una persona a SQL: cuando es nueva, o cuando llega un reviewerName no nulo distinto del último
+    que se envió (por ejemplo, si el nombre aparece por primera vez en una review posterior). En cualquier otro caso, el 
+    ON DUPLICATE KEY UPDATE no cambiaría nada y la fila solo añadiría tráfico y bloqueos.
+
+    Args:
+        id_persona (int): identificador de la persona.
+        reviewerName (str): nombre de la persona en la review actual (puede ser None).
+        persona_nueva (bool): si la persona se acaba de ver por primera vez.
+
+    Returns:
+        bool: True si hay que insertar o actualizar la fila de la persona.
+    
+    """
+    # Solo se guarda una huella del nombre por persona (ver NombresPersonas en mapa_identidades.py), no el reviewerID ni el nombre
+    return nombres_personas.actualizar(id_persona=id_persona, nombre=reviewerName) or persona_nueva
+
+# CREACIÓN DEL DOCUMENTO DE MONGODB DE UNA REVIEW
+def crear_documento_mongo(id_review:int, helpful:list, reviewText:str, summary:str, tipo_producto:int=None, overall:float=None)-> dict:
+    """
+
+    Crea el documento de MongoDB de una review, con el mismo identificador que la review de SQL. Solo se incluyen los campos no nulos.
+    Si se indica el tipo de producto y CAMPOS_DERIVADOS_MONGODB está activado, se añaden también los campos derivados (ver 
+    campos_derivados.py).
+
+    Args:
+        id_review (int): identificador de la review (será el _id del documento).
+        helpful (list): votos de utilidad de la review.
+        reviewText (str): texto de la review.
+        summary (str): resumen de la review.
+        tipo_producto (int, optional): identificador del tipo de producto de la review. Defaults to None.
+        overall (float, optional): puntuación de la review. Defaults to None.
+
+    Returns:
+        dict: documento listo para ser insertado en la colección.
+    
+    """
+    documento = {"_id": id_review}
+
+    # Pero solo añadimos los campos no nulos (directamente, sin crear antes un diccionario con todos los campos)
+    if helpful is not None:
+        documento["helpful"] = helpful
+    if reviewText is not None:
+        documento["reviewText"] = reviewText
+    if summary is not None:
+        documento["summary"] = summary
+
+    if CAMPOS_DERIVADOS_MONGODB and tipo_producto is not None:
+        anadir_campos_derivados(documento=documento, tipo_producto=tipo_producto, overall=overall, helpful=helpful, reviewText=reviewText,
+                                summary=summary)
+
+    return documento
+
+# LECTURA DE LAS REVIEWS DE UN FICHERO
+def iterar_campos_fichero(file_in:str, desplazamiento_inicial:int=0)-> Iterator[Tuple[int, tuple]]:
+    """
+
+    Recorre las reviews de un fichero de datos en orden, devolviendo (yield) los campos de cada una con extraer_campos_review junto
+    con la posición (en bytes) en la que termina su línea, que es desde donde habría que seguir leyendo tras esa review.
+    Si LECTURA_PARALELA_MMAP está activado, el fichero se parsea por rangos en varios procesos (ver lectura_paralela.py). Los ficheros
+    comprimidos (.json.gz o .json.zst) se leen siempre en streaming (ver lectura_ficheros.py), y en ellos la posición es la de los 
+    datos ya descomprimidos. Al terminar se muestra el informe de lectura del fichero.
+
+    Args:
+        file_in (str): ruta del fichero de entrada de datos.
+        desplazamiento_inicial (int, optional): byte desde el que se empieza a leer (inicio de una línea). Defaults to 0.
+
+    Returns:
+        Iterator[tuple]: generador de tuplas (desplazamiento, campos), donde campos es la tupla (reviewerID, asin, reviewerName, 
+        helpful, reviewText, overall, summary, unixReviewTime, reviewTime).
+    
+    """
+    inicio = time.perf_counter()
+
+    # Un fichero comprimido no se puede mapear en memoria, así que se lee en streaming aunque esté activada la lectura en paralelo
+    if LECTURA_PARALELA_MMAP and not es_fichero_comprimido(file_in=file_in):
+
+        # Lo importamos aquí porque lectura_paralela.py a su vez importa este script
+        from lectura_paralela import iterar_campos_paralelo
+
+        yield from iterar_campos_paralelo(file_in=file_in, num_procesos=NUM_PROCESOS_LECTURA, tamano_rango=TAMANO_RANGO_LECTURA,
+                                          desplazamiento_inicial=desplazamiento_inicial)
+
+        # La lectura se hace en los procesos hijos, así que solo conocemos el tamaño leído y el tiempo total
+        bytes_leidos = os.path.getsize(file_in) - desplazamiento_inicial
+        mostrar_informe_lectura(file_in=file_in, bytes_disco=bytes_leidos, bytes_datos=bytes_leidos, tiempo_lectura=None, 
+                                tiempo_total=time.perf_counter() - inicio)
+
+    else:
+        # Abrimos el fichero de datos en modo lectura binaria, para poder llevar la cuenta exacta de los bytes leídos
+        fichero, lector_disco, lector_datos = abrir_fichero_datos(file_in=file_in, desplazamiento_inicial=desplazamiento_inicial)
+
+        with fichero as file:
+
+            desplazamiento = desplazamiento_inicial
+
+            # Iteramos por cada línea del fichero
+            for linea in file:
+
+                desplazamiento += len(linea)
+
+                # Extraemos el diccionario donde tenemos los datos de una review y accedemos a cada campo
+                yield desplazamiento, extraer_campos_review(json.loads(linea))
+
+        mostrar_informe_lectura(file_in=file_in, bytes_disco=lector_disco.bytes_leidos, bytes_datos=lector_datos.bytes_leidos, 
+                                tiempo_lectura=lector_datos.tiempo_lectura, tiempo_total=time.perf_counter() - inicio)
+
+# GENERACIÓN DE LOS LOTES DE DATOS DE UN FICHERO
+def generar_lotes_fichero(file_in:str, batch_size:int, insertar_personas_y_tipos:bool=True, desplazamiento_inicial:int=0)-> Iterator[dict]:
+    """
+
+    Lee un fichero de datos review a review, asigna los identificadores y va devolviendo (yield) lotes de filas listos para insertar. 
+    Cada lote es un diccionario con las listas de tuplas de cada tabla de SQL y la lista de documentos de MongoDB:
+
+        {"personas": [...], "tipos_producto": [...], "productos": [...], "review": [...], "documentos": [...], "columnas": {...},
+         "tipo_producto": n, "desplazamiento": n}
+
+    Se devuelve un lote cada vez que se alcanzan batch_size reviews, y un último lote con las que queden al final del fichero. El 
+    desplazamiento es el byte del fichero en el que termina la última review del lote (desde donde se seguiría leyendo), y "columnas"
+    tiene los arrays de NumPy de overall y unixReviewTime del lote (ver completar_lote).
+
+    Args:
+        file_in (str): ruta del fichero de entrada de datos.
+        batch_size (int): número de reviews de cada lote.
+        insertar_personas_y_tipos (bool, optional): si es False, los lotes no incluyen filas de Personas ni Tipos_producto, porque 
+            ya las ha insertado otro proceso (carga en paralelo, ver carga_paralela.py). Defaults to True.
+        desplazamiento_inicial (int, optional): byte del fichero desde el que se empieza a leer (reanudación). Defaults to 0.
+
+    Returns:
+        Iterator[dict]: generador de lotes.
+    
+    """
+    # Variable global empleada para controlar el identificador de las reviews (el resto se asignan en asignar_ids_review)
+    global id_review
+
+    # Extraemos el nombre del tipo de producto a partir del nombre del fichero de datos
+    nombre_tipo_producto = extraer_tipo_producto(nombre_fichero=file_in)
+
+    # Con la lectura en paralelo, los campos ya llegan en columnas y los lotes se transforman sin crear una tupla por review
+    # (un fichero comprimido no se puede mapear en memoria, así que se lee en streaming)
+    if LECTURA_PARALELA_MMAP and not es_fichero_comprimido(file_in=file_in):
+        yield from generar_lotes_columnas(file_in=file_in, batch_size=batch_size, nombre_tipo_producto=nombre_tipo_producto,
+                                          insertar_personas_y_tipos=insertar_personas_y_tipos, 
+                                          desplazamiento_inicial=desplazamiento_inicial)
+        return
+
+    # Inicializamos el lote vacío donde vamos a ir cargando los datos, y las listas con los campos e identificadores de sus reviews
+    lote = crear_lote_vacio()
+    registros, ids_personas, ids_productos = [], [], []
+
+    # Iteramos por cada review del fichero, ya separada en sus campos
+    for desplazamiento, campos in iterar_campos_fichero(file_in=file_in, desplazamiento_inicial=desplazamiento_inicial):
+
+        reviewerID, asin, reviewerName = campos[:3]
+
+        id_persona, id_producto, id_tipo_producto = anadir_ids_review(lote=lote, reviewerID=reviewerID, asin=asin, 
+                                                                      reviewerName=reviewerName, nombre_tipo_producto=nombre_tipo_producto,
+                                                                      insertar_personas_y_tipos=insertar_personas_y_tipos)
+
+        # Las filas de Review y los documentos de MongoDB se crean de una vez para todo el lote (ver transformacion_lotes.py)
+        registros.append(campos)
+        ids_personas.append(id_persona)
+        ids_productos.append(id_producto)
+
+        # Cada vez que leemos una línea es una nueva review así que siempre actualizamos el contador de ids de reviews
+        id_review += 1
+        
+        # Devolvemos el lote solo si ya tiene el tamaño deseado, y empezamos uno nuevo
+        if len(registros) >= batch_size:
+            completar_lote(lote=lote, registros=registros, ids_personas=ids_personas, ids_productos=ids_productos, 
+                           tipo_producto=id_tipo_producto, desplazamiento=desplazamiento)
+            yield lote
+            lote = crear_lote_vacio()
+            registros, ids_personas, ids_productos = [], [], []
+            
+    # Lote final si quedan datos y no se ha completado un lote
+    if registros:
+        completar_lote(lote=lote, registros=registros, ids_personas=ids_personas, ids_productos=ids_productos, 
+                       tipo_producto=id_tipo_producto, desplazamiento=desplazamiento)
+        yield lote
+
+def generar_lotes_columnas(file_in:str, batch_size:int, nombre_tipo_producto:str, insertar_personas_y_tipos:bool=True, 
+                           desplazamiento_inicial:int=0)-> Iterator[dict]:
+    """
+
+    Igual que generar_lotes_fichero, pero a partir de los lotes de columnas de la lectura en paralelo (ver lectura_paralela.py): solo
+    la asignación de identificadores se hace review a review, y el resto de columnas pasan directamente a transformar_columnas.
+    Al terminar se muestra el informe de lectura del fichero.
+
+    Args:
+        file_in (str): ruta del fichero de entrada de datos (sin comprimir).
+        batch_size (int): número de reviews de cada lote.
+        nombre_tipo_producto (str): tipo de producto del fichero.
+        insertar_personas_y_tipos (bool, optional): si es False, los lotes no incluyen filas de Personas ni Tipos_producto. 
+            Defaults to True.
+        desplazamiento_inicial (int, optional): byte del fichero desde el que se empieza a leer (reanudación). Defaults to 0.
+
+    Returns:
+        Iterator[dict]: generador de lotes, con el mismo formato que generar_lotes_fichero.
+    
+    """
+    # Lo importamos aquí porque lectura_paralela.py a su vez importa este script
+    from lectura_paralela import leer_columnas_paralelo, agrupar_columnas
+
+    # Variable global empleada para controlar el identificador de las reviews
+    global id_review
+
+    inicio = time.perf_counter()
+    lotes_columnas = leer_columnas_paralelo(file_in=file_in, num_procesos=NUM_PROCESOS_LECTURA, tamano_rango=TAMANO_RANGO_LECTURA,
+                                            desplazamiento_inicial=desplazamiento_inicial)
+
+    for columnas in agrupar_columnas(lotes_columnas=lotes_columnas, tamano=batch_size):
+
+        lote = crear_lote_vacio()
+        ids_personas, ids_productos = [], []
+        tabla_revisores, tabla_asins = columnas["tabla_revisores"], columnas["tabla_asins"]
+
+        for cod_revisor, cod_asin, reviewerName in zip(columnas["cod_revisor"].tolist(), columnas["cod_asin"].tolist(), 
+                                                       columnas["reviewerName"]):
+
+            id_persona, id_producto, id_tipo_producto = anadir_ids_review(lote=lote, reviewerID=tabla_revisores[cod_revisor], 
+                                                                          asin=tabla_asins[cod_asin], reviewerName=reviewerName,
+                                                                          nombre_tipo_producto=nombre_tipo_producto,
+                                                                          insertar_personas_y_tipos=insertar_personas_y_tipos)
+            ids_personas.append(id_persona)
+            ids_productos.append(id_producto)
+
+        id_review += columnas["n_filas"]
+
+        completar_lote(lote=lote, columnas=columnas, ids_personas=ids_personas, ids_productos=ids_productos, 
+                       tipo_producto=id_tipo_producto, desplazamiento=int(columnas["desplazamiento"][-1]))
+        yield lote
+
+    # La lectura se hace en los procesos hijos, así que solo conocemos el tamaño leído y el tiempo total
+    bytes_leidos = os.path.getsize(file_in) - desplazamiento_inicial
+    mostrar_informe_lectura(file_in=file_in, bytes_disco=bytes_leidos, bytes_datos=bytes_leidos, tiempo_lectura=None, 
+                            tiempo_total=time.perf_counter() - inicio)
+
+def anadir_ids_review(lote:dict, reviewerID:str, asin:str, reviewerName:str, nombre_tipo_producto:str, 
+                      insertar_personas_y_tipos:bool=True)-> Tuple[int, int, int]:
+    """
+
+    Asigna los identificadores de una review (asignar_ids_review) y añade al lote las filas de Personas, Tipos_producto y Productos
+    que sean nuevas o hayan cambiado.
+
+    Args:
+        lote (dict): lote en construcción, que se modifica.
+        reviewerID (str): identificador de la persona que hace la review.
+        asin (str): identificador del producto.
+        reviewerName (str): nombre de la persona en la review (puede ser None).
+        nombre_tipo_producto (str): tipo de producto del fichero.
+        insertar_personas_y_tipos (bool, optional): si es False, no se añaden filas de Personas ni Tipos_producto. Defaults to True.
+
+    Returns:
+        tuple: (id_persona, id_producto, id_tipo_producto) de la review.
+    
+    """
+    # Asignación de IDs únicos con contadores y diccionarios
+    id_persona, id_producto, id_tipo_producto, (persona_nueva, producto_nuevo, tipo_producto_nuevo) = asignar_ids_review(
+        reviewerID=reviewerID, asin=asin, nombre_tipo_producto=nombre_tipo_producto)
+    
+    # Añadimos a las listas de tuplas, las tuplas creadas para que sean posteriormente insertadas (SQL)
+    # Las filas de personas, productos y tipos de producto solo se envían si son nuevas o han cambiado
+    if insertar_personas_y_tipos:
+        if persona_modificada(id_persona=id_persona, reviewerName=reviewerName, persona_nueva=persona_nueva):
+            lote["personas"].append((id_persona, reviewerID, reviewerName))
+        if tipo_producto_nuevo:
+            lote["tipos_producto"].append((id_tipo_producto, nombre_tipo_producto))
+    if producto_nuevo:
+        lote["productos"].append((id_producto, asin, id_tipo_producto))
+
+    return id_persona, id_producto, id_tipo_producto
+
+def completar_lote(lote:dict, ids_personas:List[int], ids_productos:List[int], tipo_producto:int, desplazamiento:int,
+                   registros:List[tuple]=None, columnas:dict=None)-> None:
+    """
+
+    Añade a un lote las filas de Review y los documentos de MongoDB de sus reviews, transformándolas todas a la vez con 
+    transformar_lote, o con transformar_columnas si llegan en columnas (ver transformacion_lotes.py), el tipo de producto de sus 
+    reviews y el desplazamiento en el que termina la última.
+
+    Args:
+        lote (dict): lote generado por generar_lotes_fichero, que se modifica.
+        ids_personas (list): id_persona de cada review del lote.
+        ids_productos (list): id_producto de cada review del lote.
+        tipo_producto (int): identificador del tipo de producto del fichero (para los campos derivados de los documentos y los buckets
+            de productos).
+        desplazamiento (int): byte del fichero en el que termina la última review del lote.
+        registros (list, optional): campos de cada review del lote (extraer_campos_review). Defaults to None.
+        columnas (dict, optional): lote de columnas de la lectura en paralelo (ver lectura_paralela.py), en lugar de registros. 
+            Defaults to None.
+
+    Returns:
+        None
+    
+    """
+    opciones = {"incluir_unix_review_time": not ESQUEMA_COMPACTO, "tipo_producto": tipo_producto if CAMPOS_DERIVADOS_MONGODB else None}
+
+    # Los identificadores de las reviews del lote son los últimos asignados con el contador global
+    if columnas is not None:
+        lote["review"], lote["documentos"], lote["columnas"] = transformar_columnas(
+            id_review_inicial=id_review - columnas["n_filas"], ids_personas=ids_personas, ids_productos=ids_productos, 
+            overall=columnas["overall"], unix_review_time=columnas["unixReviewTime"], helpful=columnas["helpful"], 
+            reviewText=columnas["reviewText"], summary=columnas["summary"], reviewTime=columnas["reviewTime"], **opciones)
+    else:
+        lote["review"], lote["documentos"], lote["columnas"] = transformar_lote(
+            id_review_inicial=id_review - len(registros), ids_personas=ids_personas, ids_productos=ids_productos, registros=registros,
+            **opciones)
+
+    lote["tipo_producto"] = tipo_producto
+    lote["desplazamiento"] = desplazamiento
+
+def crear_lote_vacio()-> dict:
+    """
+
+    Crea un lote vacío, con una lista por cada tabla de SQL y otra para los documentos de MongoDB.
+
+    Args:
+        None
+
+    Returns:
+        dict: lote vacío.
+    
+    """
+    return {"personas": [], "tipos_producto": [], "productos": [], "review": [], "documentos": []}
+
+# INSERCIÓN DE UN LOTE EN SQL
+def volcar_lote_sql(cursor:Cursor, lote:dict)-> None:
+    """
+
+    Inserta en SQL las filas de un lote, tabla a tabla y en el orden que imponen las claves foráneas. Las consultas llevan 
+    ON DUPLICATE KEY UPDATE, para que si ya existe la PRIMARY KEY, se actualicen el resto de campos de esa entrada.
+
+    Args:
+        cursor (Cursor): cursor de la conexión a MySQL.
+        lote (dict): lote generado por generar_lotes_fichero.
+
+    Returns:
+        None
+    
+    """
+    insertar_lote_sql(cursor=cursor, query=QUERY_INSERTAR_PERSONAS, valores=lote["personas"])
+    insertar_lote_sql(cursor=cursor, query=QUERY_INSERTAR_TIPOS_PRODUCTO, valores=lote["tipos_producto"])
+    insertar_lote_sql(cursor=cursor, query=QUERY_INSERTAR_PRODUCTOS, valores=lote["productos"])
+    insertar_lote_sql(cursor=cursor, query=QUERY_INSERTAR_REVIEW, valores=lote["review"])
+
+# ESTADO DE LOS IDENTIFICADORES (PUNTOS DE CONTROL)
+def obtener_contadores_ids()-> dict:
+    """
+
+    Devuelve el valor actual de los contadores globales de identificadores, para guardarlo en un punto de control.
+
+    Args:
+        None
+
+    Returns:
+        dict: diccionario {"id_review", "contador_persona", "contador_producto", "contador_tipo_producto"}.
+
+    """
+    return {"id_review": id_review, "contador_persona": contador_persona, "contador_producto": contador_producto,
+            "contador_tipo_producto": contador_tipo_producto}
+
+def restaurar_estado_ids(conexion:Connection, contadores:dict)-> None:
+    """
+
+    Reconstruye los diccionarios y contadores globales de identificadores a partir de lo que ya está confirmado en MySQL, para
+    reanudar una carga desde un punto de control. Los contadores de personas, productos y tipos de producto nunca quedan por debajo
+    del mayor identificador de la base de datos (puede haber un lote confirmado justo después del último punto de control guardado).
+
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL, con la base de datos ya seleccionada.
+        contadores (dict): contadores guardados en el punto de control (ver obtener_contadores_ids).
+
+    Returns:
+        None
+
+    """
+    global dicc_ids_personas, dicc_ids_productos, dicc_ids_tipos_producto, nombres_personas
+    global contador_persona, contador_producto, contador_tipo_producto, id_review
+
+    cursor = conexion.cursor()
+
+    cursor.execute("SELECT tipo_producto, nombre_tipo_producto FROM Tipos_producto;")
+    dicc_ids_tipos_producto = {nombre_tipo_producto: tipo_producto for tipo_producto, nombre_tipo_producto in cursor.fetchall()}
+
+    cursor.execute("SELECT id_persona, reviewerID, reviewerName FROM Personas;")
+    dicc_ids_personas, nombres_personas = crear_mapa_identidades(), NombresPersonas(guardar_nombres=nombres_personas.guardar_nombres)
+
+    for id_persona, reviewerID, reviewerName in cursor.fetchall():
+        dicc_ids_personas[reviewerID] = id_persona
+        nombres_personas.actualizar(id_persona=id_persona, nombre=reviewerName)
+
+    cursor.execute("""
+                    SELECT p.id_producto, p.asin, t.nombre_tipo_producto
+                    FROM Productos p JOIN Tipos_producto t ON p.tipo_producto = t.tipo_producto;
+            """)
+    dicc_ids_productos = crear_mapa_identidades(clave_compuesta=True)
+
+    for id_producto, asin, nombre_tipo_producto in cursor.fetchall():
+        dicc_ids_productos[(asin, nombre_tipo_producto)] = id_producto
+
+    cursor.close()
+
+    contador_persona = max(contadores["contador_persona"], max(dicc_ids_personas.values(), default=-1) + 1)
+    contador_producto = max(contadores["contador_producto"], max(dicc_ids_productos.values(), default=-1) + 1)
+    contador_tipo_producto = max(contadores["contador_tipo_producto"], max(dicc_ids_tipos_producto.values(), default=-1) + 1)
+
+    # El id_review sí tiene que ser el del punto de control, porque va ligado al desplazamiento guardado del fichero
+    id_review = contadores["id_review"]
+
 # INSERCIÓN DE LOS DATOS DE UN FICHERO A LAS DISTINTAS BASES DE DATOS
-def insertar_datos_global(file_in:str, sql_conexion:Connection, mongodb_database:Database, batch_size:int)-> None:
+def insertar_datos_global(file_in:str, sql_conexion:Connection, mongodb_database:Database, batch_size:int, 
+                          insertar_personas_y_tipos:bool=True, punto_control:dict=None, metricas:MetricasIngesta=None)-> None:
     """
 
     Función que se encarga de la inserción de datos procedentes de un único fichero, pero que se distribuyen en distintas bases de datos,
-    de SQL y de MongoDB, y también en distintas tablas y colecciones. La lectura del fichero se hace línea a línea, donde para crear un 
-    objeto de tipo JSON usamos json.loads(linea).
+    de SQL y de MongoDB, y también en distintas tablas y colecciones. La lectura del fichero se hace línea a línea (ver 
+    generar_lotes_fichero), donde para crear un objeto de tipo JSON usamos json.loads(linea).
 
     Args:
         file_in (str): ruta del fichero de entrada de datos.
         mongodb_database: Objeto de MongoClient.
         sql_conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL, obtenido previamente con "pymysql.connect()".
         batch_size (int): tamaño de un lote de datos, controla cada cuanto tenemos que hacer inserciones.
+        insertar_personas_y_tipos (bool, optional): si es False no se insertan las tablas Personas y Tipos_producto, porque ya las ha
+            insertado otro proceso (carga en paralelo, ver carga_paralela.py). Defaults to True.
+        punto_control (dict, optional): punto de control de la carga (ver puntos_control.py). Si se pasa, tras cada commit se guarda
+            el avance del fichero, y la lectura empieza desde el desplazamiento guardado. Defaults to None.
+        metricas (MetricasIngesta, optional): métricas en directo de la carga (ver metricas_ingesta.py). Defaults to None.
 
     Returns:
         None. No devuelve nada, solo hace las inserciones correspondientes en las bases de datos indicadas.
     
     """
-    
-    # Variables globales empleadas para controlar los identificadores únicos
-    global dicc_ids_personas, dicc_ids_productos, dicc_ids_tipos_producto, contador_persona, contador_producto, contador_tipo_producto, id_review
-
-    # Inicializamos las listas vacías donde vamos a ir cargando los lotes de datos
-    valores_insertar_review = []
-    valores_insertar_personas = []
-    valores_insertar_productos = []
-    valores_insertar_tipos_producto = []
-    documentos_insertar_mongo = []
-
     # Inicializamos el cursor
     cursor = sql_conexion.cursor()
 
     mongo_db_collection = mongodb_database[COLECCION_MONGODB]
-    
-    # Abrimos el fichero de datos en modo lectura
-    with open(file_in, "r") as file:
-                    
-        # Extraemos el nombre del tipo de producto a partir del nombre del fichero de datos
-        nombre_tipo_producto = extraer_tipo_producto(nombre_fichero=file_in)
 
-        # Iteramos por cada línea del fichero
-        for linea in file:
+    desplazamiento = 0
 
-            # Extraemos el diccionario donde tenemos los datos de una review
-            data = json.loads(linea)
-            
-            # Accedemos a cada campo del diccionario, ponemos None en caso de que ese campo no se encuentre en el diccionario
-            reviewerID = data.get("reviewerID", None)
-            asin = data.get("asin", None)
-            reviewerName = data.get("reviewerName", None)
-            helpful = data.get("helpful", [None, None])
-            reviewText = data.get("reviewText", None)
-            overall = data.get("overall", None)
-            summary = data.get("summary", None)
-            unixReviewTime = data.get("unixReviewTime", None)
-            reviewTime = formatear_fecha(data.get("reviewTime", None))  # Formateamos la fecha al formato date (YYYY-MM-DD)
-
-            # Asignación de IDs únicos con contadores y diccionarios
-            if reviewerID not in dicc_ids_personas:
-                dicc_ids_personas[reviewerID] = contador_persona  # si el valor no está en el diccionario lo guardamos
-                id_persona = contador_persona  # cogemos el id a partir del contador
-                contador_persona += 1  # actualizamos el contador
-            else:
-                # si el valor ya está en el diccionario, sacamos el id de ahí
-                id_persona = dicc_ids_personas[reviewerID]  
-            
-            # Tenemos en cuenta que puede haber el mismo asin para distintos tipos de productos
-            if (asin, nombre_tipo_producto) not in dicc_ids_productos:
-                dicc_ids_productos[(asin, nombre_tipo_producto )] = contador_producto  # si el valor no está en el diccionario lo guardamos
-                id_producto = contador_producto  # cogemos el id a partir del contador
-                contador_producto += 1  # actualizamos el contador
-            else:
-                # si el valor ya está en el diccionario, sacamos el id de ahí
-                id_producto = dicc_ids_productos[(asin, nombre_tipo_producto)]
-            
-            if nombre_tipo_producto not in dicc_ids_tipos_producto:
-                dicc_ids_tipos_producto[nombre_tipo_producto] = contador_tipo_producto  # si el valor no está en el diccionario lo guardamos
-                id_tipo_producto = contador_tipo_producto  # cogemos el id a partir del contador
-                contador_tipo_producto += 1 # actualizamos el contador
-            else:
-                # si el valor ya está en el diccionario, sacamos el id de ahí
-                id_tipo_producto = dicc_ids_tipos_producto[nombre_tipo_producto] 
-            
-            # Añadimos a las listas de tuplas, las tuplas creadas para que sean posteriormente insertadas (SQL)
-            valores_insertar_personas.append((id_persona, reviewerID, reviewerName))
-            valores_insertar_productos.append((id_producto, asin, id_tipo_producto))
-            valores_insertar_tipos_producto.append((id_tipo_producto, nombre_tipo_producto))
-            valores_insertar_review.append((id_review, id_persona, id_producto, overall, unixReviewTime, reviewTime))
-            
-            # Añadimos a la lista de documentos, el diccionario con los campos correspondientes (MongoDB)
-            documento = {
+    if punto_control is not None:
 
-                "_id": id_review,
-                "helpful": helpful,
-                "reviewText": reviewText,
-                "summary": summary
-            }
+        # Si el fichero ya estaba empezado, seguimos desde el último lote confirmado
+        if file_in in punto_control["ficheros"]:
+            desplazamiento = punto_control["ficheros"][file_in]["desplazamiento"]
 
-            # Pero solo añadimos los campos no nulos del diccionario
-            documentos_insertar_mongo.append({k: v for k, v in documento.items() if v is not None})
+        # Los documentos a partir del id_review actual son de un lote que no llegó a confirmarse en MySQL
+        descartar_documentos_no_confirmados(mongodb_database=mongodb_database, id_review=id_review)
 
-            # Cada vez que leemos una línea es una nueva review así que siempre actualizamos el contador de ids de reviews
-            id_review += 1
-            
-            # Inserción por lotes, solo si las listas ya tienen el tamaño deseado 
-            # Añadimos el ON DUPLICATE KEY UPDATE, para que si ya existe la PRIMARY KEY, se actualicen el resto de campos de esa entrada de la tabla
-            if len(valores_insertar_review) >= batch_size:
-                insertar_lote_sql(
-                    cursor=cursor, 
-                    query="""
-                                INSERT INTO Personas (id_persona, reviewerID, reviewerName)
-                                VALUES (%s, %s, %s)
-                                ON DUPLICATE KEY UPDATE 
-                                    reviewerID = IF(VALUES(reviewerID) IS NOT NULL, VALUES(reviewerID), reviewerID),
-                                    reviewerName = IF(VALUES(reviewerName) IS NOT NULL, VALUES(reviewerName), reviewerName);
-
-                        """, 
-                    valores=valores_insertar_personas)
-                
-                insertar_lote_sql(
-                    cursor=cursor, 
-                    query="""
-                                INSERT INTO Tipos_producto (tipo_producto, nombre_tipo_producto)
-                                VALUES (%s, %s)
-                                ON DUPLICATE KEY UPDATE 
-                                    nombre_tipo_producto = IF(VALUES(nombre_tipo_producto) IS NOT NULL, VALUES(nombre_tipo_producto), nombre_tipo_producto);
-
-                        """, 
-                    valores=valores_insertar_tipos_producto)
-                
-                insertar_lote_sql(
-                    cursor=cursor, 
-                    query="""
-                                INSERT INTO Productos (id_producto, asin, tipo_producto)
-                                VALUES (%s, %s, %s)
-                                ON DUPLICATE KEY UPDATE 
-                                    asin = IF(VALUES(asin) IS NOT NULL, VALUES(asin), asin), 
-                                    tipo_producto = IF(VALUES(tipo_producto) IS NOT NULL, VALUES(tipo_producto), tipo_producto);
-                        """, 
-                    valores=valores_insertar_productos)
-                
-                insertar_lote_sql(
-                    cursor=cursor, 
-                    query="""
-                                INSERT INTO Review (id_review, id_persona, id_producto, overall, unixReviewTime, reviewTime)
-                                VALUES (%s, %s, %s, %s, %s, %s)
-                                ON DUPLICATE KEY UPDATE 
-                                    overall = IF(VALUES(overall) IS NOT NULL, VALUES(overall), overall), 
-                                    unixReviewTime = IF(VALUES(unixReviewTime) IS NOT NULL, VALUES(unixReviewTime), unixReviewTime), 
-                                    reviewTime = IF(VALUES(reviewTime) IS NOT NULL, VALUES(reviewTime), reviewTime);
-                        """, 
-                        valores=valores_insertar_review)
-                
-                mongo_db_collection.insert_many(documentos_insertar_mongo)
-                
-                # Limpiar listas después de la inserción
-                valores_insertar_review.clear()
-                valores_insertar_personas.clear()
-                valores_insertar_productos.clear()
-                valores_insertar_tipos_producto.clear()
-                documentos_insertar_mongo.clear()
-                
-    # Inserción final si quedan datos en las listas y no se ha completado un lote
-    if valores_insertar_review:
-
-        insertar_lote_sql(
-                    cursor=cursor, 
-                    query="""
-                                INSERT INTO Personas (id_persona, reviewerID, reviewerName)
-                                VALUES (%s, %s, %s)
-                                ON DUPLICATE KEY UPDATE 
-                                    reviewerID = IF(VALUES(reviewerID) IS NOT NULL, VALUES(reviewerID), reviewerID),
-                                    reviewerName = IF(VALUES(reviewerName) IS NOT NULL, VALUES(reviewerName), reviewerName);
-                        """, 
-                    valores=valores_insertar_personas)
-                
-        insertar_lote_sql(
-            cursor=cursor, 
-            query="""
-                        INSERT INTO Tipos_producto (tipo_producto, nombre_tipo_producto)
-                        VALUES (%s, %s)
-                        ON DUPLICATE KEY UPDATE 
-                            nombre_tipo_producto = IF(VALUES(nombre_tipo_producto) IS NOT NULL, VALUES(nombre_tipo_producto), nombre_tipo_producto);
-
-                """, 
-                valores=valores_insertar_tipos_producto)
-        
-        insertar_lote_sql(
-            cursor=cursor, 
-            query="""
-                        INSERT INTO Productos (id_producto, asin, tipo_producto)
-                        VALUES (%s, %s, %s)
-                        ON DUPLICATE KEY UPDATE 
-                            asin = VALUES(asin), 
-                            tipo_producto = VALUES(tipo_producto);
-                """, 
-            valores=valores_insertar_productos)
-        
-        insertar_lote_sql(
-            cursor=cursor, 
-            query="""
-                        INSERT INTO Review (id_review, id_persona, id_producto, overall, unixReviewTime, reviewTime)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                        ON DUPLICATE KEY UPDATE 
-                            overall = IF(VALUES(overall) IS NOT NULL, VALUES(overall), overall), 
-                            unixReviewTime = IF(VALUES(unixReviewTime) IS NOT NULL, VALUES(unixReviewTime), unixReviewTime), 
-                            reviewTime = IF(VALUES(reviewTime) IS NOT NULL, VALUES(reviewTime), reviewTime);
-                """, 
-                valores=valores_insertar_review)
+        registrar_avance_fichero(punto_control=punto_control, fichero=file_in, desplazamiento=desplazamiento, contadores=obtener_contadores_ids())
+
+    # Cada cuánto se hace commit en MySQL y cada cuánto se insertan los documentos acumulados en MongoDB (ver politica_volcado.py)
+    politica_commits = crear_politica_commits(desplazamiento_inicial=desplazamiento)
+    politica_mongo = crear_politica_mongo(desplazamiento_inicial=desplazamiento)
+    documentos_pendientes, filas_pendientes = [], []
+
+    # Escritores con un tamaño de escritura propio para cada tabla y para la colección (ver escritura_adaptativa.py)
+    escritor_sql = EscritorSql(cursor=cursor, queries=QUERIES_TABLAS_LOTE, batch_size=batch_size, metricas=metricas)
+    # Los documentos se insertan en paralelo con ESCRITURA_MONGO_PARALELA (ver escritura_mongo_paralela.py), esperando al journal si hay
+    # puntos de control
+    escritor_mongo = crear_escritor_mongo(coleccion=mongo_db_collection, batch_size=batch_size, metricas=metricas, 
+                                          duradero=punto_control is not None)
+
+    # Las reviews se añaden también a los buckets de sus productos, a la vez que los documentos (ver buckets_productos.py)
+    escritor_buckets = EscritorBuckets(mongodb_database=mongodb_database, metricas=metricas) if MODO_BUCKETS_PRODUCTOS else None
+
+    if metricas is not None:
+        metricas.iniciar_fichero(file_in=file_in, desplazamiento_inicial=desplazamiento)
+
+    # Inserción por lotes, cada vez que el generador completa uno
+    for lote in generar_lotes_fichero(file_in=file_in, batch_size=batch_size, insertar_personas_y_tipos=insertar_personas_y_tipos,
+                                      desplazamiento_inicial=desplazamiento):
+
+        if metricas is not None:
+            metricas.registrar_lote_leido(n_lineas=len(lote["review"]), desplazamiento=lote["desplazamiento"])
+
+        escritor_sql.anadir_lote(lote=lote)
         
-        mongo_db_collection.insert_many(documentos_insertar_mongo)
+        documentos_pendientes.extend(lote["documentos"])
+
+        if escritor_buckets is not None:
+            filas_pendientes.extend(lote["review"])
+
+        toca_commit = politica_commits.registrar_lote(desplazamiento=lote["desplazamiento"])
+
+        # Los documentos pendientes se insertan siempre antes de un commit, para que MongoDB llegue hasta la misma review que MySQL
+        if politica_mongo.registrar_lote(desplazamiento=lote["desplazamiento"]) or toca_commit:
+            escritor_mongo.escribir(documentos=documentos_pendientes)
+
+            if escritor_buckets is not None:
+                escritor_buckets.escribir(filas_review=filas_pendientes, documentos=documentos_pendientes, tipo_producto=lote["tipo_producto"])
+                filas_pendientes.clear()
+
+            documentos_pendientes.clear()
+            politica_mongo.reiniciar()
+
+        if toca_commit:
+            # Las escrituras de MongoDB que sigan en vuelo tienen que terminar antes del commit
+            escritor_mongo.esperar()
+            escritor_sql.volcar()
+            sql_conexion.commit()
+            politica_commits.reiniciar()
+
+            # Con puntos de control, tras cada commit se guarda hasta dónde hemos llegado
+            if punto_control is not None:
+                registrar_avance_fichero(punto_control=punto_control, fichero=file_in, desplazamiento=lote["desplazamiento"], 
+                                         contadores=obtener_contadores_ids())
+
+        # Byte hasta el que llegan los lotes ya insertados (para el punto de control final)
+        desplazamiento = lote["desplazamiento"]
+
+    escritor_sql.volcar()
+
+    if documentos_pendientes:
+        escritor_mongo.escribir(documentos=documentos_pendientes)
+
+        if escritor_buckets is not None:
+            escritor_buckets.escribir(filas_review=filas_pendientes, documentos=documentos_pendientes, tipo_producto=lote["tipo_producto"])
+
+    escritor_mongo.cerrar()
     
     # Guardamos los cambios tras las inserciones
     sql_conexion.commit()
 
+    if metricas is not None:
+        metricas.terminar_fichero()
+
+    if MODO_LOTES_ADAPTATIVOS:
+        escritor_sql.mostrar_informe(file_in=file_in)
+        escritor_mongo.mostrar_informe()
+
+    if punto_control is not None:
+        registrar_avance_fichero(punto_control=punto_control, fichero=file_in, desplazamiento=desplazamiento, contadores=obtener_contadores_ids(), 
+                                 completado=True)
+
     # Cerramos el cursor
     cursor.close()
 
 # EJECUCIÓN DEL PROCESO COMPLETO
-def main()-> None:
+def main(reanudar:bool=False)-> None:
     """
 
     Función principal del script, que se encarga de llamar al resto de funciones para desarrollar el flujo completo del programa de 
@@ -542,39 +1353,133 @@ def main()-> None:
     los distintos procesos.
 
     Args:
-        None
+        reanudar (bool, optional): si es True, se continúa la carga desde el último punto de control guardado, sin borrar las bases
+            de datos (ver puntos_control.py). Defaults to False.
     
     Returns:
         None
     
     """
+    # Con puntos de control la inserción es siempre por lotes y secuencial, que es la que permite confirmar y reanudar lote a lote
+    usar_puntos_control = GUARDAR_PUNTOS_CONTROL or reanudar
+
+    if usar_puntos_control and (MODO_CARGA_MASIVA or MODO_CARGA_PARALELA or MODO_PIPELINE):
+        print("\nAviso: con puntos de control se ignoran MODO_CARGA_MASIVA, MODO_CARGA_PARALELA y MODO_PIPELINE.")
+
+    modo_carga_masiva = MODO_CARGA_MASIVA and not usar_puntos_control
+    modo_carga_paralela = MODO_CARGA_PARALELA and not usar_puntos_control
+    modo_pipeline = MODO_PIPELINE and not usar_puntos_control
 
-    # Nos conectamos a la base de datos de MongoDB
-    dbname = get_database_mongo(database=NOMBRE_BASE_DATOS_MONGO_DB)
+    punto_control = cargar_punto_control(nombre_proceso="load_data") if reanudar else None
 
-    # Nos conectamos a MySQL
-    conexion = conectar_mysql()
+    if reanudar and punto_control is None:
+        print("\nNo hay ningún punto de control guardado, se hace la carga completa desde el principio.")
+
+    # Nos conectamos a la base de datos de MongoDB (al reanudar no se borra, se sigue con los documentos ya insertados)
+    if punto_control is None:
+        dbname = get_database_mongo(database=NOMBRE_BASE_DATOS_MONGO_DB)
+    else:
+        dbname = MongoClient(CONNECTION_STRING)[NOMBRE_BASE_DATOS_MONGO_DB]
+
+    # Nos conectamos a MySQL (en la carga masiva necesitamos poder usar LOAD DATA LOCAL INFILE)
+    conexion = conectar_mysql(local_infile=modo_carga_masiva)
 
     # En caso de que nos hayamos podido conectar a MySQL
     if conexion:
 
-        # Creamos la Base de Datos SQL
-        create_database_sql(conexion)
+        # Al reanudar, la base de datos SQL ya existe y recuperamos los identificadores ya asignados
+        if punto_control is not None:
 
-        # Creamos las tablas SQL (inicialmente vacías)
-        create_tables_sql(conexion)
+            conexion.select_db(NOMBRE_BASE_DATOS_SQL)
 
-        # Iteramos sobre todos los ficheros
-        for fichero in FICHEROS_DATOS_LOAD_DATA:
-            
-            # Insertamoslos datos en el fichero correspondiente
-            insertar_datos_global(file_in=fichero, sql_conexion=conexion, mongodb_database=dbname, batch_size=BATCH_SIZE)
+            restaurar_estado_ids(conexion=conexion, contadores=punto_control["ficheros"][punto_control["ultimo_fichero"]]["contadores"])
+
+            print(f"\nReanudamos la carga desde el punto de control: \"{punto_control['ruta']}\".")
+
+        else:
+            # Creamos la Base de Datos SQL
+            create_database_sql(conexion)
+
+            # La carga inicial rápida (restricciones al final) solo se puede hacer con la carga masiva, ya que las consultas con 
+            # ON DUPLICATE KEY UPDATE necesitan las claves primarias para no duplicar filas
+            diferir_restricciones = modo_carga_masiva and DIFERIR_RESTRICCIONES
+
+            if DIFERIR_RESTRICCIONES and not modo_carga_masiva:
+                print("\nAviso: DIFERIR_RESTRICCIONES solo se aplica con MODO_CARGA_MASIVA, las tablas se crean con sus restricciones.")
+
+            # Creamos las tablas SQL (inicialmente vacías)
+            create_tables_sql(conexion, diferir_restricciones=diferir_restricciones)
+
+            if usar_puntos_control:
+                punto_control = crear_punto_control(nombre_proceso="load_data")
+
+        # Si está activada, hacemos la carga masiva con ficheros de staging y LOAD DATA LOCAL INFILE
+        if modo_carga_masiva:
+
+            # Lo importamos aquí porque carga_masiva.py a su vez importa este script
+            from carga_masiva import cargar_ficheros_masivo
+
+            cargar_ficheros_masivo(ficheros=FICHEROS_DATOS_LOAD_DATA, sql_conexion=conexion, mongodb_database=dbname, batch_size=BATCH_SIZE)
+
+            # Con todos los datos ya cargados, añadimos las claves primarias y foráneas de una sola vez (si los datos no son válidos, se
+            # lanza una excepción y la carga termina con error, sin crear los índices ni sincronizar las secuencias)
+            if diferir_restricciones:
+                crear_restricciones_diferidas_sql(conexion)
+                print("\nRestricciones de todas las tablas de SQL validadas y creadas con éxito.")
+
+        # Si está activada, hacemos la carga de todos los ficheros en paralelo (un proceso por fichero)
+        elif modo_carga_paralela:
+
+            # Lo importamos aquí porque carga_paralela.py a su vez importa este script
+            from carga_paralela import cargar_ficheros_en_paralelo
+
+            cargar_ficheros_en_paralelo(ficheros=FICHEROS_DATOS_LOAD_DATA, sql_conexion=conexion, mongodb_database=dbname, 
+                                        batch_size=BATCH_SIZE, num_procesos=NUM_PROCESOS_CARGA)
+
+        else:
+            # Métricas en directo de la carga (ver metricas_ingesta.py)
+            metricas, reportadores = iniciar_metricas(ficheros=FICHEROS_DATOS_LOAD_DATA)
+
+            # Iteramos sobre todos los ficheros
+            for fichero in FICHEROS_DATOS_LOAD_DATA:
+
+                # Al reanudar, los ficheros que ya se terminaron de insertar se saltan
+                if punto_control is not None and punto_control["ficheros"].get(fichero, {}).get("completado", False):
+                    print(f"\nEl fichero: \"{fichero}\" ya estaba cargado según el punto de control, lo saltamos.")
+                    continue
+                
+                # Insertamoslos datos en el fichero correspondiente (con el pipeline de parseo y escritura, si está activado)
+                if modo_pipeline:
+                    from pipeline_ingesta import insertar_datos_pipeline
+                    insertar_datos_pipeline(file_in=fichero, sql_conexion=conexion, mongodb_database=dbname, batch_size=BATCH_SIZE,
+                                            tamano_colas=TAMANO_COLAS_PIPELINE, metricas=metricas)
+                else:
+                    insertar_datos_global(file_in=fichero, sql_conexion=conexion, mongodb_database=dbname, batch_size=BATCH_SIZE,
+                                          punto_control=punto_control, metricas=metricas)
+
+                # Avisamos al usuario de que todo ha ido bien
+                print(f"\nYa hemos cargado los datos del fichero: \"{fichero}\" en la base de datos SQL: \"{NOMBRE_BASE_DATOS_SQL}\".")
+
+                # Avisamos al usuario de que todo ha ido bien
+                print(f"\nYa hemos cargado los datos del fichero: \"{fichero}\" en la colección \"{COLECCION_MONGODB}\" de la base de datos MongoDb : \"{NOMBRE_BASE_DATOS_MONGO_DB}\".")
+
+            parar_metricas(reportadores=reportadores)
+
+            # La carga ha terminado, ya no hace falta el punto de control
+            if punto_control is not None:
+                borrar_punto_control(punto_control=punto_control)
+
+        # Con todos los datos ya cargados, creamos de una vez los índices de las consultas y comprobamos que se usan
+        if CREAR_INDICES_CONSULTAS:
+
+            # Lo importamos aquí porque indices_sql.py a su vez importa este script
+            from indices_sql import crear_indices_consultas_sql
 
-            # Avisamos al usuario de que todo ha ido bien
-            print(f"\nYa hemos cargado los datos del fichero: \"{fichero}\" en la base de datos SQL: \"{NOMBRE_BASE_DATOS_SQL}\".")
+            crear_indices_consultas_sql(conexion=conexion)
+            crear_indices_mongodb(mongodb_database=dbname)
 
-            # Avisamos al usuario de que todo ha ido bien
-            print(f"\nYa hemos cargado los datos del fichero: \"{fichero}\" en la colección \"{COLECCION_MONGODB}\" de la base de datos MongoDb : \"{NOMBRE_BASE_DATOS_MONGO_DB}\".")
+        # Dejamos las secuencias de identificadores a continuación de los ya usados, para las inserciones de inserta_dataset.py
+        sincronizar_secuencias(conexion=conexion)
               
     # Cerramos la conexión MySQl
     conexion.close()
@@ -585,7 +1490,7 @@ if __name__=="__main__":
 
     try:
         # Llamamos a la función principal del archivo para que desarrolle el proceso completo
-        main()
+        main(reanudar=leer_opcion_reanudar(descripcion="Carga inicial de los ficheros de datos en MySQL y MongoDB."))
 
     except Exception as e:
         # Controlamos posibles excepciones
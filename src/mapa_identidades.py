@@ -0,0 +1,352 @@
+"""
+Este script se empleará para guardar de forma compacta los identificadores asignados a cada reviewerID (dicc_ids_personas) y a cada
+(asin, tipo_producto) (dicc_ids_productos) durante la carga de load_data.py.
+
+Con un diccionario normal, cada clave es un objeto str (o una tupla de dos str) con su propia cabecera, más el objeto int del valor
+y la entrada de la tabla del diccionario: unos 150-200 bytes por clave. Con decenas de millones de revisores eso son varios GB de
+memoria en el proceso de carga. MapaIdentidades tiene la misma semántica que el diccionario (in, [], get, items...), pero guarda:
+
+    - las claves codificadas en UTF-8, una detrás de otra, en un único bytearray (y un array con el inicio de cada una),
+    - el hash crc32 de cada clave y su identificador en arrays de enteros (módulo array),
+    - una tabla hash de direccionamiento abierto (sondeo lineal) con el número de entrada de cada posición, que se dobla cuando se
+      llena a la mitad.
+
+Así cada clave ocupa sus bytes más unos 40 bytes fijos, y no se crea ningún objeto de Python por clave. A cambio, cada búsqueda se
+hace en Python y es unas 5 veces más lenta que en un diccionario, así que solo se usa con MAPAS_IDENTIDADES_COMPACTOS activado; si no,
+crear_mapa_identidades devuelve un diccionario normal.
+
+NombresPersonas guarda, con la misma idea, el último reviewerName no nulo enviado a SQL de cada persona, en arrays indexados por
+id_persona: una huella de 64 bits del nombre (8 bytes por persona), suficiente para saber si el nombre ha cambiado, y solo si hace falta
+recuperar el nombre (carga_masiva.py, que escribe la tabla Personas al final) también sus bytes.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+import zlib
+from array import array
+from typing import Iterator, Tuple
+
+############################################################################################################################################
+
+# Posición vacía de la tabla hash
+POSICION_VACIA = -1
+
+# Codificación de una clave nula (no es UTF-8 válido, así que no puede coincidir con ninguna cadena)
+CLAVE_NULA = b"\xff"
+
+# Separador de los componentes de una clave compuesta
+SEPARADOR_CLAVE = b"\x00"
+
+############################################################################################################################################
+
+class MapaIdentidades:
+    """
+
+    Mapa compacto de claves (str, o tuplas de str si es compuesto) a identificadores enteros, con la misma semántica que un dict.
+    No permite borrar claves, ya que los identificadores asignados en la carga nunca se eliminan.
+
+    Attributes:
+        clave_compuesta (bool): si las claves son tuplas de cadenas (por ejemplo (asin, tipo_producto)).
+
+    """
+    def __init__(self, clave_compuesta:bool=False, capacidad_inicial:int=1024):
+        self.clave_compuesta = clave_compuesta
+
+        # La capacidad de la tabla hash siempre es una potencia de 2, para poder calcular la posición con una máscara
+        capacidad = 1
+        while capacidad < 2 * capacidad_inicial:
+            capacidad *= 2
+
+        self._tabla = array("i", [POSICION_VACIA]) * capacidad
+        self._claves = bytearray()
+        self._inicios = array("q", [0])  # la clave de la entrada i ocupa _claves[_inicios[i]:_inicios[i + 1]]
+        self._hashes = array("I")
+        self._valores = array("i")
+
+    # CODIFICACIÓN DE LAS CLAVES
+    def _codificar(self, clave)-> bytes:
+        if self.clave_compuesta:
+            return SEPARADOR_CLAVE.join([CLAVE_NULA if componente is None else componente.encode("utf-8") for componente in clave])
+
+        return CLAVE_NULA if clave is None else clave.encode("utf-8")
+
+    def _decodificar(self, clave_bytes:bytes):
+        if self.clave_compuesta:
+            return tuple([None if componente == CLAVE_NULA else componente.decode("utf-8")
+                          for componente in clave_bytes.split(SEPARADOR_CLAVE)])
+
+        return None if clave_bytes == CLAVE_NULA else clave_bytes.decode("utf-8")
+
+    # BÚSQUEDA EN LA TABLA HASH
+    def _buscar(self, clave_bytes:bytes, hash_clave:int)-> Tuple[int, int]:
+        """
+
+        Busca una clave en la tabla hash con sondeo lineal.
+
+        Args:
+            clave_bytes (bytes): clave ya codificada.
+            hash_clave (int): crc32 de la clave.
+
+        Returns:
+            tuple: (posición de la tabla, número de entrada). Si la clave no está, el número de entrada es POSICION_VACIA y la posición
+            es la primera libre, donde habría que insertarla.
+
+        """
+        tabla, hashes, inicios, claves = self._tabla, self._hashes, self._inicios, self._claves
+        mascara = len(tabla) - 1
+        posicion = hash_clave & mascara
+
+        while True:
+            entrada = tabla[posicion]
+
+            if entrada == POSICION_VACIA:
+                return posicion, POSICION_VACIA
+
+            if hashes[entrada] == hash_clave and claves[inicios[entrada]:inicios[entrada + 1]] == clave_bytes:
+                return posicion, entrada
+
+            posicion = (posicion + 1) & mascara
+
+    def _ampliar_tabla(self)-> None:
+        """
+
+        Dobla el tamaño de la tabla hash y vuelve a colocar todas las entradas (las claves y valores no se mueven).
+
+        """
+        tabla = array("i", [POSICION_VACIA]) * (2 * len(self._tabla))
+        mascara = len(tabla) - 1
+
+        for entrada, hash_clave in enumerate(self._hashes):
+            posicion = hash_clave & mascara
+            while tabla[posicion] != POSICION_VACIA:
+                posicion = (posicion + 1) & mascara
+            tabla[posicion] = entrada
+
+        self._tabla = tabla
+
+    # INTERFAZ DE DICCIONARIO
+    def __len__(self)-> int:
+        return len(self._valores)
+
+    def __contains__(self, clave)-> bool:
+        clave_bytes = self._codificar(clave)
+        return self._buscar(clave_bytes, zlib.crc32(clave_bytes))[1] != POSICION_VACIA
+
+    def __getitem__(self, clave)-> int:
+        clave_bytes = self._codificar(clave)
+        entrada = self._buscar(clave_bytes, zlib.crc32(clave_bytes))[1]
+
+        if entrada == POSICION_VACIA:
+            raise KeyError(clave)
+
+        return self._valores[entrada]
+
+    def get(self, clave, defecto=None):
+        clave_bytes = self._codificar(clave)
+        entrada = self._buscar(clave_bytes, zlib.crc32(clave_bytes))[1]
+
+        return defecto if entrada == POSICION_VACIA else self._valores[entrada]
+
+    def __setitem__(self, clave, valor:int)-> None:
+        clave_bytes = self._codificar(clave)
+        hash_clave = zlib.crc32(clave_bytes)
+        posicion, entrada = self._buscar(clave_bytes, hash_clave)
+
+        if entrada != POSICION_VACIA:
+            self._valores[entrada] = valor
+            return
+
+        self._insertar(posicion, clave_bytes, hash_clave, valor)
+
+    def _insertar(self, posicion:int, clave_bytes:bytes, hash_clave:int, valor:int)-> None:
+        """
+
+        Añade una clave nueva en una posición libre de la tabla hash (devuelta por _buscar).
+
+        """
+        # Nueva entrada al final de los arrays
+        self._tabla[posicion] = len(self._valores)
+        self._claves += clave_bytes
+        self._inicios.append(len(self._claves))
+        self._hashes.append(hash_clave)
+        self._valores.append(valor)
+
+        # Mantenemos la tabla como mucho medio llena, para que las búsquedas sigan siendo cortas
+        if 2 * len(self._valores) > len(self._tabla):
+            self._ampliar_tabla()
+
+    def setdefault(self, clave, valor:int)-> int:
+        """
+
+        Igual que dict.setdefault: devuelve el valor de la clave si ya está y, si no, la guarda con el valor dado y lo devuelve.
+        Solo recorre la tabla hash una vez.
+
+        """
+        clave_bytes = self._codificar(clave)
+        hash_clave = zlib.crc32(clave_bytes)
+        posicion, entrada = self._buscar(clave_bytes, hash_clave)
+
+        if entrada != POSICION_VACIA:
+            return self._valores[entrada]
+
+        self._insertar(posicion, clave_bytes, hash_clave, valor)
+
+        return valor
+
+    def keys(self)-> Iterator:
+        claves, inicios = self._claves, self._inicios
+        for entrada in range(len(self._valores)):
+            yield self._decodificar(bytes(claves[inicios[entrada]:inicios[entrada + 1]]))
+
+    def __iter__(self)-> Iterator:
+        return self.keys()
+
+    def values(self)-> Iterator[int]:
+        return iter(self._valores)
+
+    def items(self)-> Iterator[tuple]:
+        return zip(self.keys(), self._valores)
+
+    def update(self, otro)-> None:
+        for clave, valor in otro.items():
+            self[clave] = valor
+
+    def copy(self)-> "MapaIdentidades":
+        copia = MapaIdentidades(clave_compuesta=self.clave_compuesta)
+        copia._tabla = array("i", self._tabla)
+        copia._claves = bytearray(self._claves)
+        copia._inicios = array("q", self._inicios)
+        copia._hashes = array("I", self._hashes)
+        copia._valores = array("i", self._valores)
+        return copia
+
+    def memoria_bytes(self)-> int:
+        """
+
+        Devuelve la memoria aproximada que ocupan los datos del mapa, en bytes.
+
+        """
+        return (len(self._claves) + self._tabla.itemsize * len(self._tabla) + self._inicios.itemsize * len(self._inicios) +
+                self._hashes.itemsize * len(self._hashes) + self._valores.itemsize * len(self._valores))
+
+############################################################################################################################################
+
+# CREACIÓN DE LOS MAPAS DE IDENTIFICADORES SEGÚN LA CONFIGURACIÓN
+def crear_mapa_identidades(clave_compuesta:bool=False):
+    """
+
+    Crea un mapa vacío de claves a identificadores: un MapaIdentidades si MAPAS_IDENTIDADES_COMPACTOS está activado, o un diccionario.
+
+    Args:
+        clave_compuesta (bool, optional): si las claves son tuplas de dos cadenas, como (asin, tipo_producto). Defaults to False.
+
+    Returns:
+        MapaIdentidades o dict: mapa vacío, con la misma semántica en los dos casos.
+
+    """
+    return MapaIdentidades(clave_compuesta=clave_compuesta) if MAPAS_IDENTIDADES_COMPACTOS else {}
+
+############################################################################################################################################
+
+# Huella de una persona sin nombre enviado
+HUELLA_VACIA = 0
+
+def huella_nombre(nombre_bytes:bytes)-> int:
+    """
+
+    Calcula una huella de 64 bits de un nombre (crc32 y adler32), nunca igual a HUELLA_VACIA.
+
+    """
+    return ((zlib.crc32(nombre_bytes) << 32) | zlib.adler32(nombre_bytes)) or 1
+
+class NombresPersonas:
+    """
+
+    Último reviewerName no nulo de cada persona, indexado por id_persona, sin ningún objeto de Python por persona.
+
+    Attributes:
+        guardar_nombres (bool): si además de la huella se guardan los bytes del nombre, para poder recuperarlo con get.
+
+    """
+    def __init__(self, guardar_nombres:bool=False):
+        self.guardar_nombres = guardar_nombres
+
+        self._huellas = array("Q")
+        self._inicios = array("q")  # el nombre de id_persona ocupa _nombres[_inicios[id_persona]:_inicios[id_persona] + _longitudes[id_persona]]
+        self._longitudes = array("i")
+        self._nombres = bytearray()
+
+    def _ampliar(self, id_persona:int)-> None:
+        """
+
+        Amplía los arrays para que quepa id_persona (como mínimo al doble, para que el coste de ampliar se reparta).
+
+        """
+        n_nuevas = max(id_persona + 1, 2 * len(self._huellas)) - len(self._huellas)
+
+        self._huellas.frombytes(bytes(self._huellas.itemsize * n_nuevas))
+
+        if self.guardar_nombres:
+            self._inicios.frombytes(bytes(self._inicios.itemsize * n_nuevas))
+            self._longitudes.frombytes(bytes(self._longitudes.itemsize * n_nuevas))
+
+    def actualizar(self, id_persona:int, nombre:str)-> bool:
+        """
+
+        Guarda el nombre de una persona si no es nulo y es distinto del último guardado.
+
+        Args:
+            id_persona (int): identificador de la persona.
+            nombre (str): nombre de la persona en la review actual (puede ser None).
+
+        Returns:
+            bool: True si el nombre ha cambiado (y hay que enviarlo a SQL).
+
+        """
+        if nombre is None:
+            return False
+
+        if id_persona >= len(self._huellas):
+            self._ampliar(id_persona)
+
+        nombre_bytes = nombre.encode("utf-8")
+        huella = huella_nombre(nombre_bytes)
+
+        if self._huellas[id_persona] == huella:
+            return False
+
+        self._huellas[id_persona] = huella
+
+        # Si el nombre cambia, los bytes del anterior se quedan sin usar (pasa muy pocas veces)
+        if self.guardar_nombres:
+            self._inicios[id_persona] = len(self._nombres)
+            self._longitudes[id_persona] = len(nombre_bytes)
+            self._nombres += nombre_bytes
+
+        return True
+
+    def get(self, id_persona:int)-> str:
+        """
+
+        Devuelve el último nombre guardado de una persona (None si no tiene). Solo se puede usar con guardar_nombres.
+
+        """
+        if not self.guardar_nombres:
+            raise ValueError("NombresPersonas no guarda los nombres (guardar_nombres=False)")
+
+        if id_persona >= len(self._huellas) or self._huellas[id_persona] == HUELLA_VACIA:
+            return None
+
+        inicio = self._inicios[id_persona]
+        return self._nombres[inicio:inicio + self._longitudes[id_persona]].decode("utf-8")
+
+    def memoria_bytes(self)-> int:
+        return (self._huellas.itemsize * len(self._huellas) + self._inicios.itemsize * len(self._inicios) +
+                self._longitudes.itemsize * len(self._longitudes) + len(self._nombres))
@@ -23,11 +23,14 @@ from pymongo import MongoClient
 from configuracion import *
 import matplotlib.pyplot as plt
 from itertools import zip_longest
-from wordcloud import WordCloud
+from wordcloud import WordCloud, STOPWORDS
 import os
 from colorama import Fore, Style,init
 from threading import Thread
 from pymysql.connections import Connection
+from datetime import datetime
+from collections import Counter
+from campos_derivados import palabras_summary
 
 ############################################################################################################################################
 
@@ -121,13 +124,14 @@ def consulta1_mostrar_evolucion_reviews_por_anio(conexion:Connection, tipo:str)-
 
     cantidades = []
 
-    # Consultas para conseguir el menor y mayor año disponible en la base de datos
+    # Consultas para conseguir el menor y mayor año disponible en la base de datos (con el índice de la columna anio, MySQL solo lee 
+    # el primer y el último valor del índice)
     sql_year_menor = """
-                SELECT MIN(YEAR(reviewTime))
+                SELECT MIN(anio)
                 FROM review;
                     """
     sql_year_mayor = """
-                SELECT MAX(YEAR(reviewTime))
+                SELECT MAX(anio)
                 FROM review;
                     """
     year_menor,year_mayor = ejecutar_consulta_sql(conexion=conexion,sql=sql_year_menor)[0][0],ejecutar_consulta_sql(conexion=conexion,sql=sql_year_mayor)[0][0] 
@@ -166,13 +170,14 @@ def conseguir_datos_reviews_año_consulta1(conexion:Connection, tipo:str, ano:in
     """
     # Distinguir si nos ha pedido que le demos de todos a la vez o de un tipo en concreto
     if tipo != "Todos":
-        # Query que nos consigue el total de produtos en función del año y el tipo de producto
+        # Query que nos consigue el total de produtos en función del año y el tipo de producto (filtramos por la columna generada anio 
+        # en lugar de por YEAR(reviewTime), para que se pueda buscar en el índice)
         sql ="""
         SELECT count(*)
         FROM review r
         INNER JOIN productos p ON p.id_producto = r.id_producto
         INNER JOIN tipos_producto pr ON p.tipo_producto = pr.tipo_producto
-        WHERE YEAR(r.reviewTime) = %s AND pr.nombre_tipo_producto = %s;
+        WHERE r.anio = %s AND pr.nombre_tipo_producto = %s;
         """
         result_sql = ejecutar_consulta_sql(conexion=conexion,sql=sql,args=[ano,tipo])
 
@@ -372,6 +377,122 @@ def conseguir_numero_nota_consulta3(conexion:Connection, tipo:str, producto:str)
             dict_overall_reviews[res[0]] = res[1]
             
         return dict_overall_reviews
+
+def conseguir_ids_producto(conexion:Connection, producto:str) -> list:
+    """
+
+    Obtener los identificadores de producto de un ASIN (uno por cada categoría en la que aparezca).
+
+    Args:
+        conexion(pymysql.connections.Connection): Conexión a la base de datos MySQL.
+        producto (str): ASIN del producto buscado.
+    
+    Returns:
+        ids(list): lista con los id_producto del ASIN.
+
+    """
+    sql ="""
+        SELECT id_producto
+        FROM productos
+        WHERE asin = %s;
+        """
+    result_sql = ejecutar_consulta_sql(conexion=conexion, sql=sql, args=[producto])
+
+    return [res[0] for res in result_sql]
+
+def conseguir_reviews_producto_consulta3(conexion:Connection, collection_name:Collection, producto:str) -> list:
+    """
+
+    Conseguir las NUMERO_REVIEWS_PRODUCTO reviews más recientes (las de mayor id_review) de un producto, con sus textos. Se leen de los
+    buckets del producto (ver buckets_productos.py): como cada bucket guarda sus reviews en orden, de cada uno solo se traen las últimas.
+
+    Args:
+        conexion(pymysql.connections.Connection): Conexión a la base de datos MySQL.
+        collection_name (Collection): Objeto de la colección dentro de la base de datos.
+        producto (str): ASIN del producto buscado.
+    
+    Returns:
+        reviews(list): lista de diccionarios con id_review, overall, reviewTime, summary y reviewText (los que tenga cada review).
+
+    """
+    ids = conseguir_ids_producto(conexion, producto)
+
+    buckets_collection = collection_name.database[COLECCION_BUCKETS_MONGODB]
+
+    # Las cargas hechas sin buckets se siguen pudiendo consultar, buscando antes los ids de las reviews en MySQL
+    if not tiene_buckets(buckets_collection, {"id_producto": {"$in": ids}}):
+        return conseguir_reviews_producto_consulta3_por_ids(conexion, collection_name, producto)
+
+    result_mongo = buckets_collection.find({"id_producto": {"$in": ids}}, 
+                                           {"_id": 0, "reviews": {"$slice": -NUMERO_REVIEWS_PRODUCTO}})
+
+    reviews = [review for bucket in result_mongo for review in bucket["reviews"]]
+    reviews.sort(key=lambda review: review["id_review"], reverse=True)
+
+    return reviews[:NUMERO_REVIEWS_PRODUCTO]
+
+def conseguir_reviews_producto_consulta3_por_ids(conexion:Connection, collection_name:Collection, producto:str) -> list:
+    """
+
+    Igual que conseguir_reviews_producto_consulta3, sin buckets: se buscan en MySQL las últimas reviews del producto y se traen de
+    MongoDB sus textos.
+
+    Args:
+        conexion(pymysql.connections.Connection): Conexión a la base de datos MySQL.
+        collection_name (Collection): Objeto de la colección dentro de la base de datos.
+        producto (str): ASIN del producto buscado.
+    
+    Returns:
+        reviews(list): lista de diccionarios con id_review, overall, reviewTime, summary y reviewText (los que tenga cada review).
+
+    """
+    sql ="""
+        SELECT r.id_review, r.overall, r.reviewTime
+        FROM review r
+        INNER JOIN productos p ON p.id_producto = r.id_producto
+        WHERE asin = %s
+        ORDER BY r.id_review DESC
+        LIMIT %s;
+        """
+    result_sql = ejecutar_consulta_sql(conexion=conexion, sql=sql, args=[producto, NUMERO_REVIEWS_PRODUCTO])
+
+    reviews = [{"id_review": res[0], "overall": res[1], "reviewTime": res[2]} for res in result_sql]
+
+    # Añadimos a cada review los textos de su documento
+    result_mongo = collection_name.find({"_id": {"$in": [review["id_review"] for review in reviews]}}, 
+                                        {"summary": 1, "reviewText": 1})
+    documentos = {documento["_id"]: documento for documento in result_mongo}
+
+    for review in reviews:
+        documento = documentos.get(review["id_review"], {})
+        for campo in ["summary", "reviewText"]:
+            if campo in documento:
+                review[campo] = documento[campo]
+
+    return reviews
+
+def mostrar_reviews_producto_consulta3(conexion:Connection, collection_name:Collection, producto:str)-> None:
+    """
+
+    Mostrar por pantalla las reviews más recientes de un producto, con su nota, su fecha y sus textos.
+
+    Args:
+        conexion(pymysql.connections.Connection): Conexión a la base de datos MySQL.
+        collection_name (Collection): Objeto de la colección dentro de la base de datos.
+        producto (str): ASIN del producto buscado.
+
+    Returns:
+        None. Solo muestra las reviews.
+
+    """
+    reviews = conseguir_reviews_producto_consulta3(conexion, collection_name, producto)
+
+    print("\n" + Fore.CYAN + Style.BRIGHT + f"Últimas reviews de {producto}:")
+
+    for review in reviews:
+        print(Fore.GREEN + Style.BRIGHT + f"\n ▶ Overall: {review.get('overall', '-')}   Fecha: {review.get('reviewTime', '-')}")
+        print(Fore.YELLOW + f"   {review.get('summary', '')}")
+        print(Fore.WHITE + f"   {review.get('reviewText', '')}")
     
 ############################################################################################################################################
 
@@ -379,7 +500,7 @@ def conseguir_numero_nota_consulta3(conexion:Connection, tipo:str, producto:str)
 def consulta4_mostrar_evolucion_reviews_tiempo(conexion:Connection, tipo:str)-> None:
     """
 
-    Convertir la información obtenida de un diccionario que nos relaciona los unixReviewTime con la cantidad de reviews hechas en ese tiempo concreto, en listas
+    Convertir la información obtenida de un diccionario que nos relaciona cada mes con la cantidad de reviews hechas en ese mes, en listas
     para luego poder mostrar un plot que nos muestre la evolución de la cantidad de reviews a medida que va avanzando el tiempo.
 
     Args:
@@ -417,46 +538,48 @@ def consulta4_mostrar_evolucion_reviews_tiempo(conexion:Connection, tipo:str)->
 def conseguir_timestamp_cantidad_reviews_consulta4(conexion:Connection, tipo:str) -> dict:
     """
 
-    Conseguir la cantidad de reviews por unixReviewTime específicos. 
+    Conseguir la cantidad de reviews de cada mes. Se agrupa por las columnas generadas anio y anio_mes (AAAAMM), que están en los 
+    índices de Review, en lugar de por unixReviewTime.
 
     Args:
         conexion(pymysql.connections.Connection): Conexión a la base de datos MySQL.
         tipo (str): categoría elegida por el usuario.
     
     Returns:
-        time_cantidad_sql(dict): diccionario que relaciona un unixReviewTime con la cantidad de reviews hechas en ese momento.
+        time_cantidad_sql(dict): diccionario que relaciona el primer día de cada mes (datetime) con la cantidad de reviews hechas en ese mes.
 
     """
 
     # Filtrar en función de si quiere de todos los tipos a la vez o de un tipo en concreto
     if tipo != "Todos":
         sql ="""
-            SELECT unixReviewTime,count(*)
+            SELECT r.anio, r.anio_mes, count(*)
             FROM review r
             INNER JOIN productos p ON p.id_producto = r.id_producto
             INNER JOIN tipos_producto pr ON p.tipo_producto = pr.tipo_producto
             WHERE pr.nombre_tipo_producto = %s
-            GROUP BY unixReviewTime
-            ORDER BY unixReviewTime;
+            GROUP BY r.anio, r.anio_mes
+            ORDER BY r.anio, r.anio_mes;
             """
         result_sql = ejecutar_consulta_sql(conexion=conexion,sql=sql,args=[tipo])
 
-    # Cuando el tipo es Todos hacemos la misma query pero ahora sin filtrar por tipo de producto
+    # Cuando el tipo es Todos hacemos la misma query pero ahora sin filtrar por tipo de producto (toda review tiene su producto por la
+    # clave foránea, así que basta con recorrer el índice de anio y anio_mes, en orden)
     elif tipo == "Todos":
         sql ="""
-            SELECT unixReviewTime,count(*)
-            FROM review r
-            INNER JOIN productos p ON p.id_producto = r.id_producto
-            INNER JOIN tipos_producto pr ON p.tipo_producto = pr.tipo_producto
-            GROUP BY unixReviewTime
-            ORDER BY unixReviewTime;
+            SELECT anio, anio_mes, count(*)
+            FROM review
+            WHERE anio IS NOT NULL
+            GROUP BY anio, anio_mes
+            ORDER BY anio, anio_mes;
             """
         result_sql = ejecutar_consulta_sql(conexion=conexion,sql=sql)
     
     time_cantidad_sql = {}
-    # Vamos a asiganndo a cada unixReviewTime la cantidad de reviews
+    # Vamos a asiganndo a cada mes la cantidad de reviews (las reviews sin fecha no se pueden colocar en el tiempo)
     for res in result_sql:
-        time_cantidad_sql[res[0]] = res[1]
+        if res[1] is not None:
+            time_cantidad_sql[datetime(res[1] // 100, res[1] % 100, 1)] = res[2]
     
     # Devolvemos el diccionario
     return time_cantidad_sql
@@ -543,20 +666,124 @@ def consulta6_generar_nube_palabras_por_categoria(conexion:Connection, collectio
         None. Solo hace el plot.
 
     """
-    texto = conseguir_summary_tipo_consulta6(conexion,collection_name,tipo)
+    frecuencias = conseguir_summary_tipo_consulta6(conexion,collection_name,tipo)
 
-    wordcloud = WordCloud(width=800, height=400, background_color='white').generate(texto)
+    # Quitamos las palabras vacías (las mismas que quitaría WordCloud si le pasáramos el texto entero)
+    frecuencias = {palabra: cantidad for palabra, cantidad in frecuencias.items() if palabra not in STOPWORDS}
+
+    wordcloud = WordCloud(width=800, height=400, background_color='white').generate_from_frequencies(frecuencias)
     plt.figure(figsize=(12, 6))
     plt.imshow(wordcloud, interpolation='bilinear')
     plt.axis("off")
     plt.tight_layout()
     plt.show()
 
-def conseguir_summary_tipo_consulta6(conexion:Connection, collection_name:Collection, tipo:str) -> str:
+def conseguir_id_tipo_producto(conexion:Connection, tipo:str) -> int:
+    """
+
+    Obtener el identificador de una categoría de producto, que es el que se guarda en los documentos de MongoDB (campo derivado 
+    tipo_producto, ver campos_derivados.py).
+
+    Args:
+        conexion(pymysql.connections.Connection): Conexión a la base de datos MySQL.
+        tipo (str): categoría elegida por el usuario.
+    
+    Returns:
+        tipo_producto(int): identificador de la categoría (None si no existe).
+
+    """
+    sql ="""
+        SELECT tipo_producto
+        FROM tipos_producto
+        WHERE nombre_tipo_producto = %s;
+        """
+    result_sql = ejecutar_consulta_sql(conexion=conexion, sql=sql, args=[tipo])
+
+    return result_sql[0][0] if result_sql else None
+
+def tiene_buckets(buckets_collection:Collection, filtro:dict) -> bool:
+    """
+
+    Comprobar si hay buckets de productos (ver buckets_productos.py) que cumplan un filtro, que solo existen si la carga se hizo con
+    MODO_BUCKETS_PRODUCTOS activado.
+
+    Args:
+        buckets_collection (Collection): colección de los buckets de productos.
+        filtro (dict): filtro de MongoDB (por tipo_producto o por id_producto).
+    
+    Returns:
+        bool: True si hay algún bucket que cumpla el filtro.
+
+    """
+    return buckets_collection.find_one(filtro, {"_id": 1}) is not None
+
+def tiene_campos_derivados(conexion:Connection, collection_name:Collection, tipo_producto:int) -> bool:
+    """
+
+    Comprobar si todos los documentos de una categoría tienen los campos derivados, que solo existen en los documentos insertados con
+    CAMPOS_DERIVADOS_MONGODB activado. Una categoría puede mezclar documentos antiguos (sin campos derivados) y nuevos, y entonces la
+    agregación por tipo_producto se dejaría los antiguos, así que se compara el número de documentos de la categoría en MongoDB
+    (índice de tipo_producto) con el de sus reviews en MySQL.
+
+    Args:
+        conexion(pymysql.connections.Connection): Conexión a la base de datos MySQL.
+        collection_name (Collection): Objeto de la colección dentro de la base de datos.
+        tipo_producto (int): identificador de la categoría.
+    
+    Returns:
+        bool: True si todas las reviews de la categoría tienen su documento con los campos derivados.
+
+    """
+    sql ="""
+        SELECT COUNT(*)
+        FROM review r
+        INNER JOIN productos p ON r.id_producto = p.id_producto
+        WHERE p.tipo_producto = %s;
+        """
+    n_reviews = ejecutar_consulta_sql(conexion=conexion, sql=sql, args=[tipo_producto])[0][0]
+
+    return n_reviews > 0 and collection_name.count_documents({"tipo_producto": tipo_producto}) >= n_reviews
+
+def conseguir_summary_tipo_consulta6(conexion:Connection, collection_name:Collection, tipo:str) -> dict:
+    """
+
+    Obtener cuántas veces aparece cada palabra de los summary de las reviews de una categoría de producto específica (las 
+    NUMERO_PALABRAS_NUBE más frecuentes). MongoDB separa y cuenta las palabras ya guardadas en cada documento (palabras_summary), 
+    así que solo se traen las palabras con su cantidad.
+
+    Args:
+        conexion(pymysql.connections.Connection): Conexión a la base de datos MySQL.
+        collection_name (Collection): Objeto de la colección dentro de la base de datos.
+        tipo (str): categoría elegida por el usuario.
+    
+    Returns:
+        frecuencias(dict): diccionario que relaciona cada palabra con el número de veces que aparece.
+
+    """
+    tipo_producto = conseguir_id_tipo_producto(conexion, tipo)
+
+    if tipo_producto is None:
+        return {}
+
+    # Los documentos insertados sin campos derivados se siguen pudiendo consultar, buscando antes sus ids en MySQL
+    if not tiene_campos_derivados(conexion, collection_name, tipo_producto):
+        return conseguir_summary_tipo_consulta6_por_ids(conexion, collection_name, tipo)
+
+    result_mongo = collection_name.aggregate([
+        {"$match": {"tipo_producto": tipo_producto}},
+        {"$unwind": "$palabras_summary"},
+        {"$group": {"_id": "$palabras_summary", "cantidad": {"$sum": 1}}},
+        {"$sort": {"cantidad": -1}},
+        {"$limit": NUMERO_PALABRAS_NUBE}
+    ])
+
+    return {res["_id"]: res["cantidad"] for res in result_mongo}
+
+def conseguir_summary_tipo_consulta6_por_ids(conexion:Connection, collection_name:Collection, tipo:str) -> dict:
     """
 
-    Obtener un texto con todas las palabras de longitud mayor de 3 puestas en una review el campo de summary de una categoría 
-    de producto específica.
+    Igual que conseguir_summary_tipo_consulta6, para documentos sin campos derivados: se buscan en MySQL los ids de las reviews de la 
+    categoría y se traen de MongoDB sus summary, que se separan en palabras aquí.
 
     Args:
         conexion(pymysql.connections.Connection): Conexión a la base de datos MySQL.
@@ -564,7 +791,7 @@ def conseguir_summary_tipo_consulta6(conexion:Connection, collection_name:Collec
         tipo (str): categoría elegida por el usuario.
     
     Returns:
-        texto(str): texto que separa por espacios " " las palabras de longitud mayor de 3.
+        frecuencias(dict): diccionario que relaciona cada palabra con el número de veces que aparece.
 
     """
     
@@ -584,23 +811,17 @@ def conseguir_summary_tipo_consulta6(conexion:Connection, collection_name:Collec
     # Buscamos en mongo los summary de reviews que estén en la lista de ids de reviews de la categoría deseada
     result_mongo = collection_name.find({"_id": {"$in": ids}},{"_id": 0, "summary": 1})
 
-    palabras_filtradas = []
+    frecuencias = Counter()
     # Bucle por cada review que haya encontrado
     for diccionario_summary in result_mongo:
         # Guardamos el campo de summary
-        summary = diccionario_summary["summary"]
+        summary = diccionario_summary.get("summary")
         # Comprobamos que tenga ya que es posible que no tenga
         if summary:
-            # Bucle para por cada palabra que haya en nuestrp summary, filtrarla para que su longitud sea mayor de 3
-            for palabra in summary.split():
-                if len(palabra) > 3:
-                    palabras_filtradas.append(palabra)
-        
-    
-    # Unimos todas las palabras en un único string, ya que es lo que nos pide la librería para crear la nube de palabras
-    texto = " ".join(palabras_filtradas)
+            # Separamos las palabras igual que al guardar los campos derivados
+            frecuencias.update(palabras_summary(summary))
             
-    return texto
+    return dict(frecuencias.most_common(NUMERO_PALABRAS_NUBE))
 
 ############################################################################################################################################
 
@@ -664,6 +885,81 @@ def conseguir_medias_texto_consulta7(conexion:Connection, collection_name:Collec
     """
 
     Conseguiremos un diccionario que tiene por cada overall la media de characters en el campo de reviewText, especificada una categoría de producto.
+    La media la calcula MongoDB con una agregación sobre los campos derivados overall y longitud_review_text, que están en el índice 
+    idx_tipo_overall_longitud, así que no se leen los textos.
+
+    Args:
+        conexion(pymysql.connections.Connection): Conexión a la base de datos MySQL.
+        collection_name(Collection): nombre de la colección.
+        tipo (str): categoría elegida por el usuario.
+    
+    Returns:
+        dict_overalls(dict): diccionario que relaciona overall con media de characters en el campo de reviewText.
+
+    """
+    tipo_producto = conseguir_id_tipo_producto(conexion, tipo)
+
+    if tipo_producto is None:
+        return {}
+
+    # Con los buckets de productos, la media sale de los agregados de cada bucket, sin leer cada review
+    buckets_collection = collection_name.database[COLECCION_BUCKETS_MONGODB]
+    if tiene_buckets(buckets_collection, {"tipo_producto": tipo_producto}):
+        return conseguir_medias_texto_consulta7_por_buckets(buckets_collection, tipo_producto)
+
+    # Los documentos insertados sin campos derivados se siguen pudiendo consultar, buscando antes sus ids en MySQL
+    if not tiene_campos_derivados(conexion, collection_name, tipo_producto):
+        return conseguir_medias_texto_consulta7_por_ids(conexion, collection_name, tipo)
+
+    result_mongo = collection_name.aggregate([
+        {"$match": {"tipo_producto": tipo_producto}},
+        {"$group": {"_id": "$overall", "media": {"$avg": "$longitud_review_text"}}},
+        {"$sort": {"_id": 1}}
+    ])
+
+    dict_overalls = {}
+    # Las reviews sin texto no tienen longitud_review_text, y $avg no las tiene en cuenta
+    for res in result_mongo:
+        if res["_id"] is not None and res["media"] is not None:
+            dict_overalls[res["_id"]] = res["media"]
+
+    return dict_overalls
+
+def conseguir_medias_texto_consulta7_por_buckets(buckets_collection:Collection, tipo_producto:int) -> dict:
+    """
+
+    Igual que conseguir_medias_texto_consulta7, a partir de los buckets de productos de la categoría (ver buckets_productos.py): se 
+    suman las longitudes y el número de reviews con texto de cada overall que ya tiene calculados cada bucket.
+
+    Args:
+        buckets_collection(Collection): colección de los buckets de productos.
+        tipo_producto (int): identificador de la categoría.
+    
+    Returns:
+        dict_overalls(dict): diccionario que relaciona overall con media de characters en el campo de reviewText.
+
+    """
+    result_mongo = buckets_collection.aggregate([
+        {"$match": {"tipo_producto": tipo_producto}},
+        {"$project": {"_id": 0, "por_overall": {"$objectToArray": "$por_overall"}}},
+        {"$unwind": "$por_overall"},
+        {"$group": {"_id": "$por_overall.k", "n_con_texto": {"$sum": "$por_overall.v.n_con_texto"},
+                    "suma_longitud": {"$sum": "$por_overall.v.suma_longitud_review_text"}}}
+    ])
+
+    dict_overalls = {}
+    # Los overall son las claves de por_overall, así que vienen como texto
+    for res in result_mongo:
+        if res["n_con_texto"]:
+            dict_overalls[int(res["_id"])] = res["suma_longitud"] / res["n_con_texto"]
+
+    return dict(sorted(dict_overalls.items()))
+
+def conseguir_medias_texto_consulta7_por_ids(conexion:Connection, collection_name:Collection, tipo:str) -> dict:
+    """
+
+    Igual que conseguir_medias_texto_consulta7, para documentos sin campos derivados: se buscan en MySQL los ids de las reviews de cada
+    overall de la categoría y se traen de MongoDB sus reviewText.
 
     Args:
         conexion(pymysql.connections.Connection): Conexión a la base de datos MySQL.
@@ -1055,6 +1351,7 @@ def main()-> None:
                 elif opcion_menu_consulta3 == "2":
                     limpiar_pantalla()
                     producto = menu_elegir_producto_consulta3(conexion_mysql)
+                    mostrar_reviews_producto_consulta3(conexion=conexion_mysql,collection_name=collection_name,producto=producto)
                     consulta3_mostrar_histograma_por_nota(conexion=conexion_mysql,tipo=None,producto=producto)
 
             ####################
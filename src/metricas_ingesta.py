@@ -0,0 +1,398 @@
+"""
+Este script se empleará para seguir en directo el avance de la inserción de los ficheros de datos (load_data.py, inserta_dataset.py y
+pipeline_ingesta.py), en lugar de esperar al mensaje que se muestra al terminar cada fichero. Así se puede ver, en una carga larga, si
+el escritor de MySQL o el de MongoDB se ha quedado parado.
+
+Los cargadores van apuntando en un objeto MetricasIngesta:
+
+    - las líneas (reviews) leídas y los bytes leídos frente al tamaño del fichero, de los que sale la velocidad y el tiempo
+      estimado que falta (ETA) del fichero y de la carga completa (solo con ficheros sin comprimir, de los que se conoce el tamaño).
+    - cada escritura de cada destino (cada tabla de SQL y la colección de MongoDB, ver escritura_adaptativa.py), con el número de
+      filas y un histograma de latencias, y los segundos que lleva cada destino sin escribir.
+    - el número de lotes pendientes en las colas del pipeline (ver pipeline_ingesta.py).
+
+Las métricas se publican con los reportadores de METRICAS_REPORTADORES (ver REPORTADORES_METRICAS), que se pueden combinar:
+
+    - "log_json": cada INTERVALO_METRICAS_SEGUNDOS escribe una línea JSON con todas las métricas (por pantalla o, si
+      RUTA_LOG_METRICAS no es None, al final de ese fichero).
+    - "prometheus": sirve las métricas en formato de texto de Prometheus en http://127.0.0.1:PUERTO_METRICAS/metrics.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+import bisect
+import json
+import os
+import queue
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Lock, Thread
+from typing import Dict, List
+from lectura_ficheros import es_fichero_comprimido
+
+############################################################################################################################################
+
+# Límites superiores (en segundos) de las cubetas del histograma de latencias de las escrituras
+CUBETAS_LATENCIA = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+# Prefijo de los nombres de las métricas en formato Prometheus
+PREFIJO_METRICAS = "ingesta"
+
+############################################################################################################################################
+
+# MÉTRICAS DE UNA CARGA
+class MetricasIngesta:
+    """
+
+    Contadores de la inserción en curso. Se actualizan una vez por lote o por escritura (nunca por línea), y se pueden leer desde
+    otros hilos (los reportadores) mientras la carga sigue.
+
+    Attributes:
+        fichero (str): fichero que se está insertando.
+        lineas_fichero (int): reviews leídas del fichero actual.
+        bytes_fichero (int): bytes leídos del fichero actual.
+        lineas_total (int): reviews leídas de todos los ficheros.
+        escrituras (dict): {destino: {"escrituras", "filas", "segundos", "cubetas", "ultima"}}.
+
+    """
+    def __init__(self):
+        self._cerrojo = Lock()
+        self.inicio = time.monotonic()
+
+        self.tamanos_ficheros = {}
+        self.ficheros_completados = []
+        self.fichero = None
+        self.tamano_fichero = None
+        self.inicio_fichero = None
+        self.lineas_fichero = 0
+        self.bytes_fichero = 0
+        self._bytes_inicio_fichero = 0
+        self.lineas_total = 0
+
+        self.escrituras = {}
+        self.colas = {}
+
+    # Ficheros de la carga
+    def planificar_ficheros(self, ficheros:List[str])-> None:
+        """
+
+        Apunta los ficheros que se van a insertar y su tamaño (None si están comprimidos), para estimar lo que falta de la carga.
+
+        Args:
+            ficheros (list): rutas de los ficheros de datos.
+
+        Returns:
+            None
+
+        """
+        self.tamanos_ficheros = {fichero: None if es_fichero_comprimido(file_in=fichero) else os.path.getsize(fichero) for fichero in ficheros}
+
+    def iniciar_fichero(self, file_in:str, desplazamiento_inicial:int=0)-> None:
+        with self._cerrojo:
+            self.fichero = file_in
+            self.tamano_fichero = None if es_fichero_comprimido(file_in=file_in) else os.path.getsize(file_in)
+            self.inicio_fichero = time.monotonic()
+            self.lineas_fichero = 0
+            self.bytes_fichero = desplazamiento_inicial
+            self._bytes_inicio_fichero = desplazamiento_inicial
+
+    def terminar_fichero(self)-> None:
+        with self._cerrojo:
+            if self.fichero is not None and self.fichero not in self.ficheros_completados:
+                self.ficheros_completados.append(self.fichero)
+
+    def registrar_lote_leido(self, n_lineas:int, desplazamiento:int)-> None:
+        """
+
+        Apunta un lote leído del fichero actual.
+
+        Args:
+            n_lineas (int): reviews del lote.
+            desplazamiento (int): byte del fichero en el que termina el lote.
+
+        Returns:
+            None
+
+        """
+        with self._cerrojo:
+            self.lineas_fichero += n_lineas
+            self.lineas_total += n_lineas
+            self.bytes_fichero = desplazamiento
+
+    # Escrituras
+    def registrar_escritura(self, destino:str, n_filas:int, segundos:float)-> None:
+        """
+
+        Apunta una escritura (executemany o insert_many) de un destino.
+
+        Args:
+            destino (str): tabla de SQL o colección de MongoDB.
+            n_filas (int): filas escritas.
+            segundos (float): latencia de la escritura.
+
+        Returns:
+            None
+
+        """
+        with self._cerrojo:
+            if destino not in self.escrituras:
+                self.escrituras[destino] = {"escrituras": 0, "filas": 0, "segundos": 0.0, "cubetas": [0] * (len(CUBETAS_LATENCIA) + 1),
+                                            "ultima": None}
+
+            medida = self.escrituras[destino]
+            medida["escrituras"] += 1
+            medida["filas"] += n_filas
+            medida["segundos"] += segundos
+            medida["cubetas"][bisect.bisect_left(CUBETAS_LATENCIA, segundos)] += 1
+            medida["ultima"] = time.monotonic()
+
+    # Colas del pipeline
+    def registrar_colas(self, colas:Dict[str, queue.Queue])-> None:
+        """
+
+        Apunta las colas del pipeline, cuyo tamaño se lee cada vez que se publican las métricas. Con un diccionario vacío se dejan de
+        seguir.
+
+        Args:
+            colas (dict): {nombre: cola}.
+
+        Returns:
+            None
+
+        """
+        with self._cerrojo:
+            self.colas = dict(colas)
+
+    # Lectura de las métricas
+    def _eta(self, ahora:float)-> tuple:
+        segundos_fichero = ahora - self.inicio_fichero if self.inicio_fichero is not None else 0.0
+        bytes_leidos = self.bytes_fichero - self._bytes_inicio_fichero if self.fichero is not None else 0
+
+        if not self.tamano_fichero or not bytes_leidos or not segundos_fichero:
+            return None, None
+
+        velocidad = bytes_leidos / segundos_fichero
+        eta_fichero = (self.tamano_fichero - self.bytes_fichero) / velocidad
+
+        # Para la carga completa hace falta el tamaño de todos los ficheros que quedan
+        pendientes = [fichero for fichero in self.tamanos_ficheros if fichero != self.fichero and fichero not in self.ficheros_completados]
+        tamanos_pendientes = [self.tamanos_ficheros[fichero] for fichero in pendientes]
+
+        eta_total = None if None in tamanos_pendientes else eta_fichero + sum(tamanos_pendientes) / velocidad
+
+        return eta_fichero, eta_total
+
+    def instantanea(self)-> dict:
+        """
+
+        Devuelve una copia de todas las métricas en este momento.
+
+        Returns:
+            dict: métricas, listas para guardarse como JSON.
+
+        """
+        with self._cerrojo:
+            ahora = time.monotonic()
+            eta_fichero, eta_total = self._eta(ahora=ahora)
+            segundos_fichero = ahora - self.inicio_fichero if self.inicio_fichero is not None else 0.0
+
+            return {
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+                "segundos": round(ahora - self.inicio, 1),
+                "fichero": self.fichero,
+                "ficheros_completados": len(self.ficheros_completados),
+                "ficheros_totales": len(self.tamanos_ficheros) or None,
+                "lineas_fichero": self.lineas_fichero,
+                "lineas_total": self.lineas_total,
+                "lineas_por_segundo": round(self.lineas_fichero / segundos_fichero, 1) if segundos_fichero else None,
+                "bytes_leidos": self.bytes_fichero,
+                "bytes_fichero": self.tamano_fichero,
+                "progreso_fichero": round(self.bytes_fichero / self.tamano_fichero, 4) if self.tamano_fichero else None,
+                "eta_fichero_segundos": round(eta_fichero, 1) if eta_fichero is not None else None,
+                "eta_total_segundos": round(eta_total, 1) if eta_total is not None else None,
+                "escrituras": {destino: {"escrituras": medida["escrituras"], "filas": medida["filas"], "segundos": round(medida["segundos"], 4),
+                                         "cubetas": list(medida["cubetas"]),
+                                         "segundos_sin_escribir": round(ahora - medida["ultima"], 1)}
+                               for destino, medida in self.escrituras.items()},
+                "colas": {nombre: cola.qsize() for nombre, cola in self.colas.items()}
+            }
+
+############################################################################################################################################
+
+# FORMATO PROMETHEUS
+def formatear_prometheus(instantanea:dict)-> str:
+    """
+
+    Escribe una instantánea de las métricas en el formato de texto de Prometheus.
+
+    Args:
+        instantanea (dict): métricas devueltas por MetricasIngesta.instantanea.
+
+    Returns:
+        str: métricas en formato Prometheus.
+
+    """
+    lineas = []
+
+    def metrica(nombre:str, tipo:str, valores:list)-> None:
+        lineas.append(f"# TYPE {PREFIJO_METRICAS}_{nombre} {tipo}")
+        for etiquetas, valor in valores:
+            if valor is not None:
+                lineas.append(f"{PREFIJO_METRICAS}_{nombre}{etiquetas} {valor}")
+
+    metrica("lineas_leidas_total", "counter", [("", instantanea["lineas_total"])])
+    metrica("lineas_fichero", "gauge", [("", instantanea["lineas_fichero"])])
+    metrica("bytes_leidos_fichero", "gauge", [("", instantanea["bytes_leidos"])])
+    metrica("bytes_tamano_fichero", "gauge", [("", instantanea["bytes_fichero"])])
+    metrica("ficheros_completados", "gauge", [("", instantanea["ficheros_completados"])])
+    metrica("eta_fichero_segundos", "gauge", [("", instantanea["eta_fichero_segundos"])])
+    metrica("eta_total_segundos", "gauge", [("", instantanea["eta_total_segundos"])])
+
+    escrituras = instantanea["escrituras"]
+    metrica("escrituras_total", "counter", [(f"{{destino=\"{destino}\"}}", medida["escrituras"]) for destino, medida in escrituras.items()])
+    metrica("filas_escritas_total", "counter", [(f"{{destino=\"{destino}\"}}", medida["filas"]) for destino, medida in escrituras.items()])
+    metrica("segundos_sin_escribir", "gauge", [(f"{{destino=\"{destino}\"}}", medida["segundos_sin_escribir"])
+                                               for destino, medida in escrituras.items()])
+
+    # Histograma de latencias: las cubetas de Prometheus son acumuladas
+    lineas.append(f"# TYPE {PREFIJO_METRICAS}_latencia_escritura_segundos histogram")
+    for destino, medida in escrituras.items():
+        acumulado = 0
+        for limite, cuenta in zip(CUBETAS_LATENCIA + ["+Inf"], medida["cubetas"]):
+            acumulado += cuenta
+            lineas.append(f"{PREFIJO_METRICAS}_latencia_escritura_segundos_bucket{{destino=\"{destino}\",le=\"{limite}\"}} {acumulado}")
+        lineas.append(f"{PREFIJO_METRICAS}_latencia_escritura_segundos_sum{{destino=\"{destino}\"}} {medida['segundos']}")
+        lineas.append(f"{PREFIJO_METRICAS}_latencia_escritura_segundos_count{{destino=\"{destino}\"}} {medida['escrituras']}")
+
+    metrica("lotes_en_cola", "gauge", [(f"{{cola=\"{nombre}\"}}", tamano) for nombre, tamano in instantanea["colas"].items()])
+
+    return "\n".join(lineas) + "\n"
+
+############################################################################################################################################
+
+# REPORTADORES
+class ReportadorLogJson:
+    """
+
+    Escribe periódicamente una línea JSON con las métricas, desde un hilo aparte.
+
+    """
+    def __init__(self, metricas:MetricasIngesta, intervalo:float=INTERVALO_METRICAS_SEGUNDOS, ruta:str=RUTA_LOG_METRICAS):
+        self.metricas = metricas
+        self.intervalo = intervalo
+        self.ruta = ruta
+        self._parada = Event()
+        self._hilo = Thread(target=self._bucle, daemon=True)
+
+    def _escribir(self)-> None:
+        linea = json.dumps(self.metricas.instantanea(), ensure_ascii=False)
+
+        if self.ruta is None:
+            print(linea, flush=True)
+        else:
+            with open(self.ruta, "a", encoding="utf-8") as fichero:
+                fichero.write(linea + "\n")
+
+    def _bucle(self)-> None:
+        while not self._parada.wait(self.intervalo):
+            self._escribir()
+
+    def iniciar(self)-> None:
+        self._hilo.start()
+
+    def parar(self)-> None:
+        self._parada.set()
+        self._hilo.join()
+
+        # Última línea con las métricas finales
+        self._escribir()
+
+class ServidorMetricasPrometheus:
+    """
+
+    Sirve las métricas en formato Prometheus en http://127.0.0.1:puerto/metrics, desde un hilo aparte.
+
+    """
+    def __init__(self, metricas:MetricasIngesta, puerto:int=PUERTO_METRICAS):
+        self.metricas = metricas
+        self.puerto = puerto
+        self._servidor = None
+        self._hilo = None
+
+    def iniciar(self)-> None:
+        metricas = self.metricas
+
+        class ManejadorMetricas(BaseHTTPRequestHandler):
+
+            def do_GET(self)-> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+
+                contenido = formatear_prometheus(instantanea=metricas.instantanea()).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(contenido)))
+                self.end_headers()
+                self.wfile.write(contenido)
+
+            # No mostramos por pantalla cada petición
+            def log_message(self, *args)-> None:
+                pass
+
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", self.puerto), ManejadorMetricas)
+        self._hilo = Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+
+        print(f"\nMétricas de la carga en http://127.0.0.1:{self.puerto}/metrics")
+
+    def parar(self)-> None:
+        self._servidor.shutdown()
+        self._servidor.server_close()
+        self._hilo.join()
+
+# Reportadores disponibles, por el nombre que se usa en METRICAS_REPORTADORES
+REPORTADORES_METRICAS = {
+
+    "log_json": ReportadorLogJson,
+    "prometheus": ServidorMetricasPrometheus
+}
+
+############################################################################################################################################
+
+# CREACIÓN DE LAS MÉTRICAS A PARTIR DE LA CONFIGURACIÓN
+def iniciar_metricas(ficheros:List[str])-> tuple:
+    """
+
+    Crea las métricas de una carga y arranca los reportadores de METRICAS_REPORTADORES.
+
+    Args:
+        ficheros (list): ficheros de datos que se van a insertar.
+
+    Returns:
+        tuple: (metricas, reportadores), donde metricas es None si no hay ningún reportador configurado.
+
+    """
+    if not METRICAS_REPORTADORES:
+        return None, []
+
+    metricas = MetricasIngesta()
+    metricas.planificar_ficheros(ficheros=ficheros)
+
+    reportadores = [REPORTADORES_METRICAS[nombre](metricas=metricas) for nombre in METRICAS_REPORTADORES]
+    for reportador in reportadores:
+        reportador.iniciar()
+
+    return metricas, reportadores
+
+def parar_metricas(reportadores:list)-> None:
+    for reportador in reportadores:
+        reportador.parar()
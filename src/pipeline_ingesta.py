@@ -0,0 +1,500 @@
+"""
+Este script se empleará para insertar un fichero de datos en forma de pipeline (productor/consumidor), como alternativa a
+insertar_datos_global de load_data.py, donde un mismo hilo lee y parsea las líneas, inserta en MySQL y después inserta en MongoDB,
+de forma que mientras se espera a una base de datos la CPU y la otra base de datos están paradas.
+
+El pipeline tiene tres etapas que se ejecutan a la vez:
+
+    1. Parseo (hilo principal): genera los lotes con generar_lotes_fichero (json.loads, formateo de fechas y asignación de IDs).
+    2. Escritura en MySQL (hilo propio): inserta las filas de cada lote con executemany.
+    3. Escritura en MongoDB (hilo propio): inserta los documentos de cada lote con insert_many, en paralelo si
+       ESCRITURA_MONGO_PARALELA está activado (y sus reviews en los buckets de productos, si MODO_BUCKETS_PRODUCTOS está activado, ver
+       buckets_productos.py).
+
+Las etapas se comunican con colas acotadas (TAMANO_COLAS_PIPELINE lotes), de forma que si un escritor se queda atrás, el parseo se
+bloquea en lugar de acumular lotes en memoria (backpressure). Cada etapa lleva contadores de lotes, filas, tiempo ocupado y tiempo
+esperando, y al final se muestra un informe indicando qué etapa ha sido el cuello de botella.
+
+Como en insertar_datos_global, antes de cada commit de MySQL los documentos de MongoDB tienen que estar insertados hasta el mismo lote:
+la etapa de MySQL pide a la de MongoDB que vuelque lo pendiente y espera su confirmación (AvanceMongo) antes de hacer commit. Si alguna
+etapa falla, los documentos que MongoDB ya había insertado de lotes sin commit en MySQL se borran (descartar_documentos_no_confirmados,
+ver puntos_control.py), para no dejar documentos huérfanos.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+import queue
+import time
+from threading import Thread, Event, Condition
+from pymongo.database import Database
+from pymysql.connections import Connection
+import load_data
+from load_data import generar_lotes_fichero, QUERIES_TABLAS_LOTE
+from politica_volcado import crear_politica_commits, crear_politica_mongo
+from escritura_adaptativa import EscritorSql
+from escritura_mongo_paralela import crear_escritor_mongo
+from buckets_productos import EscritorBuckets
+from metricas_ingesta import MetricasIngesta
+from puntos_control import descartar_documentos_no_confirmados
+
+############################################################################################################################################
+
+# Marca que se envía por las colas para indicar a los escritores que no hay más lotes
+FIN_PIPELINE = None
+
+# Tiempo máximo (en segundos) que se espera en una cola antes de volver a comprobar si otra etapa ha fallado
+TIMEOUT_COLA = 0.5
+
+############################################################################################################################################
+
+# FUNCIONES AUXILIARES
+def crear_estadisticas_etapa()-> dict:
+    """
+
+    Crea el diccionario de contadores de una etapa del pipeline.
+
+    Args:
+        None
+
+    Returns:
+        dict: contadores de la etapa (lotes, filas, tiempo_ocupado y tiempo_espera, en segundos).
+
+    """
+    return {"lotes": 0, "filas": 0, "tiempo_ocupado": 0.0, "tiempo_espera": 0.0}
+
+def poner_en_cola(cola:queue.Queue, elemento, parada:Event, estadisticas:dict)-> bool:
+    """
+
+    Mete un elemento en una cola acotada, esperando si está llena. La espera se corta si otra etapa del pipeline ha fallado.
+
+    Args:
+        cola (queue.Queue): cola de destino.
+        elemento: lote (o FIN_PIPELINE) a meter en la cola.
+        parada (Event): evento que se activa cuando alguna etapa falla.
+        estadisticas (dict): contadores de la etapa que mete el elemento (se suma el tiempo de espera).
+
+    Returns:
+        bool: True si el elemento se ha metido en la cola, False si se ha parado el pipeline.
+
+    """
+    inicio = time.perf_counter()
+
+    try:
+        while not parada.is_set():
+            try:
+                cola.put(elemento, timeout=TIMEOUT_COLA)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    finally:
+        estadisticas["tiempo_espera"] += time.perf_counter() - inicio
+
+def sacar_de_cola(cola:queue.Queue, parada:Event, estadisticas:dict):
+    """
+
+    Saca un elemento de una cola, esperando si está vacía. La espera se corta si otra etapa del pipeline ha fallado.
+
+    Args:
+        cola (queue.Queue): cola de origen.
+        parada (Event): evento que se activa cuando alguna etapa falla.
+        estadisticas (dict): contadores de la etapa que saca el elemento (se suma el tiempo de espera).
+
+    Returns:
+        El lote sacado de la cola, o FIN_PIPELINE si no hay más lotes o se ha parado el pipeline.
+
+    """
+    inicio = time.perf_counter()
+
+    try:
+        while not parada.is_set():
+            try:
+                return cola.get(timeout=TIMEOUT_COLA)
+            except queue.Empty:
+                continue
+        return FIN_PIPELINE
+
+    finally:
+        estadisticas["tiempo_espera"] += time.perf_counter() - inicio
+
+############################################################################################################################################
+
+# SINCRONIZACIÓN ENTRE LAS ETAPAS DE ESCRITURA
+class AvanceMongo:
+    """
+
+    Lleva la cuenta de los lotes que la etapa de MongoDB ya ha insertado, para que la etapa de MySQL no haga commit de un lote cuyos
+    documentos aún no están en MongoDB. Los lotes se cuentan en el orden en que llegan por las colas (el mismo en las dos etapas).
+
+    Attributes:
+        lotes_escritos (int): número de lotes cuyos documentos ya se han insertado en MongoDB.
+        lotes_solicitados (int): número de lotes hasta el que la etapa de MySQL ha pedido que se inserte.
+
+    """
+    def __init__(self):
+        self._condicion = Condition()
+        self.lotes_escritos = 0
+        self.lotes_solicitados = 0
+
+    def solicitar(self, n_lotes:int)-> None:
+        """
+
+        Pide a la etapa de MongoDB que inserte los documentos pendientes hasta el lote n_lotes (sin esperar a su política).
+
+        Args:
+            n_lotes (int): número de lotes que tienen que estar insertados.
+
+        """
+        with self._condicion:
+            self.lotes_solicitados = max(self.lotes_solicitados, n_lotes)
+
+    def toca_escribir(self, n_lotes_recibidos:int)-> bool:
+        """
+
+        Indica si la etapa de MySQL está esperando a algún lote de los que la etapa de MongoDB ya ha recibido.
+
+        Args:
+            n_lotes_recibidos (int): número de lotes que ha recibido la etapa de MongoDB.
+
+        Returns:
+            bool: True si hay que insertar ya los documentos pendientes.
+
+        """
+        with self._condicion:
+            return self.lotes_escritos < self.lotes_solicitados <= n_lotes_recibidos
+
+    def registrar_escritura(self, n_lotes:int)-> None:
+        """
+
+        Apunta que los documentos de los n_lotes primeros lotes ya están insertados y despierta a la etapa de MySQL.
+
+        Args:
+            n_lotes (int): número de lotes insertados.
+
+        """
+        with self._condicion:
+            self.lotes_escritos = n_lotes
+            self._condicion.notify_all()
+
+    def esperar(self, n_lotes:int, parada:Event)-> bool:
+        """
+
+        Espera a que los documentos de los n_lotes primeros lotes estén insertados. La espera se corta si alguna etapa ha fallado.
+
+        Args:
+            n_lotes (int): número de lotes que tienen que estar insertados.
+            parada (Event): evento que se activa cuando alguna etapa falla.
+
+        Returns:
+            bool: True si ya están insertados, False si se ha parado el pipeline.
+
+        """
+        with self._condicion:
+            while self.lotes_escritos < n_lotes and not parada.is_set():
+                self._condicion.wait(timeout=TIMEOUT_COLA)
+            return self.lotes_escritos >= n_lotes
+
+############################################################################################################################################
+
+# ETAPAS DE ESCRITURA
+def etapa_escritura_sql(cola:queue.Queue, sql_conexion:Connection, parada:Event, estadisticas:dict, errores:list, batch_size:int,
+                        avance_mongo:AvanceMongo, confirmado:dict, metricas:MetricasIngesta=None)-> None:
+    """
+
+    Etapa que inserta en MySQL los lotes que llegan por la cola, hasta recibir FIN_PIPELINE. Hace commit según la política de commits
+    (ver politica_volcado.py) y al terminar, siempre después de que la etapa de MongoDB haya insertado los documentos hasta el mismo
+    lote; si falla, hace rollback de lo que no se había confirmado, guarda el error y para el resto del pipeline.
+
+    Args:
+        cola (queue.Queue): cola de lotes de la etapa.
+        sql_conexion (pymysql.connections.Connection): conexión a MySQL (solo la usa este hilo).
+        parada (Event): evento que se activa cuando alguna etapa falla.
+        estadisticas (dict): contadores de la etapa.
+        errores (list): lista donde se guarda el error si la etapa falla.
+        batch_size (int): tamaño inicial de las escrituras.
+        avance_mongo (AvanceMongo): lotes ya insertados por la etapa de MongoDB.
+        confirmado (dict): {"id_review": primer id_review sin commit en MySQL}, que se actualiza tras cada commit.
+        metricas (MetricasIngesta, optional): métricas en directo de la carga. Defaults to None.
+
+    Returns:
+        None
+
+    """
+    cursor = sql_conexion.cursor()
+    politica_commits = crear_politica_commits()
+    n_lotes, id_review_siguiente = 0, confirmado["id_review"]
+
+    try:
+        # Las filas se escriben con un tamaño de escritura propio para cada tabla (ver escritura_adaptativa.py)
+        escritor_sql = EscritorSql(cursor=cursor, queries=QUERIES_TABLAS_LOTE, batch_size=batch_size, metricas=metricas)
+
+        while True:
+            lote = sacar_de_cola(cola=cola, parada=parada, estadisticas=estadisticas)
+
+            if lote is FIN_PIPELINE:
+                break
+
+            inicio = time.perf_counter()
+            escritor_sql.anadir_lote(lote=lote)
+            n_lotes += 1
+            id_review_siguiente += len(lote["review"])
+
+            if politica_commits.registrar_lote(desplazamiento=lote["desplazamiento"]):
+                escritor_sql.volcar()
+
+                # El commit espera a que los documentos de los mismos lotes estén en MongoDB (si MongoDB falla, no se confirma nada)
+                avance_mongo.solicitar(n_lotes=n_lotes)
+                if not avance_mongo.esperar(n_lotes=n_lotes, parada=parada):
+                    break
+
+                sql_conexion.commit()
+                confirmado["id_review"] = id_review_siguiente
+                politica_commits.reiniciar()
+
+            estadisticas["tiempo_ocupado"] += time.perf_counter() - inicio
+
+            estadisticas["lotes"] += 1
+            estadisticas["filas"] += len(lote["review"])
+
+        # Solo guardamos los cambios si el resto del pipeline ha terminado bien (y MongoDB ha insertado todos los documentos)
+        if not parada.is_set():
+            escritor_sql.volcar()
+            avance_mongo.solicitar(n_lotes=n_lotes)
+
+        if not parada.is_set() and avance_mongo.esperar(n_lotes=n_lotes, parada=parada):
+            sql_conexion.commit()
+            confirmado["id_review"] = id_review_siguiente
+        else:
+            sql_conexion.rollback()
+
+    except Exception as error:
+        errores.append(error)
+        parada.set()
+        sql_conexion.rollback()
+
+    finally:
+        cursor.close()
+
+def etapa_escritura_mongo(cola:queue.Queue, mongodb_database:Database, parada:Event, estadisticas:dict, errores:list, batch_size:int,
+                          avance_mongo:AvanceMongo, metricas:MetricasIngesta=None)-> None:
+    """
+
+    Etapa que inserta en MongoDB los documentos de los lotes que llegan por la cola, hasta recibir FIN_PIPELINE, acumulándolos según la
+    política de inserciones de MongoDB (ver politica_volcado.py) o hasta que la etapa de MySQL los pida para hacer commit. Si falla,
+    guarda el error y para el resto del pipeline.
+
+    Args:
+        cola (queue.Queue): cola de lotes de la etapa.
+        mongodb_database (Database): base de datos de MongoDB.
+        parada (Event): evento que se activa cuando alguna etapa falla.
+        estadisticas (dict): contadores de la etapa.
+        errores (list): lista donde se guarda el error si la etapa falla.
+        batch_size (int): tamaño inicial de las escrituras.
+        avance_mongo (AvanceMongo): lotes ya insertados, que espera la etapa de MySQL antes de cada commit.
+        metricas (MetricasIngesta, optional): métricas en directo de la carga. Defaults to None.
+
+    Returns:
+        None
+
+    """
+    mongo_db_collection = mongodb_database[COLECCION_MONGODB]
+    politica_mongo = crear_politica_mongo()
+    documentos_pendientes, filas_pendientes = [], []
+    # En paralelo si ESCRITURA_MONGO_PARALELA está activado (ver escritura_mongo_paralela.py)
+    escritor_mongo = crear_escritor_mongo(coleccion=mongo_db_collection, batch_size=batch_size, metricas=metricas)
+    escritor_buckets = EscritorBuckets(mongodb_database=mongodb_database, metricas=metricas) if MODO_BUCKETS_PRODUCTOS else None
+    n_lotes = 0
+
+    try:
+        while True:
+            lote = sacar_de_cola(cola=cola, parada=parada, estadisticas=estadisticas)
+
+            if lote is FIN_PIPELINE:
+                break
+
+            inicio = time.perf_counter()
+            documentos_pendientes.extend(lote["documentos"])
+            n_lotes += 1
+
+            if escritor_buckets is not None:
+                filas_pendientes.extend(lote["review"])
+                tipo_producto = lote["tipo_producto"]
+
+            # Se inserta según la política, o antes si la etapa de MySQL está esperando a alguno de estos lotes para hacer commit
+            if politica_mongo.registrar_lote(desplazamiento=lote["desplazamiento"]) or avance_mongo.toca_escribir(n_lotes_recibidos=n_lotes):
+                escritor_mongo.escribir(documentos=documentos_pendientes)
+
+                if escritor_buckets is not None:
+                    escritor_buckets.escribir(filas_review=filas_pendientes, documentos=documentos_pendientes, tipo_producto=tipo_producto)
+                    filas_pendientes.clear()
+
+                documentos_pendientes.clear()
+                politica_mongo.reiniciar()
+
+                # Los lotes solo cuentan como insertados cuando han terminado las escrituras que siguen en vuelo
+                escritor_mongo.esperar()
+                avance_mongo.registrar_escritura(n_lotes=n_lotes)
+
+            estadisticas["tiempo_ocupado"] += time.perf_counter() - inicio
+
+            estadisticas["lotes"] += 1
+            estadisticas["filas"] += len(lote["documentos"])
+
+        # Documentos que quedaban pendientes (solo si el resto del pipeline ha terminado bien)
+        if documentos_pendientes and not parada.is_set():
+            inicio = time.perf_counter()
+            escritor_mongo.escribir(documentos=documentos_pendientes)
+
+            if escritor_buckets is not None:
+                escritor_buckets.escribir(filas_review=filas_pendientes, documentos=documentos_pendientes, tipo_producto=tipo_producto)
+
+            estadisticas["tiempo_ocupado"] += time.perf_counter() - inicio
+
+        escritor_mongo.cerrar()
+
+        if not parada.is_set():
+            avance_mongo.registrar_escritura(n_lotes=n_lotes)
+
+    except Exception as error:
+        errores.append(error)
+        parada.set()
+
+        # Paramos también los hilos del escritor (el error de la etapa ya está guardado)
+        try:
+            escritor_mongo.cerrar()
+        except Exception:
+            pass
+
+############################################################################################################################################
+
+# INFORME DE RENDIMIENTO DEL PIPELINE
+def mostrar_informe_pipeline(file_in:str, estadisticas:dict, tiempo_total:float)-> None:
+    """
+
+    Muestra por pantalla los contadores de cada etapa y cuál ha sido el cuello de botella (la etapa con más tiempo ocupado).
+
+    Args:
+        file_in (str): ruta del fichero insertado.
+        estadisticas (dict): diccionario {nombre_etapa: contadores}.
+        tiempo_total (float): tiempo total del pipeline, en segundos.
+
+    Returns:
+        None
+
+    """
+    print(f"\nRendimiento del pipeline para el fichero \"{file_in}\" ({tiempo_total:.1f} s):")
+
+    for nombre_etapa, contadores in estadisticas.items():
+        filas_por_segundo = contadores["filas"] / contadores["tiempo_ocupado"] if contadores["tiempo_ocupado"] else 0.0
+
+        print(f"    - {nombre_etapa:<8} {contadores['lotes']:>6} lotes  {contadores['filas']:>10} filas  "
+              f"ocupado {contadores['tiempo_ocupado']:>7.1f} s  esperando {contadores['tiempo_espera']:>7.1f} s  "
+              f"({filas_por_segundo:,.0f} filas/s)")
+
+    cuello_botella = max(estadisticas, key=lambda nombre_etapa: estadisticas[nombre_etapa]["tiempo_ocupado"])
+    print(f"    Cuello de botella: {cuello_botella}")
+
+############################################################################################################################################
+
+# INSERCIÓN DE UN FICHERO CON EL PIPELINE
+def insertar_datos_pipeline(file_in:str, sql_conexion:Connection, mongodb_database:Database, batch_size:int, tamano_colas:int,
+                            metricas:MetricasIngesta=None)-> dict:
+    """
+
+    Inserta un fichero de datos en MySQL y MongoDB con el pipeline de tres etapas. Las filas insertadas son las mismas que con
+    insertar_datos_global, ya que los lotes se generan igual y cada escritor los inserta en el mismo orden. Si alguna etapa falla, se
+    borran de MongoDB los documentos de los lotes que no llegaron a tener commit en MySQL.
+
+    Args:
+        file_in (str): ruta del fichero de entrada de datos.
+        sql_conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL.
+        mongodb_database (Database): base de datos de MongoDB.
+        batch_size (int): tamaño de un lote de datos.
+        tamano_colas (int): número máximo de lotes pendientes en cada cola.
+        metricas (MetricasIngesta, optional): métricas en directo de la carga (ver metricas_ingesta.py). Defaults to None.
+
+    Returns:
+        dict: contadores de cada etapa {"parseo": ..., "mysql": ..., "mongodb": ...}.
+
+    Raises:
+        Exception: el primer error que se haya producido en cualquiera de las etapas.
+
+    """
+    estadisticas = {"parseo": crear_estadisticas_etapa(), "mysql": crear_estadisticas_etapa(), "mongodb": crear_estadisticas_etapa()}
+
+    cola_sql = queue.Queue(maxsize=tamano_colas)
+    cola_mongo = queue.Queue(maxsize=tamano_colas)
+    parada = Event()
+    errores = []
+
+    # Primer id_review del fichero (generar_lotes_fichero continúa el contador global), que avanza con cada commit de MySQL
+    avance_mongo = AvanceMongo()
+    confirmado = {"id_review": load_data.id_review}
+
+    hilo_sql = Thread(target=etapa_escritura_sql, args=(cola_sql, sql_conexion, parada, estadisticas["mysql"], errores, batch_size,
+                                                         avance_mongo, confirmado, metricas), daemon=True)
+    hilo_mongo = Thread(target=etapa_escritura_mongo, args=(cola_mongo, mongodb_database, parada, estadisticas["mongodb"], errores,
+                                                             batch_size, avance_mongo, metricas), daemon=True)
+
+    if metricas is not None:
+        metricas.iniciar_fichero(file_in=file_in)
+        metricas.registrar_colas(colas={"mysql": cola_sql, "mongodb": cola_mongo})
+
+    inicio_pipeline = time.perf_counter()
+    hilo_sql.start()
+    hilo_mongo.start()
+
+    try:
+        generador_lotes = generar_lotes_fichero(file_in=file_in, batch_size=batch_size)
+
+        while not parada.is_set():
+
+            # Parseamos el siguiente lote (medimos solo el tiempo de parseo, no el de espera en las colas)
+            inicio = time.perf_counter()
+            lote = next(generador_lotes, FIN_PIPELINE)
+            estadisticas["parseo"]["tiempo_ocupado"] += time.perf_counter() - inicio
+
+            if lote is FIN_PIPELINE:
+                break
+
+            estadisticas["parseo"]["lotes"] += 1
+            estadisticas["parseo"]["filas"] += len(lote["review"])
+
+            if metricas is not None:
+                metricas.registrar_lote_leido(n_lineas=len(lote["review"]), desplazamiento=lote["desplazamiento"])
+
+            # El mismo lote se envía a los dos escritores
+            poner_en_cola(cola=cola_sql, elemento=lote, parada=parada, estadisticas=estadisticas["parseo"])
+            poner_en_cola(cola=cola_mongo, elemento=lote, parada=parada, estadisticas=estadisticas["parseo"])
+
+    except Exception as error:
+        errores.append(error)
+        parada.set()
+
+    # Avisamos a los escritores de que no hay más lotes y esperamos a que terminen
+    poner_en_cola(cola=cola_sql, elemento=FIN_PIPELINE, parada=parada, estadisticas=estadisticas["parseo"])
+    poner_en_cola(cola=cola_mongo, elemento=FIN_PIPELINE, parada=parada, estadisticas=estadisticas["parseo"])
+    hilo_sql.join()
+    hilo_mongo.join()
+
+    if metricas is not None:
+        metricas.registrar_colas(colas={})
+        if not errores:
+            metricas.terminar_fichero()
+
+    mostrar_informe_pipeline(file_in=file_in, estadisticas=estadisticas, tiempo_total=time.perf_counter() - inicio_pipeline)
+
+    if errores:
+        # Los documentos que MongoDB ya había insertado de lotes sin commit en MySQL se borran, para no dejar huérfanos
+        descartar_documentos_no_confirmados(mongodb_database=mongodb_database, id_review=confirmado["id_review"])
+        raise errores[0]
+
+    return estadisticas
@@ -0,0 +1,121 @@
+"""
+Este script se empleará para decidir cada cuánto se hace commit en MySQL y cada cuánto se insertan en MongoDB los documentos
+acumulados, durante la inserción de los ficheros de datos (load_data.py, inserta_dataset.py y pipeline_ingesta.py).
+
+Hacer un único commit al final de cada fichero convierte una categoría de millones de reviews en una sola transacción enorme: el
+undo log de InnoDB crece sin límite, los bloqueos se mantienen durante toda la carga (mientras el menú de visualización consulta la
+misma base de datos) y una caída obliga a deshacer el fichero entero. Con una PoliticaVolcado se confirma cada cierto número de lotes,
+cada cierto tiempo o cada cierto volumen de datos leídos (lo que ocurra antes):
+
+    - COMMIT_CADA_LOTES, COMMIT_CADA_SEGUNDOS, COMMIT_CADA_MEGABYTES: commits de MySQL.
+    - MONGO_INSERCION_CADA_LOTES, MONGO_INSERCION_CADA_SEGUNDOS, MONGO_INSERCION_CADA_MEGABYTES: inserciones (insert_many) de
+      MongoDB, que además se hacen siempre justo antes de cada commit de MySQL, para que lo confirmado en las dos bases de datos
+      llegue siempre hasta la misma review.
+
+Un criterio a None no se usa. Si los tres criterios de una política son None, solo se vuelca al final del fichero.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+import time
+
+############################################################################################################################################
+
+class PoliticaVolcado:
+    """
+
+    Lleva la cuenta de los lotes, el tiempo y los bytes acumulados desde el último volcado (commit o inserción) e indica cuándo toca
+    el siguiente.
+
+    Attributes:
+        cada_lotes (int): número de lotes entre volcados (None si no se usa).
+        cada_segundos (float): segundos entre volcados (None si no se usa).
+        cada_bytes (int): bytes leídos del fichero entre volcados (None si no se usa).
+
+    """
+    def __init__(self, cada_lotes:int=None, cada_segundos:float=None, cada_bytes:int=None, desplazamiento_inicial:int=0):
+        self.cada_lotes = cada_lotes
+        self.cada_segundos = cada_segundos
+        self.cada_bytes = cada_bytes
+
+        self._desplazamiento_actual = desplazamiento_inicial
+        self.reiniciar()
+
+    def reiniciar(self)-> None:
+        """
+
+        Vuelve a empezar la cuenta, justo después de un volcado.
+
+        """
+        self.lotes_pendientes = 0
+        self._inicio = time.monotonic()
+        self._desplazamiento_inicio = self._desplazamiento_actual
+
+    def registrar_lote(self, desplazamiento:int)-> bool:
+        """
+
+        Apunta un lote más y devuelve si ya toca volcar.
+
+        Args:
+            desplazamiento (int): byte del fichero en el que termina el lote (lote["desplazamiento"]).
+
+        Returns:
+            bool: True si se ha llegado a alguno de los límites de la política.
+
+        """
+        self.lotes_pendientes += 1
+        self._desplazamiento_actual = desplazamiento
+
+        if self.cada_lotes is not None and self.lotes_pendientes >= self.cada_lotes:
+            return True
+
+        if self.cada_segundos is not None and time.monotonic() - self._inicio >= self.cada_segundos:
+            return True
+
+        if self.cada_bytes is not None and self._desplazamiento_actual - self._desplazamiento_inicio >= self.cada_bytes:
+            return True
+
+        return False
+
+############################################################################################################################################
+
+# CREACIÓN DE LAS POLÍTICAS A PARTIR DE LA CONFIGURACIÓN
+def megabytes_a_bytes(megabytes:float)-> int:
+    return None if megabytes is None else int(megabytes * 1024 * 1024)
+
+def crear_politica_commits(desplazamiento_inicial:int=0)-> PoliticaVolcado:
+    """
+
+    Crea la política de commits de MySQL de configuracion.py.
+
+    Args:
+        desplazamiento_inicial (int, optional): byte del fichero desde el que se empieza a leer. Defaults to 0.
+
+    Returns:
+        PoliticaVolcado: política de commits.
+
+    """
+    return PoliticaVolcado(cada_lotes=COMMIT_CADA_LOTES, cada_segundos=COMMIT_CADA_SEGUNDOS,
+                           cada_bytes=megabytes_a_bytes(COMMIT_CADA_MEGABYTES), desplazamiento_inicial=desplazamiento_inicial)
+
+def crear_politica_mongo(desplazamiento_inicial:int=0)-> PoliticaVolcado:
+    """
+
+    Crea la política de inserciones en MongoDB de configuracion.py.
+
+    Args:
+        desplazamiento_inicial (int, optional): byte del fichero desde el que se empieza a leer. Defaults to 0.
+
+    Returns:
+        PoliticaVolcado: política de inserciones.
+
+    """
+    return PoliticaVolcado(cada_lotes=MONGO_INSERCION_CADA_LOTES, cada_segundos=MONGO_INSERCION_CADA_SEGUNDOS,
+                           cada_bytes=megabytes_a_bytes(MONGO_INSERCION_CADA_MEGABYTES), desplazamiento_inicial=desplazamiento_inicial)
@@ -0,0 +1,220 @@
+"""
+Este script se empleará para guardar puntos de control durante la inserción de los ficheros de datos (load_data.py e
+inserta_dataset.py), de forma que si la carga se interrumpe (un fallo de red, de la base de datos o del propio equipo) se pueda
+reanudar desde el último lote confirmado en lugar de volver a empezar desde cero.
+
+Con GUARDAR_PUNTOS_CONTROL activado, tras cada commit en MySQL (según la política de commits, ver politica_volcado.py; antes de cada
+commit se insertan también los documentos pendientes en MongoDB) y, solo entonces, se guarda el punto de control. En inserta_dataset.py
+se hace commit tras cada lote. Para cada fichero se guarda:
+
+    - "desplazamiento": byte del fichero hasta el que se han confirmado las reviews (el siguiente lote empieza ahí).
+    - "contadores": siguiente id_review y siguientes identificadores de personas, productos y tipos de producto.
+    - "completado": si el fichero ya se ha insertado entero.
+
+El fichero del punto de control se escribe de forma atómica (fichero temporal, fsync y os.replace), así que nunca queda a medias.
+
+Al reanudar (--resume), los documentos de MongoDB con _id mayor o igual que el id_review guardado se borran, porque pueden venir de un
+lote que se insertó en MongoDB pero cuyo commit en MySQL no llegó a hacerse. Si el commit sí se hizo pero no se llegó a guardar el
+punto de control, el lote se vuelve a insertar con los mismos identificadores, y el ON DUPLICATE KEY UPDATE deja las filas igual.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+import argparse
+import json
+import os
+import tempfile
+from pymongo.database import Database
+from buckets_productos import descartar_reviews_buckets
+
+############################################################################################################################################
+
+# LECTURA DE LA OPCIÓN --resume DE LA LÍNEA DE COMANDOS
+def leer_opcion_reanudar(descripcion:str)-> bool:
+    """
+
+    Lee los argumentos de la línea de comandos de un script de inserción.
+
+    Args:
+        descripcion (str): descripción del script, que se muestra con --help.
+
+    Returns:
+        bool: True si se ha pasado --resume.
+
+    """
+    parser = argparse.ArgumentParser(description=descripcion)
+    parser.add_argument("--resume", action="store_true", help="reanuda la inserción desde el último punto de control guardado")
+
+    return parser.parse_args().resume
+
+############################################################################################################################################
+
+# LECTURA Y ESCRITURA DE LOS PUNTOS DE CONTROL
+def ruta_punto_control(nombre_proceso:str)-> str:
+    """
+
+    Devuelve la ruta del fichero de punto de control de un proceso de inserción.
+
+    Args:
+        nombre_proceso (str): nombre del proceso ("load_data" o "inserta_dataset").
+
+    Returns:
+        str: ruta del fichero JSON dentro de CARPETA_PUNTOS_CONTROL.
+
+    """
+    return os.path.join(CARPETA_PUNTOS_CONTROL, f"{NOMBRE_BASE_DATOS_SQL}_{nombre_proceso}.json")
+
+def crear_punto_control(nombre_proceso:str)-> dict:
+    """
+
+    Crea un punto de control vacío (todavía no se guarda en disco).
+
+    Args:
+        nombre_proceso (str): nombre del proceso ("load_data" o "inserta_dataset").
+
+    Returns:
+        dict: punto de control con las claves "ruta", "ultimo_fichero" y "ficheros".
+
+    """
+    return {"ruta": ruta_punto_control(nombre_proceso=nombre_proceso), "ultimo_fichero": None, "ficheros": {}}
+
+def cargar_punto_control(nombre_proceso:str)-> dict:
+    """
+
+    Lee el último punto de control guardado de un proceso de inserción.
+
+    Args:
+        nombre_proceso (str): nombre del proceso ("load_data" o "inserta_dataset").
+
+    Returns:
+        dict: el punto de control, o None si no hay ninguno guardado.
+
+    """
+    ruta = ruta_punto_control(nombre_proceso=nombre_proceso)
+
+    if not os.path.exists(ruta):
+        return None
+
+    with open(ruta, "r", encoding="utf-8") as fichero:
+        punto_control = json.load(fichero)
+
+    punto_control["ruta"] = ruta
+
+    return punto_control
+
+def guardar_punto_control(punto_control:dict)-> None:
+    """
+
+    Guarda un punto de control en disco de forma atómica y duradera: se escribe en un fichero temporal de la misma carpeta, se fuerza
+    su escritura en disco (fsync) y se renombra sobre el anterior con os.replace, que es atómico.
+
+    Args:
+        punto_control (dict): punto de control (ver crear_punto_control).
+
+    Returns:
+        None
+
+    """
+    carpeta = os.path.dirname(punto_control["ruta"]) or "."
+    os.makedirs(carpeta, exist_ok=True)
+
+    descriptor, ruta_temporal = tempfile.mkstemp(prefix=".punto_control_", suffix=".json", dir=carpeta)
+
+    try:
+        with os.fdopen(descriptor, "w", encoding="utf-8") as fichero:
+            json.dump({clave: valor for clave, valor in punto_control.items() if clave != "ruta"}, fichero, indent=4)
+            fichero.flush()
+            os.fsync(fichero.fileno())
+
+        os.replace(ruta_temporal, punto_control["ruta"])
+
+    except BaseException:
+        if os.path.exists(ruta_temporal):
+            os.remove(ruta_temporal)
+        raise
+
+    # El renombrado tampoco es duradero hasta que se escribe la carpeta (en Windows no se puede abrir una carpeta)
+    if hasattr(os, "O_DIRECTORY"):
+        descriptor_carpeta = os.open(carpeta, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(descriptor_carpeta)
+        finally:
+            os.close(descriptor_carpeta)
+
+def registrar_avance_fichero(punto_control:dict, fichero:str, desplazamiento:int, contadores:dict, completado:bool=False)-> None:
+    """
+
+    Actualiza el estado de un fichero en el punto de control y lo guarda. Solo se debe llamar justo después de un commit en MySQL.
+
+    Args:
+        punto_control (dict): punto de control (ver crear_punto_control).
+        fichero (str): ruta del fichero de datos.
+        desplazamiento (int): byte del fichero hasta el que están confirmadas las reviews.
+        contadores (dict): siguientes identificadores {"id_review", "contador_persona", "contador_producto", "contador_tipo_producto"}.
+        completado (bool, optional): si el fichero ya se ha insertado entero. Defaults to False.
+
+    Returns:
+        None
+
+    """
+    punto_control["ficheros"][fichero] = {"desplazamiento": desplazamiento, "contadores": dict(contadores), "completado": completado}
+    punto_control["ultimo_fichero"] = fichero
+
+    guardar_punto_control(punto_control=punto_control)
+
+def borrar_punto_control(punto_control:dict)-> None:
+    """
+
+    Borra el fichero de un punto de control, una vez terminada la inserción de todos los ficheros.
+
+    Args:
+        punto_control (dict): punto de control (ver crear_punto_control).
+
+    Returns:
+        None
+
+    """
+    if os.path.exists(punto_control["ruta"]):
+        os.remove(punto_control["ruta"])
+
+############################################################################################################################################
+
+# LIMPIEZA DE LOS DOCUMENTOS DE MONGODB DE UN LOTE NO CONFIRMADO
+def descartar_documentos_no_confirmados(mongodb_database:Database, id_review:int, id_review_fin:int=None)-> int:
+    """
+
+    Borra los documentos de MongoDB con _id mayor o igual que id_review (y menor que id_review_fin, si se pasa), que pertenecen a lotes
+    sin commit en MySQL (y sus reviews de los buckets de productos, si MODO_BUCKETS_PRODUCTOS está activado).
+
+    Args:
+        mongodb_database (Database): base de datos de MongoDB.
+        id_review (int): primer id_review no confirmado.
+        id_review_fin (int, optional): primer id_review fuera del bloque reservado por este proceso, cuando puede haber otras 
+            inserciones a la vez (ver secuencias_ids.py). Defaults to None.
+
+    Returns:
+        int: número de documentos borrados.
+
+    """
+    filtro_id = {"$gte": id_review}
+
+    if id_review_fin is not None:
+        filtro_id["$lt"] = id_review_fin
+
+    resultado = mongodb_database[COLECCION_MONGODB].delete_many({"_id": filtro_id})
+
+    # Las mismas reviews se quitan de los buckets de productos (ver buckets_productos.py)
+    if MODO_BUCKETS_PRODUCTOS:
+        descartar_reviews_buckets(mongodb_database=mongodb_database, id_review=id_review, id_review_fin=id_review_fin)
+
+    if resultado.deleted_count:
+        print(f"\nSe han descartado {resultado.deleted_count} documentos de MongoDB de un lote que no llegó a confirmarse.")
+
+    return resultado.deleted_count
@@ -0,0 +1,175 @@
+"""
+Este script se empleará para repartir los identificadores numéricos (id_review, id_persona, id_producto y tipo_producto) entre los
+procesos que insertan datos en MySQL, sin que dos inserciones que se ejecutan a la vez (por ejemplo, dos inserta_dataset.py con
+ficheros de categorías distintas) usen los mismos identificadores.
+
+En lugar de buscar el identificador más alto de cada tabla (ORDER BY ... DESC LIMIT 1) y seguir numerando en local, hay una tabla
+Secuencias_ids con el siguiente identificador libre de cada secuencia. Cada proceso reserva bloques de identificadores con una única
+sentencia:
+
+    UPDATE Secuencias_ids SET siguiente_id = LAST_INSERT_ID(siguiente_id + n) WHERE nombre_secuencia = ...
+
+que bloquea la fila de la secuencia solo durante esa sentencia, y el valor reservado se lee de LAST_INSERT_ID(), que es propio de
+cada conexión. Las reservas se hacen con una conexión aparte en modo autocommit, para que queden confirmadas al momento aunque la
+transacción de los datos siga abierta. Los identificadores de un bloque que no se lleguen a usar se pierden (quedan huecos en la
+numeración), pero nunca se repiten.
+
+Las secuencias se sincronizan con el máximo de cada tabla (sincronizar_secuencias) al terminar load_data.py y al empezar
+inserta_dataset.py, así que también funcionan con bases de datos creadas antes de que existiera la tabla.
+
+Si dos inserciones simultáneas encuentran a la vez la misma persona nueva, cada una le reserva su propio id_persona, pero solo se
+queda la fila de la primera: con el índice UNIQUE de reviewerID, la segunda actualiza esa fila y usa su id_persona en sus reviews (lo
+mismo con los productos, ver resolver_dimensiones_nuevas en inserta_dataset.py). El identificador reservado por la segunda se pierde.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+from configuracion import*
+import pymysql
+from pymysql.connections import Connection
+from typing import Tuple
+
+############################################################################################################################################
+
+# Tabla de MySQL con el siguiente identificador libre de cada secuencia
+TABLA_SECUENCIAS_SQL = "Secuencias_ids"
+
+# Secuencias de identificadores: nombre de la secuencia -> (tabla, columna) de la que sale
+SECUENCIAS_IDS = {
+
+    "id_persona": ("Personas", "id_persona"),
+    "tipo_producto": ("Tipos_producto", "tipo_producto"),
+    "id_producto": ("Productos", "id_producto"),
+    "id_review": ("Review", "id_review")
+}
+
+############################################################################################################################################
+
+# CONEXIÓN PROPIA PARA LAS RESERVAS
+def conectar_secuencias()-> Connection:
+    """
+
+    Crea una conexión a la base de datos SQL en modo autocommit, para reservar identificadores sin confirmar los datos pendientes de la
+    conexión principal.
+
+    Returns:
+        pymysql.connections.Connection: conexión con la base de datos NOMBRE_BASE_DATOS_SQL ya seleccionada.
+
+    """
+    return pymysql.connect(host="localhost", user=USER_SQL, password=PASSWORD_SQL, database=NOMBRE_BASE_DATOS_SQL, autocommit=True)
+
+# CREACIÓN Y SINCRONIZACIÓN DE LAS SECUENCIAS
+def sincronizar_secuencias(conexion:Connection)-> None:
+    """
+
+    Crea la tabla de secuencias si no existe y adelanta cada secuencia hasta el identificador más alto de su tabla más uno. Nunca la
+    hace retroceder, ya que puede haber bloques reservados por otros procesos que todavía no se han insertado.
+
+    Args:
+        conexion (pymysql.connections.Connection): Objeto de conexión activo a MySQL, con la base de datos seleccionada.
+
+    Returns:
+        None
+
+    """
+    cursor = conexion.cursor()
+
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLA_SECUENCIAS_SQL} (
+            nombre_secuencia VARCHAR(50) NOT NULL,
+            siguiente_id INT NOT NULL,
+            PRIMARY KEY (nombre_secuencia)
+        );
+    """)
+
+    for nombre_secuencia, (tabla, columna) in SECUENCIAS_IDS.items():
+        cursor.execute(f"""
+            INSERT INTO {TABLA_SECUENCIAS_SQL} (nombre_secuencia, siguiente_id)
+            SELECT %s, COALESCE(MAX({columna}), -1) + 1 FROM {tabla}
+            ON DUPLICATE KEY UPDATE siguiente_id = GREATEST(siguiente_id, VALUES(siguiente_id));
+        """, [nombre_secuencia])
+
+    conexion.commit()
+    cursor.close()
+
+# RESERVA DE UN BLOQUE DE IDENTIFICADORES
+def reservar_bloque_ids(conexion:Connection, nombre_secuencia:str, n_ids:int)-> int:
+    """
+
+    Reserva n_ids identificadores consecutivos de una secuencia, de forma atómica.
+
+    Args:
+        conexion (pymysql.connections.Connection): conexión de conectar_secuencias (en modo autocommit).
+        nombre_secuencia (str): nombre de la secuencia (clave de SECUENCIAS_IDS).
+        n_ids (int): número de identificadores a reservar.
+
+    Returns:
+        int: primer identificador del bloque. El bloque es [primer identificador, primer identificador + n_ids).
+
+    Raises:
+        KeyError: si la secuencia no existe (no se ha llamado antes a sincronizar_secuencias).
+
+    """
+    cursor = conexion.cursor()
+
+    filas_actualizadas = cursor.execute(f"""
+        UPDATE {TABLA_SECUENCIAS_SQL}
+        SET siguiente_id = LAST_INSERT_ID(siguiente_id + %s)
+        WHERE nombre_secuencia = %s;
+    """, [n_ids, nombre_secuencia])
+
+    # LAST_INSERT_ID(expresión) devuelve el nuevo valor en la propia respuesta del UPDATE, sin otra consulta
+    fin_bloque = cursor.lastrowid
+
+    conexion.commit()
+    cursor.close()
+
+    if not filas_actualizadas:
+        raise KeyError(f"La secuencia de identificadores \"{nombre_secuencia}\" no existe en la tabla {TABLA_SECUENCIAS_SQL}.")
+
+    return fin_bloque - n_ids
+
+############################################################################################################################################
+
+# ASIGNACIÓN DE IDENTIFICADORES UNO A UNO
+class AsignadorIds:
+    """
+
+    Reparte los identificadores de una secuencia de uno en uno, reservándolos de tamano_bloque en tamano_bloque. En cuanto se gasta un
+    bloque se reserva el siguiente, de forma que siempre hay un bloque reservado: así, el bloque en curso que se guarda en un punto de
+    control contiene todos los identificadores que se usen hasta el siguiente.
+
+    Attributes:
+        siguiente_id (int): siguiente identificador que se va a devolver.
+        fin_bloque (int): primer identificador fuera del bloque reservado.
+
+    """
+    def __init__(self, conexion:Connection, nombre_secuencia:str, tamano_bloque:int, bloque_inicial:Tuple[int, int]=None):
+        self.conexion = conexion
+        self.nombre_secuencia = nombre_secuencia
+        self.tamano_bloque = tamano_bloque
+
+        # Al reanudar desde un punto de control se sigue con el bloque que ya estaba reservado
+        if bloque_inicial is not None:
+            self.siguiente_id, self.fin_bloque = bloque_inicial
+        else:
+            self._reservar_bloque()
+
+    def _reservar_bloque(self)-> None:
+        self.siguiente_id = reservar_bloque_ids(conexion=self.conexion, nombre_secuencia=self.nombre_secuencia, n_ids=self.tamano_bloque)
+        self.fin_bloque = self.siguiente_id + self.tamano_bloque
+
+    def siguiente(self)-> int:
+        identificador = self.siguiente_id
+        self.siguiente_id += 1
+
+        if self.siguiente_id >= self.fin_bloque:
+            self._reservar_bloque()
+
+        return identificador
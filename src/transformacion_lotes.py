@@ -0,0 +1,189 @@
+"""
+Este script se empleará para transformar de una vez todas las reviews de un lote (generar_lotes_fichero de load_data.py) en las filas
+de la tabla Review y los documentos de MongoDB, en lugar de hacerlo review a review dentro del bucle de lectura.
+
+Los campos de las reviews del lote se trasponen a columnas (una tupla por campo, con zip(*registros), que se hace en C), y:
+
+    - overall y unixReviewTime se convierten en arrays de NumPy con su tipo (float64 e int64), de forma que un valor con un tipo
+      inesperado (por ejemplo, un número escrito como texto) se convierte, o falla, al crear el lote y no al insertarlo en MySQL.
+    - las filas de Review se construyen con un único zip de las columnas.
+    - los documentos de MongoDB se crean directamente con sus campos no nulos (ver crear_documento_mongo de load_data.py), y con los
+      campos derivados de campos_derivados.py si se indica el tipo de producto del lote.
+
+Los arrays tipados se guardan también en el lote ("columnas"), por si se quieren usar para calcular estadísticas sin recorrer las filas.
+Con la lectura en paralelo (ver lectura_paralela.py) los campos ya llegan en columnas, y se transforman con transformar_columnas sin
+pasar por las tuplas de cada review.
+La fecha (reviewTime) ya llega formateada, con formatear_fecha de load_data.py, que guarda en caché las fechas ya convertidas.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+############################################################################################################################################
+
+# Importamos las librerías necesarias
+import numpy as np
+from typing import List, Tuple
+from campos_derivados import anadir_campos_derivados
+
+############################################################################################################################################
+
+# Valor que representa un unixReviewTime nulo en los arrays de enteros (ninguna review real tiene una fecha negativa)
+UNIX_REVIEW_TIME_NULO = -1
+
+# Posición de cada campo en las tuplas de extraer_campos_review de load_data.py
+(CAMPO_REVIEWER_ID, CAMPO_ASIN, CAMPO_REVIEWER_NAME, CAMPO_HELPFUL, CAMPO_REVIEW_TEXT, CAMPO_OVERALL, CAMPO_SUMMARY,
+ CAMPO_UNIX_REVIEW_TIME, CAMPO_REVIEW_TIME) = range(9)
+
+############################################################################################################################################
+
+# CONVERSIÓN DE LAS COLUMNAS NUMÉRICAS
+def columna_overall(valores:tuple)-> np.ndarray:
+    """
+
+    Convierte la columna overall de un lote en un array de float64, con NaN en los valores nulos.
+
+    Args:
+        valores (tuple): valores de overall de las reviews del lote (pueden ser None).
+
+    Returns:
+        np.ndarray: array de float64.
+
+    """
+    # NumPy ya convierte los None en NaN cuando el tipo es float64
+    return np.array(valores, dtype=np.float64)
+
+def columna_unix_review_time(valores:tuple)-> np.ndarray:
+    """
+
+    Convierte la columna unixReviewTime de un lote en un array de int64, con UNIX_REVIEW_TIME_NULO en los valores nulos.
+
+    Args:
+        valores (tuple): valores de unixReviewTime de las reviews del lote (pueden ser None).
+
+    Returns:
+        np.ndarray: array de int64.
+
+    """
+    return np.fromiter((UNIX_REVIEW_TIME_NULO if valor is None else valor for valor in valores), dtype=np.int64, count=len(valores))
+
+def valores_sql(columna:np.ndarray, nulos:np.ndarray)-> list:
+    """
+
+    Convierte un array de NumPy en una lista de valores de Python para pymysql, con None en las posiciones nulas.
+
+    Args:
+        columna (np.ndarray): array tipado.
+        nulos (np.ndarray): array de booleanos con las posiciones nulas.
+
+    Returns:
+        list: valores de la columna (int o float de Python, o None).
+
+    """
+    # tolist() convierte todo el array a tipos de Python de una sola vez. Solo si hay nulos se recorre la lista para sustituirlos
+    valores = columna.tolist()
+
+    if nulos.any():
+        valores = [None if es_nulo else valor for valor, es_nulo in zip(valores, nulos.tolist())]
+
+    return valores
+
+############################################################################################################################################
+
+# TRANSFORMACIÓN DE UN LOTE
+def transformar_columnas(id_review_inicial:int, ids_personas:List[int], ids_productos:List[int], overall:np.ndarray, 
+                         unix_review_time:np.ndarray, helpful:list, reviewText:list, summary:list, reviewTime:list, 
+                         incluir_unix_review_time:bool=True, tipo_producto:int=None)-> Tuple[list, list, dict]:
+    """
+
+    Crea las filas de la tabla Review y los documentos de MongoDB de un lote de reviews que ya está separado en columnas.
+
+    Args:
+        id_review_inicial (int): identificador de la primera review del lote (el resto son consecutivos).
+        ids_personas (list): id_persona de cada review del lote.
+        ids_productos (list): id_producto de cada review del lote.
+        overall (np.ndarray): array de float64 con el overall de cada review (NaN si es nulo).
+        unix_review_time (np.ndarray): array de int64 con el unixReviewTime de cada review (UNIX_REVIEW_TIME_NULO si es nulo).
+        helpful (list): helpful de cada review del lote.
+        reviewText (list): reviewText de cada review del lote.
+        summary (list): summary de cada review del lote.
+        reviewTime (list): fecha ya formateada de cada review del lote.
+        incluir_unix_review_time (bool, optional): si es False, las filas de Review no llevan unixReviewTime. Defaults to True.
+        tipo_producto (int, optional): identificador del tipo de producto de las reviews del lote, para los campos derivados. 
+            Defaults to None.
+
+    Returns:
+        tuple: (filas_review, documentos, columnas), igual que transformar_lote.
+
+    """
+    ids_review = range(id_review_inicial, id_review_inicial + len(overall))
+
+    valores_overall = valores_sql(columna=overall, nulos=np.isnan(overall))
+
+    if incluir_unix_review_time:
+        filas_review = list(zip(ids_review, ids_personas, ids_productos, valores_overall,
+                                valores_sql(columna=unix_review_time, nulos=unix_review_time == UNIX_REVIEW_TIME_NULO), reviewTime))
+    else:
+        filas_review = list(zip(ids_review, ids_personas, ids_productos, valores_overall, reviewTime))
+
+    documentos = []
+
+    for id_review, valor_helpful, valor_reviewText, valor_summary, valor_overall in zip(ids_review, helpful, reviewText, summary,
+                                                                                        valores_overall):
+
+        # Igual que crear_documento_mongo, pero sin crear un diccionario intermedio con los campos nulos
+        documento = {"_id": id_review}
+
+        if valor_helpful is not None:
+            documento["helpful"] = valor_helpful
+        if valor_reviewText is not None:
+            documento["reviewText"] = valor_reviewText
+        if valor_summary is not None:
+            documento["summary"] = valor_summary
+
+        if tipo_producto is not None:
+            anadir_campos_derivados(documento=documento, tipo_producto=tipo_producto, overall=valor_overall, helpful=valor_helpful, 
+                                    reviewText=valor_reviewText, summary=valor_summary)
+
+        documentos.append(documento)
+
+    return filas_review, documentos, {"overall": overall, "unixReviewTime": unix_review_time}
+
+def transformar_lote(id_review_inicial:int, ids_personas:List[int], ids_productos:List[int], registros:List[tuple], 
+                     incluir_unix_review_time:bool=True, tipo_producto:int=None)-> Tuple[list, list, dict]:
+    """
+
+    Crea las filas de la tabla Review y los documentos de MongoDB de un lote de reviews, columna a columna.
+
+    Args:
+        id_review_inicial (int): identificador de la primera review del lote (el resto son consecutivos).
+        ids_personas (list): id_persona de cada review del lote.
+        ids_productos (list): id_producto de cada review del lote.
+        registros (list): campos de cada review del lote, con el formato de extraer_campos_review de load_data.py.
+        incluir_unix_review_time (bool, optional): si es False, las filas de Review no llevan unixReviewTime (esquema compacto, 
+            en el que se calcula a partir de reviewTime). Defaults to True.
+        tipo_producto (int, optional): identificador del tipo de producto de las reviews del lote. Si no es None, se añaden a los
+            documentos los campos derivados (ver campos_derivados.py). Defaults to None.
+
+    Returns:
+        tuple:
+            - filas_review (list): tuplas (id_review, id_persona, id_producto, overall, unixReviewTime, reviewTime), o sin
+              unixReviewTime si no se incluye.
+            - documentos (list): documentos de MongoDB, con _id igual al id_review y solo los campos no nulos.
+            - columnas (dict): arrays tipados {"overall": float64, "unixReviewTime": int64} del lote.
+
+    """
+    if not registros:
+        return [], [], {"overall": np.empty(0, dtype=np.float64), "unixReviewTime": np.empty(0, dtype=np.int64)}
+
+    # Trasponemos las tuplas de las reviews a una tupla por campo
+    columnas_campos = list(zip(*registros))
+
+    return transformar_columnas(id_review_inicial=id_review_inicial, ids_personas=ids_personas, ids_productos=ids_productos,
+                                overall=columna_overall(valores=columnas_campos[CAMPO_OVERALL]),
+                                unix_review_time=columna_unix_review_time(valores=columnas_campos[CAMPO_UNIX_REVIEW_TIME]),
+                                helpful=columnas_campos[CAMPO_HELPFUL], reviewText=columnas_campos[CAMPO_REVIEW_TEXT],
+                                summary=columnas_campos[CAMPO_SUMMARY], reviewTime=columnas_campos[CAMPO_REVIEW_TIME],
+                                incluir_unix_review_time=incluir_unix_review_time, tipo_producto=tipo_producto)
@@ -0,0 +1,14 @@
+"""
+Configuración común de las pruebas: los scripts de src/ se importan entre sí por su nombre (from configuracion import*), así que la
+carpeta src se añade al path antes de importarlos.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,96 @@
+"""
+Pruebas de buckets_productos.py: agregados de los buckets, reparto de las reviews de un producto y escrituras repetidas con
+MODO_UPSERT_MONGODB.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+import buckets_productos as bp
+
+############################################################################################################################################
+
+class ColeccionBuckets:
+    """Colección falsa de buckets con lo justo de find y bulk_write (UpdateOne con upsert) que usa EscritorBuckets."""
+    name = "buckets"
+
+    def __init__(self):
+        self.buckets = []
+
+    def create_index(self, campos, name=None):
+        pass
+
+    def find(self, filtro, proyeccion=None):
+        ids_reviews = set(filtro["reviews.id_review"]["$in"])
+        return [bucket for bucket in self.buckets if bucket["id_producto"] in filtro["id_producto"]["$in"]
+                and ids_reviews & {review["id_review"] for review in bucket["reviews"]}]
+
+    def bulk_write(self, operaciones, ordered=True):
+        for operacion in operaciones:
+            filtro, update = operacion._filter, operacion._doc
+            bucket = next((bucket for bucket in self.buckets if bucket["id_producto"] == filtro["id_producto"]
+                           and bucket["n_reviews"] <= filtro["n_reviews"]["$lte"]), None)
+
+            if bucket is None:
+                bucket = {"id_producto": filtro["id_producto"], "n_reviews": 0, "reviews": [], **update["$setOnInsert"]}
+                self.buckets.append(bucket)
+
+            bucket["reviews"] += update["$push"]["reviews"]["$each"]
+            for campo, valor in update["$inc"].items():
+                *ruta, nombre = campo.split(".")
+                destino = bucket
+                for parte in ruta:
+                    destino = destino.setdefault(parte, {})
+                destino[nombre] = destino.get(nombre, 0) + valor
+
+class BaseDatosFalsa(dict):
+    def __missing__(self, nombre):
+        self[nombre] = ColeccionBuckets()
+        return self[nombre]
+
+# Filas de Review (id_review, id_persona, id_producto, overall, unixReviewTime, reviewTime) y sus documentos
+FILAS = [(1, 10, 7, 5.0, 0, "2014-01-01"), (2, 11, 7, 3.0, 0, "2014-01-02"), (3, 12, 8, None, 0, None), (4, 13, 7, 5.0, 0, "2014-01-03")]
+DOCUMENTOS = [{"_id": 1, "reviewText": "abc"}, {"_id": 2}, {"_id": 3, "summary": "s"}, {"_id": 4, "reviewText": "hola"}]
+
+############################################################################################################################################
+
+def test_crear_bucket_con_agregados():
+    reviews = [bp.crear_review_bucket(fila_review=fila, documento=documento) for fila, documento in zip(FILAS, DOCUMENTOS)]
+
+    bucket = bp.crear_bucket(id_producto=7, tipo_producto=1, reviews=reviews)
+
+    assert (bucket["n_reviews"], bucket["primera_review"], bucket["ultima_review"]) == (4, 1, 4)
+    assert bucket["por_overall"]["5"] == {"n_reviews": 2, "n_con_texto": 2, "suma_longitud_review_text": 7}
+    assert bucket["por_overall"]["3"] == {"n_reviews": 1}
+    assert reviews[2] == {"id_review": 3, "id_persona": 12, "summary": "s"}
+
+def test_los_grupos_no_pasan_del_tamano_del_bucket():
+    escritor = bp.EscritorBuckets(mongodb_database=BaseDatosFalsa(), tamano_bucket=2)
+    reviews = [{"id_review": i, "id_persona": 0} for i in range(5)]
+
+    operaciones = escritor.operaciones_producto(id_producto=7, tipo_producto=1, reviews=reviews)
+
+    assert [len(operacion._doc["$push"]["reviews"]["$each"]) for operacion in operaciones] == [2, 2, 1]
+    assert [operacion._filter["n_reviews"]["$lte"] for operacion in operaciones] == [0, 0, 1]
+
+def test_repetir_una_escritura_idempotente_no_duplica_reviews():
+    base_datos = BaseDatosFalsa()
+    escritor = bp.EscritorBuckets(mongodb_database=base_datos, idempotente=True)
+
+    escritor.escribir(filas_review=FILAS[:2], documentos=DOCUMENTOS[:2], tipo_producto=1)
+    escritor.escribir(filas_review=FILAS, documentos=DOCUMENTOS, tipo_producto=1)
+
+    buckets = base_datos[bp.COLECCION_BUCKETS_MONGODB].buckets
+    assert sorted(review["id_review"] for bucket in buckets for review in bucket["reviews"]) == [1, 2, 3, 4]
+    assert sum(bucket["n_reviews"] for bucket in buckets) == 4
+
+def test_sin_modo_idempotente_se_repiten():
+    base_datos = BaseDatosFalsa()
+    escritor = bp.EscritorBuckets(mongodb_database=base_datos)
+
+    escritor.escribir(filas_review=FILAS, documentos=DOCUMENTOS, tipo_producto=1)
+    escritor.escribir(filas_review=FILAS, documentos=DOCUMENTOS, tipo_producto=1)
+
+    assert sum(bucket["n_reviews"] for bucket in base_datos[bp.COLECCION_BUCKETS_MONGODB].buckets) == 8
@@ -0,0 +1,70 @@
+"""
+Pruebas de busqueda_dimensiones.py: caché LRU y búsqueda por lotes de las personas que ya existen.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+import busqueda_dimensiones as bd
+from busqueda_dimensiones import CacheLRU
+
+############################################################################################################################################
+
+class CursorPersonas:
+    """Cursor falso que devuelve las personas cuyo reviewerID coincide sin distinguir mayúsculas (como la comparación de MySQL)."""
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def execute(self, query, claves):
+        self.conexion.consultas.append(list(claves))
+        claves_minusculas = {clave.lower() for clave in claves}
+        self.filas = [fila for fila in self.conexion.personas if fila[1].lower() in claves_minusculas]
+
+    def fetchall(self):
+        return self.filas
+
+    def close(self):
+        pass
+
+class ConexionPersonas:
+    def __init__(self, personas):
+        self.personas = personas
+        self.consultas = []
+
+    def cursor(self):
+        return CursorPersonas(self)
+
+############################################################################################################################################
+
+def test_cache_descarta_la_menos_usada():
+    cache = CacheLRU(capacidad=2)
+    cache["a"], cache["b"] = 1, 2
+
+    # Al leer "a", la menos usada pasa a ser "b"
+    assert cache.get("a") == 1
+    cache["c"] = 3
+
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert len(cache) == 2
+
+def test_cache_sobrescribir_renueva_la_clave():
+    cache = CacheLRU(capacidad=2)
+    cache.update({"a": 1, "b": 2})
+    cache["a"] = 10
+    cache["c"] = 3
+
+    assert cache.get("a") == 10 and cache.get("b", "no") == "no"
+
+def test_personas_de_la_cache_no_se_consultan(monkeypatch):
+    monkeypatch.setattr(bd, "TAMANO_CONSULTA_IN", 1)
+    conexion = ConexionPersonas(personas=[(1, "R1", "Ana"), (2, "r2", None), (3, "R3", "Carla")])
+    cache = CacheLRU(capacidad=10)
+    cache["R1"] = (1, "Ana")
+
+    personas = bd.resolver_personas_lote(conexion=conexion, cache=cache, reviewerIDs=["R1", "R3", "R2", "R3", None])
+
+    # R2 no existe (solo "r2", que MySQL devuelve al no distinguir mayúsculas), y cada trozo del IN es una consulta
+    assert personas == {"R1": (1, "Ana"), "R3": (3, "Carla")}
+    assert conexion.consultas == [["R3"], ["R2"]]
@@ -0,0 +1,42 @@
+"""
+Pruebas de campos_derivados.py: palabras de summary, fracción de votos útiles y campos que se añaden a los documentos.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+import campos_derivados as cd
+
+############################################################################################################################################
+
+def test_palabras_summary_en_minusculas_sin_puntuacion_ni_palabras_cortas(monkeypatch):
+    monkeypatch.setattr(cd, "LONGITUD_MINIMA_PALABRA_SUMMARY", 4)
+
+    assert cd.palabras_summary("Great Album!! Great, don't miss it...") == ["great", "album", "great", "don't", "miss"]
+    assert cd.palabras_summary("") == []
+
+def test_ratio_helpful():
+    assert cd.ratio_helpful([1, 4]) == 0.25
+    assert cd.ratio_helpful([0, 0]) is None
+    assert cd.ratio_helpful(None) is None
+    assert cd.ratio_helpful([3]) is None
+
+def test_ratio_helpful_con_valores_que_no_son_numeros():
+    assert cd.ratio_helpful([None, 3]) is None
+    assert cd.ratio_helpful([2, None]) is None
+    assert cd.ratio_helpful(["1", 2]) is None
+    assert cd.ratio_helpful([True, 2]) is None
+
+def test_anadir_campos_derivados_solo_los_no_nulos():
+    documento = {"_id": 1}
+    cd.anadir_campos_derivados(documento=documento, tipo_producto=3, overall=4.0, helpful=[1, 2], reviewText="hola", summary="Nice work")
+
+    assert documento == {"_id": 1, "tipo_producto": 3, "overall": 4, "longitud_review_text": 4, "palabras_summary": ["nice", "work"],
+                         "ratio_helpful": 0.5}
+
+    documento = {"_id": 2}
+    cd.anadir_campos_derivados(documento=documento, tipo_producto=3, overall=None, helpful=[None, 3], reviewText=None, summary=None)
+
+    assert documento == {"_id": 2, "tipo_producto": 3}
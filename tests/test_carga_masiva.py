@@ -0,0 +1,36 @@
+"""
+Pruebas de carga_masiva.py: escritura de los valores en los ficheros TSV de staging de LOAD DATA.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+import io
+from carga_masiva import escapar_valor_tsv, escribir_fila_tsv
+
+############################################################################################################################################
+
+def test_nulos_y_numeros():
+    assert escapar_valor_tsv(None) == "\\N"
+    assert escapar_valor_tsv(5) == "5"
+    assert escapar_valor_tsv(4.0) == "4.0"
+
+def test_caracteres_especiales_de_load_data():
+    assert escapar_valor_tsv("a\tb\nc\rd\0e") == "a\\tb\\nc\\rd\\0e"
+
+    # La barra invertida se escapa antes que el resto, para no escaparla dos veces
+    assert escapar_valor_tsv("C:\\ruta\t") == "C:\\\\ruta\\t"
+
+def test_la_cadena_N_no_es_un_nulo():
+    assert escapar_valor_tsv("N") == "N"
+    assert escapar_valor_tsv("\\N") == "\\\\N"
+
+def test_una_fila_es_una_linea_con_un_campo_por_columna():
+    fichero = io.StringIO()
+
+    escribir_fila_tsv(fichero, (1, "Ana\tMaría", None, "línea 1\nlínea 2"))
+
+    assert fichero.getvalue() == "1\tAna\\tMaría\t\\N\tlínea 1\\nlínea 2\n"
+    assert fichero.getvalue().count("\n") == 1 and fichero.getvalue().count("\t") == 3
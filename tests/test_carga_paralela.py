@@ -0,0 +1,61 @@
+"""
+Pruebas de carga_paralela.py: reparto de los rangos de identificadores entre ficheros y contadores de cada proceso hijo.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+import pytest
+import load_data
+import carga_paralela
+
+############################################################################################################################################
+
+ESCANEOS = [
+    {"fichero": "data/Musica_5.json", "nombre_tipo_producto": "Musica", "n_lineas": 4, "n_productos": 2,
+     "revisores": {"A": "Ana", "B": None}},
+    {"fichero": "data/Vacio_5.json", "nombre_tipo_producto": "Vacio", "n_lineas": 0, "n_productos": 0, "revisores": {}},
+    {"fichero": "data/Libros_5.json", "nombre_tipo_producto": "Libros", "n_lineas": 3, "n_productos": 3,
+     "revisores": {"C": "Carla", "A": None, "B": "Bea"}},
+]
+
+@pytest.fixture
+def contadores_vacios(monkeypatch):
+    """Contadores de load_data como al empezar una carga nueva (se restauran al terminar la prueba)."""
+    for nombre in ("contador_persona", "contador_producto", "contador_tipo_producto", "id_review"):
+        monkeypatch.setattr(load_data, nombre, 0)
+    monkeypatch.setattr(load_data, "dicc_ids_personas", carga_paralela.crear_mapa_identidades())
+    monkeypatch.setattr(load_data, "dicc_ids_productos", carga_paralela.crear_mapa_identidades(clave_compuesta=True))
+    monkeypatch.setattr(load_data, "dicc_ids_tipos_producto", {})
+
+############################################################################################################################################
+
+def test_rangos_consecutivos_en_el_orden_de_los_ficheros(contadores_vacios):
+    planes, valores_personas, valores_tipos_producto = carga_paralela.planificar_rangos_ids(escaneos=ESCANEOS)
+
+    assert [plan["fichero"] for plan in planes] == ["data/Musica_5.json", "data/Libros_5.json"]
+    assert [(plan["id_review_inicial"], plan["id_producto_inicial"], plan["id_tipo_producto"]) for plan in planes] == [(0, 0, 0), (4, 2, 1)]
+    assert valores_tipos_producto == [(0, "Musica"), (1, "Libros")]
+    assert sorted(valores_personas) == [(0, "A", "Ana"), (1, "B", "Bea"), (2, "C", "Carla")]
+
+def test_el_mismo_tipo_de_producto_en_dos_ficheros_falla(contadores_vacios):
+    with pytest.raises(ValueError):
+        carga_paralela.planificar_rangos_ids(escaneos=[ESCANEOS[0], dict(ESCANEOS[0], fichero="data/otro/Musica_5.json")])
+
+def test_los_procesos_no_ven_personas_nuevas(contadores_vacios):
+    planes, _, _ = carga_paralela.planificar_rangos_ids(escaneos=ESCANEOS)
+
+    for plan, escaneo in zip(planes, (ESCANEOS[0], ESCANEOS[2])):
+        carga_paralela.posicionar_contadores(plan=plan)
+
+        for reviewerID in escaneo["revisores"]:
+            id_persona, _, id_tipo_producto, (persona_nueva, _, tipo_producto_nuevo) = load_data.asignar_ids_review(
+                reviewerID=reviewerID, asin="X", nombre_tipo_producto=plan["nombre_tipo_producto"])
+
+            assert id_persona == plan["ids_personas"][reviewerID]
+            assert (persona_nueva, tipo_producto_nuevo) == (False, False)
+            assert id_tipo_producto == plan["id_tipo_producto"]
+
+        assert load_data.contador_persona == 3
@@ -0,0 +1,35 @@
+"""
+Pruebas de escritura_adaptativa.py: ajuste del tamaño de escritura de un destino y su límite de bytes.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+import escritura_adaptativa as ea
+
+############################################################################################################################################
+
+def test_el_tamano_sigue_la_direccion_que_mejora():
+    control = ea.ControlTamanoLote(nombre="review", tamano_inicial=1000, limite_bytes=10 ** 9, tamano_minimo=10, tamano_maximo=10 ** 6)
+
+    control.registrar_escritura(n_filas=1000, n_bytes=1000, segundos=1.0)
+    assert control.tamano == 1250
+
+    # Peor rendimiento: cambia de dirección
+    control.registrar_escritura(n_filas=1250, n_bytes=1250, segundos=2.0)
+    assert control.tamano == 1000
+
+def test_el_tamano_no_pasa_del_limite_de_bytes():
+    control = ea.ControlTamanoLote(nombre="reviews", tamano_inicial=100_000, limite_bytes=ea.LIMITE_BYTES_MONGO, tamano_minimo=10,
+                                   tamano_maximo=10 ** 6)
+
+    control.registrar_escritura(n_filas=100_000, n_bytes=100_000 * 1000, segundos=1.0)
+    assert control.tamano == ea.LIMITE_BYTES_MONGO // 1000
+
+def test_sin_modo_adaptativo_el_tamano_no_cambia():
+    control = ea.ControlTamanoLote(nombre="review", tamano_inicial=500, limite_bytes=100, adaptativo=False)
+
+    control.registrar_escritura(n_filas=500, n_bytes=500 * 1000, segundos=1.0)
+    assert control.tamano == 500 and control.bytes_por_fila == 1000
@@ -0,0 +1,72 @@
+"""
+Pruebas de escritura_mongo_paralela.py: documentos que se reintentan tras un BulkWriteError y elección del escritor de MongoDB.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+import pytest
+from pymongo.errors import BulkWriteError
+import escritura_mongo_paralela as emp
+
+############################################################################################################################################
+
+class ColeccionFalsa:
+    """Colección falsa que guarda los documentos y el write concern con el que se ha pedido escribir."""
+    name = "reviews"
+
+    def __init__(self):
+        self.documentos = {}
+        self.write_concern = None
+
+    def with_options(self, write_concern=None):
+        self.write_concern = write_concern
+        return self
+
+    def insert_many(self, documentos, ordered=True):
+        for documento in documentos:
+            self.documentos[documento["_id"]] = documento
+
+def error_escritura(codigos, write_concern=False):
+    detalles = {"writeErrors": [{"index": indice, "code": codigo} for indice, codigo in codigos],
+                "writeConcernErrors": [{"code": 64}] if write_concern else []}
+    return BulkWriteError(detalles)
+
+DOCUMENTOS = [{"_id": 1}, {"_id": 2}, {"_id": 3}]
+
+############################################################################################################################################
+
+def test_documentos_fallidos_solo_los_que_fallan():
+    assert emp.documentos_fallidos(DOCUMENTOS, error_escritura([(1, 91)]), reintento=0) == [{"_id": 2}]
+
+def test_clave_duplicada_en_la_primera_escritura_se_lanza():
+    error = error_escritura([(0, emp.CODIGO_CLAVE_DUPLICADA)])
+
+    with pytest.raises(BulkWriteError):
+        emp.documentos_fallidos(DOCUMENTOS, error, reintento=0)
+
+def test_clave_duplicada_en_un_reintento_ya_estaba_insertada():
+    error = error_escritura([(0, emp.CODIGO_CLAVE_DUPLICADA), (2, 91)])
+
+    assert emp.documentos_fallidos(DOCUMENTOS, error, reintento=1) == [{"_id": 3}]
+
+def test_error_de_write_concern_reintenta_todos():
+    assert emp.documentos_fallidos(DOCUMENTOS, error_escritura([], write_concern=True), reintento=0) == DOCUMENTOS
+    assert emp.documentos_fallidos(DOCUMENTOS, error_escritura([(0, 91)], write_concern=True), reintento=0, upsert=True) == DOCUMENTOS
+
+def test_escritor_paralelo_duradero_espera_al_journal(monkeypatch):
+    monkeypatch.setattr(emp, "ESCRITURA_MONGO_PARALELA", True)
+
+    coleccion = ColeccionFalsa()
+    escritor = emp.crear_escritor_mongo(coleccion=coleccion, batch_size=2, duradero=True)
+
+    escritor.escribir(documentos=DOCUMENTOS)
+    escritor.cerrar()
+
+    assert coleccion.write_concern.document.get("j") is True
+    assert sorted(coleccion.documentos) == [1, 2, 3]
+
+def test_escritor_por_defecto_es_el_sincrono():
+    assert isinstance(emp.crear_escritor_mongo(coleccion=ColeccionFalsa(), batch_size=2), emp.EscritorMongo)
@@ -0,0 +1,180 @@
+"""
+Pruebas de filtro_duplicados.py: filtro de Bloom escalable, fichero del filtro y detección de las reviews repetidas de un lote.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+import pytest
+import filtro_duplicados as fd
+
+############################################################################################################################################
+
+class CursorReviews:
+    """Cursor falso que devuelve, para un WHERE p.reviewerID IN (...), las filas (reviewerID, asin, unixReviewTime, id_review)."""
+    def __init__(self, filas):
+        self.filas = filas
+        self.resultado = []
+
+    def execute(self, consulta, args=None):
+        self.resultado = [fila for fila in self.filas if fila[0] in args]
+
+    def fetchall(self):
+        return self.resultado
+
+    def close(self):
+        pass
+
+class ConexionReviews:
+    def __init__(self, filas):
+        self.filas = filas
+
+    def cursor(self, *args):
+        return CursorReviews(self.filas)
+
+class CursorBaseDatos:
+    """Cursor falso que responde a las consultas de la huella y de las claves de una tabla Review en memoria."""
+    def __init__(self, reviews):
+        self.reviews = reviews
+        self.resultado = []
+
+    def execute(self, consulta, args=None):
+        if consulta.startswith("SELECT @@hostname"):
+            self.resultado = [("localhost", 3306, "bd")]
+        elif consulta == fd.QUERY_HUELLA_REVIEWS:
+            self.resultado = [(len(self.reviews), max(self.reviews, default=None))]
+        elif consulta == fd.QUERY_CRC_REVIEW:
+            self.resultado = [(hash(self.reviews[args[0]]) & 0xFFFFFFFF,)] if args[0] in self.reviews else []
+        else:
+            desde = args[0] if args else -1
+            self.resultado = [(*clave, id_review) for id_review, clave in sorted(self.reviews.items()) if id_review > desde]
+            self.lecturas.append(len(self.resultado))
+
+    def fetchone(self):
+        return self.resultado[0] if self.resultado else None
+
+    def fetchmany(self, tamano):
+        filas, self.resultado = self.resultado[:tamano], self.resultado[tamano:]
+        return filas
+
+    def close(self):
+        pass
+
+class ConexionBaseDatos:
+    def __init__(self, reviews):
+        self.reviews = reviews
+        self.lecturas = []
+
+    def cursor(self, *args):
+        cursor = CursorBaseDatos(self.reviews)
+        cursor.lecturas = self.lecturas
+        return cursor
+
+@pytest.fixture
+def ruta_filtro(tmp_path, monkeypatch):
+    ruta = str(tmp_path / "bd.bloom")
+    monkeypatch.setattr(fd, "ruta_filtro_duplicados", lambda: ruta)
+    return ruta
+
+############################################################################################################################################
+
+def test_filtro_sin_falsos_negativos_y_crece():
+    filtro = fd.FiltroBloomEscalable(capacidad_inicial=100, probabilidad_error=0.01)
+    claves = [(f"r{i}", f"a{i % 7}", 1000 + i) for i in range(1000)]
+
+    for clave in claves:
+        filtro.anadir(clave)
+
+    assert all(filtro.contiene(clave) for clave in claves)
+    assert filtro.n_elementos == 1000
+    assert len(filtro.filtros) > 1
+    assert filtro.filtros[1].capacidad == 2 * filtro.filtros[0].capacidad
+
+def test_filtro_probabilidad_error():
+    filtro = fd.FiltroBloomEscalable(capacidad_inicial=2000, probabilidad_error=0.01)
+
+    for i in range(2000):
+        filtro.anadir((f"r{i}", "a", i))
+
+    falsos_positivos = sum(filtro.contiene((f"x{i}", "b", i)) for i in range(20000))
+
+    assert falsos_positivos / 20000 < 0.02
+
+def test_guardar_y_cargar_filtro(tmp_path):
+    filtro = fd.FiltroBloomEscalable(capacidad_inicial=50, probabilidad_error=0.01)
+    for i in range(300):
+        filtro.anadir((f"r{i}", "a", i))
+
+    huella = {"servidor": "localhost:3306", "base_datos": "bd", "n_reviews": 300, "max_id_review": 299, "crc_ultima_review": 12345}
+    ruta = str(tmp_path / "filtro.bloom")
+
+    fd.guardar_filtro(filtro=filtro, huella=huella, ruta=ruta)
+    cargado, huella_cargada = fd.cargar_filtro(ruta=ruta)
+
+    assert huella_cargada == huella
+    assert cargado.n_elementos == 300
+    assert all(cargado.contiene((f"r{i}", "a", i)) for i in range(300))
+
+def test_cargar_filtro_danado(tmp_path):
+    filtro = fd.FiltroBloomEscalable(capacidad_inicial=50, probabilidad_error=0.01)
+    filtro.anadir(("r", "a", 1))
+
+    ruta = tmp_path / "filtro.bloom"
+    fd.guardar_filtro(filtro=filtro, huella={}, ruta=str(ruta))
+
+    # Un bit cambiado no pasa el CRC32
+    datos = bytearray(ruta.read_bytes())
+    datos[-1] ^= 1
+    ruta.write_bytes(bytes(datos))
+    assert fd.cargar_filtro(ruta=str(ruta)) == (None, None)
+
+    # Un fichero cortado tampoco sirve
+    ruta.write_bytes(bytes(datos[:-3]))
+    assert fd.cargar_filtro(ruta=str(ruta)) == (None, None)
+
+    assert fd.cargar_filtro(ruta=str(tmp_path / "no_existe.bloom")) == (None, None)
+
+def test_detectar_lote():
+    existentes = [("r1", "a1", 10, 1), ("r2", "a2", 20, 2)]
+    filtro = fd.FiltroBloomEscalable(capacidad_inicial=100, probabilidad_error=0.01)
+    for reviewerID, asin, unixReviewTime, _ in existentes:
+        filtro.anadir((reviewerID, asin, unixReviewTime))
+
+    detector = fd.DetectorDuplicados(conexion=ConexionReviews(existentes), filtro=filtro)
+
+    # Repetida en la base de datos, nueva, repetida dentro del lote y del bloque propio (se vuelve a insertar al reanudar)
+    lote = [("r1", "a1", 10), ("r3", "a3", 30), ("r3", "a3", 30), ("r2", "a2", 20)]
+    assert detector.detectar_lote(claves=lote, bloque_propio=(2, 3)) == {0, 2}
+
+    # Las del lote anterior siguen contando aunque aún no estén en MySQL, hasta el commit
+    assert detector.detectar_lote(claves=[("r3", "a3", 30)]) == {0}
+    assert detector.n_duplicadas == 3
+
+    detector.registrar_commit()
+    assert detector.pendientes == set()
+
+def test_filtro_se_pone_al_dia_con_las_reviews_nuevas(ruta_filtro):
+    conexion = ConexionBaseDatos({id_review: (f"r{id_review}", "a", id_review) for id_review in range(1, 101)})
+
+    fd.guardar_detector_duplicados(fd.abrir_detector_duplicados(conexion=conexion))
+    assert conexion.lecturas == [100]
+
+    # Otra inserción sin filtro añade reviews con identificadores más altos: solo se leen esas
+    conexion.reviews.update({id_review: (f"r{id_review}", "a", id_review) for id_review in range(101, 111)})
+    detector = fd.abrir_detector_duplicados(conexion=conexion)
+
+    assert conexion.lecturas == [100, 10]
+    assert detector.filtro.contiene(("r105", "a", 105))
+
+def test_filtro_se_reconstruye_si_faltan_reviews_anteriores(ruta_filtro):
+    conexion = ConexionBaseDatos({id_review: (f"r{id_review}", "a", id_review) for id_review in range(1, 101)})
+    fd.guardar_detector_duplicados(fd.abrir_detector_duplicados(conexion=conexion))
+
+    # Una review borrada y otra nueva dejan el mismo número de reviews, pero con la nueva solo no sale la cuenta
+    del conexion.reviews[50]
+    conexion.reviews[101] = ("r101", "a", 101)
+    fd.abrir_detector_duplicados(conexion=conexion)
+
+    assert conexion.lecturas == [100, 1, 100]
@@ -0,0 +1,82 @@
+"""
+Pruebas de lectura_paralela.py: división del fichero en rangos alineados a los saltos de línea y reparto de los lotes de columnas
+en lotes de batch_size reviews.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+import json
+import numpy as np
+import lectura_paralela as lp
+
+############################################################################################################################################
+
+def escribir_fichero(ruta, n_lineas, final_con_salto=True):
+    lineas = [json.dumps({"reviewerID": f"R{i % 3}", "asin": f"A{i % 2}", "overall": float(i % 5 + 1), "unixReviewTime": 1000 + i,
+                          "reviewTime": "01 2, 2014", "helpful": [0, i]}) for i in range(n_lineas)]
+    ruta.write_text("\n".join(lineas) + ("\n" if final_con_salto else ""))
+    return str(ruta)
+
+def lote_columnas(n_filas, primer_valor):
+    """Lote de columnas mínimo como los de parsear_rango, con un revisor y un asin distintos por fila."""
+    valores = list(range(primer_valor, primer_valor + n_filas))
+    return {"n_filas": n_filas, "tabla_revisores": [f"R{v}" for v in valores], "cod_revisor": np.arange(n_filas, dtype=np.int32),
+            "tabla_asins": [f"A{v}" for v in valores], "cod_asin": np.arange(n_filas, dtype=np.int32),
+            "overall": np.array(valores, dtype=np.float64), "unixReviewTime": np.array(valores, dtype=np.int64),
+            "desplazamiento": np.array(valores, dtype=np.int64), "reviewerName": valores, "helpful": valores, "reviewText": valores,
+            "summary": valores, "reviewTime": valores}
+
+############################################################################################################################################
+
+def test_rangos_cubren_el_fichero_sin_partir_lineas(tmp_path):
+    ruta = escribir_fichero(tmp_path / "Musica_5.json", n_lineas=50)
+    contenido = open(ruta, "rb").read()
+
+    rangos = lp.calcular_rangos_fichero(file_in=ruta, tamano_rango=300)
+
+    assert len(rangos) > 1
+    assert rangos[0][0] == 0 and rangos[-1][1] == len(contenido)
+    assert all(fin == siguiente_inicio for (_, fin), (siguiente_inicio, _) in zip(rangos, rangos[1:]))
+    assert all(contenido[fin - 1:fin] == b"\n" for _, fin in rangos)
+
+def test_rangos_desde_un_desplazamiento_y_sin_salto_final(tmp_path):
+    ruta = escribir_fichero(tmp_path / "Musica_5.json", n_lineas=10, final_con_salto=False)
+    contenido = open(ruta, "rb").read()
+    inicio_tercera_linea = contenido.index(b"\n", contenido.index(b"\n") + 1) + 1
+
+    rangos = lp.calcular_rangos_fichero(file_in=ruta, tamano_rango=10 ** 6, desplazamiento_inicial=inicio_tercera_linea)
+
+    assert rangos == [(inicio_tercera_linea, len(contenido))]
+
+def test_fichero_vacio_no_tiene_rangos(tmp_path):
+    ruta = tmp_path / "Vacio_5.json"
+    ruta.write_text("")
+
+    assert lp.calcular_rangos_fichero(file_in=str(ruta), tamano_rango=100) == []
+
+def test_parsear_rango_devuelve_las_columnas_del_rango(tmp_path):
+    ruta = escribir_fichero(tmp_path / "Musica_5.json", n_lineas=6)
+    (inicio, fin), = lp.calcular_rangos_fichero(file_in=ruta, tamano_rango=10 ** 6)
+
+    columnas = lp.parsear_rango(file_in=ruta, inicio=inicio, fin=fin)
+
+    assert columnas["n_filas"] == 6
+    assert [columnas["tabla_revisores"][codigo] for codigo in columnas["cod_revisor"]] == ["R0", "R1", "R2", "R0", "R1", "R2"]
+    assert columnas["tabla_asins"] == ["A0", "A1"]
+    assert columnas["desplazamiento"][-1] == fin
+    assert columnas["reviewTime"][0] == "2014-01-02"
+
+def test_agrupar_columnas_en_lotes_del_tamano_pedido():
+    rangos = [lote_columnas(n_filas=4, primer_valor=0), lote_columnas(n_filas=1, primer_valor=4), lote_columnas(n_filas=6, primer_valor=5)]
+
+    lotes = list(lp.agrupar_columnas(lotes_columnas=iter(rangos), tamano=3))
+
+    assert [lote["n_filas"] for lote in lotes] == [3, 3, 3, 2]
+    for numero_lote, lote in enumerate(lotes):
+        valores = list(range(3 * numero_lote, 3 * numero_lote + lote["n_filas"]))
+        assert [lote["tabla_revisores"][codigo] for codigo in lote["cod_revisor"].tolist()] == [f"R{v}" for v in valores]
+        assert [lote["tabla_asins"][codigo] for codigo in lote["cod_asin"].tolist()] == [f"A{v}" for v in valores]
+        assert lote["overall"].tolist() == valores and lote["summary"] == valores
@@ -0,0 +1,98 @@
+"""
+Pruebas de mapa_identidades.py: semántica de diccionario de MapaIdentidades y huellas de los nombres de NombresPersonas.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+import pytest
+import mapa_identidades
+from mapa_identidades import MapaIdentidades, NombresPersonas
+import load_data
+
+############################################################################################################################################
+
+def test_mapa_igual_que_un_diccionario():
+    mapa, diccionario = MapaIdentidades(capacidad_inicial=4), {}
+
+    # Suficientes claves para que la tabla hash se amplíe varias veces
+    for i in range(5000):
+        clave = f"reviewer_{i % 3000}_ñ"
+        assert mapa.setdefault(clave, i) == diccionario.setdefault(clave, i)
+
+    assert len(mapa) == len(diccionario) == 3000
+    assert dict(mapa.items()) == diccionario
+    assert mapa["reviewer_7_ñ"] == 7
+    assert "no_existe" not in mapa and mapa.get("no_existe", -1) == -1
+
+    with pytest.raises(KeyError):
+        mapa["no_existe"]
+
+def test_mapa_clave_compuesta_y_nula():
+    mapa = MapaIdentidades(clave_compuesta=True)
+    mapa[("B000", "Digital_Music")] = 1
+    mapa[("B000", "Video_Games")] = 2
+    mapa[(None, "Video_Games")] = 3
+
+    assert mapa[("B000", "Digital_Music")] == 1 and mapa[("B000", "Video_Games")] == 2
+    assert mapa[(None, "Video_Games")] == 3
+    assert set(mapa.keys()) == {("B000", "Digital_Music"), ("B000", "Video_Games"), (None, "Video_Games")}
+
+def test_mapa_copia_independiente():
+    mapa = MapaIdentidades()
+    mapa["a"] = 1
+
+    copia = mapa.copy()
+    copia["b"] = 2
+    copia["a"] = 5
+
+    assert dict(mapa.items()) == {"a": 1}
+    assert dict(copia.items()) == {"a": 5, "b": 2}
+
+def test_mapa_segun_la_configuracion(monkeypatch):
+    assert type(mapa_identidades.crear_mapa_identidades()) is dict
+
+    monkeypatch.setattr(mapa_identidades, "MAPAS_IDENTIDADES_COMPACTOS", True)
+    mapa = mapa_identidades.crear_mapa_identidades(clave_compuesta=True)
+
+    assert isinstance(mapa, MapaIdentidades) and mapa.clave_compuesta
+
+############################################################################################################################################
+
+def test_nombres_solo_cambian_con_un_nombre_distinto():
+    nombres = NombresPersonas()
+
+    assert nombres.actualizar(id_persona=10, nombre=None) is False
+    assert nombres.actualizar(id_persona=10, nombre="Ana") is True
+    assert nombres.actualizar(id_persona=10, nombre="Ana") is False
+    assert nombres.actualizar(id_persona=10, nombre=None) is False
+    assert nombres.actualizar(id_persona=10, nombre="Ana María") is True
+    assert nombres.actualizar(id_persona=3, nombre="Ana") is True
+
+    # Sin guardar_nombres solo hay una huella por persona
+    assert nombres.memoria_bytes() == 8 * len(nombres._huellas)
+
+    with pytest.raises(ValueError):
+        nombres.get(id_persona=10)
+
+def test_nombres_guardados_para_la_carga_masiva():
+    nombres = NombresPersonas(guardar_nombres=True)
+
+    nombres.actualizar(id_persona=0, nombre="José")
+    nombres.actualizar(id_persona=0, nombre="José Luis")
+    nombres.actualizar(id_persona=2, nombre="Eva")
+
+    assert nombres.get(id_persona=0) == "José Luis"
+    assert nombres.get(id_persona=1) is None
+    assert nombres.get(id_persona=2) == "Eva"
+    assert nombres.get(id_persona=100) is None
+
+def test_persona_modificada(monkeypatch):
+    monkeypatch.setattr(load_data, "nombres_personas", NombresPersonas())
+
+    assert load_data.persona_modificada(id_persona=0, reviewerName=None, persona_nueva=True) is True
+    assert load_data.persona_modificada(id_persona=0, reviewerName=None, persona_nueva=False) is False
+    assert load_data.persona_modificada(id_persona=0, reviewerName="Ana", persona_nueva=False) is True
+    assert load_data.persona_modificada(id_persona=0, reviewerName="Ana", persona_nueva=False) is False
@@ -0,0 +1,158 @@
+"""
+Pruebas de pipeline_ingesta.py: los commits de MySQL esperan a que MongoDB haya insertado los mismos lotes, y si una etapa falla se
+borran de MongoDB los documentos de los lotes sin commit.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+import pytest
+import load_data
+import pipeline_ingesta
+import escritura_mongo_paralela
+import politica_volcado
+import puntos_control
+
+############################################################################################################################################
+
+class CursorFalso:
+    """Cursor falso que apunta las filas de Review insertadas en la conexión."""
+    max_stmt_length = 1024
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def execute(self, query):
+        pass
+
+    def fetchone(self):
+        return (64 * 1024 * 1024,)
+
+    def executemany(self, query, filas):
+        if query == load_data.QUERY_INSERTAR_REVIEW:
+            self.conexion.pendientes.extend(fila[0] for fila in filas)
+
+    def close(self):
+        pass
+
+class ConexionFalsa:
+    """Conexión falsa de MySQL que guarda qué id_review había en MongoDB en cada commit, y que puede fallar en un commit concreto."""
+    def __init__(self, coleccion, commit_fallido=None):
+        self.coleccion = coleccion
+        self.commit_fallido = commit_fallido
+        self.pendientes, self.confirmadas, self.commits = [], [], []
+
+    def cursor(self):
+        return CursorFalso(self)
+
+    def commit(self):
+        if len(self.commits) + 1 == self.commit_fallido:
+            raise RuntimeError("commit fallido")
+        self.commits.append(sorted(self.coleccion.documentos))
+        self.confirmadas.extend(self.pendientes)
+        self.pendientes.clear()
+
+    def rollback(self):
+        self.pendientes.clear()
+
+class ResultadoBorrado:
+    def __init__(self, deleted_count):
+        self.deleted_count = deleted_count
+
+class ColeccionFalsa:
+    name = "reviews"
+
+    def __init__(self):
+        self.documentos = {}
+
+    def insert_many(self, documentos, **opciones):
+        for documento in documentos:
+            self.documentos[documento["_id"]] = documento
+
+    def with_options(self, write_concern=None):
+        return self
+
+    def delete_many(self, filtro):
+        borrados = [id_review for id_review in self.documentos if id_review >= filtro["_id"]["$gte"]]
+        for id_review in borrados:
+            del self.documentos[id_review]
+        return ResultadoBorrado(len(borrados))
+
+class BaseDatosFalsa:
+    def __init__(self):
+        self.coleccion = ColeccionFalsa()
+
+    def __getitem__(self, nombre):
+        return self.coleccion
+
+def generar_lotes(n_lotes, tamano_lote, id_inicial):
+    for indice in range(n_lotes):
+        ids = range(id_inicial + indice * tamano_lote, id_inicial + (indice + 1) * tamano_lote)
+        yield {"review": [(id_review,) for id_review in ids], "documentos": [{"_id": id_review} for id_review in ids],
+               "desplazamiento": indice + 1, "tipo_producto": 1}
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Pipeline con commits cada 2 lotes y sin inserciones en MongoDB por política (solo cuando MySQL las pide)."""
+    monkeypatch.setattr(politica_volcado, "COMMIT_CADA_LOTES", 2)
+    monkeypatch.setattr(politica_volcado, "COMMIT_CADA_SEGUNDOS", None)
+    monkeypatch.setattr(politica_volcado, "MONGO_INSERCION_CADA_LOTES", None)
+    monkeypatch.setattr(pipeline_ingesta, "MODO_BUCKETS_PRODUCTOS", False)
+    monkeypatch.setattr(puntos_control, "MODO_BUCKETS_PRODUCTOS", False)
+    monkeypatch.setattr(load_data, "id_review", 100)
+    monkeypatch.setattr(pipeline_ingesta, "generar_lotes_fichero",
+                        lambda file_in, batch_size: generar_lotes(n_lotes=5, tamano_lote=batch_size, id_inicial=100))
+
+############################################################################################################################################
+
+def test_avance_mongo_espera_a_los_lotes_solicitados():
+    avance = pipeline_ingesta.AvanceMongo()
+    parada = pipeline_ingesta.Event()
+
+    avance.solicitar(n_lotes=2)
+    assert not avance.toca_escribir(n_lotes_recibidos=1)
+    assert avance.toca_escribir(n_lotes_recibidos=3)
+
+    avance.registrar_escritura(n_lotes=3)
+    assert not avance.toca_escribir(n_lotes_recibidos=3)
+    assert avance.esperar(n_lotes=2, parada=parada)
+
+    parada.set()
+    assert not avance.esperar(n_lotes=4, parada=parada)
+
+def test_cada_commit_tiene_sus_documentos_en_mongo(pipeline):
+    base_datos = BaseDatosFalsa()
+    conexion = ConexionFalsa(coleccion=base_datos.coleccion)
+
+    pipeline_ingesta.insertar_datos_pipeline(file_in="datos.json", sql_conexion=conexion, mongodb_database=base_datos, batch_size=3,
+                                             tamano_colas=1)
+
+    assert len(conexion.commits) == 3
+    for documentos_en_commit, n_lotes in zip(conexion.commits, (2, 4, 5)):
+        assert set(range(100, 100 + 3 * n_lotes)) <= set(documentos_en_commit)
+    assert sorted(base_datos.coleccion.documentos) == conexion.confirmadas == list(range(100, 115))
+
+def test_commits_esperan_a_la_escritura_paralela(pipeline, monkeypatch):
+    monkeypatch.setattr(escritura_mongo_paralela, "ESCRITURA_MONGO_PARALELA", True)
+    base_datos = BaseDatosFalsa()
+    conexion = ConexionFalsa(coleccion=base_datos.coleccion)
+
+    pipeline_ingesta.insertar_datos_pipeline(file_in="datos.json", sql_conexion=conexion, mongodb_database=base_datos, batch_size=3,
+                                             tamano_colas=1)
+
+    for documentos_en_commit, n_lotes in zip(conexion.commits, (2, 4, 5)):
+        assert set(range(100, 100 + 3 * n_lotes)) <= set(documentos_en_commit)
+    assert sorted(base_datos.coleccion.documentos) == conexion.confirmadas == list(range(100, 115))
+
+def test_fallo_en_mysql_descarta_los_documentos_sin_commit(pipeline):
+    base_datos = BaseDatosFalsa()
+    conexion = ConexionFalsa(coleccion=base_datos.coleccion, commit_fallido=2)
+
+    with pytest.raises(RuntimeError):
+        pipeline_ingesta.insertar_datos_pipeline(file_in="datos.json", sql_conexion=conexion, mongodb_database=base_datos,
+                                                 batch_size=3, tamano_colas=1)
+
+    assert conexion.confirmadas == list(range(100, 106))
+    assert sorted(base_datos.coleccion.documentos) == conexion.confirmadas
@@ -0,0 +1,57 @@
+"""
+Pruebas de politica_volcado.py: cuándo toca hacer commit o insertar en MongoDB según los lotes, el tiempo y los bytes leídos.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+import politica_volcado
+from politica_volcado import PoliticaVolcado
+
+############################################################################################################################################
+
+def test_volcado_cada_lotes():
+    politica = PoliticaVolcado(cada_lotes=3)
+
+    assert [politica.registrar_lote(desplazamiento=100 * i) for i in range(1, 4)] == [False, False, True]
+
+    politica.reiniciar()
+    assert politica.lotes_pendientes == 0
+    assert not politica.registrar_lote(desplazamiento=400)
+
+def test_volcado_cada_bytes_desde_el_desplazamiento_inicial():
+    politica = PoliticaVolcado(cada_bytes=1000, desplazamiento_inicial=5000)
+
+    assert not politica.registrar_lote(desplazamiento=5600)
+    assert politica.registrar_lote(desplazamiento=6000)
+
+    # Tras el volcado, los bytes se cuentan desde el último lote registrado
+    politica.reiniciar()
+    assert not politica.registrar_lote(desplazamiento=6999)
+    assert politica.registrar_lote(desplazamiento=7000)
+
+def test_volcado_cada_segundos(monkeypatch):
+    reloj = [100.0]
+    monkeypatch.setattr(politica_volcado.time, "monotonic", lambda: reloj[0])
+    politica = PoliticaVolcado(cada_segundos=30)
+
+    reloj[0] = 129.0
+    assert not politica.registrar_lote(desplazamiento=1)
+    reloj[0] = 130.0
+    assert politica.registrar_lote(desplazamiento=2)
+
+def test_sin_criterios_solo_se_vuelca_al_final():
+    politica = PoliticaVolcado()
+
+    assert not any(politica.registrar_lote(desplazamiento=10 ** 9 * i) for i in range(1, 1000))
+
+def test_politicas_desde_la_configuracion(monkeypatch):
+    monkeypatch.setattr(politica_volcado, "COMMIT_CADA_LOTES", None)
+    monkeypatch.setattr(politica_volcado, "COMMIT_CADA_SEGUNDOS", None)
+    monkeypatch.setattr(politica_volcado, "COMMIT_CADA_MEGABYTES", 0.5)
+    politica = politica_volcado.crear_politica_commits(desplazamiento_inicial=10)
+
+    assert (politica.cada_lotes, politica.cada_segundos, politica.cada_bytes) == (None, None, 512 * 1024)
+    assert politica_volcado.megabytes_a_bytes(None) is None
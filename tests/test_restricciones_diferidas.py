@@ -0,0 +1,96 @@
+"""
+Pruebas de las restricciones de load_data.py: una carga con datos que no cumplen las restricciones no se da por buena, y los índices de
+Personas y Productos son UNIQUE (también en bases de datos que ya los tenían sin serlo).
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+import pytest
+import load_data
+
+############################################################################################################################################
+
+class CursorRestricciones:
+    """Cursor falso que apunta las sentencias y devuelve un número fijo de restricciones en information_schema."""
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def execute(self, sql):
+        self.conexion.sentencias.append(sql)
+
+    def fetchone(self):
+        return (self.conexion.n_restricciones,)
+
+    def close(self):
+        pass
+
+class ConexionRestricciones:
+    def __init__(self, n_restricciones):
+        self.n_restricciones = n_restricciones
+        self.sentencias = []
+
+    def cursor(self):
+        return CursorRestricciones(self)
+
+N_RESTRICCIONES = len(load_data.CLAVES_PRIMARIAS_SQL) + sum(len(claves) for claves in load_data.CLAVES_FORANEAS_SQL.values())
+
+############################################################################################################################################
+
+def test_datos_no_validos_lanzan_excepcion_sin_tocar_las_tablas(monkeypatch):
+    monkeypatch.setattr(load_data, "validar_restricciones_sql", lambda conexion: ["Review: 3 id_persona sin persona"])
+    conexion = ConexionRestricciones(n_restricciones=N_RESTRICCIONES)
+
+    with pytest.raises(ValueError):
+        load_data.crear_restricciones_diferidas_sql(conexion)
+
+    assert not any("ALTER TABLE" in sentencia for sentencia in conexion.sentencias)
+
+def test_faltan_restricciones_tras_crearlas(monkeypatch):
+    monkeypatch.setattr(load_data, "validar_restricciones_sql", lambda conexion: [])
+
+    with pytest.raises(RuntimeError):
+        load_data.crear_restricciones_diferidas_sql(ConexionRestricciones(n_restricciones=N_RESTRICCIONES - 1))
+
+def test_restricciones_creadas(monkeypatch):
+    monkeypatch.setattr(load_data, "validar_restricciones_sql", lambda conexion: [])
+    conexion = ConexionRestricciones(n_restricciones=N_RESTRICCIONES)
+
+    load_data.crear_restricciones_diferidas_sql(conexion)
+
+    assert sum("ALTER TABLE" in sentencia for sentencia in conexion.sentencias) == len(load_data.COLUMNAS_TABLAS_SQL)
+
+def test_indices_de_las_dimensiones_son_unicos():
+    assert "UNIQUE INDEX idx_personas_reviewerID (reviewerID)" in load_data.restricciones_tabla_sql("Personas")
+    assert "UNIQUE INDEX idx_productos_asin (asin, tipo_producto)" in load_data.restricciones_tabla_sql("Productos")
+
+class CursorIndices:
+    """Cursor falso con los índices que ya existen en information_schema (tabla, nombre, NON_UNIQUE)."""
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def execute(self, sql):
+        self.conexion.sentencias.append(sql)
+
+    def fetchall(self):
+        return self.conexion.indices
+
+    def close(self):
+        pass
+
+class ConexionIndices:
+    def __init__(self, indices):
+        self.indices = indices
+        self.sentencias = []
+
+    def cursor(self):
+        return CursorIndices(self)
+
+def test_indice_existente_sin_unique_se_vuelve_a_crear():
+    conexion = ConexionIndices([("personas", "idx_personas_reviewerID", 1), ("productos", "idx_productos_asin", 0)])
+
+    assert load_data.crear_indices_faltantes_sql(conexion) == ["idx_personas_reviewerID"]
+    assert any("DROP INDEX idx_personas_reviewerID, ADD UNIQUE INDEX idx_personas_reviewerID" in sentencia
+               for sentencia in conexion.sentencias)
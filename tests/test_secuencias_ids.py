@@ -0,0 +1,84 @@
+"""
+Pruebas de secuencias_ids.py: reparto de los identificadores de una secuencia en bloques reservados y continuación de un bloque al
+reanudar.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+import pytest
+import secuencias_ids
+from secuencias_ids import AsignadorIds
+
+############################################################################################################################################
+
+class CursorSecuencias:
+    """Cursor falso que reserva bloques de la tabla de secuencias: devuelve el final del bloque en lastrowid, como LAST_INSERT_ID()."""
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.lastrowid = None
+
+    def execute(self, query, args=None):
+        n_ids, nombre_secuencia = args
+
+        if nombre_secuencia not in self.conexion.secuencias:
+            return 0
+
+        self.conexion.secuencias[nombre_secuencia] += n_ids
+        self.conexion.reservas.append((nombre_secuencia, n_ids))
+        self.lastrowid = self.conexion.secuencias[nombre_secuencia]
+        return 1
+
+    def close(self):
+        pass
+
+class ConexionSecuencias:
+    def __init__(self, secuencias):
+        self.secuencias = secuencias
+        self.reservas = []
+
+    def cursor(self):
+        return CursorSecuencias(self)
+
+    def commit(self):
+        pass
+
+############################################################################################################################################
+
+def test_reserva_un_bloque_nuevo_al_gastar_el_anterior():
+    conexion = ConexionSecuencias({"id_persona": 10})
+    ids_personas = AsignadorIds(conexion=conexion, nombre_secuencia="id_persona", tamano_bloque=3)
+
+    assert [ids_personas.siguiente() for _ in range(7)] == list(range(10, 17))
+
+    # Siempre queda un bloque reservado: el tercero se reserva al dar el último identificador del segundo
+    assert conexion.reservas == [("id_persona", 3)] * 3
+    assert (ids_personas.siguiente_id, ids_personas.fin_bloque) == (17, 19)
+
+def test_bloques_de_dos_asignadores_no_se_solapan():
+    conexion = ConexionSecuencias({"id_review": 0})
+    primero = AsignadorIds(conexion=conexion, nombre_secuencia="id_review", tamano_bloque=4)
+    segundo = AsignadorIds(conexion=conexion, nombre_secuencia="id_review", tamano_bloque=4)
+
+    ids_primero = [primero.siguiente() for _ in range(6)]
+    ids_segundo = [segundo.siguiente() for _ in range(6)]
+
+    assert not set(ids_primero) & set(ids_segundo)
+
+def test_reanudar_con_el_bloque_del_punto_de_control():
+    conexion = ConexionSecuencias({"id_review": 100})
+    ids_review = AsignadorIds(conexion=conexion, nombre_secuencia="id_review", tamano_bloque=5, bloque_inicial=(42, 45))
+
+    # El bloque del punto de control se termina sin reservar nada, y después se sigue con uno nuevo
+    assert [ids_review.siguiente() for _ in range(2)] == [42, 43]
+    assert conexion.reservas == []
+
+    assert ids_review.siguiente() == 44
+    assert conexion.reservas == [("id_review", 5)]
+    assert ids_review.siguiente() == 100
+
+def test_secuencia_inexistente():
+    with pytest.raises(KeyError):
+        secuencias_ids.reservar_bloque_ids(conexion=ConexionSecuencias({}), nombre_secuencia="id_persona", n_ids=10)
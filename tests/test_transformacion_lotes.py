@@ -0,0 +1,59 @@
+"""
+Pruebas de transformacion_lotes.py: filas de Review y documentos de MongoDB de un lote, con los campos nulos.
+
+Autores: Jorge Carnicero Príncipe y Andrés Gil Vicente
+Grupo: 2º A IMAT
+Proyecto: Proyecto Final 2024/2025 - Bases de Datos
+
+"""
+
+import numpy as np
+import transformacion_lotes as tl
+
+############################################################################################################################################
+
+# (reviewerID, asin, reviewerName, helpful, reviewText, overall, summary, unixReviewTime, reviewTime)
+REGISTROS = [
+    ("R1", "A1", "Ana", [1, 2], "Muy bueno", 5.0, "Bien", 1400000000, "2014-05-13"),
+    ("R2", "A1", None, None, None, None, None, None, None),
+    ("R1", "A2", "Ana", [0, 0], "Regular", "3", "Meh", 1400086400, "2014-05-14"),
+]
+
+############################################################################################################################################
+
+def test_filas_review_con_nulos():
+    filas, _, columnas = tl.transformar_lote(id_review_inicial=10, ids_personas=[0, 1, 0], ids_productos=[0, 0, 1], registros=REGISTROS)
+
+    assert filas == [(10, 0, 0, 5.0, 1400000000, "2014-05-13"), (11, 1, 0, None, None, None), (12, 0, 1, 3.0, 1400086400, "2014-05-14")]
+    assert all(type(fila[3]) in (float, type(None)) for fila in filas)
+    assert columnas["unixReviewTime"].tolist() == [1400000000, tl.UNIX_REVIEW_TIME_NULO, 1400086400]
+    assert np.isnan(columnas["overall"][1])
+
+def test_esquema_compacto_sin_unix_review_time():
+    filas, _, _ = tl.transformar_lote(id_review_inicial=0, ids_personas=[0, 1, 0], ids_productos=[0, 0, 1], registros=REGISTROS,
+                                      incluir_unix_review_time=False)
+
+    assert filas[0] == (0, 0, 0, 5.0, "2014-05-13")
+
+def test_documentos_solo_con_campos_no_nulos():
+    _, documentos, _ = tl.transformar_lote(id_review_inicial=10, ids_personas=[0, 1, 0], ids_productos=[0, 0, 1], registros=REGISTROS)
+
+    assert documentos[0] == {"_id": 10, "helpful": [1, 2], "reviewText": "Muy bueno", "summary": "Bien"}
+    assert documentos[1] == {"_id": 11}
+
+def test_lote_vacio():
+    filas, documentos, columnas = tl.transformar_lote(id_review_inicial=0, ids_personas=[], ids_productos=[], registros=[])
+
+    assert filas == [] and documentos == [] and columnas["overall"].size == 0
+
+def test_columnas_igual_que_tuplas():
+    por_tuplas = tl.transformar_lote(id_review_inicial=0, ids_personas=[0, 1, 0], ids_productos=[0, 0, 1], registros=REGISTROS)
+    campos = list(zip(*REGISTROS))
+
+    por_columnas = tl.transformar_columnas(id_review_inicial=0, ids_personas=[0, 1, 0], ids_productos=[0, 0, 1],
+                                           overall=tl.columna_overall(campos[tl.CAMPO_OVERALL]),
+                                           unix_review_time=tl.columna_unix_review_time(campos[tl.CAMPO_UNIX_REVIEW_TIME]),
+                                           helpful=campos[tl.CAMPO_HELPFUL], reviewText=campos[tl.CAMPO_REVIEW_TEXT],
+                                           summary=campos[tl.CAMPO_SUMMARY], reviewTime=campos[tl.CAMPO_REVIEW_TIME])
+
+    assert por_columnas[:2] == por_tuplas[:2]